@@ -18,9 +18,11 @@ from analysis.integrations.legal_data import LegalData
 from analysis.templates.template_manager import LeilaoTemplateManager
 from analysis.templates import LeilaoTemplateManager
 from analysis.integrations import GeographicData, LegalData, MarketData
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Any, Optional, List
 from analysis.integrations.ibge_data import IBGEDataCollector
+from services.circuit_breaker import get_circuit_breaker
+from services.municipio_index import get_municipio_index, make_municipio, split_address
 
 # Carrega as variáveis de ambiente
 load_dotenv()
@@ -78,46 +80,19 @@ class Validator:
         ]
         return all(field in data for field in required_fields)
 
-class CacheManager:
-    def __init__(self):
-        self.cache = {}
-        self.expiry_time = timedelta(hours=24)
-
-    def get_cached_analysis(self, cache_key: str) -> Optional[Dict]:
-        """Recupera análise do cache se existir e não estiver expirada"""
-        if cache_key in self.cache:
-            entry = self.cache[cache_key]
-            if datetime.now() - entry["timestamp"] < self.expiry_time:
-                metrics_collector.record_cache_operation(True, len(self.cache))
-                return entry["data"]
-        metrics_collector.record_cache_operation(False, len(self.cache))
-        return None
-
-    def save_analysis(self, cache_key: str, analysis_data: Dict):
-        """Salva análise no cache com timestamp"""
-        self.cache[cache_key] = {
-            "data": analysis_data,
-            "timestamp": datetime.now()
-        }
-        metrics_collector.record_cache_operation(True, len(self.cache))
-
-    def clear_expired_cache(self):
-        """Remove entradas expiradas do cache"""
-        current_time = datetime.now()
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if current_time - entry["timestamp"] > self.expiry_time
-        ]
-        for key in expired_keys:
-            del self.cache[key]
-        metrics_collector.record_cache_operation(True, len(self.cache))
-
 class AnaliseImovel:
     """Classe principal para análise de imóveis em leilão"""
     
+    # Fontes externas (disjuntores) de que cada seção da análise depende
+    FONTES_SECOES = {
+        'analise_legal': ('legal_data',),
+        'analise_mercado': ('market_data',),
+        'dados_ibge': ('ibge_agregados',)
+    }
+    
     def __init__(self):
         self.client = OpenAI(api_key=OPENAI_API_KEY)
-        self.cache_manager = CacheManager()
+        self.cache_manager = cache_manager
         self.template_manager = LeilaoTemplateManager()
         self.legal_data = LegalData(api_key=LEGAL_API_KEY)
         self.legal_analyzer = LegalAnalyzer(self.legal_data)
@@ -126,6 +101,27 @@ class AnaliseImovel:
         self.validator = Validator()
         self.ibge_collector = IBGEDataCollector()
         
+    def _executar_secao(self, secao: str, secoes_degradadas: List[str], executar) -> Any:
+        """
+        Executa uma seção da análise respeitando os disjuntores das suas fontes.
+        
+        Se alguma fonte está com o circuito aberto, a seção não é executada e
+        volta marcada como degradada na hora, sem esperar timeouts. Se o
+        circuito abrir durante a execução, o resultado é mantido, mas a seção
+        também entra em ``secoes_degradadas``.
+        """
+        fontes = self.FONTES_SECOES.get(secao, ())
+        indisponiveis = [fonte for fonte in fontes if get_circuit_breaker(fonte).is_open()]
+        if indisponiveis:
+            logger.warning(f"Seção {secao} degradada: fontes indisponíveis {indisponiveis}")
+            secoes_degradadas.append(secao)
+            return {'status': 'degradado', 'fontes_indisponiveis': indisponiveis}
+            
+        resultado = executar()
+        if any(get_circuit_breaker(fonte).is_open() for fonte in fontes):
+            secoes_degradadas.append(secao)
+        return resultado
+        
     def _validate_url(self, url: str) -> bool:
         """Valida se a URL fornecida é válida"""
         url_pattern = re.compile(
@@ -261,11 +257,18 @@ class AnaliseImovel:
                     'idh': None
                 }
                 
-            # Tenta obter dados do IBGE
-            response = requests.get(f"https://servicodados.ibge.gov.br/api/v1/localidades/enderecos/{endereco}")
-            
-            if response.status_code == 404:
-                self.logger.warning("Endereço não encontrado no IBGE, retornando dados padrão")
+            # Município identificado pelo índice local do IBGE, sem acessar a rede
+            municipio = get_municipio_index().find_in_address(endereco)
+            
+            if municipio is None:
+                # Fora do índice local: a API de localidades do IBGE resolve o código
+                partes = split_address(endereco)
+                codigo = self.ibge_collector.get_codigo_municipio(*partes) if partes else None
+                if codigo is not None:
+                    municipio = make_municipio(codigo, partes[0])
+            
+            if municipio is None:
+                self.logger.warning("Município do endereço não encontrado no índice do IBGE, retornando dados padrão")
                 return {
                     'codigo_municipio': None,
                     'nome_municipio': None,
@@ -275,17 +278,12 @@ class AnaliseImovel:
                     'pib_per_capita': None,
                     'idh': None
                 }
-                
-            if response.status_code != 200:
-                raise Exception(f"Erro ao obter dados do IBGE: {response.status_code} {response.text}")
-                
-            data = response.json()
             
             return {
-                'codigo_municipio': data.get('municipio', {}).get('id'),
-                'nome_municipio': data.get('municipio', {}).get('nome'),
-                'uf': data.get('municipio', {}).get('microrregiao', {}).get('mesorregiao', {}).get('UF', {}).get('sigla'),
-                'regiao': data.get('municipio', {}).get('microrregiao', {}).get('mesorregiao', {}).get('UF', {}).get('regiao', {}).get('nome'),
+                'codigo_municipio': municipio.codigo,
+                'nome_municipio': municipio.nome,
+                'uf': municipio.uf,
+                'regiao': municipio.regiao_nome,
                 'populacao': None,  # Será preenchido posteriormente
                 'pib_per_capita': None,  # Será preenchido posteriormente
                 'idh': None  # Será preenchido posteriormente
@@ -333,16 +331,23 @@ class AnaliseImovel:
     def _analisar_dados_juridicos(self, numero_processo: str, matricula: str, edital: str, matricula_texto: str) -> Dict[str, Any]:
         """Analisa dados jurídicos do imóvel"""
         try:
-            # TODO: Implementar análise jurídica detalhada
-            return {
-                'riscos': 'não analisado',
-                'onus': 'não analisado',
-                'status': 'não analisado'
-            }
+            # Ainda não memorizada: o resultado provisório ficaria no cache depois
+            # da implementação. Ao implementar, usar ``memoize_stage("juridico", ...)``
+            # e registrar a etapa em ``CacheManager.STAGE_VERSIONS``.
+            return self._executar_analise_juridica(numero_processo, matricula, edital, matricula_texto)
         except Exception as e:
-            self.logger.error(f"Erro na análise jurídica: {str(e)}")
+            logger.error(f"Erro na análise jurídica: {str(e)}")
             return {}
             
+    def _executar_analise_juridica(self, numero_processo: str, matricula: str, edital: str, matricula_texto: str) -> Dict[str, Any]:
+        """Executa a análise jurídica (sem cache)"""
+        # TODO: Implementar análise jurídica detalhada
+        return {
+            'riscos': 'não analisado',
+            'onus': 'não analisado',
+            'status': 'não analisado'
+        }
+            
     def _analisar_dados_mercado(self, endereco: str, area: str, valor_inicial: str) -> Dict[str, Any]:
         """Analisa dados de mercado do imóvel"""
         try:
@@ -438,57 +443,11 @@ class AnaliseImovel:
     def _analisar_documentos(self) -> Dict[str, Any]:
         """Realiza a análise tradicional com documentos"""
         try:
-            # Verifica se já existe análise em cache
-            cached_analysis = self.cache_manager.get_cached_analysis(
-                self.edital or "",
-                self.matricula or ""
-            )
-            
-            if cached_analysis:
-                logger.info("Utilizando análise do cache")
-                return cached_analysis
-
-            # Prepara o prompt para o GPT-4
-            prompt = f"""
-            Analise os seguintes documentos de um imóvel em leilão e extraia as seguintes informações:
-            
-            Documentos fornecidos:
-            Edital: {self.edital or 'Não fornecido'}
-            Matrícula: {self.matricula or 'Não fornecido'}
-            
-            Por favor, identifique e retorne APENAS as seguintes informações em formato JSON:
-            1. Se há penhoras ou gravames (sim/não)
-            2. Se há dívidas de condomínio (sim/não)
-            3. Se o imóvel está ocupado (sim/não)
-            4. Observações relevantes sobre condições e riscos jurídicos
-            
-            Retorne APENAS o JSON, sem texto adicional.
-            """
-
-            logger.info("Iniciando análise com OpenAI")
-            response = self.client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "Você é um especialista em análise de documentos imobiliários."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=500
+            # Resumo memorizado pelo conteúdo dos documentos
+            return self.cache_manager.memoize_stage(
+                "resumo_llm", self._gerar_resumo_llm, self.edital or "", self.matricula or ""
             )
 
-            # Extrai e retorna a análise
-            analysis = response.choices[0].message.content
-            result = eval(analysis)  # Converte a string JSON em dicionário
-            
-            # Salva a análise no cache
-            self.cache_manager.save_analysis(
-                self.edital or "",
-                self.matricula or "",
-                result
-            )
-            
-            return result
-
         except Exception as e:
             logger.error(f"Erro na análise do imóvel: {str(e)}")
             return {
@@ -498,6 +457,42 @@ class AnaliseImovel:
                 "observacoes": f"Erro na análise: {str(e)}"
             }
 
+    def _gerar_resumo_llm(self) -> Dict[str, Any]:
+        """Gera o resumo dos documentos com o modelo de linguagem (sem cache)"""
+        # Prepara o prompt para o GPT-4
+        prompt = f"""
+        Analise os seguintes documentos de um imóvel em leilão e extraia as seguintes informações:
+        
+        Documentos fornecidos:
+        Edital: {self.edital or 'Não fornecido'}
+        Matrícula: {self.matricula or 'Não fornecido'}
+        
+        Por favor, identifique e retorne APENAS as seguintes informações em formato JSON:
+        1. Se há penhoras ou gravames (sim/não)
+        2. Se há dívidas de condomínio (sim/não)
+        3. Se o imóvel está ocupado (sim/não)
+        4. Observações relevantes sobre condições e riscos jurídicos
+        
+        Retorne APENAS o JSON, sem texto adicional.
+        """
+
+        logger.info("Iniciando análise com OpenAI")
+        response = self.client.chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": "Você é um especialista em análise de documentos imobiliários."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            max_tokens=500
+        )
+
+        # Extrai e retorna a análise
+        analysis = response.choices[0].message.content
+        result = eval(analysis)  # Converte a string JSON em dicionário
+        
+        return result
+
     def _processar_edital_pdf(self, pdf_url: str) -> str:
         """Processa o conteúdo do edital em PDF"""
         try:
@@ -572,26 +567,6 @@ class AnaliseImovel:
             }
         } 
 
-    def _check_cache(self, key: str) -> Dict[str, Any] | None:
-        """Verifica se existe um resultado em cache para a chave fornecida."""
-        if key in self.cache:
-            cached_data = self.cache[key]
-            if datetime.now() - cached_data['timestamp'] < self.cache_ttl:
-                metrics_collector.record_cache_hit()
-                return cached_data['result']
-            else:
-                del self.cache[key]
-        
-        metrics_collector.record_cache_miss()
-        return None
-    
-    def _update_cache(self, key: str, result: Dict[str, Any]) -> None:
-        """Atualiza o cache com um novo resultado."""
-        self.cache[key] = {
-            'timestamp': datetime.now(),
-            'result': result
-        }
-    
     def analyze_property(self, edital_texto: str, matricula_texto: str) -> Dict[str, Any]:
         """
         Analisa um imóvel com base no texto do edital e da matrícula.
@@ -604,24 +579,19 @@ class AnaliseImovel:
             Dict contendo as análises realizadas
         """
         start_time = time.time()
-        cache_key = f"{hash(edital_texto)}_{hash(matricula_texto)}"
         
         try:
-            # Verifica cache
-            cached_result = self._check_cache(cache_key)
-            if cached_result:
-                return cached_result
-            
-            # Realiza as análises
+            # Cada documento é analisado uma única vez por conteúdo, entre lotes e workers
             result = {
-                'edital': self._analyze_edital(edital_texto),
-                'matricula': self._analyze_matricula(matricula_texto),
+                'edital': self.cache_manager.memoize_stage(
+                    "edital", lambda: self._analyze_edital(edital_texto), edital_texto
+                ),
+                'matricula': self.cache_manager.memoize_stage(
+                    "matricula", lambda: self._analyze_matricula(matricula_texto), matricula_texto
+                ),
                 'timestamp': datetime.now().isoformat()
             }
             
-            # Atualiza cache
-            self._update_cache(cache_key, result)
-            
             # Registra métricas
             duration = time.time() - start_time
             metrics_collector.record_api_call('analyze_property', duration)
@@ -701,21 +671,27 @@ class AnaliseImovel:
             if 'erro' in dados_preliminares:
                 return dados_preliminares
                 
+            # Seções cujas fontes estão fora do ar são puladas e marcadas como degradadas
+            secoes_degradadas = []
+            
             # Analisa dados geográficos
-            dados_geograficos = self._analisar_dados_geograficos(dados_preliminares.get('endereco', ''))
+            dados_geograficos = self._executar_secao(
+                'dados_geograficos', secoes_degradadas,
+                lambda: self._analisar_dados_geograficos(dados_preliminares.get('endereco', ''))
+            )
             
             # Analisa aspectos legais
-            analise_legal = self.legal_analyzer.analyze({
+            analise_legal = self._executar_secao('analise_legal', secoes_degradadas, lambda: self.legal_analyzer.analyze({
                 'processo': dados_preliminares.get('processo'),
                 'matricula': dados_preliminares.get('matricula')
-            })
+            }))
             
             # Analisa aspectos de mercado
-            analise_mercado = self.market_analyzer.analyze({
+            analise_mercado = self._executar_secao('analise_mercado', secoes_degradadas, lambda: self.market_analyzer.analyze({
                 'endereco': dados_preliminares.get('endereco'),
                 'area': dados_preliminares.get('area'),
                 'valor_avaliacao': dados_preliminares.get('valor_avaliacao')
-            })
+            }))
             
             # Compila os resultados
             resultado = {
@@ -723,6 +699,7 @@ class AnaliseImovel:
                 'dados_geograficos': dados_geograficos,
                 'analise_legal': analise_legal,
                 'analise_mercado': analise_mercado,
+                'secoes_degradadas': secoes_degradadas,
                 'data_analise': datetime.now().isoformat(),
                 'status': 'completa'
             }
@@ -845,18 +822,16 @@ class AnaliseImovel:
             # Extrai dados do imóvel
             dados_imovel = await self._extrair_dados_imovel(url)
             
-            # Obtém dados do IBGE
-            codigo_municipio = self.ibge_collector.get_codigo_municipio(
-                dados_imovel.get("cidade", ""),
-                dados_imovel.get("estado", "")
-            )
-            
-            if codigo_municipio:
-                dados_ibge = self.ibge_collector.get_municipio_data(codigo_municipio)
+            # Obtém dados do IBGE (pulado na hora se a API de agregados estiver fora do ar)
+            secoes_degradadas = []
+            dados_ibge = self._executar_secao('dados_ibge', secoes_degradadas, lambda: self._coletar_dados_ibge(dados_imovel))
+            if dados_ibge is not None:
                 dados_imovel["dados_ibge"] = dados_ibge
+            dados_imovel["secoes_degradadas"] = secoes_degradadas
 
-            # Salva no cache
-            self.cache_manager.set(cache_key, dados_imovel)
+            # Salva no cache (análises degradadas não, para serem refeitas quando a fonte voltar)
+            if not secoes_degradadas:
+                self.cache_manager.set(cache_key, dados_imovel)
             
             return dados_imovel
 
@@ -864,12 +839,21 @@ class AnaliseImovel:
             logger.error(f"Erro ao analisar imóvel: {str(e)}")
             raise
 
+    def _coletar_dados_ibge(self, dados_imovel: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Obtém os dados do IBGE do município do imóvel"""
+        codigo_municipio = self.ibge_collector.get_codigo_municipio(
+            dados_imovel.get("cidade", ""),
+            dados_imovel.get("estado", "")
+        )
+        if not codigo_municipio:
+            return None
+        return self.ibge_collector.get_municipio_data(codigo_municipio)
+
 async def analyze_property(edital_texto: Optional[str] = None, matricula_texto: Optional[str] = None) -> Dict:
     """Analisa o edital e a matrícula do imóvel usando GPT"""
     try:
-        # Verifica se há análise em cache
-        cache_key = f"{edital_texto[:100]}_{matricula_texto[:100]}"
-        cached_result = cache_manager.get_cached_analysis(cache_key)
+        # Verifica se há análise em cache (chave pelo conteúdo completo dos documentos)
+        cached_result = cache_manager.get_cached_analysis(edital_texto or "", matricula_texto or "")
         if cached_result:
             logger.info("Análise encontrada em cache")
             return cached_result
@@ -917,7 +901,7 @@ async def analyze_property(edital_texto: Optional[str] = None, matricula_texto:
         }
 
         # Salva no cache
-        cache_manager.save_analysis(cache_key, result)
+        cache_manager.save_analysis(edital_texto or "", matricula_texto or "", result)
         logger.info("Análise concluída e salva em cache")
         
         return result
@@ -1,17 +1,29 @@
+import asyncio
+import re
 import requests
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from services.http_client import get_http_client
+from services.async_http_client import HTTP_ERRORS, get_async_http_client
+from services.cep_index import CepIndex, get_cep_index
 from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
+_CEP_PATTERN = re.compile(r'(?<!\d)\d{5}-?\d{3}(?!\d)')
+
 class AddressAPI:
-    def __init__(self):
+    def __init__(self, http_client: Optional[requests.Session] = None, cep_index: Optional[CepIndex] = None):
         self.base_url = "https://viacep.com.br/ws"
+        self.http = http_client or get_http_client()
+        self.ceps = cep_index or get_cep_index()
         
     def get_address_info(self, cep: str) -> Dict[str, Any]:
         """
-        Busca informações de endereço pelo CEP usando a API ViaCEP.
+        Busca informações de endereço pelo CEP.
+        
+        O índice local de CEPs responde primeiro; o ViaCEP só é consultado
+        para CEPs desconhecidos, e cada resposta dele é gravada no índice.
         
         Args:
             cep: CEP no formato 00000000 (apenas números)
@@ -24,42 +36,86 @@ class AddressAPI:
             cep = ''.join(filter(str.isdigit, cep))
             
             if len(cep) != 8:
-                return {
-                    "error": "CEP inválido",
-                    "message": "O CEP deve conter 8 dígitos"
-                }
+                return self._cep_invalido()
+
+            local = self.ceps.lookup(cep)
+            if local is not None:
+                return self._parse_address_info(local)
                 
-            response = requests.get(f"{self.base_url}/{cep}/json/")
+            response = self.http.get(f"{self.base_url}/{cep}/json/")
             response.raise_for_status()
             
-            data = response.json()
-            
-            if "erro" in data:
-                return {
-                    "error": "CEP não encontrado",
-                    "message": "O CEP informado não existe"
-                }
-                
-            return {
-                "cep": data["cep"],
-                "logradouro": data["logradouro"],
-                "complemento": data["complemento"],
-                "bairro": data["bairro"],
-                "cidade": data["localidade"],
-                "estado": data["uf"],
-                "ibge": data["ibge"],
-                "gia": data["gia"],
-                "ddd": data["ddd"],
-                "siafi": data["siafi"]
-            }
+            return self._aprender(cep, response.json())
             
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar CEP: {str(e)}")
+            return self._faixa_ou_erro(cep, e)
+
+    async def get_address_info_async(self, cep: str) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_address_info``."""
+        try:
+            cep = ''.join(filter(str.isdigit, cep))
+            if len(cep) != 8:
+                return self._cep_invalido()
+            local = self.ceps.lookup(cep)
+            if local is not None:
+                return self._parse_address_info(local)
+            data = await get_async_http_client().get_json(f"{self.base_url}/{cep}/json/")
+            return self._aprender(cep, data)
+        except HTTP_ERRORS as e:
+            return self._faixa_ou_erro(cep, e)
+
+    def _aprender(self, cep: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Grava a resposta do ViaCEP no índice local e a converte"""
+        try:
+            self.ceps.learn(cep, data)
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar o CEP {cep} no índice local: {str(e)}")
+        return self._parse_address_info(data)
+
+    def _faixa_ou_erro(self, cep: str, e: Exception) -> Dict[str, Any]:
+        """Sem o ViaCEP, responde com a cidade da faixa de CEP, se conhecida"""
+        faixa = self.ceps.faixa(cep)
+        if faixa is None:
+            return self._erro_cep(e)
+        logger.warning(f"ViaCEP indisponível ({str(e)}); CEP {cep} resolvido pela faixa")
+        resultado = self._parse_address_info(dict(faixa, cep=f"{cep[:5]}-{cep[5:]}", logradouro="",
+                                                  complemento="", bairro=""))
+        resultado["precisao"] = "faixa"
+        return resultado
+
+    def _cep_invalido(self) -> Dict[str, Any]:
+        return {
+            "error": "CEP inválido",
+            "message": "O CEP deve conter 8 dígitos"
+        }
+
+    def _erro_cep(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao consultar CEP: {str(e)}")
+        return {
+            "error": "Erro na consulta",
+            "message": "Não foi possível consultar o CEP"
+        }
+
+    def _parse_address_info(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        if "erro" in data:
             return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar o CEP"
+                "error": "CEP não encontrado",
+                "message": "O CEP informado não existe"
             }
             
+        return {
+            "cep": data["cep"],
+            "logradouro": data["logradouro"],
+            "complemento": data["complemento"],
+            "bairro": data["bairro"],
+            "cidade": data["localidade"],
+            "estado": data["uf"],
+            "ibge": data["ibge"],
+            "gia": data["gia"],
+            "ddd": data["ddd"],
+            "siafi": data["siafi"]
+        }
+            
     def search_address(self, uf: str, cidade: str, logradouro: str) -> Dict[str, Any]:
         """
         Busca CEP por endereço usando a API ViaCEP.
@@ -78,44 +134,70 @@ class AddressAPI:
             cidade = quote(cidade)
             logradouro = quote(logradouro)
             
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/{uf}/{cidade}/{logradouro}/json/"
             )
             response.raise_for_status()
             
-            data = response.json()
-            
-            if isinstance(data, dict) and "erro" in data:
-                return {
-                    "error": "Endereço não encontrado",
-                    "message": "Nenhum endereço encontrado com os parâmetros informados"
-                }
-                
-            # Se retornar apenas um resultado, converte para lista
-            if isinstance(data, dict):
-                data = [data]
-                
-            return {
-                "results": [
-                    {
-                        "cep": item["cep"],
-                        "logradouro": item["logradouro"],
-                        "complemento": item["complemento"],
-                        "bairro": item["bairro"],
-                        "cidade": item["localidade"],
-                        "estado": item["uf"]
-                    }
-                    for item in data
-                ]
-            }
+            return self._parse_search(response.json())
             
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao buscar endereço: {str(e)}")
+            return self._erro_busca(e)
+
+    async def search_address_async(self, uf: str, cidade: str, logradouro: str) -> Dict[str, Any]:
+        """Versão assíncrona de ``search_address``."""
+        try:
+            url = f"{self.base_url}/{quote(uf.upper())}/{quote(cidade)}/{quote(logradouro)}/json/"
+            return self._parse_search(await get_async_http_client().get_json(url))
+        except HTTP_ERRORS as e:
+            return self._erro_busca(e)
+
+    def _erro_busca(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao buscar endereço: {str(e)}")
+        return {
+            "error": "Erro na consulta",
+            "message": "Não foi possível buscar o endereço"
+        }
+
+    def _parse_search(self, data: Any) -> Dict[str, Any]:
+        if isinstance(data, dict) and "erro" in data:
             return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível buscar o endereço"
+                "error": "Endereço não encontrado",
+                "message": "Nenhum endereço encontrado com os parâmetros informados"
             }
             
+        # Se retornar apenas um resultado, converte para lista
+        if isinstance(data, dict):
+            data = [data]
+            
+        return {
+            "results": [
+                {
+                    "cep": item["cep"],
+                    "logradouro": item["logradouro"],
+                    "complemento": item["complemento"],
+                    "bairro": item["bairro"],
+                    "cidade": item["localidade"],
+                    "estado": item["uf"]
+                }
+                for item in data
+            ]
+        }
+            
+    def _split_address(self, address: str) -> Tuple[Optional[str], Optional[Tuple[str, str, str]]]:
+        """Extrai o CEP e as partes (uf, cidade, logradouro) de um endereço, quando presentes."""
+        # Último grupo de 8 dígitos (com ou sem hífen): o número do imóvel não entra no CEP
+        ceps = _CEP_PATTERN.findall(address)
+        cep = ceps[-1].replace('-', '') if ceps else ''
+        partes = None
+        parts = address.split(',')
+        if len(parts) >= 2:
+            logradouro = parts[0].strip()
+            cidade_estado = parts[1].strip().split('-')
+            if len(cidade_estado) == 2:
+                partes = (cidade_estado[1].strip(), cidade_estado[0].strip(), logradouro)
+        return (cep if len(cep) == 8 else None), partes
+
     def enrich_address(self, address: str) -> Dict[str, Any]:
         """
         Tenta enriquecer um endereço com informações adicionais.
@@ -127,29 +209,86 @@ class AddressAPI:
             Dict com endereço enriquecido ou erro
         """
         try:
-            # Tenta extrair CEP do endereço
-            cep = ''.join(filter(str.isdigit, address))
-            if len(cep) == 8:
-                return self.get_address_info(cep)
+            cep, partes = self._split_address(address)
+            local = self._endereco_local(cep)
+            if local is not None:
+                return local
+            if not cep and not partes:
+                return self._endereco_invalido()
+
+            # Busca pelo CEP primeiro; a busca por partes só é feita se ele falhar
+            resultado = self.get_address_info(cep) if cep else None
+            if partes and (resultado is None or "error" in resultado):
+                busca = self.search_address(*partes)
+                if resultado is None or "error" not in busca:
+                    resultado = busca
+            return resultado
+
+        except Exception as e:
+            return self._erro_enriquecimento(e)
+
+    async def enrich_address_async(self, address: str) -> Dict[str, Any]:
+        """
+        Versão assíncrona de ``enrich_address``.
+        
+        Quando o endereço tem CEP e também logradouro/cidade/UF, as duas
+        consultas são feitas em paralelo; o resultado do CEP tem prioridade e
+        a busca por partes é usada se o CEP falhar.
+        """
+        try:
+            cep, partes = self._split_address(address)
+            local = self._endereco_local(cep)
+            if local is not None:
+                return local
+            consultas = []
+            if cep:
+                consultas.append(self.get_address_info_async(cep))
+            if partes:
+                consultas.append(self.search_address_async(*partes))
+            if not consultas:
+                return self._endereco_invalido()
                 
-            # Se não encontrar CEP, tenta buscar por partes do endereço
-            parts = address.split(',')
-            if len(parts) >= 2:
-                logradouro = parts[0].strip()
-                cidade_estado = parts[1].strip().split('-')
-                if len(cidade_estado) == 2:
-                    cidade = cidade_estado[0].strip()
-                    uf = cidade_estado[1].strip()
-                    return self.search_address(uf, cidade, logradouro)
-                    
-            return {
-                "error": "Endereço inválido",
-                "message": "Não foi possível processar o endereço informado"
-            }
+            resultados = await asyncio.gather(*consultas)
+            for resultado in resultados:
+                if "error" not in resultado:
+                    return resultado
+            return resultados[0]
             
         except Exception as e:
-            logger.error(f"Erro ao enriquecer endereço: {str(e)}")
-            return {
-                "error": "Erro no processamento",
-                "message": "Não foi possível processar o endereço"
-            } 
\ No newline at end of file
+            return self._erro_enriquecimento(e)
+
+    def _endereco_local(self, cep: Optional[str]) -> Optional[Dict[str, Any]]:
+        # CEP já conhecido: responde do índice local, sem nenhuma consulta
+        local = self.ceps.lookup(cep) if cep else None
+        if local is not None and "erro" not in local:
+            return self._parse_address_info(local)
+        return None
+
+    def _endereco_invalido(self) -> Dict[str, Any]:
+        return {
+            "error": "Endereço inválido",
+            "message": "Não foi possível processar o endereço informado"
+        }
+
+    def _erro_enriquecimento(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao enriquecer endereço: {str(e)}")
+        return {
+            "error": "Erro no processamento",
+            "message": "Não foi possível processar o endereço"
+        }
+
+    def enrich_addresses(self, addresses: List[str]) -> List[Dict[str, Any]]:
+        """
+        Enriquece vários endereços, um de cada vez.
+        
+        Args:
+            addresses: Lista de endereços completos
+            
+        Returns:
+            Lista de resultados, na mesma ordem dos endereços
+        """
+        return [self.enrich_address(address) for address in addresses]
+
+    async def enrich_addresses_async(self, addresses: List[str]) -> List[Dict[str, Any]]:
+        """Versão assíncrona de ``enrich_addresses``, com as consultas em paralelo (limitadas pelo cliente HTTP)."""
+        return list(await asyncio.gather(*(self.enrich_address_async(address) for address in addresses)))
@@ -1,208 +1,265 @@
+import asyncio
+import aiohttp
 import requests
 import logging
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+from services.http_client import get_http_client
+from services.async_http_client import HTTP_ERRORS, get_async_http_client
+from services.series_store import SeriesStore, accumulated_rate, annualize_rate, get_series_store
+from datetime import date, datetime, timedelta
 
 logger = logging.getLogger(__name__)
 
+# Códigos das séries do SGS usadas nos indicadores
+SERIE_SELIC = 11
+SERIE_IPCA = 433
+
+# Mapeamento de moedas para códigos BCB
+CURRENCY_CODES = {
+    "USD": 1,
+    "EUR": 21619,
+    "GBP": 21620
+}
+
+def _sem_dados(e: Exception) -> bool:
+    """O SGS responde 404 quando não há pontos na faixa consultada."""
+    status = getattr(e, "status", None) or getattr(getattr(e, "response", None), "status_code", None)
+    return status == 404
+
 class BCBAPI:
-    def __init__(self):
+    def __init__(self, http_client: Optional[requests.Session] = None,
+                 series_store: Optional[SeriesStore] = None):
         self.base_url = "https://api.bcb.gov.br/dados/serie/bcdata.sgs"
-        
+        self.http = http_client or get_http_client()
+        # Séries guardadas localmente: cada consulta baixa só as datas que faltam
+        self.series = series_store or get_series_store()
+
+    def _periodo(self, start_date: Optional[str], end_date: Optional[str], dias: int) -> Tuple[str, str]:
+        """Usa os últimos ``dias`` dias se as datas não forem fornecidas."""
+        if not start_date or not end_date:
+            end_date = datetime.now().strftime("%d/%m/%Y")
+            start_date = (datetime.now() - timedelta(days=dias)).strftime("%d/%m/%Y")
+        return start_date, end_date
+
+    def _serie_request(self, codigo: int, start_date: date, end_date: date) -> Tuple[str, Dict[str, Any]]:
+        """Monta a URL e os parâmetros da consulta de uma série do SGS."""
+        return f"{self.base_url}.{codigo}/dados", {
+            "formato": "json",
+            "dataInicial": start_date.strftime("%d/%m/%Y"),
+            "dataFinal": end_date.strftime("%d/%m/%Y")
+        }
+
+    def _parse_serie(self, codigo: int, start_date: str, end_date: str) -> Dict[str, Any]:
+        """Monta a resposta de uma série a partir dos dados armazenados."""
+        datas, valores = self.series.window(codigo, start_date, end_date)
+        return {
+            "periodo": {
+                "inicio": start_date,
+                "fim": end_date
+            },
+            "dados": [
+                {
+                    "data": data.strftime("%d/%m/%Y"),
+                    "valor": valor
+                }
+                for data, valor in zip(datas.astype(date), valores.tolist())
+            ]
+        }
+
+    def _pontos(self, data: List[Dict[str, Any]]) -> List[Tuple[str, Any]]:
+        return [(item["data"], item["valor"]) for item in data]
+
+    def _faixa_vazia(self, codigo: int, e: Exception) -> List[Tuple[str, Any]]:
+        """Um 404 em série já armazenada é uma faixa sem pontos (ex.: fim de semana); senão, erro."""
+        if _sem_dados(e) and self.series.size(codigo):
+            return []
+        raise e
+
+    def _consultar_serie(self, codigo: int, start_date: str, end_date: str) -> Dict[str, Any]:
+        for inicio, fim in self.series.missing_ranges(codigo, start_date, end_date):
+            url, params = self._serie_request(codigo, inicio, fim)
+            try:
+                response = self.http.get(url, params=params)
+                response.raise_for_status()
+                pontos = self._pontos(response.json())
+            except requests.exceptions.HTTPError as e:
+                pontos = self._faixa_vazia(codigo, e)
+            self.series.merge(codigo, pontos, inicio, fim)
+        return self._parse_serie(codigo, start_date, end_date)
+
+    async def _consultar_serie_async(self, codigo: int, start_date: str, end_date: str) -> Dict[str, Any]:
+        faixas = self.series.missing_ranges(codigo, start_date, end_date)
+
+        async def baixar(inicio: date, fim: date) -> List[Tuple[str, Any]]:
+            url, params = self._serie_request(codigo, inicio, fim)
+            try:
+                return self._pontos(await get_async_http_client().get_json(url, params=params))
+            except aiohttp.ClientResponseError as e:
+                return self._faixa_vazia(codigo, e)
+
+        for (inicio, fim), pontos in zip(faixas, await asyncio.gather(*(baixar(*faixa) for faixa in faixas))):
+            self.series.merge(codigo, pontos, inicio, fim)
+        return self._parse_serie(codigo, start_date, end_date)
+
     def get_selic_rate(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
         """
         Obtém a taxa SELIC histórica.
-        
+
         Args:
             start_date: Data inicial no formato dd/mm/yyyy
             end_date: Data final no formato dd/mm/yyyy
-            
+
         Returns:
             Dict com dados da SELIC ou erro
         """
         try:
             # Se não fornecidas datas, usa últimos 12 meses
-            if not start_date or not end_date:
-                end_date = datetime.now().strftime("%d/%m/%Y")
-                start_date = (datetime.now() - timedelta(days=365)).strftime("%d/%m/%Y")
-                
-            response = requests.get(
-                f"{self.base_url}.11/dados",
-                params={
-                    "formato": "json",
-                    "dataInicial": start_date,
-                    "dataFinal": end_date
-                }
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            return {
-                "periodo": {
-                    "inicio": start_date,
-                    "fim": end_date
-                },
-                "dados": [
-                    {
-                        "data": item["data"],
-                        "valor": item["valor"]
-                    }
-                    for item in data
-                ]
-            }
-            
+            start_date, end_date = self._periodo(start_date, end_date, 365)
+            return self._consultar_serie(SERIE_SELIC, start_date, end_date)
+
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar SELIC: {str(e)}")
-            return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar a taxa SELIC"
-            }
-            
+            return self._erro_selic(e)
+
+    async def get_selic_rate_async(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_selic_rate``."""
+        try:
+            start_date, end_date = self._periodo(start_date, end_date, 365)
+            return await self._consultar_serie_async(SERIE_SELIC, start_date, end_date)
+        except HTTP_ERRORS as e:
+            return self._erro_selic(e)
+
+    def _erro_selic(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao consultar SELIC: {str(e)}")
+        return {
+            "error": "Erro na consulta",
+            "message": "Não foi possível consultar a taxa SELIC"
+        }
+
     def get_inflation(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
         """
         Obtém dados de inflação (IPCA).
-        
+
         Args:
             start_date: Data inicial no formato dd/mm/yyyy
             end_date: Data final no formato dd/mm/yyyy
-            
+
         Returns:
             Dict com dados de inflação ou erro
         """
         try:
-            if not start_date or not end_date:
-                end_date = datetime.now().strftime("%d/%m/%Y")
-                start_date = (datetime.now() - timedelta(days=365)).strftime("%d/%m/%Y")
-                
-            response = requests.get(
-                f"{self.base_url}.433/dados",
-                params={
-                    "formato": "json",
-                    "dataInicial": start_date,
-                    "dataFinal": end_date
-                }
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            return {
-                "periodo": {
-                    "inicio": start_date,
-                    "fim": end_date
-                },
-                "dados": [
-                    {
-                        "data": item["data"],
-                        "valor": item["valor"]
-                    }
-                    for item in data
-                ]
-            }
-            
+            start_date, end_date = self._periodo(start_date, end_date, 365)
+            return self._consultar_serie(SERIE_IPCA, start_date, end_date)
+
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar inflação: {str(e)}")
-            return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar dados de inflação"
-            }
-            
-    def get_exchange_rate(self, currency: str = "USD", 
-                         start_date: str = None, 
+            return self._erro_inflacao(e)
+
+    async def get_inflation_async(self, start_date: str = None, end_date: str = None) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_inflation``."""
+        try:
+            start_date, end_date = self._periodo(start_date, end_date, 365)
+            return await self._consultar_serie_async(SERIE_IPCA, start_date, end_date)
+        except HTTP_ERRORS as e:
+            return self._erro_inflacao(e)
+
+    def _erro_inflacao(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao consultar inflação: {str(e)}")
+        return {
+            "error": "Erro na consulta",
+            "message": "Não foi possível consultar dados de inflação"
+        }
+
+    def get_exchange_rate(self, currency: str = "USD",
+                         start_date: str = None,
                          end_date: str = None) -> Dict[str, Any]:
         """
         Obtém dados de câmbio.
-        
+
         Args:
             currency: Moeda (USD, EUR, etc)
             start_date: Data inicial no formato dd/mm/yyyy
             end_date: Data final no formato dd/mm/yyyy
-            
+
         Returns:
             Dict com dados de câmbio ou erro
         """
         try:
-            if not start_date or not end_date:
-                end_date = datetime.now().strftime("%d/%m/%Y")
-                start_date = (datetime.now() - timedelta(days=30)).strftime("%d/%m/%Y")
-                
-            # Mapeamento de moedas para códigos BCB
-            currency_codes = {
-                "USD": 1,
-                "EUR": 21619,
-                "GBP": 21620
-            }
-            
-            code = currency_codes.get(currency.upper(), 1)  # Default para USD
-            
-            response = requests.get(
-                f"{self.base_url}.{code}/dados",
-                params={
-                    "formato": "json",
-                    "dataInicial": start_date,
-                    "dataFinal": end_date
-                }
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            return {
-                "moeda": currency.upper(),
-                "periodo": {
-                    "inicio": start_date,
-                    "fim": end_date
-                },
-                "dados": [
-                    {
-                        "data": item["data"],
-                        "valor": item["valor"]
-                    }
-                    for item in data
-                ]
-            }
-            
+            start_date, end_date = self._periodo(start_date, end_date, 30)
+            code = CURRENCY_CODES.get(currency.upper(), 1)  # Default para USD
+            return {"moeda": currency.upper(), **self._consultar_serie(code, start_date, end_date)}
+
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar câmbio: {str(e)}")
-            return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar dados de câmbio"
-            }
-            
+            return self._erro_cambio(e)
+
+    async def get_exchange_rate_async(self, currency: str = "USD",
+                                      start_date: str = None,
+                                      end_date: str = None) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_exchange_rate``."""
+        try:
+            start_date, end_date = self._periodo(start_date, end_date, 30)
+            code = CURRENCY_CODES.get(currency.upper(), 1)
+            return {"moeda": currency.upper(), **await self._consultar_serie_async(code, start_date, end_date)}
+        except HTTP_ERRORS as e:
+            return self._erro_cambio(e)
+
+    def _erro_cambio(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao consultar câmbio: {str(e)}")
+        return {
+            "error": "Erro na consulta",
+            "message": "Não foi possível consultar dados de câmbio"
+        }
+
     def get_economic_indicators(self) -> Dict[str, Any]:
         """
         Obtém os principais indicadores econômicos.
-        
+
+        Para consultar as três séries em paralelo, use ``get_economic_indicators_async``.
+
         Returns:
             Dict com indicadores econômicos ou erro
         """
         try:
-            # Taxa SELIC atual
-            selic = self.get_selic_rate()
-            if "error" in selic:
-                return selic
-                
-            # Inflação acumulada 12 meses
-            inflacao = self.get_inflation()
-            if "error" in inflacao:
-                return inflacao
-                
-            # Câmbio atual
-            cambio = self.get_exchange_rate()
-            if "error" in cambio:
-                return cambio
-                
-            return {
-                "selic": selic["dados"][-1]["valor"] if selic["dados"] else None,
-                "inflacao_12m": sum(item["valor"] for item in inflacao["dados"][-12:]) if inflacao["dados"] else None,
-                "cambio_usd": cambio["dados"][-1]["valor"] if cambio["dados"] else None,
-                "data_atualizacao": datetime.now().strftime("%d/%m/%Y")
-            }
-            
+            # Taxa SELIC atual, inflação acumulada 12 meses e câmbio atual
+            return self._indicadores(self.get_selic_rate(), self.get_inflation(), self.get_exchange_rate())
         except Exception as e:
-            logger.error(f"Erro ao obter indicadores: {str(e)}")
-            return {
-                "error": "Erro no processamento",
-                "message": "Não foi possível obter os indicadores econômicos"
-            } 
\ No newline at end of file
+            return self._erro_indicadores(e)
+
+    async def get_economic_indicators_async(self) -> Dict[str, Any]:
+        """
+        Obtém os principais indicadores econômicos consultando SELIC, IPCA e
+        câmbio simultaneamente.
+
+        Returns:
+            Dict com indicadores econômicos ou erro
+        """
+        try:
+            # Taxa SELIC atual, inflação acumulada 12 meses e câmbio atual
+            selic, inflacao, cambio = await asyncio.gather(
+                self.get_selic_rate_async(),
+                self.get_inflation_async(),
+                self.get_exchange_rate_async()
+            )
+            return self._indicadores(selic, inflacao, cambio)
+        except Exception as e:
+            return self._erro_indicadores(e)
+
+    def _indicadores(self, selic: Dict[str, Any], inflacao: Dict[str, Any], cambio: Dict[str, Any]) -> Dict[str, Any]:
+        for resultado in (selic, inflacao, cambio):
+            if "error" in resultado:
+                return resultado
+
+        # IPCA acumulado com capitalização composta; SELIC diária também anualizada
+        ipca = [item["valor"] for item in inflacao["dados"][-12:]]
+        return {
+            "selic": selic["dados"][-1]["valor"] if selic["dados"] else None,
+            "selic_anual": annualize_rate(selic["dados"][-1]["valor"]) if selic["dados"] else None,
+            "inflacao_12m": accumulated_rate(ipca) if ipca else None,
+            "cambio_usd": cambio["dados"][-1]["valor"] if cambio["dados"] else None,
+            "data_atualizacao": datetime.now().strftime("%d/%m/%Y")
+        }
+
+    def _erro_indicadores(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao obter indicadores: {str(e)}")
+        return {
+            "error": "Erro no processamento",
+            "message": "Não foi possível obter os indicadores econômicos"
+        }
@@ -1,93 +1,314 @@
+import hashlib
 import json
 import os
+import shutil
+import tempfile
 import time
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Any, Iterable, Optional, Tuple
 import logging
 from datetime import datetime, timedelta
+from config import (CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES, CACHE_MEMORY_TTL,
+                    CACHE_MAX_DISK_BYTES, CACHE_SWEEP_INTERVAL)
+from cache_expiry import ExpiryIndex, CacheSweeper
+from memory_cache import LRUCache
+from monitoring import metrics_collector
+import cache_serializer
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
 class CacheManager:
+    """
+    Cache em arquivos das integrações.
+
+    Cada entrada fica em ``cache_dir/ab/cd/<sha256>.bin``, onde o nome é o hash
+    da serialização canônica do método e seus parâmetros.  O conteúdo usa o
+    formato compacto de ``cache_serializer``; entradas antigas em JSON
+    (``<sha256>.json``) continuam sendo lidas até expirarem ou serem regravadas. O leque de dois níveis
+    mantém os diretórios pequenos, e cada shard (``ab/cd``) tem um
+    ``manifest.json`` com o prazo e o tamanho de suas entradas, de modo que a
+    indexação e a limpeza tocam apenas os shards envolvidos.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+    ENTRY_SUFFIX = ".bin"
+    LEGACY_SUFFIX = ".json"
+    _TMP_PREFIX = ".tmp-"
+
     def __init__(self, cache_dir: str = "cache", ttl_hours: int = 24):
         """
         Inicializa o gerenciador de cache.
-        
+
         Args:
             cache_dir: Diretório para armazenar os arquivos de cache
             ttl_hours: Tempo de vida do cache em horas
         """
+        if ttl_hours <= 0:
+            raise ValueError("ttl_hours deve ser positivo")
+
         self.cache_dir = cache_dir
         self.ttl = timedelta(hours=ttl_hours)
-        
+
         # Cria o diretório de cache se não existir
         if not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
-            
+
+        # Camada em memória na frente dos arquivos (write-through)
+        self.name = os.path.basename(os.path.normpath(cache_dir))
+        self.memory = LRUCache(CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES, name=self.name)
+
+        # Índice de expiração e uso em disco (ordem LRU), montados a partir dos manifestos
+        self.max_disk_bytes = CACHE_MAX_DISK_BYTES
+        self.expiry = ExpiryIndex()
+        self._disk_usage: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._index_lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._sweeper: Optional[CacheSweeper] = None
+        self._load_index()
+
+    # ------------------------------------------------------------------
+    # Layout em disco
+    # ------------------------------------------------------------------
+
+    def _get_shard_dir(self, key: str) -> str:
+        """Retorna o diretório (shard) de dois níveis de uma chave."""
+        return os.path.join(self.cache_dir, key[:2], key[2:4])
+
     def _get_cache_path(self, key: str) -> str:
         """
         Gera o caminho do arquivo de cache.
-        
+
         Args:
             key: Chave do cache
-            
+
         Returns:
             Caminho do arquivo de cache
         """
-        return os.path.join(self.cache_dir, f"{key}.json")
-        
+        return os.path.join(self._get_shard_dir(key), f"{key}{self.ENTRY_SUFFIX}")
+
+    def _get_legacy_path(self, key: str) -> str:
+        """Caminho da entrada no formato JSON anterior."""
+        return os.path.join(self._get_shard_dir(key), f"{key}{self.LEGACY_SUFFIX}")
+
+    def _entry_key(self, filename: str) -> Optional[str]:
+        """Extrai a chave do nome de um arquivo de entrada (atual ou legado)."""
+        if filename == self.MANIFEST_NAME or filename.startswith(self._TMP_PREFIX):
+            return None
+        for suffix in (self.ENTRY_SUFFIX, self.LEGACY_SUFFIX):
+            if filename.endswith(suffix):
+                return filename[:-len(suffix)]
+        return None
+
     def _generate_key(self, method: str, **kwargs) -> str:
         """
-        Gera uma chave única para o cache.
-        
+        Gera uma chave única e de tamanho fixo para o cache.
+
         Args:
             method: Nome do método
             **kwargs: Parâmetros do método
-            
+
         Returns:
-            Chave única para o cache
+            Hash SHA-256 (hex) da serialização canônica do método e parâmetros
+        """
+        # Chaves ordenadas e separadores fixos garantem a mesma serialização
+        canonical = json.dumps(
+            {"method": method, "params": kwargs},
+            sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _iter_shards(self) -> Iterable[str]:
+        """Percorre os diretórios de shard existentes."""
+        for level1 in self._list_hex_dirs(self.cache_dir):
+            for level2 in self._list_hex_dirs(level1):
+                yield level2
+
+    @staticmethod
+    def _list_hex_dirs(path: str) -> Iterable[str]:
+        try:
+            with os.scandir(path) as it:
+                return [entry.path for entry in it if entry.is_dir() and len(entry.name) == 2]
+        except FileNotFoundError:
+            return []
+
+    def _write_atomic(self, path: str, content) -> None:
+        """Grava um arquivo (texto ou bytes) via arquivo temporário + rename, sem leituras parciais."""
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=self._TMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb' if isinstance(content, bytes) else 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    # ------------------------------------------------------------------
+    # Manifestos e índices
+    # ------------------------------------------------------------------
+
+    def _read_manifest(self, shard_dir: str) -> Dict[str, list]:
+        """Lê o manifesto de um shard ({chave: [prazo, bytes]})."""
+        try:
+            with open(os.path.join(shard_dir, self.MANIFEST_NAME), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _update_manifest(self, shard_dir: str, added: Dict[str, list] = None,
+                         removed: Iterable[str] = ()) -> None:
+        """Atualiza o manifesto de um shard, removendo o shard se ficar vazio."""
+        with self._manifest_lock:
+            manifest = self._read_manifest(shard_dir)
+            manifest.update(added or {})
+            for key in removed:
+                manifest.pop(key, None)
+
+            manifest_path = os.path.join(shard_dir, self.MANIFEST_NAME)
+            if manifest or self._shard_has_entries(shard_dir):
+                self._write_atomic(manifest_path, json.dumps(manifest, separators=(',', ':')))
+                return
+
+            try:
+                os.remove(manifest_path)
+                os.rmdir(shard_dir)
+                os.rmdir(os.path.dirname(shard_dir))
+            except OSError:
+                # Shard ainda em uso (ex.: escrita concorrente ou vizinhos no primeiro nível)
+                pass
+
+    def _shard_has_entries(self, shard_dir: str) -> bool:
+        try:
+            with os.scandir(shard_dir) as it:
+                return any(self._entry_key(entry.name) for entry in it)
+        except FileNotFoundError:
+            return False
+
+    def _load_shard(self, shard_dir: str) -> Iterable[Tuple[float, str, int]]:
+        """
+        Lê as entradas de um shard a partir do manifesto.
+
+        Arquivos ausentes do manifesto (ex.: atualização perdida entre processos)
+        são consultados com ``stat`` e o manifesto é corrigido.
         """
-        # Ordena os parâmetros para garantir consistência
-        sorted_params = sorted(kwargs.items())
-        param_str = "_".join(f"{k}_{v}" for k, v in sorted_params)
-        return f"{method}_{param_str}"
-        
+        manifest = self._read_manifest(shard_dir)
+        ttl_seconds = self.ttl.total_seconds()
+        present = {}
+        missing = {}
+        with os.scandir(shard_dir) as it:
+            for entry in it:
+                if entry.name.startswith(self._TMP_PREFIX):
+                    # Escrita interrompida antes do rename
+                    if time.time() - entry.stat().st_mtime > 3600:
+                        os.remove(entry.path)
+                    continue
+                key = self._entry_key(entry.name)
+                if key is None:
+                    continue
+                if key in manifest:
+                    present[key] = manifest[key]
+                elif key not in missing:
+                    stat = entry.stat()
+                    missing[key] = [stat.st_mtime + ttl_seconds, stat.st_size]
+
+        if missing or len(present) != len(manifest):
+            present.update(missing)
+            with self._manifest_lock:
+                self._write_atomic(os.path.join(shard_dir, self.MANIFEST_NAME),
+                                   json.dumps(present, separators=(',', ':')))
+        return [(deadline, key, size) for key, (deadline, size) in present.items()]
+
+    def _load_index(self) -> None:
+        """
+        Monta o índice de expiração a partir dos manifestos dos shards,
+        sem abrir nem desserializar as entradas.
+        """
+        entries = []
+        for shard_dir in self._iter_shards():
+            entries.extend(self._load_shard(shard_dir))
+
+        # As entradas mais antigas entram primeiro na ordem LRU
+        for deadline, key, size in sorted(entries):
+            self._track(key, size, deadline)
+
+    def _track(self, key: str, size: int, deadline: float) -> None:
+        """Registra um arquivo gravado no índice de expiração e no uso em disco."""
+        self.expiry.push(key, deadline)
+        with self._index_lock:
+            self._disk_bytes += size - self._disk_usage.pop(key, 0)
+            self._disk_usage[key] = size
+
+    def _touch(self, key: str) -> None:
+        """Marca um arquivo como usado recentemente."""
+        with self._index_lock:
+            if key in self._disk_usage:
+                self._disk_usage.move_to_end(key)
+
+    def _forget(self, key: str) -> None:
+        """Remove um arquivo do índice de expiração e do uso em disco."""
+        self.expiry.discard(key)
+        with self._index_lock:
+            self._disk_bytes -= self._disk_usage.pop(key, 0)
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
     def get(self, method: str, **kwargs) -> Optional[Dict[str, Any]]:
         """
         Obtém dados do cache.
-        
+
         Args:
             method: Nome do método
             **kwargs: Parâmetros do método
-            
+
         Returns:
             Dados do cache ou None se não existir ou expirado
         """
         try:
             key = self._generate_key(method, **kwargs)
-            cache_path = self._get_cache_path(key)
-            
-            if not os.path.exists(cache_path):
+
+            # Consulta primeiro a camada em memória
+            data = self.memory.get(key, _MISSING)
+            metrics_collector.record_tier_operation(self.name, "memoria", data is not _MISSING)
+            if data is not _MISSING:
+                return data
+
+            raw = self._read_entry(key)
+            if raw is None:
+                metrics_collector.record_tier_operation(self.name, "disco", False)
                 return None
-                
-            with open(cache_path, 'r') as f:
-                cache_data = json.load(f)
-                
+            cache_data = cache_serializer.loads(raw)
+
             # Verifica se o cache expirou
             cache_time = datetime.fromisoformat(cache_data['timestamp'])
-            if datetime.now() - cache_time > self.ttl:
-                os.remove(cache_path)
+            age = datetime.now() - cache_time
+            if age > self.ttl:
+                self._remove_files([key])
+                metrics_collector.record_tier_operation(self.name, "disco", False)
                 return None
-                
+
+            self._touch(key)
+            metrics_collector.record_tier_operation(self.name, "disco", True)
+            remaining = (self.ttl - age).total_seconds()
+            self.memory.set(key, cache_data['data'], ttl=min(remaining, CACHE_MEMORY_TTL), size=len(raw))
             return cache_data['data']
-            
+
         except Exception as e:
             logger.error(f"Erro ao obter cache: {str(e)}")
             return None
-            
+
     def set(self, method: str, data: Dict[str, Any], **kwargs) -> None:
         """
         Armazena dados no cache.
-        
+
         Args:
             method: Nome do método
             data: Dados a serem armazenados
@@ -95,45 +316,159 @@ class CacheManager:
         """
         try:
             key = self._generate_key(method, **kwargs)
-            cache_path = self._get_cache_path(key)
-            
+            shard_dir = self._get_shard_dir(key)
+            os.makedirs(shard_dir, exist_ok=True)
+
             cache_data = {
                 'timestamp': datetime.now().isoformat(),
                 'data': data
             }
-            
-            with open(cache_path, 'w') as f:
-                json.dump(cache_data, f)
-                
+
+            raw = cache_serializer.dumps(cache_data)
+            self._write_atomic(self._get_cache_path(key), raw)
+            self._remove_legacy(key)
+            deadline = time.time() + self.ttl.total_seconds()
+            self._update_manifest(shard_dir, added={key: [deadline, len(raw)]})
+            self._track(key, len(raw), deadline)
+
+            ttl = min(self.ttl.total_seconds(), CACHE_MEMORY_TTL)
+            self.memory.set(key, data, ttl=ttl, size=len(raw))
+
         except Exception as e:
             logger.error(f"Erro ao armazenar cache: {str(e)}")
-            
+
     def clear_expired(self) -> None:
         """
-        Remove todos os caches expirados.
+        Remove os caches expirados e aplica o limite de espaço em disco.
+
+        Apenas os arquivos vencidos segundo o índice de expiração são tocados,
+        e cada manifesto é regravado uma única vez; se o total ainda exceder
+        ``max_disk_bytes``, os menos usados são removidos.
         """
         try:
-            now = datetime.now()
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    cache_path = os.path.join(self.cache_dir, filename)
-                    with open(cache_path, 'r') as f:
-                        cache_data = json.load(f)
-                        cache_time = datetime.fromisoformat(cache_data['timestamp'])
-                        if now - cache_time > self.ttl:
-                            os.remove(cache_path)
-                            
+            now = time.time()
+            ttl_seconds = self.ttl.total_seconds()
+            due = []
+            for key in self.expiry.pop_due(now):
+                try:
+                    mtime = os.stat(self._get_cache_path(key)).st_mtime
+                except FileNotFoundError:
+                    due.append(key)
+                    continue
+                if mtime + ttl_seconds > now:
+                    # Regravado por outro processo desde a indexação
+                    self.expiry.push(key, mtime + ttl_seconds)
+                    continue
+                due.append(key)
+            expired = self._remove_files(due)
+
+            lru = []
+            with self._index_lock:
+                excess = self._disk_bytes - self.max_disk_bytes
+                for key, size in self._disk_usage.items():
+                    if excess <= 0:
+                        break
+                    lru.append(key)
+                    excess -= size
+            evicted = self._remove_files(lru)
+
+            if expired or evicted:
+                logger.info(f"Cache {self.name}: {expired} expirados, {evicted} despejados")
+            metrics_collector.record_cache_cleanup(self.name, expired, evicted)
+
         except Exception as e:
             logger.error(f"Erro ao limpar cache expirado: {str(e)}")
-            
+
+    def _remove_files(self, keys: Iterable[str]) -> int:
+        """
+        Remove arquivos de cache e suas entradas nos índices, atualizando o
+        manifesto de cada shard envolvido uma única vez.
+
+        Returns:
+            Número de arquivos removidos
+        """
+        by_shard = defaultdict(list)
+        for key in keys:
+            by_shard[self._get_shard_dir(key)].append(key)
+
+        removed = 0
+        for shard_dir, shard_keys in by_shard.items():
+            for key in shard_keys:
+                try:
+                    os.remove(self._get_cache_path(key))
+                    removed += 1
+                except FileNotFoundError:
+                    if self._remove_legacy(key):
+                        removed += 1
+                self.memory.delete(key)
+                self._forget(key)
+            self._update_manifest(shard_dir, removed=shard_keys)
+        return removed
+
+    def _read_entry(self, key: str) -> Optional[bytes]:
+        """Lê os bytes de uma entrada, recorrendo ao arquivo JSON legado."""
+        for path in (self._get_cache_path(key), self._get_legacy_path(key)):
+            try:
+                with open(path, 'rb') as f:
+                    return f.read()
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _remove_legacy(self, key: str) -> bool:
+        """Remove a entrada legada em JSON de uma chave, se existir."""
+        try:
+            os.remove(self._get_legacy_path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def start_sweeper(self, interval: float = CACHE_SWEEP_INTERVAL) -> None:
+        """Inicia a limpeza periódica do cache em uma thread em segundo plano."""
+        if self._sweeper is None:
+            self._sweeper = CacheSweeper(self.clear_expired, interval, name=f"cache-sweeper-{self.name}")
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Interrompe a limpeza periódica do cache."""
+        if self._sweeper is not None:
+            self._sweeper.stop()
+
     def clear_all(self) -> None:
         """
         Remove todos os caches.
         """
         try:
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    os.remove(os.path.join(self.cache_dir, filename))
-                    
+            self.memory.clear()
+            with self._index_lock:
+                for key in self._disk_usage:
+                    self.expiry.discard(key)
+                self._disk_usage.clear()
+                self._disk_bytes = 0
+            with self._manifest_lock:
+                for level1 in self._list_hex_dirs(self.cache_dir):
+                    shutil.rmtree(level1, ignore_errors=True)
+
         except Exception as e:
-            logger.error(f"Erro ao limpar cache: {str(e)}") 
\ No newline at end of file
+            logger.error(f"Erro ao limpar cache: {str(e)}")
+
+
+_managers: Dict[str, CacheManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_cache_manager(cache_dir: str) -> CacheManager:
+    """
+    Retorna o cache compartilhado do processo para o diretório, com a limpeza
+    periódica em segundo plano ativa.
+
+    Instâncias distintas sobre o mesmo diretório teriam índices e camadas em
+    memória divergentes (e um sweeper cada).
+    """
+    key = os.path.abspath(cache_dir)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = CacheManager(cache_dir=cache_dir)
+    manager.start_sweeper()
+    return manager
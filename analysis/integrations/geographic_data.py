@@ -2,6 +2,7 @@ import os
 import requests
 import logging
 from typing import Dict, Any, Optional
+from services.http_client import get_http_client
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
@@ -12,8 +13,10 @@ logger = logging.getLogger(__name__)
 class GeographicData:
     """Classe para integração com dados geográficos"""
     
-    def __init__(self, openweather_api_key: str, google_maps_api_key: str):
+    def __init__(self, openweather_api_key: str, google_maps_api_key: str,
+                 http_client: Optional[requests.Session] = None):
         """Inicializa a integração com dados geográficos"""
+        self.http = http_client or get_http_client()
         self.openweather_api_key = openweather_api_key
         self.google_maps_api_key = google_maps_api_key
         self.logger = logging.getLogger(__name__)
@@ -22,7 +25,7 @@ class GeographicData:
         """Obtém dados do IBGE para as coordenadas"""
         try:
             # Faz a requisição HTTP para a API do IBGE
-            response = requests.get(
+            response = self.http.get(
                 f'https://servicodados.ibge.gov.br/api/v1/localidades/coordenadas/{latitude},{longitude}'
             )
             response.raise_for_status()
@@ -38,7 +41,7 @@ class GeographicData:
         """Obtém dados climáticos para as coordenadas"""
         try:
             # Faz a requisição HTTP para a API do OpenWeather
-            response = requests.get(
+            response = self.http.get(
                 f'https://api.openweathermap.org/data/2.5/weather',
                 params={
                     'lat': latitude,
@@ -61,7 +64,7 @@ class GeographicData:
         """Obtém dados ambientais para as coordenadas"""
         try:
             # Faz a requisição HTTP para a API do Google Maps
-            response = requests.get(
+            response = self.http.get(
                 f'https://maps.googleapis.com/maps/api/geocode/json',
                 params={
                     'latlng': f'{latitude},{longitude}',
@@ -1,176 +1,204 @@
+import asyncio
 import requests
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from services.http_client import get_http_client
+from services.async_http_client import HTTP_ERRORS, get_async_http_client
+from services.municipio_index import get_municipio_index
 from urllib.parse import quote
 
 logger = logging.getLogger(__name__)
 
 class IBGEAPI:
-    def __init__(self):
+    def __init__(self, http_client: Optional[requests.Session] = None):
         self.base_url = "https://servicodados.ibge.gov.br/api/v1"
-        
+        self.http = http_client or get_http_client()
+
+    def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        response = self.http.get(f"{self.base_url}{path}", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def _get_json_async(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return await get_async_http_client().get_json(f"{self.base_url}{path}", params=params)
+
+    def _erro(self, contexto: str, message: str, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao consultar {contexto}: {str(e)}")
+        return {
+            "error": "Erro na consulta",
+            "message": message
+        }
+
     def get_city_info(self, city_code: str) -> Dict[str, Any]:
         """
         Obtém informações básicas de um município pelo código IBGE.
-        
+
         Args:
             city_code: Código IBGE do município (7 dígitos)
-            
+
         Returns:
             Dict com informações do município ou erro
         """
+        local = self._city_info_local(city_code)
+        if local is not None:
+            return local
+        try:
+            return self._parse_city_info(self._get_json(f"/localidades/municipios/{city_code}"))
+        except requests.exceptions.RequestException as e:
+            return self._erro("município", "Não foi possível consultar o município", e)
+
+    async def get_city_info_async(self, city_code: str) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_city_info``."""
+        local = self._city_info_local(city_code)
+        if local is not None:
+            return local
         try:
-            response = requests.get(f"{self.base_url}/localidades/municipios/{city_code}")
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            return {
-                "id": data["id"],
-                "nome": data["nome"],
-                "microrregiao": {
-                    "id": data["microrregiao"]["id"],
-                    "nome": data["microrregiao"]["nome"],
-                    "mesorregiao": {
-                        "id": data["microrregiao"]["mesorregiao"]["id"],
-                        "nome": data["microrregiao"]["mesorregiao"]["nome"],
-                        "uf": {
-                            "id": data["microrregiao"]["mesorregiao"]["UF"]["id"],
-                            "sigla": data["microrregiao"]["mesorregiao"]["UF"]["sigla"],
-                            "nome": data["microrregiao"]["mesorregiao"]["UF"]["nome"],
-                            "regiao": {
-                                "id": data["microrregiao"]["mesorregiao"]["UF"]["regiao"]["id"],
-                                "sigla": data["microrregiao"]["mesorregiao"]["UF"]["regiao"]["sigla"],
-                                "nome": data["microrregiao"]["mesorregiao"]["UF"]["regiao"]["nome"]
-                            }
+            return self._parse_city_info(await self._get_json_async(f"/localidades/municipios/{city_code}"))
+        except HTTP_ERRORS as e:
+            return self._erro("município", "Não foi possível consultar o município", e)
+
+    def _city_info_local(self, city_code: str) -> Optional[Dict[str, Any]]:
+        """Hierarquia do município pelo índice local, se ele a tiver completa."""
+        municipio = get_municipio_index().get(city_code)
+        return municipio.to_dict() if municipio is not None and municipio.completo else None
+
+    def _parse_city_info(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": data["id"],
+            "nome": data["nome"],
+            "microrregiao": {
+                "id": data["microrregiao"]["id"],
+                "nome": data["microrregiao"]["nome"],
+                "mesorregiao": {
+                    "id": data["microrregiao"]["mesorregiao"]["id"],
+                    "nome": data["microrregiao"]["mesorregiao"]["nome"],
+                    "uf": {
+                        "id": data["microrregiao"]["mesorregiao"]["UF"]["id"],
+                        "sigla": data["microrregiao"]["mesorregiao"]["UF"]["sigla"],
+                        "nome": data["microrregiao"]["mesorregiao"]["UF"]["nome"],
+                        "regiao": {
+                            "id": data["microrregiao"]["mesorregiao"]["UF"]["regiao"]["id"],
+                            "sigla": data["microrregiao"]["mesorregiao"]["UF"]["regiao"]["sigla"],
+                            "nome": data["microrregiao"]["mesorregiao"]["UF"]["regiao"]["nome"]
                         }
                     }
                 }
             }
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar município: {str(e)}")
-            return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar o município"
-            }
-            
+        }
+
     def get_population(self, city_code: str) -> Dict[str, Any]:
         """
         Obtém dados populacionais de um município.
-        
+
         Args:
             city_code: Código IBGE do município
-            
+
         Returns:
             Dict com dados populacionais ou erro
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/projecoes/populacao/{city_code}",
-                params={"data": "2020"}  # Último censo disponível
-            )
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            return {
-                "populacao": data["projecao"]["populacao"],
-                "ano": data["projecao"]["ano"],
-                "periodo": data["projecao"]["periodo"]
-            }
-            
+            # Último censo disponível
+            data = self._get_json(f"/projecoes/populacao/{city_code}", {"data": "2020"})
+            return self._parse_population(data)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar população: {str(e)}")
-            return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar dados populacionais"
-            }
-            
+            return self._erro("população", "Não foi possível consultar dados populacionais", e)
+
+    async def get_population_async(self, city_code: str) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_population``."""
+        try:
+            data = await self._get_json_async(f"/projecoes/populacao/{city_code}", {"data": "2020"})
+            return self._parse_population(data)
+        except HTTP_ERRORS as e:
+            return self._erro("população", "Não foi possível consultar dados populacionais", e)
+
+    def _parse_population(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "populacao": data["projecao"]["populacao"],
+            "ano": data["projecao"]["ano"],
+            "periodo": data["projecao"]["periodo"]
+        }
+
     def get_economic_data(self, city_code: str) -> Dict[str, Any]:
         """
         Obtém dados econômicos de um município.
-        
+
         Args:
             city_code: Código IBGE do município
-            
+
         Returns:
             Dict com dados econômicos ou erro
         """
         try:
-            # PIB per capita
-            pib_response = requests.get(
-                f"{self.base_url}/economia/pib-municipios/{city_code}",
-                params={"ano": "2020"}  # Último ano disponível
-            )
-            pib_response.raise_for_status()
-            pib_data = pib_response.json()
-            
-            # IDH
-            idh_response = requests.get(
-                f"{self.base_url}/indicadores/idh/{city_code}"
-            )
-            idh_response.raise_for_status()
-            idh_data = idh_response.json()
-            
-            return {
-                "pib_per_capita": pib_data.get("valor", 0),
-                "idh": idh_data.get("valor", 0),
-                "ano": "2020"
-            }
-            
+            # PIB per capita (último ano disponível) e IDH
+            pib_data = self._get_json(f"/economia/pib-municipios/{city_code}", {"ano": "2020"})
+            idh_data = self._get_json(f"/indicadores/idh/{city_code}")
+            return self._parse_economic_data(pib_data, idh_data)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar dados econômicos: {str(e)}")
-            return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar dados econômicos"
-            }
-            
+            return self._erro("dados econômicos", "Não foi possível consultar dados econômicos", e)
+
+    async def get_economic_data_async(self, city_code: str) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_economic_data``, com as duas consultas em paralelo."""
+        try:
+            pib_data, idh_data = await asyncio.gather(
+                self._get_json_async(f"/economia/pib-municipios/{city_code}", {"ano": "2020"}),
+                self._get_json_async(f"/indicadores/idh/{city_code}")
+            )
+            return self._parse_economic_data(pib_data, idh_data)
+        except HTTP_ERRORS as e:
+            return self._erro("dados econômicos", "Não foi possível consultar dados econômicos", e)
+
+    def _parse_economic_data(self, pib_data: Dict[str, Any], idh_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "pib_per_capita": pib_data.get("valor", 0),
+            "idh": idh_data.get("valor", 0),
+            "ano": "2020"
+        }
+
     def get_indicators(self, city_code: str) -> Dict[str, Any]:
         """
         Obtém indicadores socioeconômicos de um município.
-        
+
         Args:
             city_code: Código IBGE do município
-            
+
         Returns:
             Dict com indicadores ou erro
         """
         try:
-            # Taxa de desemprego
-            desemprego_response = requests.get(
-                f"{self.base_url}/indicadores/desemprego/{city_code}"
-            )
-            desemprego_response.raise_for_status()
-            desemprego_data = desemprego_response.json()
-            
-            # Renda média
-            renda_response = requests.get(
-                f"{self.base_url}/indicadores/renda-media/{city_code}"
-            )
-            renda_response.raise_for_status()
-            renda_data = renda_response.json()
-            
-            return {
-                "taxa_desemprego": desemprego_data.get("valor", 0),
-                "renda_media": renda_data.get("valor", 0),
-                "ano": "2020"
-            }
-            
+            # Taxa de desemprego e renda média
+            desemprego_data = self._get_json(f"/indicadores/desemprego/{city_code}")
+            renda_data = self._get_json(f"/indicadores/renda-media/{city_code}")
+            return self._parse_indicators(desemprego_data, renda_data)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao consultar indicadores: {str(e)}")
-            return {
-                "error": "Erro na consulta",
-                "message": "Não foi possível consultar indicadores"
-            }
-            
+            return self._erro("indicadores", "Não foi possível consultar indicadores", e)
+
+    async def get_indicators_async(self, city_code: str) -> Dict[str, Any]:
+        """Versão assíncrona de ``get_indicators``, com as duas consultas em paralelo."""
+        try:
+            desemprego_data, renda_data = await asyncio.gather(
+                self._get_json_async(f"/indicadores/desemprego/{city_code}"),
+                self._get_json_async(f"/indicadores/renda-media/{city_code}")
+            )
+            return self._parse_indicators(desemprego_data, renda_data)
+        except HTTP_ERRORS as e:
+            return self._erro("indicadores", "Não foi possível consultar indicadores", e)
+
+    def _parse_indicators(self, desemprego_data: Dict[str, Any], renda_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "taxa_desemprego": desemprego_data.get("valor", 0),
+            "renda_media": renda_data.get("valor", 0),
+            "ano": "2020"
+        }
+
     def get_complete_city_data(self, city_code: str) -> Dict[str, Any]:
         """
         Obtém todos os dados disponíveis de um município.
-        
+
+        Para fazer as consultas em paralelo, use ``get_complete_city_data_async``.
+
         Args:
             city_code: Código IBGE do município
-            
+
         Returns:
             Dict com todos os dados disponíveis ou erro
         """
@@ -178,21 +206,51 @@ class IBGEAPI:
             city_info = self.get_city_info(city_code)
             if "error" in city_info:
                 return city_info
-                
-            population = self.get_population(city_code)
-            economic = self.get_economic_data(city_code)
-            indicators = self.get_indicators(city_code)
-            
-            return {
-                "informacoes_gerais": city_info,
-                "dados_populacionais": population,
-                "dados_economicos": economic,
-                "indicadores": indicators
-            }
-            
+            return self._complete_city_data(
+                city_info,
+                self.get_population(city_code),
+                self.get_economic_data(city_code),
+                self.get_indicators(city_code)
+            )
         except Exception as e:
-            logger.error(f"Erro ao obter dados completos: {str(e)}")
-            return {
-                "error": "Erro no processamento",
-                "message": "Não foi possível obter os dados completos"
-            } 
\ No newline at end of file
+            return self._erro_dados_completos(e)
+
+    async def get_complete_city_data_async(self, city_code: str) -> Dict[str, Any]:
+        """
+        Obtém todos os dados disponíveis de um município, disparando as seis
+        consultas simultaneamente.
+
+        Args:
+            city_code: Código IBGE do município
+
+        Returns:
+            Dict com todos os dados disponíveis ou erro
+        """
+        try:
+            city_info, population, economic, indicators = await asyncio.gather(
+                self.get_city_info_async(city_code),
+                self.get_population_async(city_code),
+                self.get_economic_data_async(city_code),
+                self.get_indicators_async(city_code)
+            )
+            if "error" in city_info:
+                return city_info
+            return self._complete_city_data(city_info, population, economic, indicators)
+        except Exception as e:
+            return self._erro_dados_completos(e)
+
+    def _complete_city_data(self, city_info: Dict[str, Any], population: Dict[str, Any],
+                            economic: Dict[str, Any], indicators: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "informacoes_gerais": city_info,
+            "dados_populacionais": population,
+            "dados_economicos": economic,
+            "indicadores": indicators
+        }
+
+    def _erro_dados_completos(self, e: Exception) -> Dict[str, Any]:
+        logger.error(f"Erro ao obter dados completos: {str(e)}")
+        return {
+            "error": "Erro no processamento",
+            "message": "Não foi possível obter os dados completos"
+        }
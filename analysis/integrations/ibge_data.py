@@ -1,87 +1,290 @@
+import asyncio
 import requests
 import logging
-from typing import Dict, Any, Optional
-from functools import lru_cache
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+from config import IBGE_AGREGADOS_BATCH_SIZE
+from services.http_client import get_http_client
+from services.async_http_client import get_async_http_client
+from services.circuit_breaker import get_circuit_breaker
+from services.agregados_store import AgregadosStore, get_agregados_store, parse_resultados
+from services.municipio_index import get_municipio_index, normalize_name
+from single_flight import SingleFlight
+from shared_cache import SharedCache
 
 logger = logging.getLogger(__name__)
 
+# Agregados do SIDRA usados na coleta: (tabela, variável)
+AGREGADO_POPULACAO = (6579, 93)   # População residente
+AGREGADO_PIB = (5938, 37)         # PIB dos Municípios
+AGREGADO_RENDIMENTO = (1384, 93)  # Rendimento médio mensal
+
+# Agrupa coletas simultâneas do mesmo município (o cache só vale após o retorno)
+_ibge_flight = SingleFlight("ibge")
+
+# Dados do IBGE mudam raramente: compartilhados entre os workers por 7 dias
+_ibge_cache = SharedCache("ibge", default_ttl=7 * 24 * 3600, max_entries=1024)
+
 class IBGEDataCollector:
     """
     Classe para coletar dados do IBGE através da API pública.
+
+    Os valores dos agregados ficam num armazenamento local (``AgregadosStore``)
+    e só os municípios que ainda não estão nele são consultados na API.
     """
     
-    def __init__(self):
+    def __init__(self, http_client: Optional[requests.Session] = None,
+                 agregados_store: Optional[AgregadosStore] = None, batch_size: int = IBGE_AGREGADOS_BATCH_SIZE):
         self.base_url = "https://servicodados.ibge.gov.br/api/v3"
+        self.localidades_url = "https://servicodados.ibge.gov.br/api/v1/localidades"
+        self.http = http_client or get_http_client()
+        self.breaker = get_circuit_breaker("ibge_agregados")
+        self.store = agregados_store or get_agregados_store()
+        self.batch_size = batch_size
         
-    @lru_cache(maxsize=128)
     def get_municipio_data(self, codigo_municipio: str) -> Dict[str, Any]:
         """
         Obtém dados demográficos e econômicos do município
         """
+        cache_key = f"municipio:{codigo_municipio}"
+        dados = _ibge_cache.get(cache_key)
+        if dados is None:
+            dados = _ibge_flight.do(("municipio", codigo_municipio),
+                                    lambda: self._coletar_municipio_data(codigo_municipio))
+            # Coleta que falhou em todas as seções não é cacheada
+            if dados and any(dados.values()):
+                _ibge_cache.set(cache_key, dados)
+        return dados
+
+    async def get_municipio_data_async(self, codigo_municipio: str) -> Dict[str, Any]:
+        """
+        Versão assíncrona de ``get_municipio_data``
+        """
+        cache_key = f"municipio:{codigo_municipio}"
+        dados = _ibge_cache.get(cache_key)
+        if dados is None:
+            dados = await _ibge_flight.do_async(("municipio", codigo_municipio),
+                                                lambda: self._coletar_municipio_data_async(codigo_municipio))
+            # Coleta que falhou em todas as seções não é cacheada
+            if dados and any(dados.values()):
+                _ibge_cache.set(cache_key, dados)
+        return dados
+
+    def get_municipios_data(self, codigos_municipios: Iterable[Any]) -> Dict[int, Dict[str, Any]]:
+        """
+        Obtém os dados de vários municípios de uma vez (ex.: triagem de um catálogo)
+
+        Os municípios ainda não armazenados são consultados em lotes de até
+        ``batch_size`` localidades por requisição, em vez de três requisições
+        por município; o resultado é indexado pelo código do município.
+        """
+        dados, pendentes = self._municipios_em_cache(codigos_municipios)
+        self._carregar_lote(pendentes)
+        return self._guardar_lote(dados, pendentes)
+
+    async def get_municipios_data_async(self, codigos_municipios: Iterable[Any]) -> Dict[int, Dict[str, Any]]:
+        """
+        Versão assíncrona de ``get_municipios_data``, com os lotes consultados em paralelo
+        """
+        dados, pendentes = self._municipios_em_cache(codigos_municipios)
+        await self._carregar_lote_async(pendentes)
+        return self._guardar_lote(dados, pendentes)
+
+    def _municipios_em_cache(self, codigos_municipios: Iterable[Any]) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """Separa os municípios já em cache (com seus dados) dos que precisam ser montados"""
+        dados: Dict[int, Dict[str, Any]] = {}
+        pendentes = []
+        for codigo in dict.fromkeys(int(codigo) for codigo in codigos_municipios):
+            cached = _ibge_cache.get(f"municipio:{codigo}")
+            if cached is None:
+                pendentes.append(codigo)
+            else:
+                dados[codigo] = cached
+        return dados, pendentes
+
+    def _guardar_lote(self, dados: Dict[int, Dict[str, Any]], pendentes: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Monta os municípios pendentes a partir do armazenamento e cacheia os que têm dados"""
+        for codigo, dados_municipio in self._montar_lote(pendentes).items():
+            if any(dados_municipio.values()):
+                _ibge_cache.set(f"municipio:{codigo}", dados_municipio)
+            dados[codigo] = dados_municipio
+        return dados
+
+    def _coletar_municipio_data(self, codigo_municipio: str) -> Dict[str, Any]:
+        """
+        Coleta os dados do município nas três consultas do IBGE
+        """
         try:
-            dados = {
+            return {
                 "demografia": self._get_dados_demograficos(codigo_municipio),
                 "economia": self._get_dados_economicos(codigo_municipio),
                 "indicadores": self._get_indicadores_sociais(codigo_municipio)
             }
-            return dados
         except Exception as e:
             logger.error(f"Erro ao obter dados do IBGE: {str(e)}")
             return {}
 
-    def _get_dados_demograficos(self, codigo_municipio: str) -> Dict[str, Any]:
+    async def _coletar_municipio_data_async(self, codigo_municipio: str) -> Dict[str, Any]:
         """
-        Obtém dados demográficos usando o agregado 6579 (População residente)
+        Coleta os dados do município disparando as três consultas do IBGE simultaneamente
         """
         try:
-            url = f"{self.base_url}/agregados/6579/periodos/-1/variaveis/93?localidades=N6[{codigo_municipio}]"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "populacao": data[0]["resultados"][0]["series"][0]["serie"],
-                    "densidade_demografica": self._calcular_densidade(data)
-                }
-            return {}
+            demografia, economia, indicadores = await asyncio.gather(
+                self._get_agregado_async(AGREGADO_POPULACAO, codigo_municipio, self._parse_demograficos,
+                                         "dados demográficos"),
+                self._get_agregado_async(AGREGADO_PIB, codigo_municipio, self._parse_economicos,
+                                         "dados econômicos"),
+                self._get_agregado_async(AGREGADO_RENDIMENTO, codigo_municipio, self._parse_indicadores_sociais,
+                                         "indicadores sociais")
+            )
+            return {
+                "demografia": demografia,
+                "economia": economia,
+                "indicadores": indicadores
+            }
         except Exception as e:
-            logger.error(f"Erro ao obter dados demográficos: {str(e)}")
+            logger.error(f"Erro ao obter dados do IBGE: {str(e)}")
             return {}
 
-    def _get_dados_economicos(self, codigo_municipio: str) -> Dict[str, Any]:
+    def _secoes(self) -> Tuple[Tuple[str, tuple, Callable[[Any], Dict[str, Any]], str], ...]:
+        """Seções dos dados do município: (chave, agregado, conversão, descrição)"""
+        return (
+            ("demografia", AGREGADO_POPULACAO, self._parse_demograficos, "dados demográficos"),
+            ("economia", AGREGADO_PIB, self._parse_economicos, "dados econômicos"),
+            ("indicadores", AGREGADO_RENDIMENTO, self._parse_indicadores_sociais, "indicadores sociais"),
+        )
+
+    def _agregado_url(self, agregado: tuple, codigos_municipios: List[int]) -> str:
+        tabela, variavel = agregado
+        localidades = ",".join(str(codigo) for codigo in codigos_municipios)
+        return f"{self.base_url}/agregados/{tabela}/periodos/-1/variaveis/{variavel}?localidades=N6[{localidades}]"
+
+    def _buscar_lote(self, agregado: tuple, codigos_municipios: List[int], contexto: str) -> None:
+        """Consulta um agregado para um lote de municípios e grava os valores no armazenamento"""
+        try:
+            response = self.breaker.call(self.http.get, self._agregado_url(agregado, codigos_municipios))
+            if response.status_code == 200:
+                self.store.save(*agregado, codigos_municipios, parse_resultados(response.json(), agregado[1]))
+        except Exception as e:
+            logger.error(f"Erro ao obter {contexto} ({len(codigos_municipios)} municípios): {str(e)}")
+
+    async def _buscar_lote_async(self, agregado: tuple, codigos_municipios: List[int], contexto: str) -> None:
+        """Versão assíncrona de ``_buscar_lote``"""
+        try:
+            data = await self.breaker.call_async(get_async_http_client().get_json,
+                                                self._agregado_url(agregado, codigos_municipios))
+            self.store.save(*agregado, codigos_municipios, parse_resultados(data, agregado[1]))
+        except Exception as e:
+            logger.error(f"Erro ao obter {contexto} ({len(codigos_municipios)} municípios): {str(e)}")
+
+    def _lotes(self, codigos_municipios: List[int]) -> List[Tuple[tuple, List[int], str]]:
+        """Lotes de até ``batch_size`` municípios, por agregado, que ainda não estão no armazenamento"""
+        lotes = []
+        for _, agregado, _, contexto in self._secoes():
+            faltando = self.store.missing(*agregado, codigos_municipios)
+            for inicio in range(0, len(faltando), self.batch_size):
+                lotes.append((agregado, faltando[inicio:inicio + self.batch_size], contexto))
+        return lotes
+
+    def _carregar_lote(self, codigos_municipios: List[int]) -> None:
         """
-        Obtém dados econômicos usando o agregado 5938 (PIB dos Municípios)
+        Busca, em lotes de até ``batch_size`` municípios por requisição, os
+        agregados que ainda não estão no armazenamento
         """
+        for agregado, lote, contexto in self._lotes(codigos_municipios):
+            self._buscar_lote(agregado, lote, contexto)
+
+    async def _carregar_lote_async(self, codigos_municipios: List[int]) -> None:
+        """
+        Busca, em lotes de até ``batch_size`` municípios por requisição, os
+        agregados que ainda não estão no armazenamento (todos em paralelo)
+        """
+        await asyncio.gather(*(self._buscar_lote_async(agregado, lote, contexto)
+                               for agregado, lote, contexto in self._lotes(codigos_municipios)))
+
+    def _montar_lote(self, codigos_municipios: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Monta os dados de cada município a partir do armazenamento"""
+        series = {secao: self.store.series(*agregado, codigos_municipios)
+                  for secao, agregado, _, _ in self._secoes()}
+        return {
+            codigo: {
+                secao: self._parse_serie(parse, codigo, series[secao].get(codigo), contexto)
+                for secao, _, parse, contexto in self._secoes()
+            }
+            for codigo in codigos_municipios
+        }
+
+    def _parse_serie(self, parse, codigo_municipio: int, serie: Optional[Dict[str, str]],
+                     contexto: str) -> Dict[str, Any]:
+        """Converte a série armazenada com ``parse``, que recebe o formato de resposta da API"""
+        if not serie:
+            return {}
         try:
-            url = f"{self.base_url}/agregados/5938/periodos/-1/variaveis/37?localidades=N6[{codigo_municipio}]"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "pib": data[0]["resultados"][0]["series"][0]["serie"],
-                    "pib_per_capita": self._calcular_pib_per_capita(data)
-                }
+            return parse([{"resultados": [{"series": [{"localidade": {"id": str(codigo_municipio)},
+                                                        "serie": serie}]}]}])
+        except Exception as e:
+            logger.error(f"Erro ao obter {contexto}: {str(e)}")
             return {}
+
+    def _get_agregado(self, agregado: tuple, codigo_municipio: str, parse, contexto: str) -> Dict[str, Any]:
+        """Consulta um agregado do SIDRA (se ainda não estiver armazenado) e converte a resposta com ``parse``"""
+        try:
+            codigo = int(codigo_municipio)
+            if self.store.missing(*agregado, [codigo]):
+                self._buscar_lote(agregado, [codigo], contexto)
+            return self._parse_serie(parse, codigo, self.store.serie(*agregado, codigo), contexto)
         except Exception as e:
-            logger.error(f"Erro ao obter dados econômicos: {str(e)}")
+            logger.error(f"Erro ao obter {contexto}: {str(e)}")
             return {}
 
+    async def _get_agregado_async(self, agregado: tuple, codigo_municipio: str, parse, contexto: str) -> Dict[str, Any]:
+        """Versão assíncrona de ``_get_agregado``"""
+        try:
+            codigo = int(codigo_municipio)
+            if self.store.missing(*agregado, [codigo]):
+                await self._buscar_lote_async(agregado, [codigo], contexto)
+            return self._parse_serie(parse, codigo, self.store.serie(*agregado, codigo), contexto)
+        except Exception as e:
+            logger.error(f"Erro ao obter {contexto}: {str(e)}")
+            return {}
+
+    def _get_dados_demograficos(self, codigo_municipio: str) -> Dict[str, Any]:
+        """
+        Obtém dados demográficos usando o agregado 6579 (População residente)
+        """
+        return self._get_agregado(AGREGADO_POPULACAO, codigo_municipio, self._parse_demograficos,
+                                  "dados demográficos")
+
+    def _parse_demograficos(self, data: Any) -> Dict[str, Any]:
+        return {
+            "populacao": data[0]["resultados"][0]["series"][0]["serie"],
+            "densidade_demografica": self._calcular_densidade(data)
+        }
+
+    def _get_dados_economicos(self, codigo_municipio: str) -> Dict[str, Any]:
+        """
+        Obtém dados econômicos usando o agregado 5938 (PIB dos Municípios)
+        """
+        return self._get_agregado(AGREGADO_PIB, codigo_municipio, self._parse_economicos,
+                                  "dados econômicos")
+
+    def _parse_economicos(self, data: Any) -> Dict[str, Any]:
+        return {
+            "pib": data[0]["resultados"][0]["series"][0]["serie"],
+            "pib_per_capita": self._calcular_pib_per_capita(data)
+        }
+
     def _get_indicadores_sociais(self, codigo_municipio: str) -> Dict[str, Any]:
         """
         Obtém indicadores sociais usando o agregado 1384 (Rendimento médio mensal)
         """
-        try:
-            url = f"{self.base_url}/agregados/1384/periodos/-1/variaveis/93?localidades=N6[{codigo_municipio}]"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    "renda_media": data[0]["resultados"][0]["series"][0]["serie"],
-                    "indice_desenvolvimento": self._calcular_idh(data)
-                }
-            return {}
-        except Exception as e:
-            logger.error(f"Erro ao obter indicadores sociais: {str(e)}")
-            return {}
+        return self._get_agregado(AGREGADO_RENDIMENTO, codigo_municipio, self._parse_indicadores_sociais,
+                                  "indicadores sociais")
+
+    def _parse_indicadores_sociais(self, data: Any) -> Dict[str, Any]:
+        return {
+            "renda_media": data[0]["resultados"][0]["series"][0]["serie"],
+            "indice_desenvolvimento": self._calcular_idh(data)
+        }
 
     def _calcular_densidade(self, data: Dict) -> float:
         """Calcula a densidade demográfica"""
@@ -109,19 +312,38 @@ class IBGEDataCollector:
         except:
             return 0.0
 
-    @lru_cache(maxsize=128)
     def get_codigo_municipio(self, nome_municipio: str, uf: str) -> Optional[str]:
         """
         Obtém o código do município a partir do nome e UF
+
+        O índice local de municípios responde sem acessar a rede; a API de
+        localidades só é consultada para nomes que ele não conhece.
+        """
+        municipio = get_municipio_index().lookup(nome_municipio, uf)
+        if municipio is not None:
+            return municipio.codigo
+
+        cache_key = f"codigo:{nome_municipio.lower()}:{uf.upper()}"
+        codigo = _ibge_cache.get(cache_key)
+        if codigo is None:
+            codigo = _ibge_flight.do(("codigo", nome_municipio.lower(), uf.upper()),
+                                     lambda: self._buscar_codigo_municipio(nome_municipio, uf))
+            if codigo is not None:
+                _ibge_cache.set(cache_key, codigo)
+        return codigo
+
+    def _buscar_codigo_municipio(self, nome_municipio: str, uf: str) -> Optional[str]:
+        """
+        Busca o código do município na lista de municípios da UF (API de
+        localidades v1, que não faz parte da API de agregados v3)
         """
         try:
-            url = f"{self.base_url}/localidades/municipios"
-            response = requests.get(url)
+            url = f"{self.localidades_url}/estados/{uf.upper()}/municipios"
+            response = self.breaker.call(self.http.get, url)
             if response.status_code == 200:
-                municipios = response.json()
-                for municipio in municipios:
-                    if (municipio["nome"].lower() == nome_municipio.lower() and 
-                        municipio["microrregiao"]["mesorregiao"]["UF"]["sigla"] == uf.upper()):
+                nome = normalize_name(nome_municipio)
+                for municipio in response.json():
+                    if normalize_name(municipio.get("nome")) == nome:
                         return municipio["id"]
             return None
         except Exception as e:
@@ -1,14 +1,18 @@
 import requests
 import logging
 from typing import Dict, Any, Optional
+from services.http_client import get_http_client
+from services.circuit_breaker import get_circuit_breaker
 
 class LegalData:
     """Classe para integração com dados jurídicos"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_client: Optional[requests.Session] = None):
         """Inicializa a integração com dados jurídicos"""
         self.api_key = api_key
+        self.http = http_client or get_http_client()
         self.logger = logging.getLogger(__name__)
+        self.breaker = get_circuit_breaker("legal_data")
         
     def obter_dados_processo(self, numero_processo: str) -> Dict[str, Any]:
         """Obtém dados de um processo judicial"""
@@ -20,7 +24,8 @@ class LegalData:
             }
             
             # Faz a requisição HTTP
-            response = requests.get(
+            response = self.breaker.call(
+                self.http.get,
                 f'https://api.judicial.com/processos/{numero_processo}',
                 headers=headers
             )
@@ -43,7 +48,8 @@ class LegalData:
             }
             
             # Faz a requisição HTTP
-            response = requests.get(
+            response = self.breaker.call(
+                self.http.get,
                 f'https://api.registral.com/matriculas/{numero_matricula}',
                 headers=headers
             )
@@ -66,7 +72,8 @@ class LegalData:
             }
             
             # Faz a requisição HTTP
-            response = requests.get(
+            response = self.breaker.call(
+                self.http.get,
                 f'https://api.judicial.com/tribunais/{sigla_tribunal}',
                 headers=headers
             )
@@ -1,14 +1,18 @@
 import requests
 import logging
 from typing import Dict, Any, Optional
+from services.http_client import get_http_client
+from services.circuit_breaker import get_circuit_breaker
 
 class MarketData:
     """Classe para integração com dados de mercado imobiliário"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, http_client: Optional[requests.Session] = None):
         """Inicializa a integração com dados de mercado"""
         self.api_key = api_key
+        self.http = http_client or get_http_client()
         self.logger = logging.getLogger(__name__)
+        self.breaker = get_circuit_breaker("market_data")
         
     def obter_dados_mercado(self, endereco: str) -> Dict[str, Any]:
         """Obtém dados de mercado para um endereço"""
@@ -20,7 +24,8 @@ class MarketData:
             }
             
             # Faz a requisição HTTP
-            response = requests.get(
+            response = self.breaker.call(
+                self.http.get,
                 f'https://api.imobiliaria.com/mercado',
                 params={'endereco': endereco},
                 headers=headers
@@ -44,7 +49,8 @@ class MarketData:
             }
             
             # Faz a requisição HTTP
-            response = requests.get(
+            response = self.breaker.call(
+                self.http.get,
                 f'https://api.imobiliaria.com/comparativos',
                 params={
                     'endereco': endereco,
@@ -71,7 +77,8 @@ class MarketData:
             }
             
             # Faz a requisição HTTP
-            response = requests.get(
+            response = self.breaker.call(
+                self.http.get,
                 f'https://api.imobiliaria.com/evolucao',
                 params={'endereco': endereco},
                 headers=headers
@@ -1,25 +1,63 @@
 import requests
 import logging
-from typing import Dict, Any, List, Tuple, Optional
-from urllib.parse import quote
-import time
+from typing import Dict, Any, Iterable, List, Tuple, Optional
+from urllib.parse import quote, urlsplit
 from datetime import datetime
 import os
-from cache_manager import CacheManager
+from .cache_manager import get_cache_manager
+from concurrent.futures import ThreadPoolExecutor
+from single_flight import SingleFlight
+from services.http_client import get_http_client
+from services.rate_limiter import get_rate_limiter
+from services.geocoding_store import GeocodingStore, get_geocoding_store, normalize_address
+from config import OSM_BASE_URL, OSM_RATE_LIMIT, OSM_BURST, OSM_MAX_CONCURRENCY
 import math
 
 logger = logging.getLogger(__name__)
 
+# Agrupa consultas idênticas simultâneas: cada uma consome o limite de 1 req/s do Nominatim
+_pois_flight = SingleFlight("osm_pois")
+
+# Geocodificações simultâneas do mesmo endereço (pela chave normalizada) viram uma consulta
+_geocode_flight = SingleFlight("osm_geocode")
+
+# Consultas de categorias em paralelo, até o permitido pelo endpoint configurado
+_pois_executor = ThreadPoolExecutor(max_workers=OSM_MAX_CONCURRENCY, thread_name_prefix="osm-pois")
+
+# Fila de geocodificação: endereços desconhecidos consultados em paralelo, até o
+# permitido pelo endpoint (o limitador de taxa espaça as requisições)
+_geocode_executor = ThreadPoolExecutor(max_workers=OSM_MAX_CONCURRENCY, thread_name_prefix="osm-geocode")
+
+# Fonte gravada com os resultados obtidos do Nominatim
+GEOCODING_SOURCE = "nominatim"
+
+# Categorias padrão de pontos de interesse
+DEFAULT_POI_CATEGORIES = [
+    "amenity",  # Serviços
+    "shop",     # Comércio
+    "leisure",  # Lazer
+    "tourism",  # Turismo
+    "building", # Edificações
+    "highway",  # Vias
+    "public_transport" # Transporte público
+]
+
+METERS_PER_DEGREE = 111320
+
 class OSMAPI:
-    def __init__(self):
+    def __init__(self, http_client: Optional[requests.Session] = None,
+                 geocoding_store: Optional[GeocodingStore] = None):
         """Inicializa o integrador com a API do OpenStreetMap"""
-        self.base_url = "https://nominatim.openstreetmap.org"
+        self.http = http_client or get_http_client()
+        self.geocoding = geocoding_store or get_geocoding_store()
+        self.base_url = OSM_BASE_URL
         self.headers = {
             'User-Agent': 'LFComLeilaoInsights/1.0 (contato@lfcom.com.br)'
         }
-        self.cache = CacheManager(cache_dir="cache/osm")  # Cache para requisições
-        self.last_request_time = 0
-        self.min_request_interval = 1.0  # segundos entre requisições
+        self.cache = get_cache_manager("cache/osm")  # Cache para requisições
+        # Limitador compartilhado por todas as instâncias (e processos, se
+        # configurado) que acessam o mesmo host
+        self.rate_limiter = get_rate_limiter(urlsplit(self.base_url).netloc, rate=OSM_RATE_LIMIT, burst=OSM_BURST)
         
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """
@@ -47,64 +85,132 @@ class OSMAPI:
         
     def _wait_for_rate_limit(self):
         """Espera o tempo necessário para respeitar o rate limit"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last_request)
-            
-        self.last_request_time = time.time()
+        self.rate_limiter.acquire()
         
     def search_location(self, address: str) -> Optional[Dict[str, Any]]:
         """
         Busca informações de localização usando o Nominatim.
         
+        Os resultados ficam guardados pela chave normalizada do endereço
+        (``normalize_address``): grafias diferentes do mesmo endereço ("Av." e
+        "Avenida", com ou sem acentos) são respondidas sem nova consulta.
+
         Args:
             address: Endereço a ser pesquisado
             
         Returns:
             Dict com informações da localização ou None se não encontrado
         """
+        key = normalize_address(address)
+        if not key:
+            logger.warning(f"Endereço vazio ou inválido: {address!r}")
+            return None
+        stored = self.geocoding.lookup(address)
+        if stored is not None:
+            return self._location(stored)
         try:
-            self._wait_for_rate_limit()
-            
-            params = {
-                'q': address,
-                'format': 'json',
-                'limit': 1,
-                'addressdetails': 1
-            }
-            
-            response = requests.get(
-                f"{self.base_url}/search",
-                params=params,
-                headers=self.headers
-            )
-            
-            if response.status_code == 200:
-                results = response.json()
-                if results and len(results) > 0:
-                    result = results[0]
-                    return {
-                        'lat': float(result['lat']),
-                        'lon': float(result['lon']),
-                        'display_name': result['display_name'],
-                        'address': result.get('address', {})
-                    }
-                else:
-                    logger.warning(f"Nenhum resultado encontrado para o endereço: {address}")
-                    return None
-            else:
-                logger.error(f"Erro na requisição ao OSM: {response.status_code} - {response.text}")
-                return None
-                
+            return self._location(_geocode_flight.do(key, lambda: self._geocode(address)))
         except Exception as e:
             logger.error(f"Erro ao buscar localização: {str(e)}")
             return None
+
+    def search_locations(self, addresses: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Geocodifica vários endereços (ex.: um catálogo inteiro).
+
+        Os já guardados são respondidos de uma vez; os desconhecidos entram
+        na fila de geocodificação e são consultados uma única vez cada,
+        respeitando o limite de taxa do endpoint.
+
+        Args:
+            addresses: Lista de endereços
+
+        Returns:
+            Lista de localizações (None se não encontrada), na mesma ordem dos endereços
+        """
+        self.geocoding.enqueue(addresses)
+        self.process_geocoding_queue(keys={normalize_address(address) for address in addresses})
+        stored = self.geocoding.lookup_many(addresses)
+        return [self._location(stored.get(normalize_address(address))) for address in addresses]
+
+    def process_geocoding_queue(self, limit: Optional[int] = None, keys: Optional[Iterable[str]] = None) -> int:
+        """
+        Consulta os endereços da fila de geocodificação.
+
+        Args:
+            limit: Máximo de endereços a consultar (None = a fila inteira)
+            keys: Consulta só estas chaves normalizadas da fila
+
+        Returns:
+            Quantidade de endereços consultados com sucesso (com ou sem resultado)
+        """
+        pending = self.geocoding.pending(None if keys is not None else limit)
+        if keys is not None:
+            keys = set(keys)
+            pending = [(key, address) for key, address in pending if key in keys][:limit]
+        futures = {
+            key: _geocode_executor.submit(_geocode_flight.do, key, lambda address=address: self._geocode(address))
+            for key, address in pending
+        }
+        consultados = 0
+        for key, future in futures.items():
+            try:
+                future.result()
+                consultados += 1
+            except Exception as e:
+                logger.error(f"Erro ao geocodificar da fila ({key}): {str(e)}")
+                self.geocoding.record_failure(key)
+        return consultados
+
+    def _geocode(self, address: str) -> Optional[Dict[str, Any]]:
+        """
+        Consulta o Nominatim e guarda o resultado (inclusive a falta de resultado).
+
+        Erros de rede ou HTTP são propagados e nada é guardado.
+        """
+        self._wait_for_rate_limit()
+
+        params = {
+            'q': address,
+            'format': 'json',
+            'limit': 1,
+            'addressdetails': 1
+        }
+
+        response = self.http.get(
+            f"{self.base_url}/search",
+            params=params,
+            headers=self.headers
+        )
+        response.raise_for_status()
+
+        results = response.json()
+        if not results:
+            logger.warning(f"Nenhum resultado encontrado para o endereço: {address}")
+            self.geocoding.save(address, None, GEOCODING_SOURCE)
+            return None
+        result = results[0]
+        self.geocoding.save(address, result, GEOCODING_SOURCE)
+        return self.geocoding.lookup(address)
+
+    def _location(self, stored: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Converte um resultado guardado no formato de ``search_location``"""
+        if stored is None or stored['lat'] is None:
+            return None
+        return {
+            'lat': stored['lat'],
+            'lon': stored['lon'],
+            'display_name': stored['display_name'],
+            'address': stored['address'],
+            'confianca': stored['confianca'],
+            'fonte': stored['fonte']
+        }
             
     def reverse_geocode(self, lat: float, lon: float) -> Dict[str, Any]:
         """Obtém informações de endereço a partir de coordenadas"""
         try:
+            self._wait_for_rate_limit()
+
             url = f"{self.base_url}/reverse"
             params = {
                 'lat': lat,
@@ -113,7 +219,7 @@ class OSMAPI:
                 'addressdetails': 1
             }
             
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=params, headers=self.headers)
             response.raise_for_status()
             
             data = response.json()
@@ -143,85 +249,122 @@ class OSMAPI:
             
     def get_pois_nearby(self, lat: float, lon: float, 
                        radius: int = 1000, 
-                       categories: List[str] = None) -> Dict[str, Any]:
+                       categories: List[str] = None,
+                       refresh: Iterable[str] = ()) -> Dict[str, Any]:
         """
         Obtém pontos de interesse próximos.
         
+        Cada categoria é consultada e armazenada em cache separadamente; as
+        que não estão em cache são buscadas em paralelo, respeitando o limite
+        de taxa do endpoint.
+
         Args:
             lat: Latitude
             lon: Longitude
             radius: Raio de busca em metros
             categories: Lista de categorias de interesse
+            refresh: Categorias a consultar novamente, ignorando o cache
             
         Returns:
             Dict com pontos de interesse ou erro
         """
-        # Verifica cache
-        cached_data = self.cache.get("get_pois_nearby", lat=lat, lon=lon, radius=radius, categories=categories)
-        if cached_data:
-            return cached_data
-            
-        try:
-            # Adiciona delay para respeitar limite de requisições
-            time.sleep(1)
-            
-            # Categorias padrão se não especificadas
-            if not categories:
-                categories = [
-                    "amenity",  # Serviços
-                    "shop",     # Comércio
-                    "leisure",  # Lazer
-                    "tourism",  # Turismo
-                    "building", # Edificações
-                    "highway",  # Vias
-                    "public_transport" # Transporte público
-                ]
-                
-            pois = []
-            for category in categories:
-                response = requests.get(
-                    f"{self.base_url}/search",
-                    params={
-                        "q": f"[{category}]",
-                        "format": "json",
-                        "limit": 50,
-                        "viewbox": f"{lon-0.01},{lat-0.01},{lon+0.01},{lat+0.01}",
-                        "bounded": 1
-                    },
-                    headers={"User-Agent": self.headers['User-Agent']}
-                )
-                response.raise_for_status()
+        if radius <= 0:
+            return {
+                "error": "Parâmetro inválido",
+                "message": "O raio de busca deve ser positivo"
+            }
+        categories = list(categories or DEFAULT_POI_CATEGORIES)
+        refresh = set(refresh)
+
+        por_categoria = {}
+        pendentes = []
+        for category in categories:
+            cached = None if category in refresh else self.cache.get(
+                "get_pois_category", lat=lat, lon=lon, radius=radius, category=category)
+            if cached is not None:
+                por_categoria[category] = cached
+            else:
+                pendentes.append(category)
                 
-                data = response.json()
-                pois.extend([
-                    {
-                        "nome": item["display_name"],
-                        "tipo": item["type"],
-                        "categoria": category,
-                        "coordenadas": {
-                            "lat": float(item["lat"]),
-                            "lon": float(item["lon"])
-                        }
-                    }
-                    for item in data
-                ])
+        futures = {
+            category: _pois_executor.submit(self._fetch_pois_category, lat, lon, radius, category)
+            for category in pendentes
+        }
+        falhas = []
+        for category, future in futures.items():
+            try:
+                por_categoria[category] = future.result()
+            except Exception as e:
+                # Rede, limite de taxa (TimeoutError) ou resposta malformada: só
+                # a categoria com problema fica de fora
+                logger.error(f"Erro ao buscar pontos de interesse ({category}): {str(e)}")
+                falhas.append(category)
                 
-            result = {
-                "total": len(pois),
-                "pontos_interesse": pois
-            }
-            
-            # Armazena no cache
-            self.cache.set("get_pois_nearby", result, lat=lat, lon=lon, radius=radius, categories=categories)
-            return result
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro ao buscar pontos de interesse: {str(e)}")
+        if falhas and len(falhas) == len(categories):
             return {
                 "error": "Erro na consulta",
                 "message": "Não foi possível buscar pontos de interesse"
             }
             
+        pois = [poi for category in categories for poi in por_categoria.get(category, [])]
+        result = {
+            "total": len(pois),
+            "pontos_interesse": pois
+        }
+        if falhas:
+            # Categorias com falha não são cacheadas e serão consultadas na próxima chamada
+            result["categorias_com_erro"] = falhas
+        return result
+
+    def _fetch_pois_category(self, lat: float, lon: float, radius: int, category: str) -> List[Dict[str, Any]]:
+        """
+        Consulta uma categoria de pontos de interesse e salva no cache.
+
+        Chamadas simultâneas para o mesmo ponto e categoria aguardam uma única consulta.
+        """
+        key = self.cache._generate_key("get_pois_category", lat=lat, lon=lon, radius=radius, category=category)
+        return _pois_flight.do(key, lambda: self._query_pois_category(lat, lon, radius, category))
+
+    def _query_pois_category(self, lat: float, lon: float, radius: int, category: str) -> List[Dict[str, Any]]:
+        """Consulta uma categoria no Nominatim, filtrando os resultados pelo raio"""
+        # Caixa que envolve o círculo de busca (graus de longitude encolhem com a latitude)
+        dlat = radius / METERS_PER_DEGREE
+        dlon = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+
+        self._wait_for_rate_limit()
+        response = self.http.get(
+            f"{self.base_url}/search",
+            params={
+                "q": f"[{category}]",
+                "format": "json",
+                "limit": 50,
+                "viewbox": f"{lon-dlon},{lat-dlat},{lon+dlon},{lat+dlat}",
+                "bounded": 1
+            },
+            headers={"User-Agent": self.headers['User-Agent']}
+        )
+        response.raise_for_status()
+
+        pois = []
+        for item in response.json():
+            poi_lat, poi_lon = float(item["lat"]), float(item["lon"])
+            distancia = self._calculate_distance(lat, lon, poi_lat, poi_lon)
+            if distancia > radius:
+                continue
+            pois.append({
+                "nome": item["display_name"],
+                "tipo": item["type"],
+                "categoria": category,
+                "coordenadas": {
+                    "lat": poi_lat,
+                    "lon": poi_lon
+                },
+                "distancia": round(distancia)
+            })
+
+        self.cache.set("get_pois_category", pois, lat=lat, lon=lon, radius=radius, category=category)
+        return pois
+
     def get_location_analysis(self, lat: float, lon: float) -> Dict[str, Any]:
         """
         Realiza análise completa de uma localização.
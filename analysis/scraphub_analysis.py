@@ -1,14 +1,16 @@
 import requests
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
 import pandas as pd
 from collections import Counter
 import logging
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from config import PAGED_FETCH_PREFETCH
+from services.http_client import get_http_client
+from services.catalog_mirror import catalog_page
+from services.paged_fetcher import PagedFetcher
 
 # Configuração de logging
 logging.basicConfig(
@@ -33,16 +35,9 @@ class ScraphubAnalyzer:
             "Content-Type": "application/json"
         }
         
-        # Configurar sessão com retry
-        self.session = requests.Session()
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504]
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("https://", adapter)
-        self.session.mount("http://", adapter)
+        # Sessão compartilhada com retry e revalidação condicional (páginas sem
+        # mudança voltam como 304 e não são baixadas de novo)
+        self.session = get_http_client("scraphub_analysis", retries=3, backoff_factor=1)
         self.session.headers.update(self.headers)
 
     def test_connection(self) -> bool:
@@ -72,56 +67,40 @@ class ScraphubAnalyzer:
             logger.error(f"Erro ao conectar com a API: {str(e)}")
             return False
 
-    def get_all_items(self, max_pages: int = 10) -> List[Dict[str, Any]]:
+    def _fetch_page(self, page: int) -> Any:
+        """Busca uma página de itens (no espelho local quando ele está em dia)"""
+        return catalog_page(page, self._fetch_remote_page)
+
+    def _fetch_remote_page(self, page: int) -> Any:
+        """Busca uma página de itens na API"""
+        response = self.session.get(f"{self.base_url}/items/2/?page={page}", timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_items(self, max_pages: Optional[int] = None, prefetch: int = PAGED_FETCH_PREFETCH,
+                   checkpoint: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Gera os itens à medida que as páginas chegam, com páginas buscadas à
+        frente em paralelo (ver ``PagedFetcher``); com ``checkpoint`` uma coleta
+        interrompida é retomada da página em que parou.
+        """
+        fetcher = PagedFetcher(self._fetch_page, prefetch=prefetch, max_pages=max_pages, checkpoint=checkpoint)
+        for page, items in fetcher.iter_pages():
+            logger.info(f"Página {page} processada ({len(items)} itens)")
+            yield from items
+
+    def get_all_items(self, max_pages: Optional[int] = 10) -> List[Dict[str, Any]]:
         """Busca todos os itens disponíveis até o limite de páginas"""
         all_items = []
-        page = 1
-        
-        while page <= max_pages:
-            try:
-                url = f"{self.base_url}/items/2/?page={page}"
-                logger.info(f"Buscando página {page}...")
-                
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                
-                data = response.json()
-                logger.info(f"Resposta recebida: {type(data)}")
-                
-                if not data:
-                    logger.info("Resposta vazia")
-                    break
-                    
-                if isinstance(data, dict):
-                    logger.info(f"Resposta é um dicionário: {data.keys()}")
-                    if 'items' in data:
-                        data = data['items']
-                    elif 'results' in data:
-                        data = data['results']
-                    else:
-                        logger.error(f"Estrutura inesperada: {data}")
-                        break
-                
-                if not isinstance(data, list):
-                    logger.error(f"Tipo de dados inesperado: {type(data)}")
-                    break
-                    
-                all_items.extend(data)
-                logger.info(f"Página {page} processada. Total de itens: {len(all_items)}")
-                
-                if len(data) < 10:
-                    logger.info("Página com menos de 10 itens, provavelmente última página")
-                    break
-                    
-                page += 1
-                
-            except requests.exceptions.RequestException as e:
-                logger.error(f"Erro na requisição: {str(e)}")
-                break
-            except Exception as e:
-                logger.error(f"Erro inesperado: {str(e)}")
-                break
-                
+        try:
+            for item in self.iter_items(max_pages=max_pages):
+                all_items.append(item)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Erro na requisição: {str(e)}")
+        except Exception as e:
+            logger.error(f"Erro inesperado: {str(e)}")
+
+        logger.info(f"Total de itens coletados: {len(all_items)}")
         return all_items
 
     def analyze_data_structure(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -14,6 +14,10 @@ from PIL import Image
 from io import BytesIO
 import numpy as np
 import cv2
+from shared_cache import SharedCache
+
+# Resultados de OCR compartilhados entre os workers (a imagem de um lote não muda)
+_ocr_cache = SharedCache("ocr", default_ttl=30 * 24 * 3600, max_entries=2048)
 
 class SmartTemplate(LeilaoTemplate):
     """Template inteligente capaz de extrair dados de diferentes sites de leilão"""
@@ -44,7 +48,7 @@ class SmartTemplate(LeilaoTemplate):
         self.tipos_documento = ['.pdf', '.doc', '.docx', '.txt']
         
         # Cache para OCR
-        self._ocr_cache = {}
+        self._ocr_cache = _ocr_cache
         
     def validar_url(self, url: str) -> bool:
         """Verifica se a URL é válida e pertence a um site de leilão"""
@@ -560,10 +564,12 @@ class SmartTemplate(LeilaoTemplate):
     def _processar_imagem_ocr(self, url_img: str, contexto: str = None) -> Dict[str, Any]:
         """Processa uma imagem com OCR e retorna o texto e metadados"""
         try:
-            # Verifica cache
-            if url_img in self._ocr_cache:
+            # Verifica cache (o resultado depende também do contexto da análise)
+            cache_key = f"{url_img}|{contexto or ''}"
+            cached = self._ocr_cache.get(cache_key)
+            if cached is not None:
                 self.logger.info(f"Usando resultado em cache para {url_img}")
-                return self._ocr_cache[url_img]
+                return cached
             
             # Baixa a imagem
             response = requests.get(url_img, timeout=10)
@@ -608,13 +614,13 @@ class SmartTemplate(LeilaoTemplate):
             resultado = {
                 'texto': texto,
                 'dados_estruturados': texto_analisado,
-                'confianca_media': np.mean([float(conf) for conf in dados['conf'] if conf != '-1']),
+                'confianca_media': float(np.mean([float(conf) for conf in dados['conf'] if conf != '-1'])),
                 'palavras_detectadas': len([word for word in dados['text'] if word.strip()]),
                 'contexto': contexto
             }
             
             # Armazena no cache
-            self._ocr_cache[url_img] = resultado
+            self._ocr_cache.set(cache_key, resultado)
             
             return resultado
             
@@ -2,9 +2,9 @@ from fastapi import FastAPI, HTTPException, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Tuple
-from datetime import datetime, timedelta
-import requests
+from typing import Optional, List
+from datetime import timedelta
+import asyncio
 import json
 from urllib.parse import quote_plus, urlparse
 import random
@@ -17,10 +17,16 @@ from dotenv import load_dotenv
 import time
 import logging
 from functools import lru_cache
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
 from src.services.image_service import ImageService
 from services.scraphub_service import ScraphubService
+from services.http_client import http_client_stats, revalidation_stats
+from services.circuit_breaker import circuit_breaker_stats
+from services.catalog_mirror import catalog_item, catalog_page, get_catalog_mirror
+from services.async_http_client import run_sync
+from services.image_validator import validate_image_urls, validate_image_urls_sync
+from config import IMAGE_VALIDATION_DEADLINE
+from single_flight import SingleFlight
+from shared_cache import SharedCache
 import io
 from pymongo import MongoClient
 
@@ -39,24 +45,29 @@ MONGO_URI = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("MONGODB_DATABASE", "leilao_insights")
 COLLECTION_NAME = "images"
 
-# Configuração do cache
+# Configuração do cache (compartilhado entre os workers, com camada local LRU)
 CACHE_DURATION = timedelta(hours=1)
-cache: Dict[str, tuple] = {}
+cache = SharedCache(
+    "api_properties",
+    default_ttl=CACHE_DURATION.total_seconds(),
+    max_entries=int(os.getenv("API_CACHE_MAX_ENTRIES", 512)),
+    max_bytes=int(os.getenv("API_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+)
+
+# Agrupa requisições idênticas simultâneas que não encontraram o cache
+properties_flight = SingleFlight("properties")
+
+# Serviço do Scraphub compartilhado (cache stale-while-revalidate)
+scraphub_service = ScraphubService()
 
 # Cache específico para URLs de imagem
-image_url_cache: Dict[str, Tuple[str, datetime]] = {}
 IMAGE_CACHE_DURATION = timedelta(hours=24)
-
-# Configuração do retry
-retry_strategy = Retry(
-    total=3,
-    backoff_factor=1,
-    status_forcelist=[429, 500, 502, 503, 504],
+image_url_cache = SharedCache(
+    "api_image_urls",
+    default_ttl=IMAGE_CACHE_DURATION.total_seconds(),
+    max_entries=int(os.getenv("IMAGE_URL_CACHE_MAX_ENTRIES", 20000)),
+    max_bytes=int(os.getenv("IMAGE_URL_CACHE_MAX_BYTES", 16 * 1024 * 1024))
 )
-adapter = HTTPAdapter(max_retries=retry_strategy)
-http = requests.Session()
-http.mount("https://", adapter)
-http.mount("http://", adapter)
 
 app = FastAPI(
     title="LFCOM API",
@@ -64,6 +75,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
+
+@app.on_event("startup")
+def start_cache_sweeper():
+    """Inicia a limpeza periódica do cache em disco do Scraphub em cada worker."""
+    scraphub_service.cache_manager.start_sweeper()
+
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -219,91 +237,97 @@ async def analyze_property_endpoint(request: PropertyAnalysisRequest):
 
 def is_valid_image_url(url: str) -> bool:
     """Verifica se uma URL é uma imagem válida."""
-    try:
-        response = http.head(url, timeout=5.0)
-        content_type = response.headers.get('content-type', '')
-        content_length = int(response.headers.get('content-length', 0))
-        
-        # Verifica se é uma imagem e tem tamanho razoável (entre 1KB e 10MB)
-        return (
-            response.status_code == 200 and
-            'image' in content_type and
-            1024 <= content_length <= 10_485_760
-        )
-    except:
-        return False
+    result = validate_image_urls_sync([url], deadline=None)[url]
+    return bool(result and result["valido"])
+
 
 def get_cached_image_url(url: str) -> Optional[str]:
     """Retorna URL do cache se ainda válida."""
-    if url in image_url_cache:
-        cached_url, timestamp = image_url_cache[url]
-        if datetime.now() - timestamp < IMAGE_CACHE_DURATION:
-            return cached_url
-        del image_url_cache[url]
-    return None
-
-def process_image_urls(image_urls):
+    return image_url_cache.get(url)
+
+
+def _cached_image_urls(urls: List[str]) -> dict:
+    """URLs finais já em cache, por URL original (consulta bloqueante; rodada fora do loop)."""
+    cached = {}
+    for url in dict.fromkeys(urls):
+        final_url = get_cached_image_url(url)
+        if final_url:
+            cached[url] = final_url
+    return cached
+
+
+def _store_image_urls(final_urls: dict) -> None:
+    """Grava no cache as URLs finais, por URL original."""
+    for url, final_url in final_urls.items():
+        image_url_cache.set(url, final_url)
+
+
+def _clean_image_url(img_url) -> Optional[str]:
+    if not img_url or not isinstance(img_url, str):
+        logger.warning(f"URL de imagem inválida: {img_url}")
+        return None
+    return img_url.strip().replace("\n", "").replace("\t", "").replace("\r", "")
+
+
+def _final_image_url(img_url: str) -> str:
+    """URL exibida para uma imagem válida (imagens da Caixa passam pelo images.weserv.nl)."""
+    if "venda-imoveis.caixa.gov.br" in img_url:
+        return f"https://images.weserv.nl/?url={quote_plus(img_url)}&output=jpg&maxage=7d"
+    return img_url
+
+
+async def process_image_urls_async(image_urls, deadline: Optional[float] = IMAGE_VALIDATION_DEADLINE):
     """
     Processa as URLs de imagem, usando o serviço images.weserv.nl para imagens da Caixa
     e mantendo as URLs originais para outras fontes.
+    
+    As URLs sem cache são validadas em lote, em paralelo e com prazo: URLs
+    inválidas são descartadas e as que ainda não responderam no prazo são
+    substituídas pela imagem de fallback (a validação continua em segundo
+    plano e vale para as próximas chamadas).
     """
     if not image_urls or not isinstance(image_urls, list):
         logger.warning("Lista de imagens vazia ou inválida")
         return [FALLBACK_IMAGES[0]]
     
-    processed_urls = []
+    urls = [url for url in (_clean_image_url(img_url) for img_url in image_urls) if url]
     
-    for img_url in image_urls:
-        if not img_url or not isinstance(img_url, str):
-            logger.warning(f"URL de imagem inválida: {img_url}")
+    # Resolve o que já está em cache e as URLs do Unsplash; o resto vai para a validação.
+    # O cache compartilhado (SQLite/Redis) é lido e gravado fora do event loop
+    resolved = await asyncio.to_thread(_cached_image_urls, urls)
+    to_store = {}
+    to_validate = []
+    for img_url in urls:
+        if img_url in resolved:
             continue
-            
-        # Limpar a URL
-        img_url = img_url.strip().replace("\n", "").replace("\t", "").replace("\r", "")
-        
-        # Verificar cache primeiro
-        cached_url = get_cached_image_url(img_url)
-        if cached_url:
-            logger.info(f"Usando URL em cache: {cached_url}")
-            processed_urls.append(cached_url)
-            continue
-        
-        # Se já for uma URL do Unsplash, usa diretamente
         if "unsplash.com" in img_url:
-            logger.info(f"Usando URL do Unsplash: {img_url}")
-            image_url_cache[img_url] = (img_url, datetime.now())
-            processed_urls.append(img_url)
+            to_store[img_url] = resolved[img_url] = img_url
+        elif img_url.startswith("http"):
+            to_validate.append(img_url)
+    
+    validations = await validate_image_urls(to_validate, deadline) if to_validate else {}
+    
+    processed_urls = []
+    for img_url in urls:
+        if img_url in resolved:
+            processed_urls.append(resolved[img_url])
             continue
-            
-        # Para URLs da Caixa, usar o serviço images.weserv.nl
-        if "venda-imoveis.caixa.gov.br" in img_url:
-            try:
-                # Verificar se a URL é válida antes de processar
-                if is_valid_image_url(img_url):
-                    proxy_url = f"https://images.weserv.nl/?url={quote_plus(img_url)}&output=jpg&maxage=7d"
-                    logger.info(f"Processando URL da Caixa: {img_url} -> {proxy_url}")
-                    image_url_cache[img_url] = (proxy_url, datetime.now())
-                    processed_urls.append(proxy_url)
-                else:
-                    logger.warning(f"URL da Caixa inválida: {img_url}")
-                    processed_urls.append(FALLBACK_IMAGES[0])
-            except Exception as e:
-                logger.error(f"Erro ao processar URL da Caixa: {str(e)}")
-                processed_urls.append(FALLBACK_IMAGES[0])
+        if img_url not in validations:
             continue
-            
-        # Para qualquer outra URL válida
-        if img_url.startswith("http"):
-            try:
-                if is_valid_image_url(img_url):
-                    logger.info(f"Usando URL externa válida: {img_url}")
-                    image_url_cache[img_url] = (img_url, datetime.now())
-                    processed_urls.append(img_url)
-                else:
-                    logger.warning(f"URL externa inválida: {img_url}")
-            except Exception as e:
-                logger.error(f"Erro ao validar URL externa: {str(e)}")
+        result = validations[img_url]
+        if result is None:
+            logger.warning(f"Validação pendente no prazo, usando fallback: {img_url}")
+            processed_urls.append(FALLBACK_IMAGES[0])
+        elif result["valido"]:
+            final_url = _final_image_url(img_url)
+            to_store[img_url] = final_url
+            processed_urls.append(final_url)
+        else:
+            logger.warning(f"URL de imagem inválida: {img_url}")
     
+    if to_store:
+        await asyncio.to_thread(_store_image_urls, to_store)
+
     # Se não conseguiu processar nenhuma URL, usa fallback
     if not processed_urls:
         logger.warning("Nenhuma URL válida encontrada, usando fallback")
@@ -312,6 +336,12 @@ def process_image_urls(image_urls):
     logger.info(f"Processadas {len(processed_urls)} URLs de imagem")
     return processed_urls
 
+
+def process_image_urls(image_urls, deadline: Optional[float] = IMAGE_VALIDATION_DEADLINE):
+    """Versão síncrona de ``process_image_urls_async``."""
+    return run_sync(process_image_urls_async(image_urls, deadline))
+
+
 def process_property_data(property_data):
     """Processa um imóvel, garantindo que todos os dados estejam corretos e as imagens sejam exibidas."""
     if not property_data or not isinstance(property_data, dict) or "data" not in property_data:
@@ -381,23 +411,57 @@ def process_property_data(property_data):
     
     return property_data
 
-def get_cached_data(cache_key: str, max_age: timedelta = CACHE_DURATION) -> Optional[dict]:
-    """Retorna dados do cache se ainda forem válidos."""
-    if cache_key in cache:
-        data, timestamp = cache[cache_key]
-        if datetime.now() - timestamp < max_age:
-            logger.info(f"Cache hit para {cache_key}")
-            return data
-        else:
-            logger.info(f"Cache expirado para {cache_key}")
-            del cache[cache_key]
-    return None
 
-def set_cached_data(cache_key: str, data: dict):
-    """Armazena dados no cache."""
-    cache[cache_key] = (data, datetime.now())
+async def get_cached_data(cache_key: str) -> Optional[dict]:
+    """
+    Retorna dados do cache se ainda forem válidos (expiração controlada pelo TTL).
+
+    O cache compartilhado faz E/S em disco ou rede: a consulta roda fora do event loop.
+    """
+    data = await asyncio.to_thread(cache.get, cache_key)
+    if data is not None:
+        logger.info(f"Cache hit para {cache_key}")
+    return data
+
+
+async def set_cached_data(cache_key: str, data: dict):
+    """Armazena dados no cache compartilhado (fora do event loop)."""
+    await asyncio.to_thread(cache.set, cache_key, data)
     logger.info(f"Dados armazenados em cache para {cache_key}")
 
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Endpoint com o uso de memória, despejos e taxa de acerto dos caches do processo"""
+    return {
+        "caches": [cache.stats(), image_url_cache.stats()],
+        "single_flight": [properties_flight.stats()]
+    }
+
+
+@app.get("/api/http/stats")
+async def get_http_stats():
+    """Retorna o uso dos pools de conexão HTTP de saída."""
+    return http_client_stats()
+
+
+@app.get("/api/http/revalidation")
+async def get_http_revalidation_stats():
+    """Retorna as requisições condicionais e os bytes economizados por fonte."""
+    return revalidation_stats()
+
+
+@app.get("/api/circuit-breakers/stats")
+async def get_circuit_breaker_stats():
+    """Retorna o estado dos disjuntores e as latências recentes de cada fonte externa."""
+    return circuit_breaker_stats()
+
+
+@app.get("/api/mirror/stats")
+async def get_mirror_stats():
+    """Retorna o tamanho do espelho local do catálogo e o atraso em relação à origem."""
+    return get_catalog_mirror().stats()
+
 @app.get("/api/properties")
 async def get_properties(
     page: int = 1,
@@ -413,69 +477,79 @@ async def get_properties(
         cache_key = f"properties_{page}_{per_page}_{city}_{state}_{type}_{min_price}_{max_price}"
         
         # Tentar obter dados do cache
-        cached_data = get_cached_data(cache_key)
+        cached_data = await get_cached_data(cache_key)
         if cached_data:
             logger.info("Retornando dados do cache")
             return cached_data
             
-        logger.info("Iniciando requisição para a API externa...")
-        start_time = time.time()
-        
-        # Por enquanto, retornar dados de exemplo
-        properties = [
-            {
-                "id": "1",
-                "data": {
-                    "id": "1",
-                    "title": "Apartamento 3 quartos - Centro",
-                    "address": "Rua Exemplo, 123",
-                    "city": "São Paulo",
-                    "state": "SP",
-                    "type": "Apartamento",
-                    "sale_value": "500000",
-                    "preco_avaliacao": "600000",
-                    "desconto": "16.67",
-                    "total_area": "120",
-                    "private_area": "90",
-                    "quartos": "3",
-                    "banheiros": "2",
-                    "garagem": "2",
-                    "images": [
-                        "https://images.unsplash.com/photo-1568605114967-8130f3a36994?w=800&q=80",
-                        "https://images.unsplash.com/photo-1570129477492-45c003edd2be?w=800&q=80"
-                    ],
-                    "modality": "Leilão SFI",
-                    "fim_1": "2024-05-01",
-                    "fim_2": "2024-05-15",
-                    "fim_venda_online": None,
-                    "aceita_financiamento": "Sim",
-                    "aceita_FGTS": "Sim",
-                    "aceita_parcelamento": "Sim",
-                    "aceita_consorcio": "Não",
-                    "description": "Excelente apartamento no centro da cidade...",
-                    "ps": ["Imóvel ocupado", "Necessita reforma"]
-                }
-            }
-        ]
-        
-        data = {
-            "properties": properties,
-            "totalPages": 1  # Por enquanto, apenas uma página
-        }
-        
-        # Armazenar no cache
-        set_cached_data(cache_key, data)
-        
-        # Log de performance
-        elapsed_time = time.time() - start_time
-        logger.info(f"Tempo total de processamento: {elapsed_time:.2f} segundos")
-        
-        return data
+        # Apenas uma requisição por chave vai à API externa; as demais aguardam o resultado
+        return await properties_flight.do_async(cache_key, lambda: load_properties(cache_key))
                 
     except Exception as e:
         logger.error(f"Erro ao buscar propriedades: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+async def load_properties(cache_key: str) -> dict:
+    """Busca as propriedades na API externa e armazena no cache."""
+    cached_data = await get_cached_data(cache_key)
+    if cached_data:
+        return cached_data
+        
+    logger.info("Iniciando requisição para a API externa...")
+    start_time = time.time()
+    
+    # Por enquanto, retornar dados de exemplo
+    properties = [
+        {
+            "id": "1",
+            "data": {
+                "id": "1",
+                "title": "Apartamento 3 quartos - Centro",
+                "address": "Rua Exemplo, 123",
+                "city": "São Paulo",
+                "state": "SP",
+                "type": "Apartamento",
+                "sale_value": "500000",
+                "preco_avaliacao": "600000",
+                "desconto": "16.67",
+                "total_area": "120",
+                "private_area": "90",
+                "quartos": "3",
+                "banheiros": "2",
+                "garagem": "2",
+                "images": [
+                    "https://images.unsplash.com/photo-1568605114967-8130f3a36994?w=800&q=80",
+                    "https://images.unsplash.com/photo-1570129477492-45c003edd2be?w=800&q=80"
+                ],
+                "modality": "Leilão SFI",
+                "fim_1": "2024-05-01",
+                "fim_2": "2024-05-15",
+                "fim_venda_online": None,
+                "aceita_financiamento": "Sim",
+                "aceita_FGTS": "Sim",
+                "aceita_parcelamento": "Sim",
+                "aceita_consorcio": "Não",
+                "description": "Excelente apartamento no centro da cidade...",
+                "ps": ["Imóvel ocupado", "Necessita reforma"]
+            }
+        }
+    ]
+    
+    data = {
+        "properties": properties,
+        "totalPages": 1  # Por enquanto, apenas uma página
+    }
+    
+    # Armazenar no cache
+    await set_cached_data(cache_key, data)
+    
+    # Log de performance
+    elapsed_time = time.time() - start_time
+    logger.info(f"Tempo total de processamento: {elapsed_time:.2f} segundos")
+    
+    return data
+
 @app.get("/api/images/{property_id}/{image_id}")
 async def get_image(property_id: str, image_id: str):
     """Endpoint para servir uma imagem pelo ID do imóvel e nome do arquivo"""
@@ -528,8 +602,9 @@ async def get_scraphub_items(
         Dict[str, Any]: Resposta da API com os itens
     """
     try:
-        service = ScraphubService()
-        items = service.get_items(page=page, per_page=per_page)
+        # Espelho local quando em dia (paginação própria); senão a API do Scraphub
+        items = catalog_page(page, lambda page: scraphub_service.get_items(page=page, per_page=per_page),
+                             per_page=per_page)
         return items
     except Exception as e:
         logger.error(f"Erro ao buscar itens do Scraphub: {str(e)}")
@@ -547,8 +622,7 @@ async def get_scraphub_item(item_id: str):
         Dict[str, Any]: Detalhes do item
     """
     try:
-        service = ScraphubService()
-        item = service.get_item_details(item_id)
+        item = catalog_item(item_id, scraphub_service.get_item_details)
         return item
     except Exception as e:
         logger.error(f"Erro ao buscar detalhes do item {item_id}: {str(e)}")
@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import weakref
+from typing import Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryIndex:
+    """
+    Índice de expiração baseado em min-heap, ordenado pelo prazo de cada chave.
+
+    Atualizar o prazo de uma chave apenas empilha a nova entrada; as antigas são
+    descartadas preguiçosamente quando chegam ao topo. Assim ``pop_due`` custa
+    O(k log n) para k itens vencidos, sem percorrer o cache inteiro.
+    """
+
+    def __init__(self):
+        self._heap: List[tuple] = []
+        self._deadlines: Dict[Hashable, float] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, key: Hashable, deadline: float) -> None:
+        """
+        Registra (ou atualiza) o prazo de expiração de uma chave.
+
+        Args:
+            key: Chave do item
+            deadline: Momento (epoch) em que o item expira
+        """
+        with self._lock:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, next(self._counter), key))
+            self._maybe_rebuild()
+
+    def update(self, key: Hashable, deadline: Optional[float]) -> None:
+        """Registra o novo prazo de uma chave, ou a remove se ``deadline`` for None."""
+        if deadline is None:
+            self.discard(key)
+        else:
+            self.push(key, deadline)
+
+    def discard(self, key: Hashable) -> None:
+        """Remove uma chave do índice (a entrada no heap é descartada depois)."""
+        with self._lock:
+            self._deadlines.pop(key, None)
+
+    def pop_due(self, now: float, limit: Optional[int] = None) -> List[Hashable]:
+        """
+        Remove e retorna as chaves cujo prazo já venceu.
+
+        Args:
+            now: Momento atual (epoch)
+            limit: Número máximo de chaves retornadas
+
+        Returns:
+            Lista de chaves vencidas
+        """
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                if limit is not None and len(due) >= limit:
+                    break
+                deadline, _, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    due.append(key)
+        return due
+
+    def next_deadline(self) -> Optional[float]:
+        """Retorna o prazo mais próximo ainda válido, ou None se vazio."""
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][2]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def _maybe_rebuild(self) -> None:
+        """Reconstrói o heap quando as entradas obsoletas dominam."""
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._deadlines):
+            self._heap = [(deadline, next(self._counter), key) for key, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._deadlines
+
+
+class CacheSweeper:
+    """
+    Executa periodicamente uma rotina de limpeza em uma thread daemon,
+    fora das threads que atendem as requisições.
+    """
+
+    def __init__(self, sweep: Callable[[], None], interval: float = 300, name: str = "cache-sweeper"):
+        """
+        Inicializa o sweeper.
+
+        Args:
+            sweep: Rotina de limpeza a ser executada
+            interval: Intervalo entre execuções em segundos
+            name: Nome da thread
+        """
+        self.sweep = sweep
+        self.interval = interval
+        self.name = name
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=_restart_after_fork(self))
+
+    def start(self) -> None:
+        """Inicia a thread de limpeza (idempotente)."""
+        if self.is_running:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Interrompe a thread de limpeza."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def trigger(self) -> None:
+        """Antecipa a próxima execução sem bloquear quem chamou."""
+        self._wakeup.set()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _after_fork(self) -> None:
+        # A thread não sobrevive ao fork (ex.: workers do gunicorn com --preload):
+        # o processo filho inicia a sua se o sweeper estava ativo no pai
+        if self._thread is None or self._stopped.is_set():
+            return
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.start()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Erro na limpeza periódica do cache: {str(e)}")
+
+
+def _restart_after_fork(sweeper: CacheSweeper) -> Callable[[], None]:
+    """Callback de ``os.register_at_fork`` que não mantém o sweeper vivo."""
+    ref = weakref.ref(sweeper)
+
+    def restart() -> None:
+        target = ref()
+        if target is not None:
+            target._after_fork()
+    return restart
@@ -1,183 +1,442 @@
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Any
-from config import logger, REPORTS_DIR, CACHE_TTL
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Optional, Any, Tuple
+from config import (logger, REPORTS_DIR, CACHE_TTL, CACHE_MEMORY_MAX_ENTRIES,
+                    CACHE_MEMORY_MAX_BYTES, CACHE_MEMORY_TTL, CACHE_MAX_DISK_BYTES,
+                    CACHE_SWEEP_INTERVAL, CACHE_REFRESH_WORKERS)
 from monitoring import metrics_collector
+from cache_storage import AppendOnlyStore
+from cache_expiry import ExpiryIndex, CacheSweeper
+from memory_cache import LRUCache
+from single_flight import SingleFlight
+import cache_serializer
 import hashlib
 
+_MISSING = object()
+
+# Buscas na origem agrupadas por chave e atualizações em segundo plano,
+# compartilhadas por todas as instâncias do processo
+_fetch_flight = SingleFlight("cache_fetch")
+_refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def normalize_text(text: Optional[str]) -> str:
+    """Normaliza um texto para endereçamento por conteúdo (Unicode NFC e espaços colapsados)."""
+    if not text:
+        return ""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def content_key(*parts: Optional[str]) -> str:
+    """
+    Gera um hash SHA-256 estável do conteúdo normalizado das partes.
+
+    Cada parte é prefixada com seu tamanho, de modo que divisões diferentes do
+    mesmo texto (ex.: edital + matrícula) não colidem.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        data = normalize_text(part).encode('utf-8')
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
 class CacheManager:
+    # Versão de cada etapa da análise: incrementar ao mudar a lógica invalida os resultados antigos
+    STAGE_VERSIONS = {
+        "edital": 1,
+        "matricula": 1,
+        "resumo_llm": 1,
+    }
+
     def __init__(self, cache_dir: str = "cache"):
         self.cache_dir = cache_dir
-        self.cache_file = os.path.join(cache_dir, "analises_cache.json")
-        self.images_cache_file = os.path.join(cache_dir, "images_cache.json")
+        self.cache_file = os.path.join(cache_dir, "analises_cache.log")
+        self.images_cache_file = os.path.join(cache_dir, "images_cache.log")
+        self.stages_cache_file = os.path.join(cache_dir, "estagios_cache.log")
         self.cache_ttl = 7 * 24 * 3600  # 7 dias em segundos
-        
+        self.stage_ttl = 30 * 24 * 3600  # resultados por conteúdo: 30 dias
+        self.max_disk_bytes = CACHE_MAX_DISK_BYTES
+
         # Cria diretório de cache se não existir
         os.makedirs(cache_dir, exist_ok=True)
-        
-        # Inicializa os arquivos de cache se não existirem
-        if not os.path.exists(self.cache_file):
-            self._save_cache({})
-        if not os.path.exists(self.images_cache_file):
-            self._save_images_cache({})
-            
+
+        # Índices de expiração, alimentados pelos logs a cada gravação
+        self.analyses_expiry = ExpiryIndex()
+        self.images_expiry = ExpiryIndex()
+        self.stages_expiry = ExpiryIndex()
+
+        # Abre os logs de cache, migrando os arquivos JSON legados se necessário
+        self.analyses_store = self._open_store(self.cache_file, "analises_cache.json", self.analyses_expiry)
+        self.images_store = self._open_store(self.images_cache_file, "images_cache.json", self.images_expiry)
+        self.stages_store = self._open_store(self.stages_cache_file, None, self.stages_expiry)
+
+        # Camada em memória na frente dos logs (write-through)
+        self.analyses_memory = LRUCache(CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES, name="analises")
+        self.images_memory = LRUCache(CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES, name="imagens")
+        self.stages_memory = LRUCache(CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES, name="estagios")
+
+        # Limpeza periódica em segundo plano (iniciada com start_sweeper)
+        self._sweeper: Optional[CacheSweeper] = None
+
         # Inicializa o campo cache_size no dicionário de métricas
         metrics_collector.metrics['cache_size'] = 0
-    
-    def _load_cache(self) -> Dict:
-        """Carrega o cache do arquivo."""
-        try:
-            with open(self.cache_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Erro ao carregar cache: {str(e)}")
-            return {}
-    
-    def _save_cache(self, cache: Dict):
-        """Salva o cache no arquivo."""
-        try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache, f, indent=2)
-        except Exception as e:
-            logger.error(f"Erro ao salvar cache: {str(e)}")
-            
-    def _load_images_cache(self) -> Dict:
-        """Carrega o cache de imagens do arquivo."""
+
+    def _open_store(self, path: str, legacy_name: Optional[str], expiry: ExpiryIndex) -> AppendOnlyStore:
+        """Abre um log de cache, importando o arquivo JSON legado na primeira vez."""
+        is_new = not os.path.exists(path)
+        store = AppendOnlyStore(path, on_change=expiry.update)
+        if legacy_name is None:
+            return store
+        legacy_file = os.path.join(self.cache_dir, legacy_name)
+        if is_new and os.path.exists(legacy_file):
+            self._migrate_legacy_cache(legacy_file, store)
+        return store
+
+    def _migrate_legacy_cache(self, legacy_file: str, store: AppendOnlyStore) -> None:
+        """Importa as entradas de um cache JSON no formato antigo."""
         try:
-            with open(self.images_cache_file, 'r') as f:
-                return json.load(f)
+            with open(legacy_file, 'r') as f:
+                legacy = json.load(f)
         except Exception as e:
-            logger.error(f"Erro ao carregar cache de imagens: {str(e)}")
-            return {}
-    
-    def _save_images_cache(self, cache: Dict):
-        """Salva o cache de imagens no arquivo."""
+            logger.error(f"Erro ao carregar cache legado {legacy_file}: {str(e)}")
+            return
+
+        migrated = 0
+        for key, entry in legacy.items():
+            try:
+                timestamp = datetime.fromisoformat(entry['timestamp']).timestamp()
+                ttl = entry.get('ttl') or self.cache_ttl
+                if time.time() - timestamp > ttl:
+                    continue
+                store.set(key, self._encode(entry['data']), ttl, timestamp)
+                migrated += 1
+            except Exception as e:
+                logger.warning(f"Entrada legada ignorada ({key}): {str(e)}")
+        logger.info(f"Migradas {migrated} entradas de {legacy_file}")
+
+    def _encode(self, data: Any) -> bytes:
+        """Serializa um valor para gravação no log (formato compacto versionado)."""
+        return cache_serializer.dumps(data)
+
+    def _decode(self, raw: bytes) -> Any:
+        """Desserializa um valor lido do log, inclusive entradas antigas em JSON."""
+        return cache_serializer.loads(raw)
+
+    def _read(self, store: AppendOnlyStore, memory: LRUCache, key: str) -> Optional[Any]:
+        """
+        Lê um item consultando primeiro a memória e depois o log em disco.
+
+        Itens encontrados no disco são promovidos para a memória com o TTL que
+        ainda lhes resta; itens expirados são removidos das duas camadas.
+        """
+        data = memory.get(key, _MISSING)
+        metrics_collector.record_tier_operation(memory.name, "memoria", data is not _MISSING)
+        if data is not _MISSING:
+            return data
+
+        record = store.get(key)
+        if record is None:
+            metrics_collector.record_tier_operation(memory.name, "disco", False)
+            return None
+        raw, timestamp, ttl = record
+        remaining = ttl - (time.time() - timestamp)
+        if remaining <= 0:
+            logger.info(f"Cache expirado para: {key}")
+            store.delete(key)
+            metrics_collector.record_tier_operation(memory.name, "disco", False)
+            return None
+
         try:
-            with open(self.images_cache_file, 'w') as f:
-                json.dump(cache, f, indent=2)
-        except Exception as e:
-            logger.error(f"Erro ao salvar cache de imagens: {str(e)}")
-    
+            data = self._decode(raw)
+        except ValueError as e:
+            # Formato desconhecido ou dependência ausente: trata como miss
+            logger.warning(f"Entrada de cache ilegível ({key}): {str(e)}")
+            store.delete(key)
+            metrics_collector.record_tier_operation(memory.name, "disco", False)
+            return None
+        metrics_collector.record_tier_operation(memory.name, "disco", True)
+        memory.set(key, data, ttl=min(remaining, CACHE_MEMORY_TTL), size=len(raw))
+        return data
+
+    def _write(self, store: AppendOnlyStore, memory: LRUCache, key: str, data: Any, ttl: float) -> None:
+        """Grava um item no log e na camada em memória."""
+        raw = self._encode(data)
+        store.set(key, raw, ttl)
+        memory.set(key, data, ttl=min(ttl, CACHE_MEMORY_TTL), size=len(raw))
+
     def _generate_key(self, edital: str, matricula: str) -> str:
         """Gera uma chave única para o cache baseada no conteúdo dos documentos."""
-        content = f"{edital}{matricula}".encode('utf-8')
-        return hashlib.md5(content).hexdigest()
-        
+        return content_key(edital, matricula)
+
+    def _stage_key(self, stage: str, texts) -> str:
+        """Gera a chave de uma etapa da análise a partir do conteúdo dos textos."""
+        version = self.STAGE_VERSIONS.get(stage, 1)
+        return f"{stage}:v{version}:{content_key(*texts)}"
+
     def _generate_image_key(self, url: str) -> str:
         """Gera uma chave única para o cache de imagens baseada na URL."""
         return hashlib.md5(url.encode('utf-8')).hexdigest()
-    
+
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Recupera um item do cache de imagens."""
-        cache = self._load_images_cache()
-        
-        if key in cache:
-            entry = cache[key]
-            cache_time = datetime.fromisoformat(entry['timestamp'])
-            if datetime.now() - cache_time < timedelta(seconds=self.cache_ttl):
-                logger.info(f"Item encontrado no cache: {key}")
-                return entry['data']
-            else:
-                logger.info(f"Cache expirado para: {key}")
-                del cache[key]
-                self._save_images_cache(cache)
-        return None
-    
+        data = self._read(self.images_store, self.images_memory, key)
+        if data is not None:
+            logger.info(f"Item encontrado no cache: {key}")
+        return data
+
     def set(self, key: str, data: Any, ttl: int = None):
         """Salva um item no cache de imagens."""
-        cache = self._load_images_cache()
-        
-        cache[key] = {
-            'data': data,
-            'timestamp': datetime.now().isoformat(),
-            'ttl': ttl or self.cache_ttl
-        }
-        
-        self._save_images_cache(cache)
+        self._write(self.images_store, self.images_memory, key, data, ttl or self.cache_ttl)
         logger.info(f"Item salvo no cache: {key}")
-    
+
+    def get_with_age(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Recupera um item do cache de imagens junto com sua idade.
+
+        Returns:
+            Tupla (dados, idade em segundos) ou None se não encontrado/expirado
+        """
+        data = self._read(self.images_store, self.images_memory, key)
+        if data is None:
+            return None
+        meta = self.images_store.get_meta(key)
+        age = time.time() - meta[0] if meta else 0.0
+        return data, age
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], fresh_ttl: float,
+                     grace_ttl: float = 0) -> Any:
+        """
+        Recupera um item do cache de imagens com semântica stale-while-revalidate.
+
+        - Até ``fresh_ttl`` segundos o item é devolvido sem consultar a origem.
+        - Entre ``fresh_ttl`` e ``fresh_ttl + grace_ttl`` o item é devolvido na hora
+          e uma única atualização é agendada em segundo plano.
+        - Sem item (ou após a janela de tolerância) a chamada bloqueia na busca,
+          agrupada com as demais chamadas simultâneas para a mesma chave.
+
+        Args:
+            key: Chave do item
+            fetch: Função sem argumentos que busca o dado na origem
+            fresh_ttl: Tempo (s) em que o dado é considerado atual
+            grace_ttl: Tempo (s) adicional em que o dado antigo ainda pode ser servido
+
+        Returns:
+            Dados do cache ou da origem
+        """
+        entry = self.get_with_age(key)
+        if entry is not None:
+            data, age = entry
+            if age < fresh_ttl:
+                return data
+            metrics_collector.record_tier_operation(self.images_memory.name, "obsoleto", True)
+            self._schedule_refresh(key, fetch, fresh_ttl + grace_ttl)
+            return data
+
+        return _fetch_flight.do(
+            (self.cache_dir, key),
+            lambda: self._fetch_and_store(key, fetch, fresh_ttl + grace_ttl, fresh_ttl)
+        )
+
+    def _fetch_and_store(self, key: str, fetch: Callable[[], Any], ttl: float,
+                         fresh_ttl: Optional[float] = None) -> Any:
+        """Busca o dado na origem e grava no cache de imagens com o TTL total."""
+        if fresh_ttl is not None:
+            # Outro líder pode ter gravado o item depois da nossa consulta ao cache
+            entry = self.get_with_age(key)
+            if entry is not None and entry[1] < fresh_ttl:
+                return entry[0]
+        data = fetch()
+        self.set(key, data, ttl)
+        return data
+
+    def _schedule_refresh(self, key: str, fetch: Callable[[], Any], ttl: float) -> None:
+        """Agenda uma única atualização em segundo plano para a chave."""
+        refresh_id = (self.cache_dir, key)
+        with _refreshing_lock:
+            if refresh_id in _refreshing:
+                return
+            _refreshing.add(refresh_id)
+
+        def refresh():
+            try:
+                _fetch_flight.do(refresh_id, lambda: self._fetch_and_store(key, fetch, ttl))
+                logger.info(f"Cache atualizado em segundo plano: {key}")
+            except Exception as e:
+                # Mantém o dado antigo até o fim da janela de tolerância
+                logger.error(f"Erro ao atualizar cache em segundo plano ({key}): {str(e)}")
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(refresh_id)
+
+        _refresh_executor.submit(refresh)
+
     def get_cached_analysis(self, edital: str, matricula: str) -> Optional[Dict[str, Any]]:
         """
         Recupera uma análise do cache se existir e não estiver expirada.
-        
+
         Args:
             edital: Texto do edital
             matricula: Texto da matrícula
-            
+
         Returns:
             Dict com a análise ou None se não encontrada/expirada
         """
-        cache = self._load_cache()
         key = self._generate_key(edital, matricula)
-        
-        if key in cache:
-            entry = cache[key]
-            if datetime.now() - entry['timestamp'] < timedelta(seconds=self.cache_ttl):
-                logger.info(f"Análise encontrada no cache: {key}")
-                metrics_collector.record_cache_operation(True, len(cache))
-                return entry['data']
-            else:
-                logger.info(f"Cache expirado para: {key}")
-                del cache[key]
-                self._save_cache(cache)
-        
-        metrics_collector.record_cache_operation(False, len(cache))
+        data = self._read(self.analyses_store, self.analyses_memory, key)
+
+        if data is not None:
+            logger.info(f"Análise encontrada no cache: {key}")
+            metrics_collector.record_cache_operation(True, len(self.analyses_store))
+            return data
+
+        metrics_collector.record_cache_operation(False, len(self.analyses_store))
         return None
-    
+
     def save_analysis(self, edital: str, matricula: str, analysis: Dict[str, Any]) -> None:
         """
         Salva uma análise no cache.
-        
+
         Args:
             edital: Texto do edital
             matricula: Texto da matrícula
             analysis: Resultado da análise
         """
-        cache = self._load_cache()
         key = self._generate_key(edital, matricula)
-        
-        cache[key] = {
-            'data': analysis,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        self._save_cache(cache)
+        self._write(self.analyses_store, self.analyses_memory, key, analysis, self.cache_ttl)
         logger.info(f"Análise salva no cache: {key}")
-        metrics_collector.record_cache_operation(True, len(cache))
-    
-    def clear_expired_cache(self):
-        """Remove entradas expiradas do cache."""
-        # Limpa cache de análises
-        cache = self._load_cache()
-        now = datetime.now()
-        expired_keys = []
-        
-        for key, data in cache.items():
-            cache_time = datetime.fromisoformat(data['timestamp'])
-            if now - cache_time > self.cache_ttl:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del cache[key]
-        
-        if expired_keys:
-            self._save_cache(cache)
-            logger.info(f"Removidas {len(expired_keys)} entradas expiradas do cache de análises")
-            
-        # Limpa cache de imagens
-        images_cache = self._load_images_cache()
-        expired_keys = []
-        
-        for key, data in images_cache.items():
-            cache_time = datetime.fromisoformat(data['timestamp'])
-            ttl = timedelta(seconds=data.get('ttl', self.cache_ttl))
-            if now - cache_time > ttl:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del images_cache[key]
-        
-        if expired_keys:
-            self._save_images_cache(images_cache)
-            logger.info(f"Removidas {len(expired_keys)} entradas expiradas do cache de imagens") 
\ No newline at end of file
+        metrics_collector.record_cache_operation(True, len(self.analyses_store))
+
+    def get_stage(self, stage: str, *texts: Optional[str]) -> Optional[Any]:
+        """
+        Recupera o resultado de uma etapa da análise pelo conteúdo dos textos.
+
+        Args:
+            stage: Nome da etapa (ex.: "edital", "matricula", "resumo_llm", "juridico")
+            *texts: Textos de entrada da etapa
+
+        Returns:
+            Resultado memorizado ou None
+        """
+        key = self._stage_key(stage, texts)
+        data = self._read(self.stages_store, self.stages_memory, key)
+        metrics_collector.record_tier_operation("estagio", stage, data is not None)
+        return data
+
+    def save_stage(self, stage: str, result: Any, *texts: Optional[str]) -> None:
+        """Memoriza o resultado de uma etapa da análise pelo conteúdo dos textos."""
+        key = self._stage_key(stage, texts)
+        self._write(self.stages_store, self.stages_memory, key, result, self.stage_ttl)
+
+    def memoize_stage(self, stage: str, compute: Callable[[], Any], *texts: Optional[str]) -> Any:
+        """
+        Executa uma etapa da análise uma única vez por conteúdo.
+
+        O mesmo edital compartilhado por vários lotes é processado uma vez, mesmo
+        em chamadas simultâneas; exceções não são memorizadas.
+
+        Args:
+            stage: Nome da etapa
+            compute: Função sem argumentos que executa a etapa
+            *texts: Textos de entrada da etapa
+
+        Returns:
+            Resultado da etapa
+        """
+        result = self.get_stage(stage, *texts)
+        if result is not None:
+            return result
+
+        def run():
+            result = self.get_stage(stage, *texts)
+            if result is None:
+                result = compute()
+                self.save_stage(stage, result, *texts)
+            return result
+
+        return _fetch_flight.do((self.cache_dir, self._stage_key(stage, texts)), run)
+
+    def clear_expired_cache(self) -> Dict[str, int]:
+        """
+        Remove as entradas expiradas e aplica o limite de espaço em disco.
+
+        Apenas as entradas vencidas são visitadas (via índice de expiração); se
+        o log ainda exceder ``max_disk_bytes``, as menos usadas são despejadas.
+
+        Returns:
+            Dict com o total de entradas expiradas e despejadas
+        """
+        tiers = (
+            ("análises", self.analyses_store, self.analyses_memory, self.analyses_expiry),
+            ("imagens", self.images_store, self.images_memory, self.images_expiry),
+            ("estágios", self.stages_store, self.stages_memory, self.stages_expiry)
+        )
+        totals = {"expirados": 0, "despejados": 0}
+        for name, store, memory, expiry in tiers:
+            expired = self._remove_due(store, memory, expiry)
+            evicted = store.evict_lru(self.max_disk_bytes)
+            for key in evicted:
+                memory.delete(key)
+
+            if expired:
+                logger.info(f"Removidas {expired} entradas expiradas do cache de {name}")
+            if evicted:
+                logger.info(f"Despejadas {len(evicted)} entradas do cache de {name} (limite de disco)")
+            metrics_collector.record_cache_cleanup(memory.name, expired, len(evicted))
+            totals["expirados"] += expired
+            totals["despejados"] += len(evicted)
+
+            # O despejo só libera disco reescrevendo o log; as entradas expiradas
+            # são recuperadas quando o espaço morto passa do limite do log
+            # (reescrever a cada varredura custaria O(n))
+            if evicted:
+                store.compact()
+            else:
+                store.compact_if_needed()
+        return totals
+
+    def _remove_due(self, store: AppendOnlyStore, memory: LRUCache, expiry: ExpiryIndex) -> int:
+        """Remove as entradas cujo prazo venceu segundo o índice de expiração."""
+        now = time.time()
+        removed = 0
+        for key in expiry.pop_due(now):
+            meta = store.get_meta(key)
+            if meta is None:
+                continue
+            timestamp, ttl = meta
+            if now - timestamp < ttl:
+                # Regravada por outro processo ainda não visto pelo índice
+                expiry.push(key, timestamp + ttl)
+                continue
+            store.delete(key)
+            memory.delete(key)
+            removed += 1
+        return removed
+
+    def start_sweeper(self, interval: float = CACHE_SWEEP_INTERVAL) -> None:
+        """Inicia a limpeza periódica do cache em uma thread em segundo plano."""
+        if self._sweeper is None:
+            self._sweeper = CacheSweeper(self.clear_expired_cache, interval, name="cache-sweeper")
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Interrompe a limpeza periódica do cache."""
+        if self._sweeper is not None:
+            self._sweeper.stop()
+
+    def schedule_cleanup(self) -> bool:
+        """
+        Antecipa a limpeza sem bloquear quem chamou.
+
+        Returns:
+            True se a limpeza foi agendada no sweeper, False se ele não está ativo
+        """
+        if self._sweeper is not None and self._sweeper.is_running:
+            self._sweeper.trigger()
+            return True
+        return False
@@ -0,0 +1,191 @@
+import json
+import zlib
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependência opcional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional
+    zstandard = None
+
+from config import (logger, CACHE_SERIALIZER_FORMAT, CACHE_COMPRESSION,
+                    CACHE_COMPRESS_THRESHOLD, CACHE_COMPRESS_LEVEL)
+
+# Cabeçalho de 3 bytes: versão do formato, codificação e compressão.
+# JSON nunca começa com um byte menor que 0x09 (tab), então entradas antigas
+# gravadas como JSON puro são reconhecidas e lidas sem cabeçalho.
+FORMAT_VERSION = 1
+_HEADER_SIZE = 3
+
+ENCODING_JSON = ord('j')
+ENCODING_MSGPACK = ord('m')
+
+COMPRESSION_NONE = ord('-')
+COMPRESSION_ZLIB = ord('z')
+COMPRESSION_ZSTD = ord('s')
+
+# Falhas de descompressão e decodificação que não são ValueError (corpo
+# corrompido ou truncado); ``loads`` as converte em ValueError
+_DECODE_ERRORS = (zlib.error,)
+if zstandard is not None:
+    _DECODE_ERRORS += (zstandard.ZstdError,)
+if msgpack is not None:
+    _DECODE_ERRORS += (msgpack.UnpackException,)
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+class CacheSerializer:
+    """
+    Serializa entradas de cache em um formato compacto e versionado.
+
+    O corpo é JSON compacto (via orjson, se instalado) ou MessagePack, e é
+    comprimido com zlib ou zstd quando passa de ``threshold`` bytes e a
+    compressão de fato reduz o tamanho. A leitura aceita qualquer combinação
+    suportada, independentemente da configuração atual, além do JSON legado.
+
+    orjson, msgpack e zstandard são opcionais (ver requirements.txt): sem
+    eles, o corpo é gravado com o ``json`` da biblioteca padrão e comprimido
+    com zlib; entradas gravadas em MessagePack ou zstd por outra instalação
+    levantam ``ValueError`` na leitura.
+    """
+
+    def __init__(self, encoding: str = CACHE_SERIALIZER_FORMAT, compression: str = CACHE_COMPRESSION,
+                 threshold: int = CACHE_COMPRESS_THRESHOLD, level: int = CACHE_COMPRESS_LEVEL):
+        """
+        Inicializa o serializador.
+
+        Args:
+            encoding: "json", "msgpack" ou "auto" (JSON compacto, legível sem dependências)
+            compression: "zlib", "zstd" ou "none"
+            threshold: Tamanho mínimo (bytes) do corpo para tentar comprimir
+            level: Nível de compressão
+        """
+        if encoding == "msgpack" and msgpack is None:
+            logger.warning("msgpack não instalado; usando JSON no cache")
+            encoding = "json"
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard não instalado; usando zlib no cache")
+            compression = "zlib"
+        if encoding not in ("json", "msgpack", "auto"):
+            raise ValueError(f"Formato de serialização inválido: {encoding}")
+        if compression not in ("zlib", "zstd", "none"):
+            raise ValueError(f"Compressão inválida: {compression}")
+
+        self.encoding = ENCODING_MSGPACK if encoding == "msgpack" else ENCODING_JSON
+        self.compression = compression
+        self.threshold = threshold
+        self.level = level
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if compression == "zstd" else None
+
+    def _encode(self, data: Any) -> bytes:
+        if self.encoding == ENCODING_MSGPACK:
+            return msgpack.packb(data, use_bin_type=True)
+        if orjson is not None:
+            try:
+                return orjson.dumps(data, option=_ORJSON_OPTIONS)
+            except TypeError:
+                # Tipos que o orjson recusa (ex.: inteiros acima de 64 bits)
+                pass
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def _compress(self, body: bytes):
+        if self.compression == "none" or len(body) < self.threshold:
+            return COMPRESSION_NONE, body
+        if self.compression == "zstd":
+            packed, method = self._zstd_compressor.compress(body), COMPRESSION_ZSTD
+        else:
+            packed, method = zlib.compress(body, self.level), COMPRESSION_ZLIB
+        if len(packed) >= len(body):
+            return COMPRESSION_NONE, body
+        return method, packed
+
+    def dumps(self, data: Any) -> bytes:
+        """
+        Serializa um valor.
+
+        Args:
+            data: Valor serializável em JSON
+
+        Returns:
+            Bytes com cabeçalho de versão
+        """
+        method, body = self._compress(self._encode(data))
+        return bytes((FORMAT_VERSION, self.encoding, method)) + body
+
+    def loads(self, raw: bytes) -> Any:
+        """
+        Desserializa um valor gravado por ``dumps`` ou no formato JSON legado.
+
+        Args:
+            raw: Bytes lidos do cache
+
+        Returns:
+            Valor desserializado
+
+        Raises:
+            ValueError: Se o cabeçalho indicar versão, codificação ou compressão
+                desconhecida, ou se o corpo estiver corrompido
+        """
+        try:
+            return self._loads(raw)
+        except _DECODE_ERRORS as e:
+            raise ValueError(f"Entrada de cache corrompida: {e}") from e
+
+    def _loads(self, raw: bytes) -> Any:
+        if isinstance(raw, str):
+            return json.loads(raw)
+        if not raw or raw[0] >= 0x09:
+            return _json_loads(raw)
+
+        if len(raw) < _HEADER_SIZE:
+            raise ValueError("Entrada de cache truncada no cabeçalho")
+        version, encoding, method = raw[0], raw[1], raw[2]
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Versão de entrada de cache desconhecida: {version}")
+
+        body = memoryview(raw)[_HEADER_SIZE:]
+        if method == COMPRESSION_ZLIB:
+            body = zlib.decompress(body)
+        elif method == COMPRESSION_ZSTD:
+            if zstandard is None:
+                raise ValueError("Entrada comprimida com zstd, mas zstandard não está instalado")
+            body = zstandard.ZstdDecompressor().decompress(body)
+        elif method != COMPRESSION_NONE:
+            raise ValueError(f"Compressão desconhecida na entrada de cache: {method}")
+
+        if encoding == ENCODING_JSON:
+            return _json_loads(body)
+        if encoding == ENCODING_MSGPACK:
+            if msgpack is None:
+                raise ValueError("Entrada em msgpack, mas msgpack não está instalado")
+            return msgpack.unpackb(body, raw=False)
+        raise ValueError(f"Codificação desconhecida na entrada de cache: {encoding}")
+
+
+def _json_loads(raw) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(bytes(raw))
+
+
+serializer = CacheSerializer()
+
+
+def dumps(data: Any) -> bytes:
+    """Serializa um valor com o serializador configurado."""
+    return serializer.dumps(data)
+
+
+def loads(raw: bytes) -> Any:
+    """Desserializa um valor gravado no cache (formato atual ou JSON legado)."""
+    return serializer.loads(raw)
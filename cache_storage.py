@@ -0,0 +1,440 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from config import logger
+
+
+class _IndexEntry(NamedTuple):
+    offset: int      # posição do valor dentro do arquivo
+    size: int        # tamanho do valor em bytes
+    record_size: int # tamanho total do registro (cabeçalho + chave + valor)
+    timestamp: float
+    ttl: float
+
+
+class AppendOnlyStore:
+    """
+    Armazenamento chave/valor em log append-only com índice em memória.
+
+    Cada escrita é anexada ao fim do arquivo e o índice guarda, para cada chave,
+    a posição do valor mais recente. Leituras fazem um único ``pread`` e escritas
+    um único ``write``, independente do tamanho do cache. Registros sobrescritos
+    ou removidos viram espaço morto, recuperado pela compactação periódica.
+
+    O índice é mantido em ordem de uso (LRU), o que permite limitar o espaço em
+    disco despejando as chaves menos usadas com ``evict_lru``.
+
+    Formato do registro:
+        magic (1) | flags (1) | tamanho da chave (4) | tamanho do valor (4) |
+        timestamp (8) | ttl (8) | crc32 (4) | chave | valor
+    """
+
+    MAGIC = 0xCA
+    FLAG_LIVE = 0
+    FLAG_TOMBSTONE = 1
+
+    _HEADER = struct.Struct('>BBIIddI')
+
+    def __init__(self, path: str, compact_ratio: float = 0.5,
+                 compact_min_bytes: int = 1024 * 1024, refresh_interval: float = 1.0,
+                 on_change: Optional[Callable[[str, Optional[float]], None]] = None):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            path: Caminho do arquivo de log
+            compact_ratio: Fração de espaço morto que dispara a compactação
+            compact_min_bytes: Espaço morto mínimo para considerar compactar
+            refresh_interval: Intervalo (s) para detectar compactações feitas por outro processo
+            on_change: Chamado com (chave, prazo de expiração) a cada gravação vista no log,
+                inclusive de outros processos; o prazo é None para remoções
+        """
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+
+        self._lock = threading.RLock()
+        self._index: "OrderedDict[str, _IndexEntry]" = OrderedDict()
+        self._fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._end = 0
+        self._dead_bytes = 0
+        self._last_refresh = 0.0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    # ------------------------------------------------------------------
+    # Abertura, varredura e sincronização com outros processos
+    # ------------------------------------------------------------------
+
+    def _open(self) -> None:
+        """Abre o arquivo de log e reconstrói o índice."""
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._inode = os.fstat(self._fd).st_ino
+        self._index = OrderedDict()
+        self._end = 0
+        self._dead_bytes = 0
+        with self._file_lock():
+            self._scan(truncate_torn_tail=True)
+        self._last_refresh = time.monotonic()
+
+    def _reopen(self) -> None:
+        """Reabre o log (após compactação feita por outro processo)."""
+        if self._fd is not None:
+            os.close(self._fd)
+        self._open()
+
+    def _file_lock(self):
+        """Lock exclusivo entre processos sobre o descritor atual."""
+        return _FileLock(self._fd)
+
+    def _path_inode(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Adquire o lock entre processos garantindo que o descritor aponta para o
+        log atual (outro processo pode ter compactado o arquivo) e que o índice
+        inclui todas as escritas já feitas.
+        """
+        while True:
+            lock = self._file_lock()
+            lock.__enter__()
+            if self._path_inode() == self._inode:
+                break
+            lock.__exit__(None, None, None)
+            self._reopen()
+        try:
+            self._catch_up()
+            yield
+        finally:
+            lock.__exit__(None, None, None)
+
+    def _iter_records(self, start: int) -> Iterator[Tuple[int, int, str, int, int, float, float]]:
+        """
+        Percorre os registros a partir de ``start``.
+
+        Yields:
+            (offset do registro, flags, chave, offset do valor, tamanho do valor, timestamp, ttl)
+        """
+        size = os.fstat(self._fd).st_size
+        offset = start
+        header_size = self._HEADER.size
+        while offset + header_size <= size:
+            header = os.pread(self._fd, header_size, offset)
+            magic, flags, key_len, value_len, timestamp, ttl, crc = self._HEADER.unpack(header)
+            record_end = offset + header_size + key_len + value_len
+            if magic != self.MAGIC or record_end > size:
+                return
+            body = os.pread(self._fd, key_len + value_len, offset + header_size)
+            if zlib.crc32(body) != crc:
+                return
+            key = body[:key_len].decode('utf-8')
+            yield offset, flags, key, offset + header_size + key_len, value_len, timestamp, ttl
+            offset = record_end
+
+    def _scan(self, truncate_torn_tail: bool = False) -> None:
+        """Aplica ao índice os registros anexados desde a última varredura."""
+        end = self._end
+        for offset, flags, key, value_offset, value_len, timestamp, ttl in self._iter_records(self._end):
+            record_size = value_offset + value_len - offset
+            previous = self._index.pop(key, None)
+            if previous:
+                self._dead_bytes += previous.record_size
+            if flags == self.FLAG_TOMBSTONE:
+                self._dead_bytes += record_size
+                self._notify(key, None)
+            else:
+                self._index[key] = _IndexEntry(value_offset, value_len, record_size, timestamp, ttl)
+                self._notify(key, timestamp + ttl)
+            end = offset + record_size
+        self._end = end
+
+        if truncate_torn_tail and os.fstat(self._fd).st_size > self._end:
+            # Registro incompleto (ex.: queda durante a escrita) é descartado
+            logger.warning(f"Descartando registro incompleto no fim de {self.path}")
+            os.ftruncate(self._fd, self._end)
+
+    def _catch_up(self) -> None:
+        """Aplica as escritas de outros processos; se o log encolheu, refaz o índice."""
+        size = os.fstat(self._fd).st_size
+        if size < self._end:
+            # Truncado por outro processo: as posições do índice não valem mais
+            for key in self._index:
+                self._notify(key, None)
+            self._index = OrderedDict()
+            self._end = 0
+            self._dead_bytes = 0
+        if size != self._end:
+            self._scan()
+
+    def _notify(self, key: str, deadline: Optional[float]) -> None:
+        if self.on_change is not None:
+            self.on_change(key, deadline)
+
+    def _refresh(self) -> None:
+        """Incorpora escritas e compactações feitas por outros processos."""
+        now = time.monotonic()
+        if now - self._last_refresh >= self.refresh_interval:
+            self._last_refresh = now
+            if self._path_inode() != self._inode:
+                self._reopen()
+                return
+        self._catch_up()
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float, float]]:
+        """
+        Lê o valor de uma chave.
+
+        Args:
+            key: Chave do item
+
+        Returns:
+            Tupla (valor, timestamp, ttl) ou None se a chave não existir
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            self._index.move_to_end(key)
+            return os.pread(self._fd, entry.size, entry.offset), entry.timestamp, entry.ttl
+
+    def get_meta(self, key: str) -> Optional[Tuple[float, float]]:
+        """Retorna (timestamp, ttl) de uma chave sem ler o valor."""
+        with self._lock:
+            entry = self._index.get(key)
+            return (entry.timestamp, entry.ttl) if entry else None
+
+    def set(self, key: str, value: bytes, ttl: float, timestamp: Optional[float] = None) -> None:
+        """
+        Grava um valor anexando um novo registro ao log.
+
+        Args:
+            key: Chave do item
+            value: Valor já serializado
+            ttl: Tempo de vida em segundos
+            timestamp: Momento da gravação (padrão: agora)
+        """
+        self._append(key, value, self.FLAG_LIVE, timestamp or time.time(), ttl)
+
+    def delete(self, key: str) -> bool:
+        """Remove uma chave gravando um registro de exclusão."""
+        with self._lock:
+            self._refresh()
+            if key not in self._index:
+                return False
+            self._append(key, b'', self.FLAG_TOMBSTONE, time.time(), 0)
+            return True
+
+    def _append(self, key: str, value: bytes, flags: int, timestamp: float, ttl: float) -> None:
+        key_bytes = key.encode('utf-8')
+        body = key_bytes + value
+        record = self._HEADER.pack(
+            self.MAGIC, flags, len(key_bytes), len(value), timestamp, ttl, zlib.crc32(body)
+        ) + body
+
+        with self._lock:
+            with self._exclusive():
+                offset = self._end
+                os.write(self._fd, record)
+                self._end = offset + len(record)
+
+                previous = self._index.pop(key, None)
+                if previous:
+                    self._dead_bytes += previous.record_size
+                if flags == self.FLAG_TOMBSTONE:
+                    self._dead_bytes += len(record)
+                    self._notify(key, None)
+                else:
+                    value_offset = offset + self._HEADER.size + len(key_bytes)
+                    self._index[key] = _IndexEntry(value_offset, len(value), len(record), timestamp, ttl)
+                    self._notify(key, timestamp + ttl)
+
+            if self._should_compact():
+                self.compact()
+
+    def _should_compact(self) -> bool:
+        return (
+            self._dead_bytes >= self.compact_min_bytes
+            and self._dead_bytes >= self._end * self.compact_ratio
+        )
+
+    def compact_if_needed(self) -> bool:
+        """
+        Compacta o log só se o espaço morto passou dos limites configurados.
+
+        Returns:
+            True se o log foi compactado
+        """
+        with self._lock:
+            if not self._should_compact():
+                return False
+            self.compact()
+            return True
+
+    def compact(self, drop_expired: bool = True) -> None:
+        """
+        Reescreve o log apenas com os registros vivos.
+
+        Args:
+            drop_expired: Se True, descarta também os itens já expirados
+        """
+        with self._lock:
+            with self._exclusive():
+                now = time.time()
+                tmp_path = f"{self.path}.compact"
+                new_index: "OrderedDict[str, _IndexEntry]" = OrderedDict()
+                with open(tmp_path, 'wb') as tmp:
+                    offset = 0
+                    for key, entry in self._index.items():
+                        if drop_expired and now - entry.timestamp > entry.ttl:
+                            continue
+                        value = os.pread(self._fd, entry.size, entry.offset)
+                        key_bytes = key.encode('utf-8')
+                        body = key_bytes + value
+                        record = self._HEADER.pack(
+                            self.MAGIC, self.FLAG_LIVE, len(key_bytes), len(value),
+                            entry.timestamp, entry.ttl, zlib.crc32(body)
+                        ) + body
+                        tmp.write(record)
+                        value_offset = offset + self._HEADER.size + len(key_bytes)
+                        new_index[key] = _IndexEntry(value_offset, len(value), len(record),
+                                                     entry.timestamp, entry.ttl)
+                        offset += len(record)
+                    tmp.flush()
+                    os.fsync(tmp.fileno())
+                os.replace(tmp_path, self.path)
+                old_fd = self._fd
+
+            os.close(old_fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND, 0o644)
+            self._inode = os.fstat(self._fd).st_ino
+            self._index = new_index
+            self._end = offset
+            self._dead_bytes = 0
+            logger.info(f"Log {self.path} compactado: {len(new_index)} itens, {offset} bytes")
+
+    def evict_lru(self, max_bytes: int) -> List[str]:
+        """
+        Remove as chaves menos usadas até os registros vivos caberem em ``max_bytes``.
+
+        O espaço só é devolvido ao disco na próxima compactação.
+
+        Args:
+            max_bytes: Tamanho máximo dos registros vivos
+
+        Returns:
+            Lista de chaves removidas
+        """
+        evicted = []
+        with self._lock:
+            self._refresh()
+            while self._index and self.live_bytes > max_bytes:
+                key = next(iter(self._index))
+                self._append(key, b'', self.FLAG_TOMBSTONE, time.time(), 0)
+                evicted.append(key)
+        return evicted
+
+    def keys(self):
+        """Retorna uma cópia das chaves presentes no índice."""
+        with self._lock:
+            return list(self._index.keys())
+
+    def items_meta(self):
+        """Retorna (chave, timestamp, ttl) de todas as chaves, sem ler os valores."""
+        with self._lock:
+            return [(key, entry.timestamp, entry.ttl) for key, entry in self._index.items()]
+
+    def clear(self) -> None:
+        """
+        Remove todos os itens do log.
+
+        Como na compactação, o log vazio substitui o arquivo (novo inode), e os
+        demais processos reabrem o arquivo em vez de ler as posições antigas.
+        """
+        with self._lock:
+            with self._exclusive():
+                tmp_path = f"{self.path}.clear"
+                with open(tmp_path, 'wb') as tmp:
+                    os.fsync(tmp.fileno())
+                os.replace(tmp_path, self.path)
+                old_fd = self._fd
+
+            os.close(old_fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND, 0o644)
+            self._inode = os.fstat(self._fd).st_ino
+            for key in self._index:
+                self._notify(key, None)
+            self._index = OrderedDict()
+            self._end = 0
+            self._dead_bytes = 0
+
+    def close(self) -> None:
+        """Fecha o arquivo de log."""
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    @property
+    def size_bytes(self) -> int:
+        """Tamanho atual do log em bytes."""
+        return self._end
+
+    @property
+    def live_bytes(self) -> int:
+        """Bytes ocupados pelos registros vivos."""
+        return self._end - self._dead_bytes
+
+    @property
+    def dead_bytes(self) -> int:
+        """Bytes ocupados por registros sobrescritos ou removidos."""
+        return self._dead_bytes
+
+
+class _FileLock:
+    """Context manager de ``flock`` exclusivo (no-op onde não há fcntl)."""
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def __enter__(self):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        return False
@@ -1,4 +1,5 @@
 import os
+import json
 import logging
 from dotenv import load_dotenv
 
@@ -26,6 +27,140 @@ SERVER_PORT = int(os.getenv('SERVER_PORT', 5001))
 
 # Configurações de cache
 CACHE_TTL = int(os.getenv('CACHE_TTL', 3600))  # 1 hora em segundos
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', 2048))
+CACHE_MEMORY_MAX_BYTES = int(os.getenv('CACHE_MEMORY_MAX_BYTES', 64 * 1024 * 1024))  # 64 MB
+CACHE_MEMORY_TTL = int(os.getenv('CACHE_MEMORY_TTL', 300))  # limita a defasagem entre workers
+CACHE_MAX_DISK_BYTES = int(os.getenv('CACHE_MAX_DISK_BYTES', 512 * 1024 * 1024))  # 512 MB por cache
+CACHE_SWEEP_INTERVAL = int(os.getenv('CACHE_SWEEP_INTERVAL', 300))  # 5 minutos
+CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 4))
+
+# Serialização das entradas de cache: "auto" (JSON compacto), "json" ou "msgpack";
+# corpos acima do limite são comprimidos com "zlib", "zstd" ou "none"
+CACHE_SERIALIZER_FORMAT = os.getenv('CACHE_SERIALIZER_FORMAT', 'auto').lower()
+CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'zlib').lower()
+CACHE_COMPRESS_THRESHOLD = int(os.getenv('CACHE_COMPRESS_THRESHOLD', 1024))  # bytes
+CACHE_COMPRESS_LEVEL = int(os.getenv('CACHE_COMPRESS_LEVEL', 3))
+
+# Cliente HTTP compartilhado pelas integrações (timeouts em segundos)
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 3))
+HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', 0.5))
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', 20))  # hosts com pool mantido
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 10))  # conexões por host
+HTTP_ASYNC_CONCURRENCY = int(os.getenv('HTTP_ASYNC_CONCURRENCY', 10))  # requisições simultâneas por cliente assíncrono
+# Revalidação condicional: corpos com ETag/Last-Modified são guardados e a próxima
+# consulta à mesma URL envia If-None-Match/If-Modified-Since (304 = corpo guardado)
+HTTP_REVALIDATION = os.getenv('HTTP_REVALIDATION', 'true').lower() in ('1', 'true', 'yes')
+HTTP_REVALIDATION_TTL = int(os.getenv('HTTP_REVALIDATION_TTL', 7 * 24 * 3600))
+HTTP_REVALIDATION_MAX_BYTES = int(os.getenv('HTTP_REVALIDATION_MAX_BYTES', 2 * 1024 * 1024))  # por corpo
+
+# Validação de URLs de imagem em lote (HEAD concorrente com prazo por lote)
+IMAGE_VALIDATION_CONCURRENCY = int(os.getenv('IMAGE_VALIDATION_CONCURRENCY', 20))
+IMAGE_VALIDATION_PER_HOST = int(os.getenv('IMAGE_VALIDATION_PER_HOST', 4))
+IMAGE_VALIDATION_TIMEOUT = float(os.getenv('IMAGE_VALIDATION_TIMEOUT', 5.0))  # por requisição
+IMAGE_VALIDATION_DEADLINE = float(os.getenv('IMAGE_VALIDATION_DEADLINE', 2.0))  # por lote
+IMAGE_VALIDATION_TTL = int(os.getenv('IMAGE_VALIDATION_TTL', 24 * 3600))
+IMAGE_VALIDATION_INVALID_TTL = int(os.getenv('IMAGE_VALIDATION_INVALID_TTL', 3600))
+
+# Download de imagens em streaming: limite de tamanho e tamanho dos blocos
+DOWNLOAD_MAX_BYTES = int(os.getenv('DOWNLOAD_MAX_BYTES', 15 * 1024 * 1024))
+DOWNLOAD_CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', 64 * 1024))
+
+# Paginação concorrente: páginas buscadas à frente do consumidor e diretório dos
+# checkpoints que permitem retomar uma coleta interrompida
+PAGED_FETCH_PREFETCH = int(os.getenv('PAGED_FETCH_PREFETCH', 4))
+PAGED_FETCH_CHECKPOINT_DIR = os.getenv('PAGED_FETCH_CHECKPOINT_DIR', 'cache/checkpoints')
+
+# Espelho local do catálogo Caixa/Scraphub: a sincronização grava só itens novos
+# ou alterados e marca os removidos; os endpoints servem do espelho enquanto o
+# atraso for menor que CATALOG_MIRROR_MAX_LAG (senão consultam a API).
+# CATALOG_SINCE_PARAM é o parâmetro da API para listar só itens alterados desde
+# uma data (vazio = toda sincronização percorre o catálogo inteiro)
+CATALOG_MIRROR_PATH = os.getenv('CATALOG_MIRROR_PATH', 'cache/catalogo.db')
+CATALOG_SYNC_INTERVAL = int(os.getenv('CATALOG_SYNC_INTERVAL', 600))
+CATALOG_FULL_SYNC_INTERVAL = int(os.getenv('CATALOG_FULL_SYNC_INTERVAL', 6 * 3600))
+CATALOG_MIRROR_MAX_LAG = int(os.getenv('CATALOG_MIRROR_MAX_LAG', 3600))
+CATALOG_SINCE_PARAM = os.getenv('CATALOG_SINCE_PARAM', '')
+
+# Séries do Banco Central (SGS) guardadas localmente: só as datas que faltam são
+# baixadas; o trecho após o último ponto é consultado de novo após o TTL
+BCB_SERIES_DIR = os.getenv('BCB_SERIES_DIR', 'cache/series_bcb')
+BCB_SERIES_REFRESH_TTL = int(os.getenv('BCB_SERIES_REFRESH_TTL', 6 * 3600))
+
+# Índice local dos municípios do IBGE, distribuído com o código (atualizado por
+# scripts/update_ibge_municipios.py)
+IBGE_MUNICIPIOS_PATH = os.getenv(
+    'IBGE_MUNICIPIOS_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ibge_municipios.csv')
+)
+
+# Agregados do SIDRA (IBGE) guardados localmente por (agregado, variável, período,
+# município); as consultas em lote agrupam até IBGE_AGREGADOS_BATCH_SIZE municípios
+# por requisição e só voltam à API depois de IBGE_AGREGADOS_TTL segundos
+IBGE_AGREGADOS_PATH = os.getenv('IBGE_AGREGADOS_PATH', 'cache/ibge_agregados.db')
+IBGE_AGREGADOS_TTL = int(os.getenv('IBGE_AGREGADOS_TTL', 7 * 24 * 3600))
+IBGE_AGREGADOS_BATCH_SIZE = int(os.getenv('IBGE_AGREGADOS_BATCH_SIZE', 100))
+
+# Índice local de CEPs: aprende com cada resposta do ViaCEP e pode ser carregado
+# de um CSV (scripts/load_ceps.py); CEPs inexistentes são lembrados por
+# CEP_NOT_FOUND_TTL segundos antes de consultar o ViaCEP de novo
+CEP_INDEX_PATH = os.getenv('CEP_INDEX_PATH', 'cache/ceps.db')
+CEP_NOT_FOUND_TTL = int(os.getenv('CEP_NOT_FOUND_TTL', 7 * 24 * 3600))
+
+# Geocodificação persistente: resultados guardados pela chave normalizada do
+# endereço; endereços sem resultado são consultados de novo após
+# GEOCODING_NOT_FOUND_TTL e saem da fila após GEOCODING_MAX_ATTEMPTS falhas
+GEOCODING_STORE_PATH = os.getenv('GEOCODING_STORE_PATH', 'cache/geocodificacao.db')
+GEOCODING_NOT_FOUND_TTL = int(os.getenv('GEOCODING_NOT_FOUND_TTL', 30 * 24 * 3600))
+GEOCODING_MAX_ATTEMPTS = int(os.getenv('GEOCODING_MAX_ATTEMPTS', 3))
+
+# OpenStreetMap: o Nominatim público permite 1 req/s sem concorrência; instâncias
+# próprias (Nominatim/Overpass) podem aumentar taxa, rajada e concorrência
+OSM_BASE_URL = os.getenv('OSM_BASE_URL', 'https://nominatim.openstreetmap.org')
+OSM_RATE_LIMIT = float(os.getenv('OSM_RATE_LIMIT', 1.0))  # requisições por segundo
+OSM_BURST = int(os.getenv('OSM_BURST', 1))
+OSM_MAX_CONCURRENCY = int(os.getenv('OSM_MAX_CONCURRENCY', 1))
+
+# Disjuntores das fontes externas: falhas seguidas que abrem o circuito, tempo
+# em aberto antes de testar a fonte de novo e timeout adaptativo (percentil da
+# latência recente vezes o multiplicador, entre o mínimo e o máximo)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', 30))
+CIRCUIT_LATENCY_WINDOW = int(os.getenv('CIRCUIT_LATENCY_WINDOW', 100))  # chamadas
+CIRCUIT_TIMEOUT_PERCENTILE = float(os.getenv('CIRCUIT_TIMEOUT_PERCENTILE', 95))
+CIRCUIT_TIMEOUT_MULTIPLIER = float(os.getenv('CIRCUIT_TIMEOUT_MULTIPLIER', 3.0))
+CIRCUIT_TIMEOUT_MIN = float(os.getenv('CIRCUIT_TIMEOUT_MIN', 1.0))
+CIRCUIT_TIMEOUT_MAX = float(os.getenv('CIRCUIT_TIMEOUT_MAX', HTTP_READ_TIMEOUT))
+
+# Cache compartilhado entre workers: "sqlite" (local), "redis" (qualquer servidor compatível) ou "none"
+SHARED_CACHE_BACKEND = os.getenv('SHARED_CACHE_BACKEND', 'sqlite').lower()
+SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL', 'redis://localhost:6379/0')
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH', 'cache/shared_cache.db')
+SHARED_CACHE_LOCAL_TTL = int(os.getenv('SHARED_CACHE_LOCAL_TTL', 60))  # cópia local de cada worker
+SHARED_CACHE_SYNC_INTERVAL = float(os.getenv('SHARED_CACHE_SYNC_INTERVAL', 1.0))
+
+# Limites de taxa por host: o estado fica na memória do processo ("local"), em
+# SQLite ("sqlite", compartilhado entre processos da máquina) ou em "redis".
+# RATE_LIMITS sobrepõe a política de hosts específicos, em JSON:
+#   {"nominatim.openstreetmap.org": {"rate": 1, "burst": 1, "mode": "leaky"}}
+RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'local').lower()
+RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', 'cache/rate_limits.db')
+RATE_LIMIT_URL = os.getenv('RATE_LIMIT_URL', SHARED_CACHE_URL)
+RATE_LIMITS = json.loads(os.getenv('RATE_LIMITS', '{}'))
+
+# Janelas de cache por fonte (segundos): 'fresh' = dado servido sem consulta;
+# 'grace' = após o fresh, dado servido na hora enquanto é atualizado em segundo plano
+CACHE_POLICIES = {
+    'caixa': {
+        'fresh': int(os.getenv('CAIXA_CACHE_FRESH_TTL', 3600)),
+        'grace': int(os.getenv('CAIXA_CACHE_GRACE_TTL', 6 * 3600)),
+    },
+    'scraphub': {
+        'fresh': int(os.getenv('SCRAPHUB_CACHE_FRESH_TTL', 900)),
+        'grace': int(os.getenv('SCRAPHUB_CACHE_GRACE_TTL', 3600)),
+    },
+}
 
 # Configurações de geolocalização
 OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
@@ -8,6 +8,7 @@ from config import logger, API_PORT, DEBUG_MODE
 from cache_manager import CacheManager
 from monitoring import metrics_collector
 from src.integrations.caixa_api import CaixaImoveisAPI
+from services.catalog_mirror import catalog_page
 import time
 import traceback
 import threading
@@ -45,6 +46,12 @@ def add_security_headers(response):
     return response
 
 cache_manager = CacheManager()
+caixa_api = CaixaImoveisAPI(cache_manager)
+
+# Limpeza periódica do cache iniciada na importação, para valer também sob
+# gunicorn (cada worker importa o módulo; com --preload o sweeper é reiniciado
+# nos processos filhos após o fork)
+cache_manager.start_sweeper()
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -177,11 +184,16 @@ def cache_maintenance():
         action = request.args.get('action', 'clean')
         
         if action == 'clean':
-            cache_manager.clear_expired_cache()
+            # Com o sweeper ativo a limpeza roda em segundo plano, sem segurar a requisição
+            if cache_manager.schedule_cleanup():
+                message = "Limpeza do cache agendada"
+            else:
+                cache_manager.clear_expired_cache()
+                message = "Cache limpo com sucesso"
             metrics_collector.record_api_call(True, time.time() - start_time)
             return jsonify({
                 "status": "success",
-                "message": "Cache limpo com sucesso"
+                "message": message
             })
         else:
             metrics_collector.record_api_call(False, time.time() - start_time)
@@ -246,9 +258,9 @@ def get_imoveis_caixa():
         # Pega o número da página dos query params, default é 1
         page = request.args.get('page', 1, type=int)
         
-        # Busca os dados da API
-        caixa_api = CaixaImoveisAPI()
-        resultado = caixa_api.get_imoveis(page)
+        # Serve do espelho local (scripts/sync_catalog.py) enquanto ele estiver em dia;
+        # senão busca na API (ou no cache compartilhado)
+        resultado = catalog_page(page, caixa_api.get_imoveis)
         
         duration = time.time() - start_time
         metrics_collector.record_api_call('/api/imoveis-caixa', duration)
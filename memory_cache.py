@@ -0,0 +1,173 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+_MISSING = object()
+
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: Optional[float]
+
+
+class LRUCache:
+    """
+    Cache em memória do processo, limitado em número de entradas e em bytes.
+
+    Cada entrada tem um TTL próprio; ao exceder qualquer um dos limites as
+    entradas menos usadas recentemente são despejadas. Leituras e escritas são
+    O(1) e protegidas por lock, sem chamadas de sistema nem desserialização.
+
+    Os valores são devolvidos por referência: quem lê não deve alterá-los.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: Optional[float] = None, name: str = "memoria"):
+        """
+        Inicializa o cache.
+
+        Args:
+            max_entries: Número máximo de entradas
+            max_bytes: Tamanho máximo estimado das entradas, em bytes
+            default_ttl: TTL padrão em segundos (None = sem expiração)
+            name: Nome usado nos logs e métricas
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.name = name
+
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Obtém um valor do cache.
+
+        Args:
+            key: Chave do item
+            default: Valor retornado se a chave não existir ou estiver expirada
+
+        Returns:
+            Valor armazenado ou ``default``
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry.expires_at is not None and time.monotonic() >= entry.expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            size: Optional[int] = None) -> None:
+        """
+        Armazena um valor no cache.
+
+        Args:
+            key: Chave do item
+            value: Valor a ser armazenado
+            ttl: Tempo de vida em segundos (padrão: ``default_ttl``)
+            size: Tamanho do valor em bytes (estimado se não informado)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            self.delete(key)
+            return
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            # Item maior que o cache inteiro: não vale a pena guardar
+            self.delete(key)
+            return
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = _Entry(value, size, expires_at)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove uma chave do cache."""
+        with self._lock:
+            if key not in self._data:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self) -> None:
+        """Remove todas as entradas."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        """Despeja as entradas menos usadas até respeitar os limites."""
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._data.popitem(last=False)
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "nome": self.name,
+                "entradas": len(self._data),
+                "bytes": self._bytes,
+                "max_entradas": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "despejos": self.evictions,
+                "expiracoes": self.expirations
+            }
+
+    @property
+    def size_bytes(self) -> int:
+        """Tamanho estimado das entradas em bytes."""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """Estima o tamanho em memória de um valor, percorrendo listas e dicionários."""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    return size
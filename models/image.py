@@ -23,6 +23,8 @@ class PropertyImage(BaseModel):
     property_id: str
     image_url: str
     local_path: str
+    sha256: Optional[str] = None
+    size: Optional[int] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -27,6 +27,14 @@ class Monitoring:
             'api_calls': [],
             'cache_hits': 0,
             'cache_misses': 0,
+            'cache_tiers': {},
+            'cache_cleanup': {},
+            'single_flight': {},
+            'http': {},
+            'revalidation': {},
+            'rate_limit': {},
+            'circuit_breakers': {},
+            'mirror': {},
             'errors': [],
             'start_time': time.time()
         }
@@ -55,6 +63,96 @@ class Monitoring:
             self.record_cache_miss()
         self.metrics['cache_size'] = cache_size
         
+    def record_tier_operation(self, cache_name: str, tier: str, is_hit: bool) -> None:
+        """Registra um hit ou miss em uma camada de cache (ex.: memória, disco)"""
+        key = f"{cache_name}.{tier}"
+        tier_metrics = self.metrics['cache_tiers'].setdefault(key, {'hits': 0, 'misses': 0})
+        if is_hit:
+            tier_metrics['hits'] += 1
+        else:
+            tier_metrics['misses'] += 1
+            
+    def record_cache_cleanup(self, cache_name: str, expired: int, evicted: int) -> None:
+        """Registra uma limpeza de cache (itens expirados e despejados por limite de espaço)"""
+        cleanup = self.metrics['cache_cleanup'].setdefault(
+            cache_name, {'expirados': 0, 'despejados': 0, 'execucoes': 0}
+        )
+        cleanup['expirados'] += expired
+        cleanup['despejados'] += evicted
+        cleanup['execucoes'] += 1
+        
+    def record_single_flight(self, name: str, is_leader: bool) -> None:
+        """Registra uma chamada que executou (líder) ou aguardou outra idêntica (agrupada)"""
+        flight = self.metrics['single_flight'].setdefault(name, {'lideres': 0, 'agrupadas': 0})
+        if is_leader:
+            flight['lideres'] += 1
+        else:
+            flight['agrupadas'] += 1
+            
+    def record_http_request(self, host: str, duration: float, status: Any = None) -> None:
+        """Registra uma requisição HTTP de saída por host (status None = falha de conexão)"""
+        http = self.metrics['http'].setdefault(
+            host, {'requisicoes': 0, 'erros': 0, 'tempo_total': 0.0}
+        )
+        http['requisicoes'] += 1
+        http['tempo_total'] += duration
+        if status is None or status >= 500:
+            http['erros'] += 1
+            
+    def record_http_revalidation(self, host: str, modified: bool, bytes_saved: int = 0) -> None:
+        """Registra uma requisição condicional por host e os bytes que deixaram de ser baixados"""
+        revalidacao = self.metrics['revalidation'].setdefault(
+            host, {'condicionais': 0, 'nao_modificados': 0, 'bytes_economizados': 0}
+        )
+        revalidacao['condicionais'] += 1
+        if not modified:
+            revalidacao['nao_modificados'] += 1
+            revalidacao['bytes_economizados'] += bytes_saved
+            
+    def record_rate_limit_wait(self, key: str, wait: float) -> None:
+        """Registra o tempo de espera imposto por um limitador de taxa"""
+        limite = self.metrics['rate_limit'].setdefault(
+            key, {'requisicoes': 0, 'esperas': 0, 'tempo_espera': 0.0, 'espera_maxima': 0.0}
+        )
+        limite['requisicoes'] += 1
+        if wait > 0:
+            limite['esperas'] += 1
+            limite['tempo_espera'] += wait
+            limite['espera_maxima'] = max(limite['espera_maxima'], wait)
+            
+    def record_circuit_transition(self, name: str, state: str) -> None:
+        """Registra a mudança de estado do disjuntor de uma fonte externa"""
+        circuito = self.metrics['circuit_breakers'].setdefault(name, {'estado': None, 'transicoes': {}})
+        circuito['estado'] = state
+        circuito['transicoes'][state] = circuito['transicoes'].get(state, 0) + 1
+            
+    def record_mirror_sync(self, name: str, full: bool, counts: Dict[str, int], duration: float,
+                           synced_at: float) -> None:
+        """Registra uma sincronização do espelho local de um catálogo externo"""
+        espelho = self.metrics['mirror'].setdefault(
+            name, {'sincronizacoes': 0, 'completas': 0, 'novos': 0, 'alterados': 0, 'removidos': 0,
+                   'tempo_total': 0.0, 'ultima_sincronizacao': None}
+        )
+        espelho['sincronizacoes'] += 1
+        espelho['completas'] += int(full)
+        for key in ('novos', 'alterados', 'removidos'):
+            espelho[key] += counts.get(key, 0)
+        espelho['tempo_total'] += duration
+        espelho['ultima_sincronizacao'] = synced_at
+            
+    def get_tier_hit_rates(self) -> Dict[str, float]:
+        """Retorna a taxa de acerto de cada camada de cache"""
+        rates = {}
+        for key, tier_metrics in self.metrics['cache_tiers'].items():
+            total = tier_metrics['hits'] + tier_metrics['misses']
+            rates[key] = tier_metrics['hits'] / total if total else 0.0
+        return rates
+        
+    def get_cache_hit_rate(self) -> float:
+        """Retorna a taxa de acerto global do cache"""
+        total = self.metrics['cache_hits'] + self.metrics['cache_misses']
+        return self.metrics['cache_hits'] / total if total else 0.0
+        
     def record_error(self, error: Exception, context: Dict[str, Any] = None) -> None:
         """Registra um erro"""
         self.metrics['errors'].append({
@@ -66,9 +164,15 @@ class Monitoring:
         
     def get_metrics(self) -> Dict[str, Any]:
         """Retorna todas as métricas coletadas"""
+        now = time.time()
         return {
             **self.metrics,
-            'uptime': time.time() - self.metrics['start_time']
+            # O atraso do espelho cresce entre as sincronizações: é calculado na leitura
+            'mirror': {
+                name: {**espelho, 'atraso_segundos': now - espelho['ultima_sincronizacao']}
+                for name, espelho in self.metrics['mirror'].items()
+            },
+            'uptime': now - self.metrics['start_time']
         }
         
     def reset_metrics(self) -> None:
@@ -77,6 +181,14 @@ class Monitoring:
             'api_calls': [],
             'cache_hits': 0,
             'cache_misses': 0,
+            'cache_tiers': {},
+            'cache_cleanup': {},
+            'single_flight': {},
+            'http': {},
+            'revalidation': {},
+            'rate_limit': {},
+            'circuit_breakers': {},
+            'mirror': {},
             'errors': [],
             'start_time': time.time()
         }
@@ -0,0 +1,150 @@
+"""
+Benchmark das variantes assíncronas das integrações de dados públicos.
+
+Sobe um servidor HTTP local que imita as respostas do IBGE, do BCB e do
+ViaCEP com uma latência fixa por requisição e compara, para cada consulta
+composta, a variante síncrona (subconsultas em sequência, pelo cliente HTTP
+compartilhado) com a assíncrona, que as dispara em paralelo.
+
+Uso:
+    python scripts/benchmark_async_integrations.py [--latency 0.1] [--rounds 5]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis.integrations.ibge_api import IBGEAPI
+from analysis.integrations.bcb_api import BCBAPI
+from services.series_store import SeriesStore
+from services.agregados_store import AgregadosStore
+from analysis.integrations.ibge_data import IBGEDataCollector
+from analysis.integrations.address_api import AddressAPI
+from services.async_http_client import run_sync
+
+MUNICIPIO = {
+    "id": 3550308, "nome": "São Paulo",
+    "microrregiao": {"id": 35061, "nome": "São Paulo", "mesorregiao": {
+        "id": 3515, "nome": "Metropolitana de São Paulo", "UF": {
+            "id": 35, "sigla": "SP", "nome": "São Paulo",
+            "regiao": {"id": 3, "sigla": "SE", "nome": "Sudeste"}}}}
+}
+LOCALIDADES = re.compile(r"N6\[([\d,]+)\]")
+SERIE = [{"data": "01/01/2024", "valor": 0.5}] * 12
+CEP = {"cep": "01310-100", "logradouro": "Avenida Paulista", "complemento": "", "bairro": "Bela Vista",
+       "localidade": "São Paulo", "uf": "SP", "ibge": "3550308", "gia": "1004", "ddd": "11", "siafi": "7107"}
+
+
+def make_handler(latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            path = self.path
+            if "/localidades/municipios/" in path:
+                data = MUNICIPIO
+            elif "/projecoes/populacao/" in path:
+                data = {"projecao": {"populacao": 12325232, "ano": 2020, "periodo": "2020"}}
+            elif "/agregados/" in path:
+                # Uma série por município pedido (as consultas em lote pedem vários)
+                codigos = LOCALIDADES.search(unquote(path)).group(1).split(",")
+                data = [{"id": path.split("/variaveis/")[1].split("?")[0], "resultados": [{"series": [
+                    {"localidade": {"id": codigo}, "serie": {"2022": "11451245"}} for codigo in codigos]}]}]
+            elif "bcdata.sgs" in path:
+                data = SERIE
+            elif path.endswith("/json/"):
+                data = CEP
+            else:
+                data = {"valor": 1}
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def measure(fn, rounds: int) -> float:
+    fn()  # aquecimento (abre as conexões)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="latência simulada por requisição (s)")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    ibge = IBGEAPI()
+    ibge.base_url = f"{base}/ibge/v1"
+    # Séries só em memória e sempre vencidas: cada rodada volta a consultar o SGS
+    bcb = BCBAPI(series_store=SeriesStore(directory=None, refresh_ttl=0))
+    bcb.base_url = f"{base}/bcdata.sgs"
+    # Agregados num arquivo temporário e sempre vencidos: cada rodada volta a consultar a API
+    tmp_dir = tempfile.mkdtemp()
+    coletor = IBGEDataCollector(agregados_store=AgregadosStore(os.path.join(tmp_dir, "agregados.db"), ttl=0))
+    coletor.base_url = f"{base}/ibge/v3"
+    # Uma triagem: 20 municípios, um a um (3 requisições cada) ou num lote por agregado
+    codigos = list(range(3500105, 3500105 + 20))
+    enderecos = AddressAPI()
+    enderecos.base_url = f"{base}/ws"
+    lista = [f"Avenida Paulista {i}, São Paulo - SP" for i in range(10)]
+
+    cenarios = [
+        ("IBGEAPI.get_complete_city_data",
+         lambda: ibge.get_complete_city_data("3550308"),
+         lambda: run_sync(ibge.get_complete_city_data_async("3550308"))),
+        ("BCBAPI.get_economic_indicators",
+         bcb.get_economic_indicators,
+         lambda: run_sync(bcb.get_economic_indicators_async())),
+        ("IBGEDataCollector (3 agregados)",
+         lambda: coletor._coletar_municipio_data("3550308"),
+         lambda: run_sync(coletor._coletar_municipio_data_async("3550308"))),
+        ("IBGEDataCollector (20 municípios)",
+         lambda: [coletor._coletar_municipio_data(codigo) for codigo in codigos],
+         lambda: run_sync(coletor._carregar_lote_async(codigos))),
+        ("AddressAPI.enrich_addresses (10)",
+         lambda: enderecos.enrich_addresses(lista),
+         lambda: run_sync(enderecos.enrich_addresses_async(lista))),
+    ]
+
+    try:
+        print(f"latência simulada: {args.latency * 1000:.0f} ms por requisição")
+        print(f"{'consulta':<36} | {'sequencial (ms)':>15} | {'paralelo (ms)':>13} | {'ganho':>6}")
+        print("-" * 80)
+        for nome, sequencial, paralelo in cenarios:
+            t_seq = measure(sequencial, args.rounds)
+            t_par = measure(paralelo, args.rounds)
+            print(f"{nome:<36} | {t_seq:>15.0f} | {t_par:>13.0f} | {t_seq / t_par:>5.1f}x")
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
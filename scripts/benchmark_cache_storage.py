@@ -0,0 +1,132 @@
+"""
+Benchmark do armazenamento do cache.
+
+Compara o custo por operação do log append-only (AppendOnlyStore) com o
+formato antigo (um único JSON relido e regravado a cada chamada) à medida
+que o número de entradas cresce.
+
+Uso:
+    python scripts/benchmark_cache_storage.py [--entries 100000] [--ops 10000]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_storage import AppendOnlyStore
+
+PAYLOAD = {
+    "id": 47106,
+    "site_id": "8444405682744",
+    "data": {
+        "title": "Apartamento 2 quartos - Centro",
+        "address": "Rua Exemplo, 123",
+        "city": "São Paulo",
+        "state": "SP",
+        "sale_value": "150000.00",
+        "images": ["https://venda-imoveis.caixa.gov.br/fotos/F8444405682744.jpg"],
+    },
+}
+
+
+def encode(data):
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def bench_store(directory: str, entries: int, ops: int) -> dict:
+    """Preenche o log com ``entries`` itens e mede leituras e escritas aleatórias."""
+    store = AppendOnlyStore(os.path.join(directory, "bench.log"))
+    value = encode(PAYLOAD)
+
+    start = time.perf_counter()
+    for i in range(entries):
+        store.set(f"imoveis_caixa_page_{i}", value, ttl=3600)
+    fill = time.perf_counter() - start
+
+    keys = [f"imoveis_caixa_page_{random.randrange(entries)}" for _ in range(ops)]
+
+    start = time.perf_counter()
+    for key in keys:
+        json.loads(store.get(key)[0])
+    get_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        store.set(key, value, ttl=3600)
+    set_time = time.perf_counter() - start
+
+    size = store.size_bytes
+    store.close()
+    return {
+        "fill_s": fill,
+        "get_us": get_time / ops * 1e6,
+        "set_us": set_time / ops * 1e6,
+        "size_mb": size / 1024 / 1024,
+    }
+
+
+def bench_legacy(directory: str, entries: int, ops: int) -> dict:
+    """Mede o formato antigo: cada operação relê e/ou regrava o JSON inteiro."""
+    path = os.path.join(directory, "legacy.json")
+    cache = {
+        f"imoveis_caixa_page_{i}": {"data": PAYLOAD, "timestamp": "2025-04-17T19:31:38", "ttl": 3600}
+        for i in range(entries)
+    }
+    with open(path, "w") as f:
+        json.dump(cache, f, indent=2)
+
+    keys = [f"imoveis_caixa_page_{random.randrange(entries)}" for _ in range(ops)]
+
+    start = time.perf_counter()
+    for key in keys:
+        with open(path) as f:
+            json.load(f)[key]
+    get_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        with open(path) as f:
+            cache = json.load(f)
+        cache[key] = {"data": PAYLOAD, "timestamp": "2025-04-17T19:31:38", "ttl": 3600}
+        with open(path, "w") as f:
+            json.dump(cache, f, indent=2)
+    set_time = time.perf_counter() - start
+
+    return {"get_us": get_time / ops * 1e6, "set_us": set_time / ops * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--ops", type=int, default=10_000)
+    parser.add_argument("--legacy-ops", type=int, default=20,
+                        help="operações no formato antigo (cada uma custa O(tamanho do cache))")
+    args = parser.parse_args()
+
+    sizes = sorted({1_000, 10_000, args.entries})
+    directory = tempfile.mkdtemp(prefix="bench_cache_")
+    try:
+        print(f"{'entradas':>10} | {'get (µs)':>10} | {'set (µs)':>10} | {'log (MB)':>9} | formato")
+        print("-" * 62)
+        for entries in sizes:
+            result = bench_store(directory, entries, args.ops)
+            print(f"{entries:>10} | {result['get_us']:>10.1f} | {result['set_us']:>10.1f} | "
+                  f"{result['size_mb']:>9.1f} | append-only")
+            os.remove(os.path.join(directory, "bench.log"))
+
+        for entries in sizes[:2]:
+            result = bench_legacy(directory, entries, args.legacy_ops)
+            print(f"{entries:>10} | {result['get_us']:>10.1f} | {result['set_us']:>10.1f} | "
+                  f"{'':>9} | JSON legado")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark do cache compartilhado entre workers.
+
+Simula ``--requests`` requisições distribuídas entre 1, 4 e 8 processos
+worker, com chaves sorteadas por uma distribuição de Zipf (poucas páginas
+muito acessadas e uma cauda longa). Cada miss conta como uma consulta à
+origem. Compara a camada local isolada de cada worker (situação anterior)
+com o backend SQLite e, se ``--redis-url`` responder, com o backend Redis.
+
+Uso:
+    python scripts/benchmark_shared_cache.py [--requests 20000] [--keys 5000]
+                                             [--redis-url redis://localhost:6379/0]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shared_cache import SharedCache, SQLiteBackend, RedisBackend
+
+PAYLOAD = {"properties": [{"id": "1", "city": "São Paulo", "sale_value": "500000"}], "totalPages": 1}
+
+
+def zipf_keys(count: int, keys: int, seed: int, s: float = 1.1):
+    """Gera ``count`` chaves com popularidade seguindo Zipf(s)."""
+    rng = random.Random(seed)
+    weights = [1 / (rank ** s) for rank in range(1, keys + 1)]
+    return [f"pagina_{k}" for k in rng.choices(range(keys), weights=weights, k=count)]
+
+
+def make_backend(kind: str, target: str):
+    if kind == "sqlite":
+        return SQLiteBackend(target)
+    if kind == "redis":
+        return RedisBackend(target)
+    return None
+
+
+def run_worker(args):
+    """Executa a fatia de requisições de um worker e retorna (hits, misses, segundos)."""
+    kind, target, namespace, keys = args
+    cache = SharedCache(namespace, backend=make_backend(kind, target), default_ttl=3600,
+                        max_entries=256, local_ttl=3600, sync_interval=1.0, shared=kind != "local")
+    start = time.perf_counter()
+    for key in keys:
+        if cache.get(key) is None:
+            cache.set(key, PAYLOAD)  # consulta à origem
+    return cache.hits, cache.misses, time.perf_counter() - start
+
+
+def bench(kind: str, target: str, workers: int, stream):
+    """Distribui o fluxo de requisições entre ``workers`` processos, como um balanceador."""
+    namespace = f"bench_{uuid.uuid4().hex[:8]}"
+    slices = [stream[i::workers] for i in range(workers)]
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(run_worker, [(kind, target, namespace, keys) for keys in slices])
+    hits = sum(r[0] for r in results)
+    misses = sum(r[1] for r in results)
+    elapsed = max(r[2] for r in results)
+    return {"hit_rate": hits / (hits + misses), "origem": misses, "req_s": len(stream) / elapsed}
+
+
+def redis_available(url: str) -> bool:
+    try:
+        RedisBackend(url).client.ping()
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--keys", type=int, default=5_000)
+    parser.add_argument("--redis-url", default=None, help="servidor compatível com Redis (opcional)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    stream = zipf_keys(args.requests, args.keys, args.seed)
+    directory = tempfile.mkdtemp(prefix="bench_shared_cache_")
+    backends = [("local", ""), ("sqlite", os.path.join(directory, "shared.db"))]
+    if args.redis_url:
+        if redis_available(args.redis_url):
+            backends.append(("redis", args.redis_url))
+        else:
+            print(f"Redis indisponível em {args.redis_url}; pulando")
+
+    try:
+        print(f"{'backend':>8} | {'workers':>7} | {'hit rate':>8} | {'origem':>7} | {'req/s':>8}")
+        print("-" * 51)
+        for kind, target in backends:
+            for workers in (1, 4, 8):
+                result = bench(kind, target, workers, stream)
+                print(f"{kind:>8} | {workers:>7} | {result['hit_rate']:>8.1%} | "
+                      f"{result['origem']:>7} | {result['req_s']:>8.0f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
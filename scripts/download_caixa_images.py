@@ -1,11 +1,15 @@
 import os
-import requests
+import sys
 from pymongo import MongoClient
 from dotenv import load_dotenv
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.streaming_download import download_to_bytes
+
 # Carrega as variáveis de ambiente
 load_dotenv()
 
@@ -27,11 +31,9 @@ def connect_to_mongo():
         raise
 
 def download_image(url):
-    """Baixa uma imagem da URL fornecida"""
+    """Baixa uma imagem da URL fornecida (em streaming, com tamanho máximo e hash SHA-256)"""
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        return response.content
+        return download_to_bytes(url, timeout=30)
     except Exception as e:
         print(f"Erro ao baixar imagem de {url}: {e}")
         return None
@@ -50,15 +52,21 @@ def process_image(db, image_data):
             return False
 
         # Baixa a imagem
-        image_content = download_image(url)
-        if not image_content:
+        download = download_image(url)
+        if not download:
+            return False
+
+        # Mesmo conteúdo já baixado para o imóvel (ex.: URLs diferentes da mesma foto)
+        if db[IMAGES_COLLECTION].find_one({'property_id': property_id, 'sha256': download.sha256}):
             return False
 
         # Salva a imagem no MongoDB
         image_doc = {
             'property_id': property_id,
             'original_url': url,
-            'image_data': image_content,
+            'image_data': download.data,
+            'sha256': download.sha256,
+            'format': download.format,
             'downloaded_at': time.time()
         }
         db[IMAGES_COLLECTION].insert_one(image_doc)
@@ -2,6 +2,8 @@ import asyncio
 import logging
 from src.services.image_downloader import ImageDownloader
 from src.integrations.caixa_api import CaixaImoveisAPI
+from services.catalog_mirror import catalog_page
+from services.paged_fetcher import PagedFetcher
 import sys
 
 # Configuração do logging
@@ -18,45 +20,34 @@ logger = logging.getLogger(__name__)
 async def download_all_images():
     logger.info("Iniciando download de imagens...")
     caixa_api = CaixaImoveisAPI()
-    page = 1
     total_processed = 0
+
+    # As páginas vêm do espelho local quando ele está em dia; as próximas são
+    # buscadas em paralelo enquanto as imagens da página atual são baixadas e,
+    # se o script cair, a próxima execução retoma da última página concluída
+    fetcher = PagedFetcher(lambda page: catalog_page(page, caixa_api.get_imoveis), checkpoint="download_images")
+    pages = fetcher.iter_pages()
     
     try:
         async with ImageDownloader() as downloader:
             while True:
-                try:
-                    logger.info(f"Buscando imóveis da página {page}...")
-                    # Busca imóveis da API
-                    data = caixa_api.get_imoveis(page)
-                    logger.info(f"Dados recebidos da API: {data.keys() if data else 'Nenhum dado'}")
-                    
-                    if not data or not data.get('results'):
-                        logger.warning(f"Nenhum resultado encontrado na página {page}")
-                        break
-                    
-                    items = data.get('results', [])
-                    logger.info(f"Encontrados {len(items)} imóveis na página {page}")
-                    
-                    # Processa imagens dos imóveis
-                    results = await downloader.process_properties_images(items)
-                    total_processed += len(results)
-                    
-                    logger.info(f"Página {page} processada. Total de imóveis processados: {total_processed}")
-                    logger.info(f"Resultados da página {page}: {results}")
-                    
-                    # Verifica se há mais páginas
-                    next_page = data.get('next')
-                    if not next_page:
-                        logger.info("Não há mais páginas para processar")
-                        break
-                    
-                    page += 1
-                    
-                except Exception as e:
-                    logger.error(f"Erro ao processar página {page}: {e}", exc_info=True)
+                entry = await asyncio.to_thread(next, pages, None)
+                if entry is None:
+                    logger.info("Não há mais páginas para processar")
                     break
+                page, items = entry
+                logger.info(f"Encontrados {len(items)} imóveis na página {page}")
+                
+                # Processa imagens dos imóveis
+                results = await downloader.process_properties_images(items)
+                total_processed += len(results)
+                
+                logger.info(f"Página {page} processada. Total de imóveis processados: {total_processed}")
+                logger.info(f"Resultados da página {page}: {results}")
     except Exception as e:
-        logger.error(f"Erro fatal no processamento: {e}", exc_info=True)
+        logger.error(f"Erro fatal no processamento (a próxima execução retoma do checkpoint): {e}", exc_info=True)
+    finally:
+        pages.close()
     
     logger.info(f"Download concluído. Total de imóveis processados: {total_processed}")
 
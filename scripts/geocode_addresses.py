@@ -0,0 +1,53 @@
+"""
+Geocodifica uma lista de endereços (ex.: os de um catálogo) pelo Nominatim.
+
+Os endereços ainda não geocodificados entram na fila persistente e são
+consultados uma vez cada, respeitando o limite de taxa do OSM; os
+resultados ficam guardados, e uma execução interrompida continua de onde
+parou. Endereços já guardados (em qualquer grafia equivalente) não são
+consultados de novo.
+
+Uso:
+    python scripts/geocode_addresses.py enderecos.txt      # um endereço por linha
+    python scripts/geocode_addresses.py --fila             # só processa a fila pendente
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import logger
+from analysis.integrations.osm_api import OSMAPI
+
+# Endereços consultados entre dois registros de progresso
+BLOCO = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("arquivo", nargs="?", help="arquivo com um endereço por linha")
+    parser.add_argument("--fila", action="store_true", help="processa só a fila pendente")
+    args = parser.parse_args()
+    if not args.arquivo and not args.fila:
+        parser.error("informe o arquivo de endereços ou --fila")
+
+    osm = OSMAPI()
+    if args.arquivo:
+        with open(args.arquivo, encoding="utf-8") as f:
+            enderecos = [linha.strip() for linha in f if linha.strip()]
+        novos = osm.geocoding.enqueue(enderecos)
+        logger.info(f"{len(enderecos)} endereços lidos, {novos} novos na fila")
+
+    inicio = time.time()
+    total = 0
+    while osm.geocoding.pending(1):
+        total += osm.process_geocoding_queue(limit=BLOCO)
+        logger.info(f"{total} endereços geocodificados em {time.time() - inicio:.0f}s; "
+                    f"fila: {osm.geocoding.stats()['fila']}")
+    logger.info(f"Geocodificação: {osm.geocoding.stats()}")
+
+
+if __name__ == "__main__":
+    main()
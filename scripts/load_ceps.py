@@ -0,0 +1,40 @@
+"""
+Carrega CEPs ou faixas de CEP de um CSV no índice local de CEPs.
+
+O CSV de CEPs usa as colunas do ViaCEP (cep, logradouro, complemento,
+bairro, localidade, uf, ibge, ddd, siafi, gia); o de faixas, cep_inicio,
+cep_fim e as colunas da localidade. ``cidade`` e ``estado`` são aceitos no
+lugar de ``localidade`` e ``uf``, e o separador (, ; tab |) é detectado.
+
+Uso:
+    python scripts/load_ceps.py ceps.csv [outro.csv ...]
+    python scripts/load_ceps.py --faixas faixas_cep.csv
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import logger
+from services.cep_index import get_cep_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("arquivos", nargs="+", help="arquivos CSV")
+    parser.add_argument("--faixas", action="store_true", help="os arquivos contêm faixas de CEP")
+    args = parser.parse_args()
+
+    index = get_cep_index()
+    for arquivo in args.arquivos:
+        inicio = time.time()
+        total = index.load_csv(arquivo, faixas=args.faixas)
+        logger.info(f"{total} {'faixas' if args.faixas else 'CEPs'} carregados de {arquivo} "
+                    f"em {time.time() - inicio:.1f}s")
+    logger.info(f"Índice de CEPs: {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
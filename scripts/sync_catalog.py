@@ -0,0 +1,46 @@
+"""
+Sincroniza o espelho local do catálogo Caixa/Scraphub.
+
+Uso:
+    python scripts/sync_catalog.py            # uma sincronização (completa ou incremental)
+    python scripts/sync_catalog.py --full     # força a varredura completa (detecta removidos)
+    python scripts/sync_catalog.py --loop     # repete a cada CATALOG_SYNC_INTERVAL segundos
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import logger, CATALOG_SYNC_INTERVAL
+from services.catalog_mirror import CatalogSync, get_catalog_mirror
+from src.integrations.caixa_api import CaixaImoveisAPI
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="força a sincronização completa")
+    parser.add_argument("--loop", action="store_true", help="sincroniza periodicamente")
+    parser.add_argument("--interval", type=int, default=CATALOG_SYNC_INTERVAL, help="intervalo do --loop (segundos)")
+    args = parser.parse_args()
+
+    caixa_api = CaixaImoveisAPI()
+    # Direto na API (sem o cache de páginas): o espelho precisa do estado atual
+    sync = CatalogSync(get_catalog_mirror(), caixa_api._fetch_imoveis)
+
+    while True:
+        try:
+            sync.run(full=True if args.full else None)
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar o catálogo: {e}", exc_info=True)
+            if not args.loop:
+                sys.exit(1)
+        if not args.loop:
+            break
+        args.full = False
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Atualiza o índice local de municípios do IBGE (data/ibge_municipios.csv).
+
+Baixa a lista completa de municípios da API de localidades do IBGE e grava
+código, nome, microrregião e mesorregião; UF e região são derivadas do
+código. Os processos em execução recarregam o arquivo quando ele muda.
+
+Uso:
+    python scripts/update_ibge_municipios.py [--output data/ibge_municipios.csv]
+"""
+import argparse
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import logger, IBGE_MUNICIPIOS_PATH
+from services.http_client import get_http_client
+from services.municipio_index import CSV_FIELDS
+
+URL = "https://servicodados.ibge.gov.br/api/v1/localidades/municipios"
+
+
+def to_row(municipio: dict) -> dict:
+    # Municípios recém-criados podem vir sem microrregião
+    micro = municipio.get("microrregiao") or {}
+    meso = micro.get("mesorregiao") or {}
+    return {
+        "codigo": municipio["id"],
+        "nome": municipio["nome"],
+        "microrregiao_id": micro.get("id", ""),
+        "microrregiao": micro.get("nome", ""),
+        "mesorregiao_id": meso.get("id", ""),
+        "mesorregiao": meso.get("nome", ""),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=IBGE_MUNICIPIOS_PATH)
+    args = parser.parse_args()
+
+    response = get_http_client().get(URL, timeout=60)
+    response.raise_for_status()
+    rows = sorted((to_row(municipio) for municipio in response.json()), key=lambda row: row["codigo"])
+
+    partial = args.output + ".tmp"
+    with open(partial, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(partial, args.output)
+    logger.info(f"{len(rows)} municípios gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
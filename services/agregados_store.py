@@ -0,0 +1,178 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import IBGE_AGREGADOS_PATH, IBGE_AGREGADOS_TTL
+
+# Valores do SIDRA que indicam dado inexistente ou sigiloso
+VALORES_AUSENTES = {"-", "..", "...", "X"}
+
+
+def parse_resultados(data: Any, variavel: int) -> List[Tuple[int, str, str]]:
+    """
+    Extrai de uma resposta da API de agregados (v3) as linhas
+    (município, período, valor) da variável, uma por localidade e período.
+    """
+    rows = []
+    for item in data or []:
+        if int(item.get("id", variavel)) != variavel:
+            continue
+        for resultado in item.get("resultados") or []:
+            for serie in resultado.get("series") or []:
+                codigo = int(serie["localidade"]["id"])
+                for periodo, valor in (serie.get("serie") or {}).items():
+                    if valor is not None and valor not in VALORES_AUSENTES:
+                        rows.append((codigo, str(periodo), str(valor)))
+    return rows
+
+
+class AgregadosStore:
+    """
+    Valores dos agregados do SIDRA (IBGE) em SQLite, um por
+    (agregado, variável, período, município).
+
+    Além dos valores, registra quando cada município foi consultado em cada
+    agregado (mesmo que a API não tenha devolvido nada para ele), para que
+    ``missing`` aponte só os municípios ainda não consultados ou cuja consulta
+    passou de ``ttl`` segundos. Os valores ficam como a API os envia (texto).
+    """
+
+    def __init__(self, path: str = IBGE_AGREGADOS_PATH, ttl: float = IBGE_AGREGADOS_TTL):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            path: Caminho do arquivo SQLite
+            ttl: Validade de uma consulta (segundos)
+        """
+        self.path = path
+        self.ttl = ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS valores (
+                agregado INTEGER NOT NULL,
+                variavel INTEGER NOT NULL,
+                periodo TEXT NOT NULL,
+                codigo INTEGER NOT NULL,
+                valor TEXT NOT NULL,
+                PRIMARY KEY (agregado, variavel, periodo, codigo)
+            );
+            CREATE TABLE IF NOT EXISTS consultas (
+                agregado INTEGER NOT NULL,
+                variavel INTEGER NOT NULL,
+                codigo INTEGER NOT NULL,
+                consultado_em REAL NOT NULL,
+                PRIMARY KEY (agregado, variavel, codigo)
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def missing(self, agregado: int, variavel: int, codigos: Iterable[Any]) -> List[int]:
+        """Municípios de ``codigos`` sem consulta válida do agregado, na ordem recebida."""
+        codigos = list(dict.fromkeys(int(codigo) for codigo in codigos))
+        if not codigos:
+            return []
+        limite = time.time() - self.ttl
+        recentes = set()
+        # Em blocos, abaixo do limite de parâmetros do SQLite
+        for start in range(0, len(codigos), 500):
+            chunk = codigos[start:start + 500]
+            recentes.update(row[0] for row in self._conn().execute(
+                f"SELECT codigo FROM consultas WHERE agregado = ? AND variavel = ? AND consultado_em > ? "
+                f"AND codigo IN ({','.join('?' * len(chunk))})", (agregado, variavel, limite, *chunk)
+            ))
+        return [codigo for codigo in codigos if codigo not in recentes]
+
+    def save(self, agregado: int, variavel: int, codigos: Iterable[Any], rows: Iterable[Tuple[int, str, str]],
+             now: Optional[float] = None) -> int:
+        """
+        Grava o resultado de uma consulta.
+
+        Args:
+            agregado: Tabela do SIDRA
+            variavel: Variável consultada
+            codigos: Municípios consultados (marcados como consultados mesmo sem valores)
+            rows: Linhas (município, período, valor), ver ``parse_resultados``
+            now: Momento da consulta
+
+        Returns:
+            Quantidade de valores gravados
+        """
+        now = now or time.time()
+        rows = list(rows)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO valores (agregado, variavel, codigo, periodo, valor) VALUES (?, ?, ?, ?, ?)",
+                ((agregado, variavel, *row) for row in rows)
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO consultas (agregado, variavel, codigo, consultado_em) VALUES (?, ?, ?, ?)",
+                ((agregado, variavel, int(codigo), now) for codigo in codigos)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def series(self, agregado: int, variavel: int, codigos: Iterable[Any]) -> Dict[int, Dict[str, str]]:
+        """Valores guardados por município: ``{codigo: {periodo: valor}}`` (só municípios com valores)."""
+        codigos = list(dict.fromkeys(int(codigo) for codigo in codigos))
+        if not codigos:
+            return {}
+        result: Dict[int, Dict[str, str]] = {}
+        # Em blocos, abaixo do limite de parâmetros do SQLite
+        for start in range(0, len(codigos), 500):
+            chunk = codigos[start:start + 500]
+            for codigo, periodo, valor in self._conn().execute(
+                f"SELECT codigo, periodo, valor FROM valores WHERE agregado = ? AND variavel = ? "
+                f"AND codigo IN ({','.join('?' * len(chunk))}) ORDER BY codigo, periodo", (agregado, variavel, *chunk)
+            ):
+                result.setdefault(codigo, {})[periodo] = valor
+        return result
+
+    def serie(self, agregado: int, variavel: int, codigo: Any) -> Dict[str, str]:
+        """Valores guardados de um município: ``{periodo: valor}``."""
+        return self.series(agregado, variavel, [codigo]).get(int(codigo), {})
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna a quantidade de valores e de municípios por agregado."""
+        rows = self._conn().execute(
+            "SELECT agregado, variavel, COUNT(*), COUNT(DISTINCT codigo), MAX(periodo) "
+            "FROM valores GROUP BY agregado, variavel"
+        ).fetchall()
+        return {
+            f"{agregado}/{variavel}": {"valores": total, "municipios": municipios, "ultimo_periodo": periodo}
+            for agregado, variavel, total, municipios, periodo in rows
+        }
+
+
+_store: Optional[AgregadosStore] = None
+_store_lock = threading.Lock()
+
+
+def get_agregados_store() -> AgregadosStore:
+    """Retorna o armazenamento de agregados compartilhado do processo."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AgregadosStore()
+        return _store
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Awaitable, Dict, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from config import (logger, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF_FACTOR,
+                    HTTP_POOL_MAXSIZE, HTTP_ASYNC_CONCURRENCY)
+from monitoring import metrics_collector
+
+T = TypeVar("T")
+
+# Exceções de transporte que as variantes assíncronas tratam como falha da consulta
+HTTP_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class AsyncHTTPClient:
+    """
+    Sessão aiohttp com pool por host, timeout padrão, retry com backoff e
+    limite de requisições simultâneas.
+
+    A sessão pertence ao event loop em que é criada; use
+    ``get_async_http_client`` para obter a instância compartilhada do loop atual.
+    """
+
+    def __init__(self, name: str = "default",
+                 timeout: Tuple[float, float] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                 retries: int = HTTP_RETRIES, backoff_factor: float = HTTP_BACKOFF_FACTOR,
+                 concurrency: int = HTTP_ASYNC_CONCURRENCY, limit_per_host: int = HTTP_POOL_MAXSIZE):
+        """
+        Inicializa o cliente.
+
+        Args:
+            name: Nome do cliente
+            timeout: Timeout padrão (conexão, leitura) em segundos
+            retries: Número máximo de novas tentativas
+            backoff_factor: Fator de espera exponencial entre tentativas
+            concurrency: Máximo de requisições simultâneas deste cliente
+            limit_per_host: Conexões simultâneas por host
+        """
+        self.name = name
+        self.timeout = aiohttp.ClientTimeout(connect=timeout[0], sock_read=timeout[1])
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.limit_per_host = limit_per_host
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def get_json(self, url: str, params: Optional[Dict[str, Any]] = None,
+                       headers: Optional[Dict[str, str]] = None) -> Any:
+        """
+        Executa um GET e devolve o corpo JSON.
+
+        Falhas de conexão, timeouts e respostas 429/5xx são repetidos com
+        backoff exponencial; após a última tentativa a exceção é propagada.
+
+        Raises:
+            aiohttp.ClientError: Falha de conexão ou status de erro
+            asyncio.TimeoutError: Timeout da requisição
+        """
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            status = None
+            try:
+                async with self.semaphore:
+                    async with self.session.get(url, params=params, headers=headers) as response:
+                        status = response.status
+                        if status in _RETRY_STATUS and attempt < self.retries:
+                            raise _Retryable(status)
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+            except (_Retryable, aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    raise
+                attempt += 1
+                logger.warning(f"Nova tentativa {attempt}/{self.retries} para {host}: {e!r}")
+                await asyncio.sleep(self.backoff_factor * (2 ** (attempt - 1)))
+            finally:
+                metrics_collector.record_http_request(host, time.perf_counter() - start, status)
+
+    async def close(self) -> None:
+        """Fecha a sessão e suas conexões."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class _Retryable(aiohttp.ClientError):
+    """Resposta com status que deve ser repetido."""
+
+    def __init__(self, status: int):
+        super().__init__(f"status {status}")
+        self.status = status
+
+
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, AsyncHTTPClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_loop_clients_lock = threading.Lock()
+
+
+def get_async_http_client(name: str = "default", **options: Any) -> AsyncHTTPClient:
+    """
+    Retorna o cliente assíncrono compartilhado de nome ``name`` no event loop atual.
+
+    Deve ser chamado de dentro de uma corrotina; ``options`` só têm efeito na criação.
+    """
+    loop = asyncio.get_running_loop()
+    with _loop_clients_lock:
+        clients = _loop_clients.setdefault(loop, {})
+        client = clients.get(name)
+        if client is None:
+            client = AsyncHTTPClient(name, **options)
+            clients[name] = client
+        return client
+
+
+async def close_async_http_clients() -> None:
+    """Fecha os clientes assíncronos do event loop atual (ex.: no desligamento da aplicação)."""
+    loop = asyncio.get_running_loop()
+    with _loop_clients_lock:
+        clients = list(_loop_clients.pop(loop, {}).values())
+    for client in clients:
+        await client.close()
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            _background_loop = asyncio.new_event_loop()
+            threading.Thread(target=_background_loop.run_forever, name="async-http", daemon=True).start()
+        return _background_loop
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Executa uma corrotina a partir de código síncrono e devolve o resultado.
+
+    As corrotinas rodam em um event loop dedicado em segundo plano, de modo que
+    a sessão HTTP assíncrona é reaproveitada entre chamadas e a função pode ser
+    usada mesmo a partir de uma thread que já tem um loop em execução.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_background_loop()).result()
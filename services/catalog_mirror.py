@@ -0,0 +1,381 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from config import (logger, CATALOG_MIRROR_PATH, CATALOG_FULL_SYNC_INTERVAL, CATALOG_MIRROR_MAX_LAG,
+                    CATALOG_SINCE_PARAM, PAGED_FETCH_PREFETCH)
+from monitoring import metrics_collector
+from services.paged_fetcher import PagedFetcher
+
+# Campos com a data de atualização do item na origem, na ordem de preferência;
+# sem nenhum deles a mudança é detectada pelo hash do conteúdo
+UPDATED_FIELDS = ("updated_at", "atualizado_em", "data_atualizacao", "modified")
+DEFAULT_PAGE_SIZE = 10
+# Sobreposição das sincronizações incrementais, contra relógios desalinhados
+SINCE_OVERLAP = 300
+
+
+def item_version(item: Dict[str, Any]) -> str:
+    """Versão do item: a data de atualização da origem ou, sem ela, o hash do conteúdo."""
+    for field in UPDATED_FIELDS:
+        if item.get(field):
+            return f"{field}:{item[field]}"
+    canonical = json.dumps(item, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return "sha256:" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CatalogMirror:
+    """
+    Espelho local de um catálogo paginado (SQLite em modo WAL).
+
+    Cada item é guardado pelo ``id`` com sua versão (data de atualização ou
+    hash); itens que saem do catálogo não são apagados, e sim marcados com
+    ``removido_em`` (tombstone), para que consumidores incrementais saibam o
+    que sumiu. As páginas servidas seguem a ordem em que os itens apareceram
+    na origem.
+    """
+
+    def __init__(self, name: str = "caixa", path: str = CATALOG_MIRROR_PATH):
+        """
+        Inicializa o espelho.
+
+        Args:
+            name: Nome do catálogo (nas métricas e no estado da sincronização)
+            path: Caminho do arquivo SQLite
+        """
+        self.name = name
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS itens (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                catalogo TEXT NOT NULL,
+                id TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                versao TEXT NOT NULL,
+                alterado_em REAL NOT NULL,
+                removido_em REAL,
+                UNIQUE (catalogo, id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_itens_alterado ON itens (catalogo, alterado_em);
+            CREATE TABLE IF NOT EXISTS estado (
+                catalogo TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                valor TEXT,
+                PRIMARY KEY (catalogo, chave)
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT valor FROM estado WHERE catalogo = ? AND chave = ?", (self.name, key)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn: sqlite3.Connection, key: str, value: Any) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO estado (catalogo, chave, valor) VALUES (?, ?, ?)",
+            (self.name, key, None if value is None else str(value))
+        )
+
+    def upsert(self, items: Iterable[Dict[str, Any]], now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Grava os itens novos ou alterados; itens com a mesma versão não são regravados.
+
+        Um item marcado como removido que volta ao catálogo perde a marca.
+
+        Returns:
+            Contagem de ``novos``, ``alterados`` e ``inalterados``
+        """
+        now = now or time.time()
+        counts = {"novos": 0, "alterados": 0, "inalterados": 0}
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for item in items:
+                if item.get("id") is None:
+                    continue
+                item_id = str(item["id"])
+                version = item_version(item)
+                row = conn.execute(
+                    "SELECT versao, removido_em FROM itens WHERE catalogo = ? AND id = ?", (self.name, item_id)
+                ).fetchone()
+                if row is not None and row[0] == version and row[1] is None:
+                    counts["inalterados"] += 1
+                    continue
+                data = json.dumps(item, ensure_ascii=False, default=str)
+                if row is None:
+                    conn.execute(
+                        "INSERT INTO itens (catalogo, id, dados, versao, alterado_em) VALUES (?, ?, ?, ?, ?)",
+                        (self.name, item_id, data, version, now)
+                    )
+                    counts["novos"] += 1
+                else:
+                    conn.execute(
+                        "UPDATE itens SET dados = ?, versao = ?, alterado_em = ?, removido_em = NULL "
+                        "WHERE catalogo = ? AND id = ?",
+                        (data, version, now, self.name, item_id)
+                    )
+                    counts["alterados"] += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return counts
+
+    def tombstone_missing(self, seen_ids: Iterable[Any], now: Optional[float] = None) -> int:
+        """
+        Marca como removidos os itens ativos que não estão em ``seen_ids``.
+
+        Só deve ser chamado após percorrer o catálogo inteiro sem erros.
+
+        Returns:
+            Quantidade de itens marcados
+        """
+        now = now or time.time()
+        seen = {str(item_id) for item_id in seen_ids}
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            active = conn.execute(
+                "SELECT id FROM itens WHERE catalogo = ? AND removido_em IS NULL", (self.name,)
+            ).fetchall()
+            missing = [(now, now, self.name, item_id) for (item_id,) in active if item_id not in seen]
+            conn.executemany(
+                "UPDATE itens SET removido_em = ?, alterado_em = ? WHERE catalogo = ? AND id = ?", missing
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(missing)
+
+    def mark_synced(self, started_at: float, full: bool, page_size: Optional[int] = None) -> None:
+        """Registra o fim de uma sincronização iniciada em ``started_at``."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._set_state(conn, "ultima_sincronizacao", started_at)
+            if full:
+                self._set_state(conn, "ultima_completa", started_at)
+            if page_size:
+                self._set_state(conn, "tamanho_pagina", page_size)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @property
+    def last_sync(self) -> Optional[float]:
+        value = self._get_state("ultima_sincronizacao")
+        return float(value) if value else None
+
+    @property
+    def last_full_sync(self) -> Optional[float]:
+        value = self._get_state("ultima_completa")
+        return float(value) if value else None
+
+    @property
+    def page_size(self) -> int:
+        value = self._get_state("tamanho_pagina")
+        return int(value) if value else DEFAULT_PAGE_SIZE
+
+    def lag(self) -> Optional[float]:
+        """Segundos desde o início da última sincronização concluída (None = nunca sincronizado)."""
+        last_sync = self.last_sync
+        return time.time() - last_sync if last_sync is not None else None
+
+    def ready(self, max_lag: float = CATALOG_MIRROR_MAX_LAG) -> bool:
+        """Indica se o espelho já foi sincronizado por completo e está dentro do atraso aceito."""
+        lag = self.lag()
+        return self.last_full_sync is not None and lag is not None and lag <= max_lag
+
+    def get(self, item_id: Any, include_removed: bool = False) -> Optional[Dict[str, Any]]:
+        """Retorna um item pelo id (itens removidos só com ``include_removed``)."""
+        row = self._conn().execute(
+            "SELECT dados, removido_em FROM itens WHERE catalogo = ? AND id = ?", (self.name, str(item_id))
+        ).fetchone()
+        if row is None or (row[1] is not None and not include_removed):
+            return None
+        return json.loads(row[0])
+
+    def page(self, page: int = 1, per_page: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Retorna uma página dos itens ativos no formato da API de origem
+        (``count``, ``next``, ``previous`` e ``results``).
+        """
+        per_page = per_page or self.page_size
+        conn = self._conn()
+        count = conn.execute(
+            "SELECT COUNT(*) FROM itens WHERE catalogo = ? AND removido_em IS NULL", (self.name,)
+        ).fetchone()[0]
+        rows = conn.execute(
+            "SELECT dados FROM itens WHERE catalogo = ? AND removido_em IS NULL ORDER BY seq LIMIT ? OFFSET ?",
+            (self.name, per_page, (page - 1) * per_page)
+        ).fetchall()
+        return {
+            "count": count,
+            "next": f"?page={page + 1}" if page * per_page < count else None,
+            "previous": f"?page={page - 1}" if page > 1 else None,
+            "results": [json.loads(data) for (data,) in rows]
+        }
+
+    def changes_since(self, since: float, limit: int = 1000) -> Dict[str, Any]:
+        """
+        Retorna o que mudou desde ``since``: itens novos ou alterados e os ids removidos.
+
+        ``cursor`` é o valor de ``since`` para a próxima chamada.
+        """
+        rows = self._conn().execute(
+            "SELECT id, dados, alterado_em, removido_em FROM itens "
+            "WHERE catalogo = ? AND alterado_em > ? ORDER BY alterado_em LIMIT ?",
+            (self.name, since, limit)
+        ).fetchall()
+        return {
+            "alterados": [json.loads(data) for _, data, _, removed in rows if removed is None],
+            "removidos": [item_id for item_id, _, _, removed in rows if removed is not None],
+            "cursor": rows[-1][2] if rows else since
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o tamanho do espelho e o atraso em relação à origem."""
+        active, removed = self._conn().execute(
+            "SELECT COALESCE(SUM(removido_em IS NULL), 0), COALESCE(SUM(removido_em IS NOT NULL), 0) "
+            "FROM itens WHERE catalogo = ?", (self.name,)
+        ).fetchone()
+        return {
+            "catalogo": self.name,
+            "itens": active,
+            "removidos": removed,
+            "ultima_sincronizacao": self.last_sync,
+            "ultima_completa": self.last_full_sync,
+            "atraso_segundos": self.lag(),
+            "pronto": self.ready()
+        }
+
+
+class CatalogSync:
+    """
+    Sincroniza um ``CatalogMirror`` com a API paginada de origem.
+
+    A sincronização completa percorre o catálogo inteiro (páginas buscadas em
+    paralelo, ver ``PagedFetcher``; páginas sem mudança voltam como 304 pela
+    revalidação do cliente HTTP) e marca como removidos os itens que não
+    apareceram. Com ``since_param`` configurado, as sincronizações entre duas
+    completas pedem à API só os itens alterados desde a última.
+    """
+
+    def __init__(self, mirror: CatalogMirror, fetch_page: Callable[[int, Dict[str, Any]], Any],
+                 since_param: str = CATALOG_SINCE_PARAM, full_sync_interval: float = CATALOG_FULL_SYNC_INTERVAL,
+                 prefetch: int = PAGED_FETCH_PREFETCH):
+        """
+        Inicializa a sincronização.
+
+        Args:
+            mirror: Espelho a atualizar
+            fetch_page: Recebe o número da página e os parâmetros extras da consulta
+            since_param: Parâmetro da API para filtrar por data de atualização ('' = sem filtro)
+            full_sync_interval: Intervalo entre sincronizações completas (segundos)
+            prefetch: Páginas buscadas em paralelo
+        """
+        self.mirror = mirror
+        self.fetch_page = fetch_page
+        self.since_param = since_param
+        self.full_sync_interval = full_sync_interval
+        self.prefetch = prefetch
+
+    def _needs_full_sync(self) -> bool:
+        last_full = self.mirror.last_full_sync
+        return not self.since_param or last_full is None or time.time() - last_full >= self.full_sync_interval
+
+    def run(self, full: Optional[bool] = None) -> Dict[str, int]:
+        """
+        Executa uma sincronização.
+
+        Args:
+            full: Força (True) ou evita (False) a sincronização completa; None decide pelo intervalo
+
+        Returns:
+            Contagem de itens ``novos``, ``alterados``, ``inalterados`` e ``removidos``
+        """
+        if full is None:
+            full = self._needs_full_sync()
+        # Sem filtro na API ou sem sincronização anterior, só a completa é possível
+        full = full or not self.since_param or self.mirror.last_sync is None
+        params: Dict[str, Any] = {}
+        if not full:
+            since = datetime.fromtimestamp(self.mirror.last_sync - SINCE_OVERLAP, tz=timezone.utc)
+            params[self.since_param] = since.isoformat()
+
+        started_at = time.time()
+        counts = {"novos": 0, "alterados": 0, "inalterados": 0, "removidos": 0}
+        seen_ids: List[Any] = []
+        fetcher = PagedFetcher(lambda page: self.fetch_page(page, params), prefetch=self.prefetch)
+        for _, items in fetcher.iter_pages():
+            for key, value in self.mirror.upsert(items, started_at).items():
+                counts[key] += value
+            seen_ids.extend(item.get("id") for item in items if item.get("id") is not None)
+
+        # Só uma varredura completa e sem erros sabe o que saiu do catálogo
+        if full:
+            counts["removidos"] = self.mirror.tombstone_missing(seen_ids)
+        self.mirror.mark_synced(started_at, full, page_size=fetcher.page_size if full else None)
+
+        duration = time.time() - started_at
+        metrics_collector.record_mirror_sync(self.mirror.name, full, counts, duration, started_at)
+        logger.info(f"Espelho '{self.mirror.name}' sincronizado ({'completa' if full else 'incremental'}) "
+                    f"em {duration:.1f}s: {counts}")
+        return counts
+
+
+_mirrors: Dict[str, CatalogMirror] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_catalog_mirror(name: str = "caixa") -> CatalogMirror:
+    """Retorna o espelho compartilhado do catálogo ``name``."""
+    with _mirrors_lock:
+        mirror = _mirrors.get(name)
+        if mirror is None:
+            mirror = CatalogMirror(name)
+            _mirrors[name] = mirror
+        return mirror
+
+
+def catalog_page(page: int, fetch_remote: Callable[[int], Any], per_page: Optional[int] = None,
+                 name: str = "caixa") -> Any:
+    """Página do catálogo servida pelo espelho quando ele está em dia; senão, pela API."""
+    mirror = get_catalog_mirror(name)
+    if mirror.ready():
+        return mirror.page(page, per_page)
+    return fetch_remote(page)
+
+
+def catalog_item(item_id: Any, fetch_remote: Callable[[Any], Any], name: str = "caixa") -> Any:
+    """Item do catálogo servido pelo espelho quando ele está em dia; senão, pela API."""
+    mirror = get_catalog_mirror(name)
+    if mirror.ready():
+        item = mirror.get(item_id)
+        if item is not None:
+            return item
+    return fetch_remote(item_id)
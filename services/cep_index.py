@@ -0,0 +1,266 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from config import CEP_INDEX_PATH, CEP_NOT_FOUND_TTL
+
+# Campos de um CEP no formato do ViaCEP
+LOCALIDADE_FIELDS = ("localidade", "uf", "ibge", "ddd", "siafi", "gia")
+CEP_FIELDS = ("cep", "logradouro", "complemento", "bairro") + LOCALIDADE_FIELDS
+# Cabeçalhos alternativos aceitos na carga de CSV
+CSV_ALIASES = {"cidade": "localidade", "municipio": "localidade", "estado": "uf", "codigo_ibge": "ibge"}
+
+
+def cep_to_int(cep: Any) -> Optional[int]:
+    """Converte um CEP (com ou sem hífen) em inteiro; None se não tiver 8 dígitos."""
+    digits = "".join(filter(str.isdigit, str(cep or "")))
+    return int(digits) if len(digits) == 8 else None
+
+
+def format_cep(cep: int) -> str:
+    """Formata um CEP inteiro como 00000-000."""
+    text = f"{cep:08d}"
+    return f"{text[:5]}-{text[5:]}"
+
+
+class CepIndex:
+    """
+    Índice local de CEPs em SQLite.
+
+    Os registros são compactos: o CEP é a chave inteira da tabela e os dados
+    da localidade (cidade, UF, códigos IBGE/SIAFI/GIA e DDD), repetidos em
+    todos os CEPs de uma cidade, ficam numa tabela à parte. Além dos CEPs
+    individuais, guarda faixas de CEP por localidade (início e fim), buscadas
+    pelo maior início menor ou igual ao CEP; elas identificam a cidade de um
+    CEP ainda desconhecido. CEPs que o ViaCEP informou como inexistentes são
+    lembrados por ``not_found_ttl`` segundos.
+    """
+
+    def __init__(self, path: str = CEP_INDEX_PATH, not_found_ttl: float = CEP_NOT_FOUND_TTL):
+        """
+        Inicializa o índice.
+
+        Args:
+            path: Caminho do arquivo SQLite
+            not_found_ttl: Tempo em que um CEP inexistente não é consultado de novo (segundos)
+        """
+        self.path = path
+        self.not_found_ttl = not_found_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._localidades: Dict[Tuple[str, ...], int] = {}
+        self._localidades_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS localidades (
+                id INTEGER PRIMARY KEY,
+                localidade TEXT NOT NULL,
+                uf TEXT NOT NULL,
+                ibge TEXT,
+                ddd TEXT,
+                siafi TEXT,
+                gia TEXT,
+                UNIQUE (localidade, uf, ibge, ddd, siafi, gia)
+            );
+            CREATE TABLE IF NOT EXISTS ceps (
+                cep INTEGER PRIMARY KEY,
+                logradouro TEXT,
+                complemento TEXT,
+                bairro TEXT,
+                localidade_id INTEGER,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS faixas (
+                inicio INTEGER PRIMARY KEY,
+                fim INTEGER NOT NULL,
+                localidade_id INTEGER NOT NULL
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _localidade_id(self, conn: sqlite3.Connection, record: Dict[str, Any]) -> int:
+        """Id da localidade do registro, criando-a se necessário (deve rodar dentro de uma transação)."""
+        key = tuple(str(record.get(field) or "") for field in LOCALIDADE_FIELDS)
+        with self._localidades_lock:
+            localidade_id = self._localidades.get(key)
+        if localidade_id is None:
+            conn.execute(f"INSERT OR IGNORE INTO localidades ({', '.join(LOCALIDADE_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                         key)
+            localidade_id = conn.execute(
+                f"SELECT id FROM localidades WHERE {' AND '.join(f'{field} = ?' for field in LOCALIDADE_FIELDS)}", key
+            ).fetchone()[0]
+            with self._localidades_lock:
+                self._localidades[key] = localidade_id
+        return localidade_id
+
+    def lookup(self, cep: Any) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o CEP no formato de resposta do ViaCEP.
+
+        Returns:
+            O registro, ``{"erro": True}`` para um CEP sabidamente inexistente ou
+            None se o CEP não está no índice
+        """
+        number = cep_to_int(cep)
+        if number is None:
+            return None
+        row = self._conn().execute(
+            "SELECT c.logradouro, c.complemento, c.bairro, c.atualizado_em, "
+            "l.localidade, l.uf, l.ibge, l.ddd, l.siafi, l.gia "
+            "FROM ceps c LEFT JOIN localidades l ON l.id = c.localidade_id WHERE c.cep = ?", (number,)
+        ).fetchone()
+        if row is not None and row[4] is None and time.time() - row[3] >= self.not_found_ttl:
+            row = None
+        if row is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        if row[4] is None:
+            return {"erro": True}
+        record = dict(zip(LOCALIDADE_FIELDS, row[4:]))
+        record.update(cep=format_cep(number), logradouro=row[0] or "", complemento=row[1] or "", bairro=row[2] or "")
+        return record
+
+    def faixa(self, cep: Any) -> Optional[Dict[str, Any]]:
+        """Localidade da faixa que contém o CEP (sem logradouro e bairro), ou None."""
+        number = cep_to_int(cep)
+        if number is None:
+            return None
+        row = self._conn().execute(
+            f"SELECT f.fim, {', '.join('l.' + field for field in LOCALIDADE_FIELDS)} "
+            "FROM faixas f JOIN localidades l ON l.id = f.localidade_id "
+            "WHERE f.inicio <= ? ORDER BY f.inicio DESC LIMIT 1", (number,)
+        ).fetchone()
+        if row is None or row[0] < number:
+            return None
+        return dict(zip(LOCALIDADE_FIELDS, row[1:]))
+
+    def learn(self, cep: Any, data: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        Grava a resposta do ViaCEP para o CEP (``{"erro": true}`` marca o CEP como inexistente).
+
+        Returns:
+            False se o CEP for inválido
+        """
+        return self.load([dict(data, cep=cep)], now=now) > 0
+
+    def load(self, records: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """
+        Grava vários CEPs numa transação (registros no formato do ViaCEP).
+
+        Returns:
+            Quantidade de CEPs gravados
+        """
+        now = now or time.time()
+        count = 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for record in records:
+                number = cep_to_int(record.get("cep"))
+                if number is None:
+                    continue
+                erro = str(record.get("erro", "")).lower() in ("true", "1")
+                if not erro and not record.get("localidade"):
+                    continue
+                localidade_id = None if erro else self._localidade_id(conn, record)
+                conn.execute(
+                    "INSERT OR REPLACE INTO ceps (cep, logradouro, complemento, bairro, localidade_id, atualizado_em) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (number, record.get("logradouro") or None, record.get("complemento") or None,
+                     record.get("bairro") or None, localidade_id, now)
+                )
+                count += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            self._localidades.clear()
+            raise
+        return count
+
+    def load_faixas(self, faixas: Iterable[Dict[str, Any]]) -> int:
+        """
+        Grava faixas de CEP (campos ``cep_inicio``, ``cep_fim`` e os da localidade).
+
+        Returns:
+            Quantidade de faixas gravadas
+        """
+        count = 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for faixa in faixas:
+                inicio, fim = cep_to_int(faixa.get("cep_inicio")), cep_to_int(faixa.get("cep_fim"))
+                if inicio is None or fim is None or fim < inicio or not faixa.get("localidade"):
+                    continue
+                conn.execute("INSERT OR REPLACE INTO faixas (inicio, fim, localidade_id) VALUES (?, ?, ?)",
+                             (inicio, fim, self._localidade_id(conn, faixa)))
+                count += 1
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            self._localidades.clear()
+            raise
+        return count
+
+    def load_csv(self, path: str, faixas: bool = False) -> int:
+        """
+        Carrega um CSV de CEPs (colunas do ViaCEP: cep, logradouro, complemento,
+        bairro, localidade, uf, ibge, ddd, siafi, gia) ou de faixas
+        (cep_inicio, cep_fim e as colunas da localidade). Aceita ``cidade`` e
+        ``estado`` no lugar de ``localidade`` e ``uf``; o separador é detectado.
+        """
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+            rows = ({CSV_ALIASES.get(key.strip().lower(), key.strip().lower()): value for key, value in row.items()
+                     if key} for row in csv.DictReader(f, dialect=dialect))
+            return self.load_faixas(rows) if faixas else self.load(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna o tamanho do índice e os acertos das consultas deste processo."""
+        conn = self._conn()
+        ceps, inexistentes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(localidade_id IS NULL), 0) FROM ceps"
+        ).fetchone()
+        total = self._hits + self._misses
+        return {
+            "ceps": ceps - inexistentes,
+            "inexistentes": inexistentes,
+            "faixas": conn.execute("SELECT COUNT(*) FROM faixas").fetchone()[0],
+            "localidades": conn.execute("SELECT COUNT(*) FROM localidades").fetchone()[0],
+            "acertos": self._hits,
+            "falhas": self._misses,
+            "taxa_acerto": self._hits / total if total else 0.0
+        }
+
+
+_index: Optional[CepIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_cep_index() -> CepIndex:
+    """Retorna o índice de CEPs compartilhado do processo."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = CepIndex()
+        return _index
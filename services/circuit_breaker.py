@@ -0,0 +1,255 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from config import (logger, HTTP_CONNECT_TIMEOUT, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT,
+                    CIRCUIT_LATENCY_WINDOW, CIRCUIT_TIMEOUT_MIN, CIRCUIT_TIMEOUT_MAX,
+                    CIRCUIT_TIMEOUT_PERCENTILE, CIRCUIT_TIMEOUT_MULTIPLIER)
+from monitoring import metrics_collector
+
+CLOSED = "fechado"
+OPEN = "aberto"
+HALF_OPEN = "semiaberto"
+
+# Amostras de latência necessárias antes de o timeout passar a ser adaptativo
+MIN_SAMPLES = 10
+
+_TIMEOUT_ERRORS = (requests.exceptions.Timeout, asyncio.TimeoutError, TimeoutError)
+
+
+class CircuitOpenError(Exception):
+    """Fonte com o circuito aberto: a chamada não foi feita."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuito de {name} aberto (nova tentativa em {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Disjuntor de uma fonte externa, com timeout adaptativo.
+
+    - ``fechado``: chamadas passam; ``failure_threshold`` falhas seguidas abrem o circuito;
+    - ``aberto``: chamadas são recusadas na hora com ``CircuitOpenError`` até
+      passar ``recovery_timeout``;
+    - ``semiaberto``: uma única chamada de teste passa; se tiver sucesso o
+      circuito fecha, senão volta a abrir.
+
+    O timeout de cada chamada acompanha a latência recente da fonte: é o
+    percentil ``timeout_percentile`` das últimas ``window`` chamadas vezes
+    ``timeout_multiplier``, limitado a [``min_timeout``, ``max_timeout``].
+    """
+
+    def __init__(self, name: str,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT,
+                 window: int = CIRCUIT_LATENCY_WINDOW,
+                 min_timeout: float = CIRCUIT_TIMEOUT_MIN,
+                 max_timeout: float = CIRCUIT_TIMEOUT_MAX,
+                 timeout_percentile: float = CIRCUIT_TIMEOUT_PERCENTILE,
+                 timeout_multiplier: float = CIRCUIT_TIMEOUT_MULTIPLIER):
+        """
+        Inicializa o disjuntor.
+
+        Args:
+            name: Nome da fonte
+            failure_threshold: Falhas consecutivas que abrem o circuito
+            recovery_timeout: Segundos em aberto antes da chamada de teste
+            window: Número de latências recentes consideradas
+            min_timeout: Menor timeout adaptativo (segundos)
+            max_timeout: Maior timeout adaptativo, usado também sem histórico
+            timeout_percentile: Percentil de latência que baseia o timeout
+            timeout_multiplier: Folga aplicada sobre o percentil
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_percentile = timeout_percentile
+        self.timeout_multiplier = timeout_multiplier
+        self._latencies = deque(maxlen=window)
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.stats_counters = {"chamadas": 0, "falhas": 0, "timeouts": 0, "recusadas": 0, "aberturas": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning(f"Circuito de {self.name}: {self._state} -> {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.stats_counters["aberturas"] += 1
+        metrics_collector.record_circuit_transition(self.name, state)
+
+    def is_open(self) -> bool:
+        """Indica se chamadas a esta fonte estão sendo recusadas."""
+        with self._lock:
+            return self._current_state() == OPEN
+
+    def allow_request(self) -> bool:
+        """Reserva uma chamada; no estado semiaberto só a chamada de teste é liberada."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.stats_counters["recusadas"] += 1
+            return False
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Percentil ``p`` (0-100) das latências recentes, ou None sem amostras."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))
+        return samples[index]
+
+    @property
+    def timeout(self) -> float:
+        """Timeout atual da fonte (segundos)."""
+        if len(self._latencies) < MIN_SAMPLES:
+            return self.max_timeout
+        adaptive = self.percentile(self.timeout_percentile) * self.timeout_multiplier
+        return min(self.max_timeout, max(self.min_timeout, adaptive))
+
+    def record_success(self, duration: float) -> None:
+        with self._lock:
+            self._latencies.append(duration)
+            self.stats_counters["chamadas"] += 1
+            self._failures = 0
+            self._probe_in_flight = False
+            self._transition(CLOSED)
+
+    def record_failure(self, duration: float, timed_out: bool = False) -> None:
+        with self._lock:
+            # Um timeout mostra que a fonte demorou pelo menos isso: entra no histórico
+            if timed_out:
+                self._latencies.append(duration)
+                self.stats_counters["timeouts"] += 1
+            self.stats_counters["chamadas"] += 1
+            self.stats_counters["falhas"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._transition(OPEN)
+            self._probe_in_flight = False
+
+    def _check(self) -> None:
+        if not self.allow_request():
+            retry_after = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_after)
+
+    def _record(self, start: float, error: Optional[BaseException] = None, status: Optional[int] = None) -> None:
+        duration = time.perf_counter() - start
+        if error is not None:
+            # Erros 4xx indicam que a fonte respondeu: não contam como falha
+            error_status = getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "status", None)
+            if isinstance(error_status, int) and error_status < 500:
+                self.record_success(duration)
+            else:
+                self.record_failure(duration, timed_out=isinstance(error, _TIMEOUT_ERRORS))
+        elif isinstance(status, int) and status >= 500:
+            self.record_failure(duration)
+        else:
+            self.record_success(duration)
+
+    def call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Executa uma chamada síncrona protegida.
+
+        ``func`` recebe ``timeout=(conexão, timeout adaptativo)`` se nenhum
+        timeout for informado (compatível com ``requests``). Respostas 5xx,
+        exceções e timeouts contam como falha.
+
+        Raises:
+            CircuitOpenError: O circuito está aberto
+        """
+        self._check()
+        kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, self.timeout))
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._record(start, error=e)
+            raise
+        self._record(start, status=getattr(result, "status_code", None))
+        return result
+
+    async def call_async(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Executa uma corrotina protegida, cancelada ao atingir o timeout adaptativo.
+
+        Raises:
+            CircuitOpenError: O circuito está aberto
+            asyncio.TimeoutError: A chamada excedeu o timeout
+        """
+        self._check()
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), self.timeout)
+        except asyncio.CancelledError:
+            with self._lock:
+                self._probe_in_flight = False
+            raise
+        except Exception as e:
+            self._record(start, error=e)
+            raise
+        self._record(start)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estado, contadores e latências recentes da fonte."""
+        return {
+            "estado": self.state,
+            "timeout": round(self.timeout, 3),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            **self.stats_counters
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str, **options: Any) -> CircuitBreaker:
+    """
+    Retorna o disjuntor compartilhado da fonte ``name``, criando-o se necessário.
+
+    ``options`` só têm efeito na criação.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **options)
+            _breakers[name] = breaker
+        return breaker
+
+
+def circuit_breaker_stats() -> Dict[str, Any]:
+    """Retorna o estado de todos os disjuntores criados."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
@@ -0,0 +1,274 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import GEOCODING_STORE_PATH, GEOCODING_NOT_FOUND_TTL, GEOCODING_MAX_ATTEMPTS
+from services.municipio_index import normalize_name
+
+# Abreviações comuns em endereços brasileiros (já sem acentos e em minúsculas)
+ABREVIACOES = {
+    "av": "avenida", "avda": "avenida", "r": "rua", "al": "alameda", "tv": "travessa", "trav": "travessa",
+    "est": "estrada", "estr": "estrada", "rod": "rodovia", "pc": "praca", "pca": "praca", "lg": "largo",
+    "lgo": "largo", "vd": "viaduto", "jd": "jardim", "jdm": "jardim", "vl": "vila", "pq": "parque",
+    "res": "residencial", "cond": "condominio", "conj": "conjunto", "cj": "conjunto", "bl": "bloco",
+    "ap": "apartamento", "apto": "apartamento", "dr": "doutor", "prof": "professor", "eng": "engenheiro",
+    "gen": "general", "cel": "coronel", "pres": "presidente", "sta": "santa", "sto": "santo",
+}
+# Marcadores de número ("n 100", "nº 100", "numero 100") e palavras que não identificam o local
+MARCADORES_NUMERO = {"n", "no", "num", "numero"}
+DESCARTAR = {"cep", "brasil", "brazil"}
+_CEP = re.compile(r"(?<!\d)(\d{5})-(\d{3})(?!\d)")
+_SEM_NUMERO = re.compile(r"\bs\s*/\s*n(?:o|º)?\b", re.IGNORECASE)
+
+# Confiança do resultado pela precisão do que o geocodificador encontrou
+CONFIANCA_POR_PRECISAO = (
+    ("house_number", 0.9),
+    ("road", 0.7),
+    ("suburb", 0.5), ("neighbourhood", 0.5), ("quarter", 0.5),
+    ("city", 0.3), ("town", 0.3), ("village", 0.3), ("municipality", 0.3),
+)
+CONFIANCA_MINIMA = 0.2
+
+
+def normalize_address(address: Optional[str]) -> str:
+    """
+    Chave canônica de um endereço: sem acentos, pontuação e espaços extras, com
+    as abreviações expandidas ("Av." = "Avenida") e o CEP sem hífen, de modo
+    que grafias triviais diferentes do mesmo endereço tenham a mesma chave.
+    """
+    if not address:
+        return ""
+    address = _CEP.sub(r"\1\2", address)
+    address = _SEM_NUMERO.sub(" sn ", address)
+    tokens = normalize_name(address).split()
+    result = []
+    for i, token in enumerate(tokens):
+        if token in DESCARTAR:
+            continue
+        if token in MARCADORES_NUMERO and i + 1 < len(tokens) and tokens[i + 1].isdigit():
+            continue
+        result.append(ABREVIACOES.get(token, token))
+    return " ".join(result)
+
+
+def confidence(address: Dict[str, Any]) -> float:
+    """Confiança (0 a 1) de um resultado pela precisão dos campos de ``address`` do Nominatim."""
+    for field, value in CONFIANCA_POR_PRECISAO:
+        if address.get(field):
+            return value
+    return CONFIANCA_MINIMA
+
+
+class GeocodingStore:
+    """
+    Resultados de geocodificação em SQLite, pela chave normalizada do endereço.
+
+    Cada resultado guarda coordenadas, nome, endereço detalhado, confiança e a
+    fonte que o produziu; endereços sem resultado também são guardados (sem
+    coordenadas) e consultados de novo após ``not_found_ttl`` segundos. Uma
+    fila persistente reúne os endereços ainda não geocodificados, para que
+    lotes grandes sejam processados aos poucos, respeitando o limite de taxa,
+    e retomados após uma interrupção.
+    """
+
+    def __init__(self, path: str = GEOCODING_STORE_PATH, not_found_ttl: float = GEOCODING_NOT_FOUND_TTL,
+                 max_attempts: int = GEOCODING_MAX_ATTEMPTS):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            path: Caminho do arquivo SQLite
+            not_found_ttl: Tempo em que um endereço sem resultado não é consultado de novo (segundos)
+            max_attempts: Falhas de consulta após as quais o endereço sai da fila
+        """
+        self.path = path
+        self.not_found_ttl = not_found_ttl
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS geocodificacoes (
+                chave TEXT PRIMARY KEY,
+                endereco TEXT NOT NULL,
+                lat REAL,
+                lon REAL,
+                nome TEXT,
+                detalhes TEXT,
+                confianca REAL,
+                fonte TEXT NOT NULL,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS fila (
+                chave TEXT PRIMARY KEY,
+                endereco TEXT NOT NULL,
+                enfileirado_em REAL NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _record(self, row: Tuple) -> Dict[str, Any]:
+        lat, lon, nome, detalhes, confianca, fonte, atualizado_em = row
+        return {
+            "lat": lat,
+            "lon": lon,
+            "display_name": nome,
+            "address": json.loads(detalhes) if detalhes else {},
+            "confianca": confianca,
+            "fonte": fonte,
+            "atualizado_em": atualizado_em
+        }
+
+    def lookup_many(self, addresses: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resultados guardados, pela chave normalizada de cada endereço.
+
+        Endereços desconhecidos (ou sem resultado há mais de ``not_found_ttl``)
+        ficam de fora; os sem resultado recente vêm com ``lat`` None.
+        """
+        keys = list(dict.fromkeys(filter(None, (normalize_address(address) for address in addresses))))
+        found: Dict[str, Dict[str, Any]] = {}
+        limite = time.time() - self.not_found_ttl
+        # Em blocos, abaixo do limite de parâmetros do SQLite
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for key, *row in self._conn().execute(
+                "SELECT chave, lat, lon, nome, detalhes, confianca, fonte, atualizado_em FROM geocodificacoes "
+                f"WHERE chave IN ({','.join('?' * len(chunk))})", chunk
+            ):
+                if row[0] is None and row[-1] <= limite:
+                    continue
+                found[key] = self._record(row)
+        return found
+
+    def lookup(self, address: str) -> Optional[Dict[str, Any]]:
+        """Resultado guardado do endereço (``lat`` None = sem resultado) ou None se desconhecido."""
+        return self.lookup_many([address]).get(normalize_address(address))
+
+    def save(self, address: str, result: Optional[Dict[str, Any]], source: str,
+             confianca: Optional[float] = None, now: Optional[float] = None) -> None:
+        """
+        Grava o resultado da geocodificação do endereço e o retira da fila.
+
+        Args:
+            address: Endereço consultado
+            result: Dict com ``lat``, ``lon``, ``display_name`` e ``address``; None = sem resultado
+            source: Fonte do resultado (ex.: "nominatim", "manual")
+            confianca: Confiança de 0 a 1; por padrão, calculada pela precisão do resultado
+            now: Momento da consulta
+        """
+        key = normalize_address(address)
+        if not key:
+            return
+        now = now or time.time()
+        if result is None:
+            values = (None, None, None, None, None)
+        else:
+            detalhes = result.get("address") or {}
+            values = (float(result["lat"]), float(result["lon"]), result.get("display_name"),
+                      json.dumps(detalhes, ensure_ascii=False),
+                      confianca if confianca is not None else confidence(detalhes))
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocodificacoes "
+                "(chave, endereco, lat, lon, nome, detalhes, confianca, fonte, atualizado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (key, address, *values, source, now)
+            )
+            conn.execute("DELETE FROM fila WHERE chave = ?", (key,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, addresses: Iterable[str], now: Optional[float] = None) -> int:
+        """
+        Põe na fila os endereços ainda sem resultado guardado (repetidos entram uma vez).
+
+        Returns:
+            Quantidade de endereços novos na fila
+        """
+        now = now or time.time()
+        addresses = list(addresses)
+        known = self.lookup_many(addresses)
+        pending = {}
+        for address in addresses:
+            key = normalize_address(address)
+            if key and key not in known:
+                pending.setdefault(key, address)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO fila (chave, endereco, enfileirado_em) VALUES (?, ?, ?)",
+                             ((key, address, now) for key, address in pending.items()))
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def pending(self, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Endereços na fila como (chave, endereço), na ordem de chegada."""
+        return self._conn().execute(
+            "SELECT chave, endereco FROM fila ORDER BY enfileirado_em, chave LIMIT ?",
+            (-1 if limit is None else limit,)
+        ).fetchall()
+
+    def record_failure(self, key: str) -> None:
+        """Conta uma falha de consulta; após ``max_attempts`` o endereço sai da fila."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE fila SET tentativas = tentativas + 1 WHERE chave = ?", (key,))
+            conn.execute("DELETE FROM fila WHERE chave = ? AND tentativas >= ?", (key, self.max_attempts))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna a quantidade de endereços geocodificados, sem resultado e na fila, por fonte."""
+        conn = self._conn()
+        por_fonte = {
+            fonte: {"encontrados": encontrados, "sem_resultado": total - encontrados}
+            for fonte, total, encontrados in conn.execute(
+                "SELECT fonte, COUNT(*), COALESCE(SUM(lat IS NOT NULL), 0) FROM geocodificacoes GROUP BY fonte"
+            )
+        }
+        return {
+            "fontes": por_fonte,
+            "fila": conn.execute("SELECT COUNT(*) FROM fila").fetchone()[0]
+        }
+
+
+_store: Optional[GeocodingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_geocoding_store() -> GeocodingStore:
+    """Retorna o armazenamento de geocodificação compartilhado do processo."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = GeocodingStore()
+        return _store
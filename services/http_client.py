@@ -0,0 +1,210 @@
+import base64
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_RETRIES, HTTP_BACKOFF_FACTOR,
+                    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_REVALIDATION, HTTP_REVALIDATION_TTL,
+                    HTTP_REVALIDATION_MAX_BYTES)
+from monitoring import metrics_collector
+from shared_cache import SharedCache
+
+# Corpos com validadores (ETag/Last-Modified), compartilhados entre os workers
+_revalidation_cache = SharedCache("http_revalidacao", default_ttl=HTTP_REVALIDATION_TTL,
+                                  max_entries=512, max_bytes=64 * 1024 * 1024)
+
+# Cabeçalhos da resposta original que são restaurados ao atender um 304
+_STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+# Cabeçalhos da requisição que entram na chave do corpo guardado: a mesma URL
+# pode responder outro conteúdo conforme o formato aceito ou as credenciais
+_KEY_HEADERS = ("Accept", "Accept-Encoding", "Accept-Language", "Authorization", "Cookie")
+
+
+class HTTPClient(requests.Session):
+    """
+    Sessão HTTP com pool de conexões por host, timeout padrão e retry com backoff.
+
+    Conexões TCP/TLS são reaproveitadas entre chamadas ao mesmo host (keep-alive).
+    Requisições sem ``timeout`` explícito usam o padrão da sessão, e cada
+    requisição é registrada no ``metrics_collector`` por host.
+
+    Com ``revalidate``, respostas GET com ETag ou Last-Modified são guardadas e
+    a próxima consulta à mesma URL, com os mesmos cabeçalhos de formato e
+    credenciais, vira uma requisição condicional; um 304 é devolvido ao
+    chamador como a resposta 200 guardada, sem baixar o corpo de novo.
+    Respostas com ``Vary`` em cabeçalhos fora da chave não são guardadas.
+    """
+
+    def __init__(self, name: str = "default",
+                 timeout: Tuple[float, float] = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT),
+                 retries: int = HTTP_RETRIES, backoff_factor: float = HTTP_BACKOFF_FACTOR,
+                 pool_connections: int = HTTP_POOL_CONNECTIONS, pool_maxsize: int = HTTP_POOL_MAXSIZE,
+                 revalidate: bool = HTTP_REVALIDATION, revalidation_cache: Optional[SharedCache] = None):
+        """
+        Inicializa a sessão.
+
+        Args:
+            name: Nome do cliente (usado nas estatísticas)
+            timeout: Timeout padrão (conexão, leitura) em segundos
+            retries: Número máximo de novas tentativas
+            backoff_factor: Fator de espera exponencial entre tentativas
+            pool_connections: Número de hosts com pool mantido
+            pool_maxsize: Conexões mantidas por host
+            revalidate: Envia requisições condicionais para URLs já baixadas
+            revalidation_cache: Onde os corpos e validadores ficam (padrão: compartilhado)
+        """
+        super().__init__()
+        self.name = name
+        self.timeout = timeout
+        retry_strategy = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            raise_on_status=False,  # a última resposta é devolvida para o chamador tratar
+        )
+        self.adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize)
+        self.mount("https://", self.adapter)
+        self.mount("http://", self.adapter)
+        self.revalidate = revalidate
+        self.revalidation_cache = revalidation_cache or _revalidation_cache
+
+    def request(self, method, url, *args, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        status = None
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            metrics_collector.record_http_request(host, time.perf_counter() - start, status)
+
+    def send(self, request, **kwargs):
+        if not self.revalidate or request.method != "GET" or kwargs.get("stream"):
+            return super().send(request, **kwargs)
+
+        # Condicionais explícitos do chamador são respeitados como estão
+        entry = None
+        key = self._revalidation_key(request)
+        if "If-None-Match" not in request.headers and "If-Modified-Since" not in request.headers:
+            entry = self.revalidation_cache.get(key)
+            if entry:
+                if entry.get("etag"):
+                    request.headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, **kwargs)
+        host = urlsplit(request.url).netloc
+        if entry and response.status_code == 304:
+            return self._from_revalidation(response, entry, key, host)
+        if entry:
+            metrics_collector.record_http_revalidation(host, modified=True)
+        if response.status_code == 200:
+            self._store_validators(response, key)
+        return response
+
+    def _revalidation_key(self, request: requests.PreparedRequest) -> str:
+        """URL mais um hash dos cabeçalhos que mudam o conteúdo (as credenciais não ficam no cache)."""
+        headers = "\n".join(f"{name}: {request.headers.get(name, '')}" for name in _KEY_HEADERS)
+        return f"{request.url}#{hashlib.sha256(headers.encode('utf-8')).hexdigest()[:32]}"
+
+    def _from_revalidation(self, response: requests.Response, entry: Dict[str, Any], key: str,
+                           host: str) -> requests.Response:
+        """Converte um 304 na resposta guardada e renova o prazo da entrada."""
+        body = base64.b64decode(entry["body"])
+        response.headers.pop("Content-Length", None)
+        # O 304 pode trazer validadores novos; os demais cabeçalhos vêm da resposta guardada
+        for name, value in entry["headers"].items():
+            response.headers.setdefault(name, value)
+        entry["etag"] = response.headers.get("ETag", entry.get("etag"))
+        entry["last_modified"] = response.headers.get("Last-Modified", entry.get("last_modified"))
+        response.status_code = 200
+        response.reason = "OK"
+        response._content = body
+        response.revalidated = True
+        self.revalidation_cache.set(key, entry)
+        metrics_collector.record_http_revalidation(host, modified=False, bytes_saved=len(body))
+        return response
+
+    def _store_validators(self, response: requests.Response, key: str) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        if "no-store" in response.headers.get("Cache-Control", "").lower():
+            return
+        # O corpo só pode ser reaproveitado se todo cabeçalho de Vary estiver na chave
+        vary = {name.strip().lower() for name in response.headers.get("Vary", "").split(",") if name.strip()}
+        if vary - {name.lower() for name in _KEY_HEADERS}:
+            return
+        if len(response.content) > HTTP_REVALIDATION_MAX_BYTES:
+            return
+        self.revalidation_cache.set(key, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "headers": {name: response.headers[name] for name in _STORED_HEADERS if name in response.headers},
+            "body": base64.b64encode(response.content).decode("ascii")
+        })
+
+    def pool_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Retorna o uso dos pools de conexão por host.
+
+        ``conexoes`` é o número de conexões abertas desde a criação do pool;
+        ``requisicoes - conexoes`` dá quantas reaproveitaram uma conexão existente.
+        """
+        stats = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "conexoes": pool.num_connections,
+                "requisicoes": pool.num_requests,
+                "ociosas": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+            }
+        return stats
+
+
+_clients: Dict[str, HTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(name: str = "default", **options: Any) -> HTTPClient:
+    """
+    Retorna o cliente HTTP compartilhado de nome ``name``, criando-o se necessário.
+
+    Clientes com o mesmo nome são a mesma instância no processo; ``options``
+    (timeout, retries, backoff_factor, pool_connections, pool_maxsize) só têm
+    efeito na criação.
+    """
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = HTTPClient(name, **options)
+            _clients[name] = client
+        return client
+
+
+def http_client_stats() -> Dict[str, Any]:
+    """Retorna o uso dos pools de todos os clientes criados."""
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.pool_stats() for name, client in clients.items()}
+
+
+def revalidation_stats() -> Dict[str, Any]:
+    """Retorna, por host, as requisições condicionais e os bytes economizados com 304."""
+    return dict(metrics_collector.metrics['revalidation'])
@@ -1,11 +1,12 @@
 import os
-import requests
+import asyncio
 import logging
 from typing import List, Optional
 from datetime import datetime
 from pathlib import Path
 from motor.motor_asyncio import AsyncIOMotorClient
 from models.image import PropertyImage
+from services.streaming_download import download_to_file
 
 # Configuração de logging
 logging.basicConfig(
@@ -27,31 +28,28 @@ class ImageService:
     async def download_and_save_image(self, image_url: str, property_id: str, image_index: int) -> Optional[str]:
         """Baixa uma imagem e salva no MongoDB."""
         try:
-            # Baixa a imagem
-            response = requests.get(image_url, timeout=10)
-            response.raise_for_status()
-            
-            # Cria diretório para o imóvel se não existir
+            # Baixa a imagem em streaming direto para o disco; a extensão vem do formato detectado
             property_dir = IMAGES_DIR / property_id
-            property_dir.mkdir(exist_ok=True)
-            
-            # Define o nome do arquivo
-            extension = image_url.split(".")[-1].lower()
-            if extension not in ["jpg", "jpeg", "png"]:
-                extension = "jpg"
-            
-            filename = f"{image_index}.{extension}"
-            filepath = property_dir / filename
+            result = await asyncio.to_thread(
+                download_to_file, image_url, property_dir / str(image_index), timeout=10
+            )
+            filepath = Path(result.path)
             
-            # Salva a imagem localmente
-            with open(filepath, "wb") as f:
-                f.write(response.content)
+            # Mesmo conteúdo já salvo para o imóvel: reaproveita o documento existente
+            existing = await self.collection.find_one({"property_id": property_id, "sha256": result.sha256})
+            if existing:
+                if existing.get("local_path") != str(filepath.relative_to(IMAGES_DIR)):
+                    filepath.unlink()
+                logger.info(f"Imagem {image_index} do imóvel {property_id} já existe ({result.sha256[:12]})")
+                return str(existing["_id"])
             
             # Cria o documento no MongoDB
             image_doc = PropertyImage(
                 property_id=property_id,
                 image_url=image_url,
-                local_path=str(filepath.relative_to(IMAGES_DIR))
+                local_path=str(filepath.relative_to(IMAGES_DIR)),
+                sha256=result.sha256,
+                size=result.size
             )
             
             # Insere no MongoDB
@@ -104,18 +102,15 @@ class ImageService:
             if not image:
                 return None
             
-            # Baixa a nova imagem
-            response = requests.get(image_url, timeout=10)
-            response.raise_for_status()
-            
-            # Atualiza o arquivo local
+            # Baixa a nova imagem em streaming, substituindo o arquivo local só ao final
             filepath = IMAGES_DIR / image.local_path
-            with open(filepath, "wb") as f:
-                f.write(response.content)
+            result = await asyncio.to_thread(download_to_file, image_url, filepath, timeout=10)
             
             # Atualiza no MongoDB
             update_data = {
                 "image_url": image_url,
+                "sha256": result.sha256,
+                "size": result.size,
                 "updated_at": datetime.utcnow()
             }
             
@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from config import (logger, IMAGE_VALIDATION_CONCURRENCY, IMAGE_VALIDATION_PER_HOST, IMAGE_VALIDATION_TIMEOUT,
+                    IMAGE_VALIDATION_DEADLINE, IMAGE_VALIDATION_TTL, IMAGE_VALIDATION_INVALID_TTL)
+from monitoring import metrics_collector
+from services.async_http_client import HTTP_ERRORS, run_sync
+from shared_cache import SharedCache
+
+# Tamanho aceito para imagens de imóveis (entre 1 KB e 10 MB)
+MIN_IMAGE_BYTES = 1024
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Respostas 4xx passageiras (timeout do servidor e limite de requisições)
+TRANSIENT_4XX = (408, 429)
+
+# Resultados das validações, compartilhados entre os workers
+_validation_cache = SharedCache("validacao_imagens", default_ttl=IMAGE_VALIDATION_TTL, max_entries=50000)
+
+
+class ImageValidator:
+    """
+    Valida URLs de imagem em lote com requisições HEAD concorrentes.
+
+    O número de conexões é limitado no total e por host. Cada resposta
+    definitiva (2xx ou 4xx) vira um resultado (``valido``, ``status``,
+    ``tamanho``, ``content_type``) no cache compartilhado com TTL — menor para
+    URLs inválidas; falhas de rede, timeouts, 5xx, 408 e 429 não são
+    guardados e voltam a ser consultados na próxima chamada. As leituras e gravações no cache
+    rodam fora do event loop (``asyncio.to_thread``). Validações que não
+    terminam dentro do prazo do lote continuam em segundo plano e aquecem o
+    cache para a próxima chamada; validações da mesma URL em andamento são
+    reaproveitadas.
+
+    A sessão pertence ao event loop em que é criada; use
+    ``get_image_validator`` para obter a instância do loop atual.
+    """
+
+    def __init__(self, concurrency: int = IMAGE_VALIDATION_CONCURRENCY, per_host: int = IMAGE_VALIDATION_PER_HOST,
+                 timeout: float = IMAGE_VALIDATION_TIMEOUT, ttl: float = IMAGE_VALIDATION_TTL,
+                 invalid_ttl: float = IMAGE_VALIDATION_INVALID_TTL, cache: Optional[SharedCache] = None):
+        """
+        Inicializa o validador.
+
+        Args:
+            concurrency: Conexões simultâneas no total
+            per_host: Conexões simultâneas por host
+            timeout: Timeout de conexão e de leitura de cada requisição (segundos)
+            ttl: Validade de um resultado válido
+            invalid_ttl: Validade de um resultado inválido
+            cache: Onde os resultados ficam (padrão: cache compartilhado)
+        """
+        self.concurrency = concurrency
+        self.per_host = per_host
+        # A espera por uma conexão livre não conta no timeout: só conexão e leitura
+        self.timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        self.ttl = ttl
+        self.invalid_ttl = invalid_ttl
+        self.cache = cache if cache is not None else _validation_cache
+        self._pending: Dict[str, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def validate_batch(self, urls: Iterable[str],
+                             deadline: Optional[float] = IMAGE_VALIDATION_DEADLINE) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Valida um lote de URLs.
+
+        Args:
+            urls: URLs a validar (repetições são consultadas uma vez)
+            deadline: Tempo máximo de espera pelo lote, em segundos (None = sem prazo)
+
+        Returns:
+            Dict URL -> resultado; URLs ainda sem resposta no prazo ficam com None
+        """
+        urls = list(dict.fromkeys(urls))
+        results: Dict[str, Optional[Dict[str, Any]]] = await asyncio.to_thread(self._cached, urls)
+        tasks = {url: self._task(url) for url in urls if url not in results}
+
+        if tasks:
+            done, pending = await asyncio.wait(set(tasks.values()), timeout=deadline)
+            if pending:
+                logger.info(f"Prazo da validação de imagens atingido: {len(pending)} de {len(tasks)} pendentes")
+            for url, task in tasks.items():
+                results[url] = task.result() if task in done and task.exception() is None else None
+        return results
+
+    def _cached(self, urls: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Resultados já em cache (consulta bloqueante; rodada fora do loop)."""
+        results = {}
+        for url in urls:
+            cached = self.cache.get(url)
+            if cached is not None:
+                results[url] = cached
+        return results
+
+    def _task(self, url: str) -> asyncio.Task:
+        task = self._pending.get(url)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._validate(url))
+            self._pending[url] = task
+            task.add_done_callback(lambda _: self._pending.pop(url, None))
+        return task
+
+    async def _validate(self, url: str) -> Dict[str, Any]:
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        status = None
+        try:
+            async with self.session.head(url, allow_redirects=True) as response:
+                status = response.status
+                content_type = response.headers.get("Content-Type", "")
+                size = int(response.headers.get("Content-Length", 0) or 0)
+            result = {
+                "valido": status == 200 and "image" in content_type and MIN_IMAGE_BYTES <= size <= MAX_IMAGE_BYTES,
+                "status": status,
+                "tamanho": size,
+                "content_type": content_type
+            }
+        except (HTTP_ERRORS + (ValueError,)) as e:
+            result = {"valido": False, "status": status, "tamanho": None, "content_type": None, "erro": str(e)}
+        finally:
+            metrics_collector.record_http_request(host, time.perf_counter() - start, status)
+
+        # Só respostas definitivas são guardadas: um erro passageiro (rede,
+        # 5xx, 408, 429) não pode marcar a imagem como inválida até o fim do TTL
+        if status is not None and (200 <= status < 300 or (400 <= status < 500 and status not in TRANSIENT_4XX)):
+            await asyncio.to_thread(self.cache.set, url, result,
+                                    ttl=self.ttl if result["valido"] else self.invalid_ttl)
+        return result
+
+    async def close(self) -> None:
+        """Fecha a sessão e suas conexões."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+_loop_validators: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ImageValidator]" = weakref.WeakKeyDictionary()
+_loop_validators_lock = threading.Lock()
+
+
+def get_image_validator() -> ImageValidator:
+    """Retorna o validador compartilhado do event loop atual (deve ser chamado de uma corrotina)."""
+    loop = asyncio.get_running_loop()
+    with _loop_validators_lock:
+        validator = _loop_validators.get(loop)
+        if validator is None:
+            validator = ImageValidator()
+            _loop_validators[loop] = validator
+        return validator
+
+
+async def validate_image_urls(urls: Iterable[str],
+                              deadline: Optional[float] = IMAGE_VALIDATION_DEADLINE) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Valida um lote de URLs com o validador do loop atual (ver ``ImageValidator.validate_batch``)."""
+    return await get_image_validator().validate_batch(urls, deadline)
+
+
+def validate_image_urls_sync(urls: Iterable[str],
+                             deadline: Optional[float] = IMAGE_VALIDATION_DEADLINE) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Versão síncrona de ``validate_image_urls``, executada no loop de segundo plano."""
+    return run_sync(validate_image_urls(list(urls), deadline))
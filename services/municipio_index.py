@@ -0,0 +1,252 @@
+import csv
+import difflib
+import os
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import logger, IBGE_MUNICIPIOS_PATH
+
+# Unidades da federação pelo código IBGE (os dois primeiros dígitos do código do município)
+UFS = {
+    11: ("RO", "Rondônia"), 12: ("AC", "Acre"), 13: ("AM", "Amazonas"), 14: ("RR", "Roraima"),
+    15: ("PA", "Pará"), 16: ("AP", "Amapá"), 17: ("TO", "Tocantins"),
+    21: ("MA", "Maranhão"), 22: ("PI", "Piauí"), 23: ("CE", "Ceará"), 24: ("RN", "Rio Grande do Norte"),
+    25: ("PB", "Paraíba"), 26: ("PE", "Pernambuco"), 27: ("AL", "Alagoas"), 28: ("SE", "Sergipe"),
+    29: ("BA", "Bahia"),
+    31: ("MG", "Minas Gerais"), 32: ("ES", "Espírito Santo"), 33: ("RJ", "Rio de Janeiro"), 35: ("SP", "São Paulo"),
+    41: ("PR", "Paraná"), 42: ("SC", "Santa Catarina"), 43: ("RS", "Rio Grande do Sul"),
+    50: ("MS", "Mato Grosso do Sul"), 51: ("MT", "Mato Grosso"), 52: ("GO", "Goiás"), 53: ("DF", "Distrito Federal"),
+}
+# Regiões pelo primeiro dígito do código
+REGIOES = {1: ("N", "Norte"), 2: ("NE", "Nordeste"), 3: ("SE", "Sudeste"), 4: ("S", "Sul"), 5: ("CO", "Centro-Oeste")}
+UF_POR_SIGLA = {sigla: codigo for codigo, (sigla, _) in UFS.items()}
+
+CSV_FIELDS = ("codigo", "nome", "microrregiao_id", "microrregiao", "mesorregiao_id", "mesorregiao")
+FUZZY_CUTOFF = 0.85
+# Intervalo mínimo entre verificações de atualização do arquivo
+RELOAD_CHECK_INTERVAL = 60
+
+# Fim de endereço: CEP opcional e a UF depois de um separador ("- SP", "/SP", "(SP)")
+_ADDRESS_CEP = re.compile(r"[\s,.-]*(?:CEP:?\s*)?\d{5}-?\d{3}[\s.]*$", re.IGNORECASE)
+_ADDRESS_UF = re.compile(r"[\s,/(-]+([A-Za-z]{2})\)?[\s.]*$")
+# Separadores entre as partes do endereço (hífens sem espaço fazem parte do nome: "Embu-Guaçu")
+_ADDRESS_PARTS = re.compile(r"\s+-\s+|,|/|\(")
+
+
+def normalize_name(text: Optional[str]) -> str:
+    """Normaliza nomes para comparação: sem acentos, minúsculas, só letras e números separados por um espaço."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+@dataclass(frozen=True)
+class Municipio:
+    """Município com a hierarquia territorial do IBGE."""
+    codigo: int
+    nome: str
+    uf: str
+    uf_nome: str
+    regiao: str
+    regiao_nome: str
+    microrregiao_id: Optional[int] = None
+    microrregiao: Optional[str] = None
+    mesorregiao_id: Optional[int] = None
+    mesorregiao: Optional[str] = None
+
+    @property
+    def uf_codigo(self) -> int:
+        return self.codigo // 100000
+
+    @property
+    def regiao_codigo(self) -> int:
+        return self.codigo // 1000000
+
+    @property
+    def completo(self) -> bool:
+        """Indica se a microrregião e a mesorregião são conhecidas."""
+        return self.microrregiao_id is not None and self.mesorregiao_id is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Hierarquia no formato de ``IBGEAPI.get_city_info``."""
+        return {
+            "id": self.codigo,
+            "nome": self.nome,
+            "microrregiao": {
+                "id": self.microrregiao_id,
+                "nome": self.microrregiao,
+                "mesorregiao": {
+                    "id": self.mesorregiao_id,
+                    "nome": self.mesorregiao,
+                    "uf": {
+                        "id": self.uf_codigo,
+                        "sigla": self.uf,
+                        "nome": self.uf_nome,
+                        "regiao": {
+                            "id": self.regiao_codigo,
+                            "sigla": self.regiao,
+                            "nome": self.regiao_nome
+                        }
+                    }
+                }
+            }
+        }
+
+
+def make_municipio(codigo: Any, nome: str, microrregiao_id: Any = None, microrregiao: Optional[str] = None,
+                   mesorregiao_id: Any = None, mesorregiao: Optional[str] = None) -> Municipio:
+    """Monta um ``Municipio`` derivando UF e região do código."""
+    codigo = int(codigo)
+    uf, uf_nome = UFS[codigo // 100000]
+    regiao, regiao_nome = REGIOES[codigo // 1000000]
+    return Municipio(
+        codigo, nome, uf, uf_nome, regiao, regiao_nome,
+        int(microrregiao_id) if microrregiao_id else None, microrregiao or None,
+        int(mesorregiao_id) if mesorregiao_id else None, mesorregiao or None
+    )
+
+
+def split_address(endereco: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Separa cidade e UF de um endereço em texto livre terminado em
+    "Cidade - UF", "Cidade/UF" ou "Cidade (UF)", com ou sem CEP no fim.
+    """
+    endereco = _ADDRESS_CEP.sub("", endereco or "")
+    match = _ADDRESS_UF.search(endereco)
+    if not match or match.group(1).upper() not in UF_POR_SIGLA:
+        return None
+    cidade = _ADDRESS_PARTS.split(endereco[:match.start()])[-1].strip()
+    return (cidade, match.group(1).upper()) if cidade else None
+
+
+class MunicipioIndex:
+    """
+    Índice em memória dos municípios do IBGE, carregado de um CSV local.
+
+    Busca por código e por nome sem acentos e sem diferenciar maiúsculas, com
+    a UF para desambiguar nomes repetidos (há dezenas de "Bom Jesus" e "São
+    Domingos") e, quando o nome não bate exatamente, uma busca aproximada
+    restrita à UF. Nenhuma consulta acessa a rede; o arquivo é atualizado
+    por ``scripts/update_ibge_municipios.py``.
+    """
+
+    def __init__(self, municipios: Iterable[Municipio] = ()):
+        self._by_code: Dict[int, Municipio] = {}
+        self._by_name: Dict[str, List[Municipio]] = {}
+        self._by_uf_name: Dict[Tuple[str, str], Municipio] = {}
+        self._names_by_uf: Dict[str, List[str]] = {}
+        for municipio in municipios:
+            self._add(municipio)
+        self._all_names = list(self._by_name)
+
+    def _add(self, municipio: Municipio) -> None:
+        name = normalize_name(municipio.nome)
+        self._by_code[municipio.codigo] = municipio
+        self._by_name.setdefault(name, []).append(municipio)
+        self._by_uf_name[(municipio.uf, name)] = municipio
+        self._names_by_uf.setdefault(municipio.uf, []).append(name)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "MunicipioIndex":
+        """Carrega o índice de um CSV com as colunas de ``CSV_FIELDS``."""
+        with open(path, encoding="utf-8", newline="") as f:
+            return cls(make_municipio(**{field: row.get(field) for field in CSV_FIELDS}) for row in csv.DictReader(f))
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    def get(self, codigo: Any) -> Optional[Municipio]:
+        """Retorna o município pelo código IBGE (7 dígitos)."""
+        try:
+            return self._by_code.get(int(codigo))
+        except (TypeError, ValueError):
+            return None
+
+    def lookup(self, nome: Optional[str], uf: Optional[str] = None, fuzzy: bool = True) -> Optional[Municipio]:
+        """
+        Busca um município pelo nome.
+
+        Args:
+            nome: Nome do município (acentos, caixa e pontuação são ignorados)
+            uf: Sigla da UF; sem ela, nomes repetidos em mais de uma UF não são resolvidos
+            fuzzy: Tenta o nome mais parecido quando não há correspondência exata
+
+        Returns:
+            O município encontrado ou None
+        """
+        name = normalize_name(nome)
+        if not name:
+            return None
+        uf = (uf or "").strip().upper() or None
+        if uf is not None:
+            municipio = self._by_uf_name.get((uf, name))
+            if municipio is not None or not fuzzy:
+                return municipio
+            matches = difflib.get_close_matches(name, self._names_by_uf.get(uf, []), n=1, cutoff=FUZZY_CUTOFF)
+            return self._by_uf_name[(uf, matches[0])] if matches else None
+
+        candidates = self._by_name.get(name)
+        if candidates is None and fuzzy:
+            matches = difflib.get_close_matches(name, self._all_names, n=1, cutoff=FUZZY_CUTOFF)
+            candidates = self._by_name[matches[0]] if matches else None
+        if candidates and len(candidates) == 1:
+            return candidates[0]
+        return None
+
+    def candidates(self, nome: Optional[str]) -> List[Municipio]:
+        """Todos os municípios com o nome exato (normalizado), em qualquer UF."""
+        return list(self._by_name.get(normalize_name(nome), []))
+
+    def find_in_address(self, endereco: Optional[str]) -> Optional[Municipio]:
+        """
+        Identifica o município de um endereço em texto livre terminado em
+        "Cidade - UF", "Cidade/UF" ou "Cidade (UF)", com ou sem CEP no fim.
+        """
+        partes = split_address(endereco)
+        return self.lookup(*partes) if partes else None
+
+    def hierarchy(self, codigo: Any) -> Optional[Dict[str, Any]]:
+        """Hierarquia territorial do município (formato de ``IBGEAPI.get_city_info``)."""
+        municipio = self.get(codigo)
+        return municipio.to_dict() if municipio else None
+
+
+_index: Optional[MunicipioIndex] = None
+_index_mtime: Optional[float] = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+
+
+def get_municipio_index() -> MunicipioIndex:
+    """
+    Retorna o índice compartilhado do processo.
+
+    O arquivo (``IBGE_MUNICIPIOS_PATH``) é relido quando muda (verificado no máximo a cada
+    ``RELOAD_CHECK_INTERVAL`` segundos); se não puder ser lido, o índice
+    fica vazio e as buscas retornam None.
+    """
+    global _index, _index_mtime, _index_checked
+    now = time.monotonic()
+    if _index is not None and now - _index_checked < RELOAD_CHECK_INTERVAL:
+        return _index
+    with _index_lock:
+        _index_checked = now
+        try:
+            mtime = os.path.getmtime(IBGE_MUNICIPIOS_PATH)
+        except OSError:
+            mtime = None
+        if _index is None or mtime != _index_mtime:
+            try:
+                _index = MunicipioIndex.from_csv(IBGE_MUNICIPIOS_PATH)
+                logger.info(f"Índice de municípios carregado: {len(_index)} municípios")
+            except (OSError, KeyError, ValueError) as e:
+                logger.error(f"Não foi possível carregar o índice de municípios {IBGE_MUNICIPIOS_PATH}: {e}")
+                _index = _index or MunicipioIndex()
+            _index_mtime = mtime
+        return _index
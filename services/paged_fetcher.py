@@ -0,0 +1,213 @@
+import json
+import math
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import logger, PAGED_FETCH_PREFETCH, PAGED_FETCH_CHECKPOINT_DIR
+
+# Chaves usadas pelas APIs paginadas para a lista de itens e para o total
+_ITEM_KEYS = ("results", "items")
+_COUNT_KEYS = ("count", "total", "total_count")
+_PAGE_COUNT_KEYS = ("total_pages", "num_pages")
+
+
+class PageFormatError(ValueError):
+    """A resposta de uma página não tem uma lista de itens reconhecível."""
+
+
+def parse_page(data: Any) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Separa os itens de uma página e o que ela informa sobre a paginação.
+
+    Aceita listas puras e dicionários no formato ``{"results"|"items": [...]}``
+    com, opcionalmente, ``next`` (link da próxima página), ``count``/``total``
+    (total de itens) ou ``total_pages``/``num_pages``.
+
+    Returns:
+        (itens, info) com as chaves ``next`` (bool ou None quando a resposta
+        não diz), ``count`` e ``total_pages`` (None quando ausentes)
+    """
+    info: Dict[str, Any] = {"next": None, "count": None, "total_pages": None}
+    if isinstance(data, list):
+        return data, info
+    if not isinstance(data, dict):
+        raise PageFormatError(f"Tipo de página inesperado: {type(data).__name__}")
+
+    key = next((key for key in _ITEM_KEYS if key in data), None)
+    if key is None or not isinstance(data[key], list):
+        raise PageFormatError(f"Estrutura de página inesperada: {list(data.keys())}")
+    if "next" in data:
+        info["next"] = bool(data["next"])
+    info["count"] = next((data[key] for key in _COUNT_KEYS if isinstance(data.get(key), int)), None)
+    info["total_pages"] = next((data[key] for key in _PAGE_COUNT_KEYS if isinstance(data.get(key), int)), None)
+    return data[key], info
+
+
+def _is_missing_page(error: BaseException) -> bool:
+    # Página além do fim em APIs que respondem 404 em vez de lista vazia
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 404
+
+
+class PagedFetcher:
+    """
+    Busca uma coleção paginada com páginas pedidas à frente do consumidor.
+
+    A primeira página é buscada sozinha para descobrir a paginação: com o
+    total (``count`` ou ``total_pages``) as demais páginas são conhecidas de
+    antemão; sem ele, o fim é dado pelo link ``next``, por uma página vazia
+    ou menor que a primeira, ou por um 404. Até ``prefetch`` páginas ficam em
+    andamento ao mesmo tempo, e os itens são entregues em ordem de página à
+    medida que chegam — o consumidor processa a página N enquanto as
+    seguintes são baixadas.
+
+    Com ``checkpoint``, a próxima página a processar é gravada em disco depois
+    que o consumidor termina cada página; uma nova execução com o mesmo nome
+    retoma dali. O checkpoint é apagado quando a coleta termina.
+    """
+
+    def __init__(self, fetch_page: Callable[[int], Any], prefetch: int = PAGED_FETCH_PREFETCH,
+                 max_pages: Optional[int] = None, start_page: int = 1, checkpoint: Optional[str] = None,
+                 checkpoint_dir: str = PAGED_FETCH_CHECKPOINT_DIR):
+        """
+        Inicializa o buscador.
+
+        Args:
+            fetch_page: Recebe o número da página e devolve a resposta (JSON já decodificado)
+            prefetch: Páginas buscadas simultaneamente à frente do consumidor
+            max_pages: Última página buscada (None = até o fim da coleção)
+            start_page: Primeira página, quando não há checkpoint
+            checkpoint: Nome do checkpoint para retomar a coleta (None = sem checkpoint)
+            checkpoint_dir: Diretório dos checkpoints
+        """
+        self.fetch_page = fetch_page
+        self.prefetch = max(1, prefetch)
+        self.max_pages = max_pages
+        self.start_page = start_page
+        self.checkpoint_path = Path(checkpoint_dir) / f"{checkpoint}.json" if checkpoint else None
+        self.total_pages: Optional[int] = None
+        self.page_size: Optional[int] = None
+        self.pages_fetched = 0
+
+    def load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Retorna o checkpoint gravado, ou None se não houver."""
+        if self.checkpoint_path is None or not self.checkpoint_path.exists():
+            return None
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Checkpoint {self.checkpoint_path} ilegível, recomeçando: {e}")
+            return None
+
+    def _save_checkpoint(self, next_page: int) -> None:
+        if self.checkpoint_path is None:
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump({
+                "pagina": next_page,
+                "total_paginas": self.total_pages,
+                "tamanho_pagina": self.page_size,
+                "atualizado_em": time.time()
+            }, f)
+        os.replace(partial, self.checkpoint_path)
+
+    def clear_checkpoint(self) -> None:
+        """Apaga o checkpoint (a próxima execução recomeça do início)."""
+        if self.checkpoint_path is not None and self.checkpoint_path.exists():
+            self.checkpoint_path.unlink()
+
+    def _discover(self, items: List[Any], info: Dict[str, Any], first_page: int) -> None:
+        if self.page_size is None and items:
+            self.page_size = len(items)
+        if info["total_pages"] is not None:
+            self.total_pages = info["total_pages"]
+        elif info["count"] is not None and self.page_size and first_page == 1:
+            self.total_pages = math.ceil(info["count"] / self.page_size)
+
+    def _last_page(self) -> Optional[int]:
+        limits = [limit for limit in (self.total_pages, self.max_pages) if limit is not None]
+        return min(limits) if limits else None
+
+    def _has_next(self, items: List[Any], info: Dict[str, Any]) -> bool:
+        if not items:
+            return False
+        if info["next"] is not None:
+            return info["next"]
+        if self.total_pages is not None:
+            return True
+        return self.page_size is None or len(items) >= self.page_size
+
+    def iter_pages(self) -> Iterator[Tuple[int, List[Any]]]:
+        """
+        Gera ``(página, itens)`` em ordem de página.
+
+        Erros de uma página propagam depois que as páginas anteriores foram
+        entregues, e o checkpoint (se houver) continua apontando para ela.
+        """
+        page = self.start_page
+        saved = self.load_checkpoint()
+        if saved:
+            page = saved.get("pagina", page)
+            self.total_pages = saved.get("total_paginas")
+            self.page_size = saved.get("tamanho_pagina")
+            logger.info(f"Retomando coleta paginada na página {page} ({self.checkpoint_path})")
+
+        last_page = self._last_page()
+        if last_page is not None and page > last_page:
+            self.clear_checkpoint()
+            return
+
+        # A primeira página vem sozinha: ela diz quantas páginas há
+        items, info = parse_page(self.fetch_page(page))
+        self.pages_fetched += 1
+        self._discover(items, info, page)
+        has_next = self._has_next(items, info)
+
+        with ThreadPoolExecutor(max_workers=self.prefetch, thread_name_prefix="paged_fetch") as executor:
+            futures: Dict[int, Future] = {}
+            next_to_submit = page + 1
+            try:
+                while True:
+                    if items:
+                        yield page, items
+                        self._save_checkpoint(page + 1)
+                    last_page = self._last_page()
+                    if not has_next or (last_page is not None and page >= last_page):
+                        break
+
+                    # Mantém a janela de páginas em andamento cheia
+                    while len(futures) < self.prefetch and (last_page is None or next_to_submit <= last_page):
+                        futures[next_to_submit] = executor.submit(self.fetch_page, next_to_submit)
+                        next_to_submit += 1
+
+                    page += 1
+                    try:
+                        data = futures.pop(page).result()
+                    except Exception as e:
+                        if self.total_pages is None and _is_missing_page(e):
+                            break
+                        raise
+                    self.pages_fetched += 1
+                    items, info = parse_page(data)
+                    has_next = self._has_next(items, info)
+            finally:
+                # Páginas especulativas além do fim (ou após um erro) são descartadas
+                for future in futures.values():
+                    future.cancel()
+
+        self.clear_checkpoint()
+
+    def iter_items(self) -> Iterator[Any]:
+        """Gera os itens de todas as páginas, em ordem."""
+        for _, items in self.iter_pages():
+            yield from items
+
+    def fetch_all(self) -> List[Any]:
+        """Retorna todos os itens em uma lista."""
+        return list(self.iter_items())
@@ -0,0 +1,278 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - dependência opcional
+    redis = None
+
+from config import logger, RATE_LIMITS, RATE_LIMIT_STORE, RATE_LIMIT_PATH, RATE_LIMIT_URL
+from monitoring import metrics_collector
+
+TOKEN = "token"
+LEAKY = "leaky"
+
+# Estado de um limitador: (a, b)
+#   token: (fichas disponíveis, instante da última atualização)
+#   leaky: (instante teórico de saída da próxima requisição, não usado)
+State = Tuple[float, float]
+
+
+def _reserve(mode: str, state: Optional[State], now: float, rate: float, burst: int,
+             timeout: Optional[float]) -> Tuple[Optional[State], float]:
+    """
+    Calcula a reserva de uma requisição.
+
+    Returns:
+        (novo estado, espera em segundos); o estado é None se a espera
+        excede ``timeout`` e nada deve ser gravado
+    """
+    if mode == LEAKY:
+        # Balde furado como fila: requisições saem espaçadas de 1/rate; quem
+        # limita a espera (timeout) também é recusado com ``burst`` já na fila.
+        # Sem timeout, a espera é a necessária
+        tat = state[0] if state else now
+        start = max(now, tat)
+        wait = start - now
+        if timeout is not None and (wait > timeout or wait > burst / rate):
+            return None, wait
+        return (start + 1 / rate, 0.0), wait
+
+    tokens, updated = state if state else (float(burst), now)
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate) - 1
+    wait = -tokens / rate if tokens < 0 else 0.0
+    if timeout is not None and wait > timeout:
+        return None, wait
+    return (tokens, now), wait
+
+
+class LocalRateStore:
+    """Estado dos limitadores na memória do processo."""
+
+    def __init__(self):
+        self._states: Dict[str, State] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, key: str, mode: str, rate: float, burst: int, timeout: Optional[float]) -> float:
+        with self._lock:
+            state, wait = _reserve(mode, self._states.get(key), time.time(), rate, burst, timeout)
+            if state is not None:
+                self._states[key] = state
+            return wait if state is not None else -wait
+
+
+class SQLiteRateStore:
+    """
+    Estado dos limitadores em SQLite, compartilhado pelos processos da máquina.
+
+    Cada reserva é uma transação ``BEGIN IMMEDIATE``, que serializa os
+    processos durante a leitura e gravação do estado.
+    """
+
+    def __init__(self, path: str = RATE_LIMIT_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS limites (chave TEXT PRIMARY KEY, a REAL NOT NULL, b REAL NOT NULL)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, key: str, mode: str, rate: float, burst: int, timeout: Optional[float]) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT a, b FROM limites WHERE chave = ?", (key,)).fetchone()
+            state, wait = _reserve(mode, row, time.time(), rate, burst, timeout)
+            if state is not None:
+                conn.execute("INSERT OR REPLACE INTO limites (chave, a, b) VALUES (?, ?, ?)", (key, *state))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait if state is not None else -wait
+
+
+# Mesmo algoritmo de ``_reserve``, executado atomicamente no servidor
+_REDIS_SCRIPT = """
+local mode, rate, burst = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local timeout = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local a = tonumber(redis.call('HGET', KEYS[1], 'a'))
+local b = tonumber(redis.call('HGET', KEYS[1], 'b'))
+local wait
+if mode == 'leaky' then
+  local start = math.max(now, a or now)
+  wait = start - now
+  if timeout >= 0 and (wait > timeout or wait > burst / rate) then return tostring(-wait) end
+  a, b = start + 1 / rate, 0
+else
+  local tokens = math.min(burst, (a or burst) + math.max(0, now - (b or now)) * rate) - 1
+  wait = 0
+  if tokens < 0 then wait = -tokens / rate end
+  if timeout >= 0 and wait > timeout then return tostring(-wait) end
+  a, b = tokens, now
+end
+redis.call('HSET', KEYS[1], 'a', a, 'b', b)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+return tostring(wait)
+"""
+
+
+class RedisRateStore:
+    """Estado dos limitadores em um servidor compatível com Redis (vários hosts/processos)."""
+
+    def __init__(self, url: str = RATE_LIMIT_URL):
+        if redis is None:
+            raise ImportError("O pacote 'redis' é necessário para o limitador distribuído")
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._script = self.client.register_script(_REDIS_SCRIPT)
+
+    def reserve(self, key: str, mode: str, rate: float, burst: int, timeout: Optional[float]) -> float:
+        result = self._script(keys=[f"limite:{key}"],
+                              args=[mode, rate, burst, -1 if timeout is None else timeout])
+        return float(result)
+
+
+class RateLimiter:
+    """
+    Limitador de taxa compartilhado, em modo balde de fichas ou balde furado.
+
+    - ``token``: acumula até ``burst`` fichas à taxa ``rate``/s, permitindo
+      rajadas curtas depois de períodos ociosos;
+    - ``leaky``: espaça as requisições de exatamente ``1/rate`` segundos;
+      chamadas com ``timeout`` são recusadas quando já há ``burst``
+      requisições aguardando, e chamadas sem timeout esperam a sua vez.
+
+    O estado fica no ``store`` (memória do processo, SQLite ou Redis), de
+    modo que limitadores com a mesma chave em threads, processos ou máquinas
+    diferentes dividem a mesma cota. O tempo de espera é registrado no
+    ``metrics_collector``.
+    """
+
+    def __init__(self, key: str, rate: float, burst: int = 1, mode: str = TOKEN, store=None):
+        """
+        Inicializa o limitador.
+
+        Args:
+            key: Identificador da cota (normalmente o host)
+            rate: Requisições por segundo
+            burst: Rajada máxima (token) ou tamanho da fila (leaky)
+            mode: "token" ou "leaky"
+            store: Onde o estado é mantido (padrão: memória do processo)
+        """
+        if rate <= 0:
+            raise ValueError("rate deve ser positivo")
+        if mode not in (TOKEN, LEAKY):
+            raise ValueError(f"Modo de limite inválido: {mode}")
+        self.key = key
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.mode = mode
+        self.store = store if store is not None else LocalRateStore()
+
+    def _reserve(self, timeout: Optional[float]) -> float:
+        wait = self.store.reserve(self.key, self.mode, self.rate, self.burst, timeout)
+        if wait < 0:
+            raise TimeoutError(f"Limite de taxa de {self.key}: espera de {-wait:.2f}s não permitida")
+        metrics_collector.record_rate_limit_wait(self.key, wait)
+        return wait
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Reserva uma requisição, bloqueando a thread até o horário reservado.
+
+        Args:
+            timeout: Espera máxima; se excedida (ou, no modo leaky, se a fila
+                já tem ``burst`` requisições), nada é reservado e
+                ``TimeoutError`` é levantado. None espera o necessário
+
+        Returns:
+            Tempo esperado, em segundos
+        """
+        wait = self._reserve(timeout)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> float:
+        """Versão assíncrona de ``acquire`` (não bloqueia o event loop)."""
+        if isinstance(self.store, LocalRateStore):
+            wait = self._reserve(timeout)
+        else:
+            # SQLite e Redis fazem E/S: a reserva roda fora do event loop
+            wait = await asyncio.to_thread(self._reserve, timeout)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class TokenBucket(RateLimiter):
+    """Limitador por balde de fichas local, sem chave compartilhada."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        super().__init__(f"local-{id(self)}", rate, burst, TOKEN)
+
+
+_store = None
+_store_lock = threading.Lock()
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_store():
+    """
+    Retorna o armazenamento configurado em RATE_LIMIT_STORE ("local", "sqlite"
+    ou "redis"); se não puder ser criado, usa a memória do processo.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                if RATE_LIMIT_STORE == "redis":
+                    _store = RedisRateStore(RATE_LIMIT_URL)
+                elif RATE_LIMIT_STORE == "sqlite":
+                    _store = SQLiteRateStore(RATE_LIMIT_PATH)
+            except Exception as e:
+                logger.error(f"Armazenamento de limites indisponível ({RATE_LIMIT_STORE}): {str(e)}")
+            if _store is None:
+                _store = LocalRateStore()
+        return _store
+
+
+def get_rate_limiter(host: str, rate: Optional[float] = None, burst: Optional[int] = None,
+                     mode: Optional[str] = None) -> RateLimiter:
+    """
+    Retorna o limitador compartilhado de um host.
+
+    Os parâmetros de RATE_LIMITS para o host têm prioridade; ``rate``,
+    ``burst`` e ``mode`` são usados quando o host não está configurado. Todas
+    as chamadas para o mesmo host devolvem a mesma instância.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            policy = RATE_LIMITS.get(host, {})
+            limiter = RateLimiter(
+                host,
+                rate=policy.get("rate", rate or 1.0),
+                burst=policy.get("burst", burst or 1),
+                mode=policy.get("mode", mode or TOKEN),
+                store=get_rate_store()
+            )
+            _limiters[host] = limiter
+        return limiter
@@ -3,17 +3,25 @@ import requests
 from typing import Dict, Any, Optional
 from datetime import datetime
 import logging
+from cache_manager import CacheManager
+from config import CACHE_POLICIES
+from services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
 class ScraphubService:
-    def __init__(self):
+    def __init__(self, cache_manager: Optional[CacheManager] = None,
+                 http_client: Optional[requests.Session] = None):
         self.base_url = "https://scraphub.comercify.shop/api"
         self.api_key = os.getenv("SCRAPHUB_API_KEY")
         self.headers = {
             "X-Api-Key": self.api_key,
             "Content-Type": "application/json"
         }
+        self.cache_fresh = CACHE_POLICIES['scraphub']['fresh']
+        self.cache_grace = CACHE_POLICIES['scraphub']['grace']
+        self.cache_manager = cache_manager or CacheManager()
+        self.http = http_client or get_http_client()
 
     def get_items(self, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
         """
@@ -26,9 +34,16 @@ class ScraphubService:
         Returns:
             Dict[str, Any]: Resposta da API com os itens
         """
+        return self.cache_manager.get_or_fetch(
+            f"scraphub_items_page_{page}", lambda: self._fetch_items(page),
+            self.cache_fresh, self.cache_grace
+        )
+
+    def _fetch_items(self, page: int) -> Dict[str, Any]:
+        """Busca uma página de itens na API do Scraphub"""
         try:
             url = f"{self.base_url}/items/2/?page={page}"
-            response = requests.get(url, headers=self.headers)
+            response = self.http.get(url, headers=self.headers)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -45,9 +60,16 @@ class ScraphubService:
         Returns:
             Dict[str, Any]: Detalhes do item
         """
+        return self.cache_manager.get_or_fetch(
+            f"scraphub_item_{item_id}", lambda: self._fetch_item_details(item_id),
+            self.cache_fresh, self.cache_grace
+        )
+
+    def _fetch_item_details(self, item_id: str) -> Dict[str, Any]:
+        """Busca os detalhes de um item na API do Scraphub"""
         try:
             url = f"{self.base_url}/items/{item_id}"
-            response = requests.get(url, headers=self.headers)
+            response = self.http.get(url, headers=self.headers)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
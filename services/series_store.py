@@ -0,0 +1,240 @@
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import logger, BCB_SERIES_DIR, BCB_SERIES_REFRESH_TTL
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def to_day(value: Any) -> int:
+    """Converte uma data (``date``, ``datetime`` ou texto dd/mm/aaaa) em dias desde 1970-01-01."""
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%d/%m/%Y").date()
+    if isinstance(value, datetime):
+        value = value.date()
+    return int((np.datetime64(value, "D") - _EPOCH).astype(np.int64))
+
+
+def from_day(day: int) -> date:
+    """Inverso de ``to_day``."""
+    return (_EPOCH + np.timedelta64(int(day), "D")).astype(date)
+
+
+class _Series:
+    """Colunas de uma série: dias (int32, ordenados) e valores (float64), mais a faixa já consultada."""
+
+    __slots__ = ("days", "values", "covered", "updated_at", "mtime")
+
+    def __init__(self):
+        self.days = np.empty(0, dtype=np.int32)
+        self.values = np.empty(0, dtype=np.float64)
+        self.covered: Optional[Tuple[int, int]] = None
+        self.updated_at = 0.0
+        self.mtime = None
+
+
+class SeriesStore:
+    """
+    Armazena séries temporais (ex.: séries do SGS do Banco Central) em colunas numpy.
+
+    Cada série guarda as datas e os valores já baixados e a faixa de datas
+    consultada na origem; ``missing_ranges`` diz o que falta buscar para
+    atender uma janela, e ``window`` devolve a janela direto da memória. Como
+    o último ponto de uma série pode ser publicado depois do fim da faixa já
+    consultada, o trecho após o último ponto é consultado de novo depois de
+    ``refresh_ttl`` segundos.
+
+    As séries ficam em arquivos ``.npz`` (um por código) no diretório, e cada
+    processo recarrega o arquivo quando outro processo o atualiza.
+    """
+
+    def __init__(self, directory: Optional[str] = BCB_SERIES_DIR, refresh_ttl: float = BCB_SERIES_REFRESH_TTL):
+        """
+        Inicializa o armazenamento.
+
+        Args:
+            directory: Diretório dos arquivos das séries (None = só em memória)
+            refresh_ttl: Intervalo para consultar de novo o trecho após o último ponto (segundos)
+        """
+        self.directory = directory
+        self.refresh_ttl = refresh_ttl
+        self._series: Dict[Any, _Series] = {}
+        self._lock = threading.RLock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, code: Any) -> Optional[str]:
+        return os.path.join(self.directory, f"serie_{code}.npz") if self.directory else None
+
+    def _get(self, code: Any) -> _Series:
+        with self._lock:
+            series = self._series.get(code)
+            if series is None:
+                series = self._series[code] = _Series()
+            path = self._path(code)
+            if path and os.path.exists(path):
+                mtime = os.path.getmtime(path)
+                if mtime != series.mtime:
+                    self._load(series, path, mtime)
+            return series
+
+    def _load(self, series: _Series, path: str, mtime: float) -> None:
+        try:
+            with np.load(path) as data:
+                series.days = data["dias"].astype(np.int32)
+                series.values = data["valores"].astype(np.float64)
+                covered = data["coberto"]
+                series.covered = (int(covered[0]), int(covered[1])) if covered.size else None
+                series.updated_at = float(data["atualizado_em"])
+            series.mtime = mtime
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Série ilegível em {path}, será baixada de novo: {e}")
+
+    def _save(self, code: Any, series: _Series) -> None:
+        path = self._path(code)
+        if not path:
+            return
+        partial = path + ".tmp.npz"
+        covered = np.array(series.covered if series.covered else [], dtype=np.int64)
+        np.savez(partial, dias=series.days, valores=series.values, coberto=covered,
+                 atualizado_em=np.float64(series.updated_at))
+        os.replace(partial, path)
+        series.mtime = os.path.getmtime(path)
+
+    def missing_ranges(self, code: Any, start: Any, end: Any) -> List[Tuple[date, date]]:
+        """
+        Retorna as faixas de datas que ainda precisam ser buscadas na origem
+        para atender a janela ``[start, end]``.
+        """
+        start, end = to_day(start), to_day(end)
+        series = self._get(code)
+        if series.covered is None:
+            return [(from_day(start), from_day(end))]
+
+        # A faixa coberta é sempre contígua: as consultas antes dela vão até o seu
+        # início e as depois dela partem do último ponto, mesmo que a janela
+        # pedida comece mais adiante (senão o intervalo entre as duas contaria
+        # como coberto sem nunca ter sido baixado)
+        ranges = []
+        covered_start, covered_end = series.covered
+        if start < covered_start:
+            ranges.append((start, covered_start - 1))
+        # Após o último ponto podem surgir dados novos: consulta de novo quando a
+        # janela passa da faixa coberta ou quando a última consulta envelheceu
+        # (só os pontos dentro da faixa coberta contam)
+        last = np.searchsorted(series.days, covered_end, side="right")
+        tail = int(series.days[last - 1]) + 1 if last else covered_start
+        stale = time.time() - series.updated_at >= self.refresh_ttl
+        if end > covered_end or (stale and end >= tail):
+            ranges.append((tail, end))
+        return [(from_day(a), from_day(b)) for a, b in ranges if a <= b]
+
+    def merge(self, code: Any, points: Iterable[Tuple[Any, float]], start: Any, end: Any) -> int:
+        """
+        Acrescenta os pontos baixados para a faixa ``[start, end]`` e amplia a
+        faixa coberta, quando as duas se tocam ou se sobrepõem.
+
+        Args:
+            code: Código da série
+            points: Pares (data, valor); valores novos substituem os da mesma data
+            start: Início da faixa consultada
+            end: Fim da faixa consultada
+
+        Returns:
+            Quantidade de pontos na série
+        """
+        start, end = to_day(start), to_day(end)
+        points = list(points)
+        new_days = np.fromiter((to_day(day) for day, _ in points), dtype=np.int32, count=len(points))
+        new_values = np.fromiter((float(value) for _, value in points), dtype=np.float64, count=len(points))
+
+        with self._lock:
+            series = self._get(code)
+            days = np.concatenate([new_days, series.days])
+            values = np.concatenate([new_values, series.values])
+            # np.unique fica com a primeira ocorrência: a dos pontos recém-baixados
+            days, index = np.unique(days, return_index=True)
+            series.days, series.values = days.astype(np.int32), values[index]
+            if series.covered is None:
+                series.covered = (start, end)
+            elif start <= series.covered[1] + 1 and end >= series.covered[0] - 1:
+                series.covered = (min(series.covered[0], start), max(series.covered[1], end))
+            # Faixa separada da coberta: os pontos ficam, mas a cobertura continua
+            # contígua e o intervalo entre as duas segue aparecendo em missing_ranges
+            series.updated_at = time.time()
+            self._save(code, series)
+            return int(series.days.size)
+
+    def size(self, code: Any) -> int:
+        """Quantidade de pontos armazenados da série."""
+        return int(self._get(code).days.size)
+
+    def window(self, code: Any, start: Any, end: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retorna (datas ``datetime64[D]``, valores) da série entre ``start`` e ``end``, inclusive.
+
+        Só o que já está armazenado é devolvido (ver ``missing_ranges``).
+        """
+        with self._lock:
+            series = self._get(code)
+            days, values = series.days, series.values
+        left = np.searchsorted(days, to_day(start), side="left")
+        right = np.searchsorted(days, to_day(end), side="right")
+        return _EPOCH + days[left:right].astype("timedelta64[D]"), values[left:right]
+
+    def stats(self) -> Dict[Any, Dict[str, Any]]:
+        """Retorna, por série em memória, o número de pontos e a faixa coberta."""
+        with self._lock:
+            return {
+                code: {
+                    "pontos": int(series.days.size),
+                    "coberto": [from_day(day).isoformat() for day in series.covered] if series.covered else None,
+                    "atualizado_em": series.updated_at
+                }
+                for code, series in self._series.items()
+            }
+
+
+def accumulated_rate(rates: np.ndarray) -> float:
+    """Taxa acumulada (%) de taxas periódicas em % (ex.: IPCA mensal em 12 meses), com capitalização composta."""
+    rates = np.asarray(rates, dtype=np.float64)
+    if rates.size == 0:
+        return 0.0
+    return float((np.prod(1 + rates / 100) - 1) * 100)
+
+
+def accumulated_index(rates: np.ndarray) -> np.ndarray:
+    """Fator acumulado período a período (1.0 = sem variação), útil para corrigir valores ao longo do tempo."""
+    return np.cumprod(1 + np.asarray(rates, dtype=np.float64) / 100)
+
+
+def annualize_rate(rate: float, periods: int = 252) -> float:
+    """Converte uma taxa por período (%) em taxa anual (%); 252 dias úteis por padrão (SELIC diária)."""
+    return float(((1 + rate / 100) ** periods - 1) * 100)
+
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """Média móvel simples; o resultado tem ``len(values) - window + 1`` pontos."""
+    values = np.asarray(values, dtype=np.float64)
+    if window <= 0 or values.size < window:
+        return np.empty(0, dtype=np.float64)
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    return (cumsum[window:] - cumsum[:-window]) / window
+
+
+_store: Optional[SeriesStore] = None
+_store_lock = threading.Lock()
+
+
+def get_series_store() -> SeriesStore:
+    """Retorna o armazenamento de séries compartilhado do processo."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SeriesStore()
+        return _store
@@ -0,0 +1,181 @@
+import hashlib
+import inspect
+import io
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+import aiohttp
+import requests
+
+from config import DOWNLOAD_MAX_BYTES, DOWNLOAD_CHUNK_SIZE
+from services.http_client import get_http_client
+
+# Assinaturas (primeiros bytes) dos formatos de imagem aceitos
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+_HEADER_BYTES = 12
+
+
+class DownloadError(Exception):
+    """Falha no download: status de erro, tamanho excedido ou conteúdo inesperado."""
+
+
+class DownloadTooLargeError(DownloadError):
+    """O conteúdo passou do tamanho máximo permitido."""
+
+
+@dataclass
+class DownloadResult:
+    """Resultado de um download em streaming."""
+    sha256: str
+    size: int
+    format: Optional[str]
+    content_type: Optional[str]
+    path: Optional[str] = None
+    data: Optional[bytes] = None
+
+
+def detect_image_format(header: bytes) -> Optional[str]:
+    """Identifica o formato da imagem pelos primeiros bytes (jpg, png, gif ou webp)."""
+    for signature, image_format in _SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+class _HashingWriter:
+    """Repassa os blocos para ``write`` calculando SHA-256, tamanho e formato."""
+
+    def __init__(self, url: str, write: Callable[[bytes], Any], max_bytes: int):
+        self.url = url
+        self.write = write
+        self.max_bytes = max_bytes
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.header = b""
+
+    def feed(self, chunk: bytes) -> Any:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise DownloadTooLargeError(f"{self.url} excede {self.max_bytes} bytes")
+        if len(self.header) < _HEADER_BYTES:
+            self.header += chunk[:_HEADER_BYTES - len(self.header)]
+        self.hash.update(chunk)
+        return self.write(chunk)
+
+    def result(self, content_type: Optional[str], require_image: bool) -> DownloadResult:
+        image_format = detect_image_format(self.header)
+        if require_image and image_format is None:
+            raise DownloadError(f"{self.url} não é uma imagem reconhecida ({content_type})")
+        return DownloadResult(self.hash.hexdigest(), self.size, image_format, content_type)
+
+
+def _check_length(url: str, content_length: Optional[str], max_bytes: int) -> None:
+    # Content-Length acima do limite aborta antes de baixar qualquer byte
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+        raise DownloadTooLargeError(f"{url} anuncia {content_length} bytes (máximo {max_bytes})")
+
+
+def stream_download(url: str, write: Callable[[bytes], Any], max_bytes: int = DOWNLOAD_MAX_BYTES,
+                    http: Optional[requests.Session] = None, chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+                    require_image: bool = True, **request_kwargs: Any) -> DownloadResult:
+    """
+    Baixa ``url`` em blocos, entregando cada bloco a ``write`` sem manter o corpo em memória.
+
+    Args:
+        url: Endereço do conteúdo
+        write: Recebe cada bloco baixado
+        max_bytes: Tamanho máximo; acima dele o download é abortado
+        http: Sessão HTTP (padrão: cliente compartilhado)
+        chunk_size: Tamanho dos blocos lidos
+        require_image: Exige que o conteúdo seja uma imagem reconhecida
+        request_kwargs: Repassados para ``http.get`` (headers, timeout...)
+
+    Returns:
+        DownloadResult com SHA-256, tamanho, formato e content-type
+
+    Raises:
+        DownloadTooLargeError: O conteúdo passou de ``max_bytes``
+        DownloadError: Status de erro ou conteúdo que não é imagem
+        requests.exceptions.RequestException: Falha de conexão
+    """
+    http = http or get_http_client()
+    with http.get(url, stream=True, **request_kwargs) as response:
+        if response.status_code != 200:
+            raise DownloadError(f"{url} respondeu {response.status_code}")
+        _check_length(url, response.headers.get("Content-Length"), max_bytes)
+        writer = _HashingWriter(url, write, max_bytes)
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            writer.feed(chunk)
+        return writer.result(response.headers.get("Content-Type"), require_image)
+
+
+def download_to_file(url: str, destination: Union[str, Path], **options: Any) -> DownloadResult:
+    """
+    Baixa ``url`` para ``destination`` em streaming (ver ``stream_download``).
+
+    O conteúdo é gravado em um arquivo temporário no mesmo diretório e só
+    substitui o destino quando o download termina bem; em caso de falha nada
+    fica no disco. Se ``destination`` não tiver extensão, a do formato
+    detectado é acrescentada.
+    """
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".part")
+    try:
+        with open(partial, "wb") as f:
+            result = stream_download(url, f.write, **options)
+        if not destination.suffix and result.format:
+            destination = destination.with_suffix(f".{result.format}")
+        os.replace(partial, destination)
+    except BaseException:
+        if partial.exists():
+            partial.unlink()
+        raise
+    result.path = str(destination)
+    return result
+
+
+def download_to_bytes(url: str, **options: Any) -> DownloadResult:
+    """Baixa ``url`` para memória em streaming; o total fica limitado a ``max_bytes``."""
+    buffer = io.BytesIO()
+    result = stream_download(url, buffer.write, **options)
+    result.data = buffer.getvalue()
+    return result
+
+
+async def stream_download_async(session: aiohttp.ClientSession, url: str, write: Callable[[bytes], Any],
+                                max_bytes: int = DOWNLOAD_MAX_BYTES, chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+                                require_image: bool = True, **request_kwargs: Any) -> DownloadResult:
+    """
+    Versão assíncrona de ``stream_download`` para sessões aiohttp.
+
+    ``write`` pode ser uma função comum ou uma corrotina (por exemplo o
+    ``write`` de um upload do GridFS no Motor).
+    """
+    async with session.get(url, **request_kwargs) as response:
+        if response.status != 200:
+            raise DownloadError(f"{url} respondeu {response.status}")
+        _check_length(url, response.headers.get("Content-Length"), max_bytes)
+        writer = _HashingWriter(url, write, max_bytes)
+        async for chunk in response.content.iter_chunked(chunk_size):
+            written = writer.feed(chunk)
+            if inspect.isawaitable(written):
+                await written
+        return writer.result(response.headers.get("Content-Type"), require_image)
+
+
+async def download_to_bytes_async(session: aiohttp.ClientSession, url: str, **options: Any) -> DownloadResult:
+    """Versão assíncrona de ``download_to_bytes``."""
+    buffer = io.BytesIO()
+    result = await stream_download_async(session, url, buffer.write, **options)
+    result.data = buffer.getvalue()
+    return result
@@ -0,0 +1,375 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - dependência opcional
+    redis = None
+
+from config import (logger, SHARED_CACHE_BACKEND, SHARED_CACHE_URL, SHARED_CACHE_PATH,
+                    SHARED_CACHE_LOCAL_TTL, SHARED_CACHE_SYNC_INTERVAL)
+from memory_cache import LRUCache
+
+_MISSING = object()
+
+
+class SharedCacheBackend:
+    """
+    Interface dos backends compartilhados entre processos.
+
+    Valores são bytes; chaves já vêm com o namespace. Além do armazenamento, o
+    backend mantém um log de invalidações para que cada worker descarte de sua
+    camada local as chaves removidas ou regravadas por outro worker.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def publish_invalidation(self, namespace: str, key: str) -> None:
+        raise NotImplementedError
+
+    def last_invalidation(self, namespace: str) -> Any:
+        """Retorna o cursor da invalidação mais recente do namespace."""
+        raise NotImplementedError
+
+    def invalidations_since(self, namespace: str, cursor: Any) -> Tuple[Any, List[str]]:
+        """Retorna (novo cursor, chaves invalidadas depois de ``cursor``)."""
+        raise NotImplementedError
+
+
+class SQLiteBackend(SharedCacheBackend):
+    """
+    Backend local em SQLite (modo WAL), compartilhado pelos workers da mesma máquina.
+    """
+
+    _PURGE_EVERY = 1000
+    _INVALIDATION_RETENTION = 3600
+
+    def __init__(self, path: str = SHARED_CACHE_PATH):
+        """
+        Inicializa o backend.
+
+        Args:
+            path: Caminho do arquivo SQLite
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._writes = 0
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entradas (
+                chave TEXT PRIMARY KEY,
+                valor BLOB NOT NULL,
+                expira_em REAL
+            );
+            CREATE TABLE IF NOT EXISTS invalidacoes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                criada_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_invalidacoes_ns ON invalidacoes (namespace, id);
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Conexão por thread (sqlite3 não compartilha conexões entre threads)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT valor FROM entradas WHERE chave = ? AND (expira_em IS NULL OR expira_em > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entradas (chave, valor, expira_em) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), expires_at)
+        )
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            self.purge()
+
+    def delete(self, key: str) -> None:
+        self._conn().execute("DELETE FROM entradas WHERE chave = ?", (key,))
+
+    def purge(self) -> None:
+        """Remove entradas expiradas e invalidações antigas."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("DELETE FROM entradas WHERE expira_em IS NOT NULL AND expira_em <= ?", (now,))
+        conn.execute("DELETE FROM invalidacoes WHERE criada_em < ?", (now - self._INVALIDATION_RETENTION,))
+
+    def publish_invalidation(self, namespace: str, key: str) -> None:
+        self._conn().execute(
+            "INSERT INTO invalidacoes (namespace, chave, criada_em) VALUES (?, ?, ?)",
+            (namespace, key, time.time())
+        )
+
+    def last_invalidation(self, namespace: str) -> int:
+        row = self._conn().execute(
+            "SELECT MAX(id) FROM invalidacoes WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0] or 0
+
+    def invalidations_since(self, namespace: str, cursor: int) -> Tuple[int, List[str]]:
+        rows = self._conn().execute(
+            "SELECT id, chave FROM invalidacoes WHERE namespace = ? AND id > ? ORDER BY id",
+            (namespace, cursor)
+        ).fetchall()
+        if not rows:
+            return cursor, []
+        return rows[-1][0], [key for _, key in rows]
+
+
+class RedisBackend(SharedCacheBackend):
+    """
+    Backend sobre o protocolo Redis; aceita qualquer servidor compatível
+    (Redis, KeyDB, Dragonfly ou um substituto local para desenvolvimento).
+    """
+
+    _STREAM_MAXLEN = 10000
+
+    def __init__(self, url: str = SHARED_CACHE_URL):
+        """
+        Inicializa o backend.
+
+        Args:
+            url: URL do servidor (ex.: redis://localhost:6379/0)
+        """
+        if redis is None:
+            raise ImportError("O pacote 'redis' é necessário para o backend Redis")
+        self.url = url
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]) -> None:
+        if ttl is not None:
+            self.client.set(key, value, px=max(1, int(ttl * 1000)))
+        else:
+            self.client.set(key, value)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def _stream(self, namespace: str) -> str:
+        return f"{namespace}:invalidacoes"
+
+    def publish_invalidation(self, namespace: str, key: str) -> None:
+        self.client.xadd(self._stream(namespace), {"chave": key},
+                         maxlen=self._STREAM_MAXLEN, approximate=True)
+
+    def last_invalidation(self, namespace: str) -> str:
+        entries = self.client.xrevrange(self._stream(namespace), count=1)
+        return entries[0][0].decode() if entries else "0-0"
+
+    def invalidations_since(self, namespace: str, cursor: str) -> Tuple[str, List[str]]:
+        response = self.client.xread({self._stream(namespace): cursor}, count=self._STREAM_MAXLEN)
+        if not response:
+            return cursor, []
+        entries = response[0][1]
+        keys = [fields[b"chave"].decode() for _, fields in entries]
+        return entries[-1][0].decode(), keys
+
+
+class SharedCache:
+    """
+    Cache compartilhado entre workers, com uma camada local LRU de vida curta.
+
+    Leituras consultam a camada local e depois o backend; escritas e remoções
+    vão para o backend e publicam uma invalidação, que os demais workers
+    aplicam à sua camada local em até ``sync_interval`` segundos. Falhas do
+    backend degradam para a camada local, sem propagar exceções.
+
+    Valores são serializados em JSON.
+    """
+
+    def __init__(self, namespace: str, backend: Optional[SharedCacheBackend] = None,
+                 default_ttl: Optional[float] = None, max_entries: int = 1024,
+                 max_bytes: int = 16 * 1024 * 1024, local_ttl: float = SHARED_CACHE_LOCAL_TTL,
+                 sync_interval: float = SHARED_CACHE_SYNC_INTERVAL, shared: bool = True):
+        """
+        Inicializa o cache.
+
+        Args:
+            namespace: Prefixo das chaves no backend (também usado nas métricas)
+            backend: Backend compartilhado (padrão: configurado em SHARED_CACHE_BACKEND)
+            default_ttl: TTL padrão em segundos (None = sem expiração)
+            max_entries: Número máximo de entradas da camada local
+            max_bytes: Tamanho máximo da camada local, em bytes
+            local_ttl: TTL máximo das entradas da camada local
+            sync_interval: Intervalo (s) entre consultas ao log de invalidações
+            shared: Se False, usa apenas a camada local (sem backend)
+        """
+        self.namespace = namespace
+        self.name = namespace
+        if not shared:
+            backend = None
+        elif backend is None:
+            backend = get_shared_backend()
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.local_ttl = local_ttl
+        self.sync_interval = sync_interval
+        self.local = LRUCache(max_entries, max_bytes, name=namespace)
+
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        self._cursor = self._call(self.backend.last_invalidation, namespace) if self.backend else None
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.errors = 0
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _call(self, fn, *args, default=None):
+        """Executa uma operação no backend, registrando falhas sem propagá-las."""
+        try:
+            return fn(*args)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Falha no cache compartilhado {self.namespace}: {str(e)}")
+            return default
+
+    def _sync(self) -> None:
+        """Aplica à camada local as invalidações publicadas por outros workers."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sync < self.sync_interval:
+                return
+            self._last_sync = now
+            cursor = self._cursor
+        result = self._call(self.backend.invalidations_since, self.namespace, cursor)
+        if not result:
+            return
+        new_cursor, keys = result
+        for key in keys:
+            self.local.delete(key)
+        with self._lock:
+            self._cursor = new_cursor
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Obtém um valor do cache.
+
+        Args:
+            key: Chave do item
+            default: Valor retornado se a chave não existir
+
+        Returns:
+            Valor armazenado ou ``default``
+        """
+        key = str(key)
+        if self.backend is not None:
+            self._sync()
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        if self.backend is None:
+            self.misses += 1
+            return default
+
+        raw = self._call(self.backend.get, self._key(key))
+        if raw is None:
+            self.misses += 1
+            return default
+        value = json.loads(raw)
+        self.hits += 1
+        self.shared_hits += 1
+        self.local.set(key, value, ttl=self.local_ttl, size=len(raw))
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Armazena um valor no cache e invalida as cópias locais dos outros workers.
+
+        Args:
+            key: Chave do item
+            value: Valor serializável em JSON
+            ttl: Tempo de vida em segundos (padrão: ``default_ttl``)
+        """
+        key = str(key)
+        ttl = self.default_ttl if ttl is None else ttl
+        raw = json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        local_ttl = self.local_ttl if ttl is None else min(ttl, self.local_ttl)
+        self.local.set(key, value, ttl=local_ttl, size=len(raw))
+        if self.backend is not None:
+            self._call(self.backend.set, self._key(key), raw, ttl)
+            self._call(self.backend.publish_invalidation, self.namespace, key)
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove uma chave do cache em todos os workers."""
+        key = str(key)
+        existed = self.local.delete(key)
+        if self.backend is not None:
+            self._call(self.backend.delete, self._key(key))
+            self._call(self.backend.publish_invalidation, self.namespace, key)
+        return existed
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do cache e de sua camada local."""
+        total = self.hits + self.misses
+        return {
+            "nome": self.namespace,
+            "backend": type(self.backend).__name__ if self.backend else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hits_compartilhados": self.shared_hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "erros": self.errors,
+            "local": self.local.stats()
+        }
+
+
+_backend_lock = threading.Lock()
+_backend: Optional[SharedCacheBackend] = None
+_backend_loaded = False
+
+
+def get_shared_backend() -> Optional[SharedCacheBackend]:
+    """
+    Retorna o backend compartilhado configurado (instância única por processo).
+
+    SHARED_CACHE_BACKEND aceita "sqlite", "redis" ou "none". Se o backend não
+    puder ser criado, o cache funciona apenas com a camada local.
+    """
+    global _backend, _backend_loaded
+    with _backend_lock:
+        if not _backend_loaded:
+            _backend_loaded = True
+            try:
+                if SHARED_CACHE_BACKEND == "redis":
+                    _backend = RedisBackend(SHARED_CACHE_URL)
+                elif SHARED_CACHE_BACKEND == "sqlite":
+                    _backend = SQLiteBackend(SHARED_CACHE_PATH)
+            except Exception as e:
+                logger.error(f"Cache compartilhado indisponível ({SHARED_CACHE_BACKEND}): {str(e)}")
+                _backend = None
+        return _backend
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from monitoring import metrics_collector
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes para a mesma chave em uma única execução.
+
+    O primeiro chamador (líder) executa a função; os demais aguardam e recebem
+    o mesmo resultado, ou a mesma exceção. O registro das chamadas em andamento
+    é compartilhado entre ``do`` (síncrono) e ``do_async``, de modo que uma
+    thread e uma corrotina pedindo a mesma chave também são agrupadas.
+
+    Chamadores síncronos não devem aguardar, na thread do event loop, uma
+    chave cuja líder seja uma corrotina desse mesmo loop.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        """
+        Inicializa o agrupador.
+
+        Args:
+            name: Nome usado nas métricas
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable):
+        """Retorna (future, é_líder) para a chave."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+                leader = True
+        metrics_collector.record_single_flight(self.name, leader)
+        return future, leader
+
+    def _finish(self, key: Hashable, future: Future, result: Any = None,
+                error: BaseException = None) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            # Future cancelado por fora: o líder ainda devolve o próprio resultado
+            pass
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Executa ``fn`` uma única vez para todas as chamadas concorrentes de ``key``.
+
+        Args:
+            key: Chave da operação (ex.: a chave de cache)
+            fn: Função sem argumentos que produz o resultado
+
+        Returns:
+            Resultado da execução do líder
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Versão assíncrona de ``do``: ``fn`` retorna um awaitable.
+
+        Args:
+            key: Chave da operação (ex.: a chave de cache)
+            fn: Função sem argumentos que retorna um awaitable com o resultado
+
+        Returns:
+            Resultado da execução do líder
+        """
+        future, leader = self._join(key)
+        if not leader:
+            # O cancelamento de um seguidor (ex.: cliente desconectou) não pode
+            # cancelar o Future compartilhado com o líder e os demais
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def in_flight(self) -> int:
+        """Número de chaves com execução em andamento."""
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de agrupamento."""
+        with self._lock:
+            return {
+                "nome": self.name,
+                "em_andamento": len(self._calls),
+                "lideres": self.leaders,
+                "agrupadas": self.coalesced
+            }
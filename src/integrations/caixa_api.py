@@ -1,35 +1,45 @@
 import requests
 from typing import Dict, Optional
 from cache_manager import CacheManager
+from config import CACHE_POLICIES
+from services.http_client import get_http_client
 import logging
 
 logger = logging.getLogger(__name__)
 
 class CaixaImoveisAPI:
-    def __init__(self):
+    def __init__(self, cache_manager: Optional[CacheManager] = None,
+                 http_client: Optional[requests.Session] = None):
         self.base_url = "https://scraphub.comercify.shop/api/items/2/"
         self.api_key = "gAAAAABn3ODQd_A82IRyOyKE_AwEAXITB6TY4Q0lxFVkiG_DxA0Ochmod4g-0jcReIuh2X7DaZLBJ5TbZIpZTxvsXRWuinq_NFxnf3chEWUZiaFPRFfhONMnIB2mtkV3cgDq2TlODXez"
-        self.cache_duration = 3600  # 1 hora em segundos
-        self.cache_manager = CacheManager()
+        self.cache_duration = CACHE_POLICIES['caixa']['fresh']
+        self.cache_grace = CACHE_POLICIES['caixa']['grace']
+        self.cache_manager = cache_manager or CacheManager()
+        self.http = http_client or get_http_client()
 
     def get_imoveis(self, page: int = 1) -> Dict:
-        """Busca imóveis da API da Caixa com cache"""
+        """
+        Busca imóveis da API da Caixa com cache.
+        
+        Páginas vencidas há menos de ``cache_grace`` segundos são devolvidas na
+        hora e atualizadas em segundo plano; só páginas sem cache bloqueiam.
+        """
         cache_key = f"imoveis_caixa_page_{page}"
+        return self.cache_manager.get_or_fetch(
+            cache_key, lambda: self._fetch_imoveis(page), self.cache_duration, self.cache_grace
+        )
         
-        # Tenta buscar do cache primeiro
-        cached_data = self.cache_manager.get(cache_key)
-        if cached_data:
-            return cached_data
-            
-        # Se não estiver em cache, busca da API
+    def _fetch_imoveis(self, page: int, params: Optional[Dict] = None) -> Dict:
+        """Busca uma página de imóveis na API (``params``: filtros extras da consulta)"""
         headers = {
             "X-Api-Key": self.api_key
         }
         
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}?page={page}",
                 headers=headers,
+                params=params,
                 timeout=30  # Timeout de 30 segundos
             )
             response.raise_for_status()
@@ -39,9 +49,6 @@ class CaixaImoveisAPI:
             if not isinstance(data, dict):
                 raise ValueError("Resposta inválida da API")
             
-            # Salva no cache
-            self.cache_manager.set(cache_key, data, self.cache_duration)
-            
             return data
         except requests.exceptions.RequestException as e:
             logger.error(f"Erro ao buscar imóveis da Caixa: {str(e)}")
@@ -3,6 +3,7 @@ import asyncio
 from typing import List, Dict
 import logging
 from src.services.image_service import ImageService
+from services.streaming_download import DownloadError, download_to_bytes_async
 import os
 from dotenv import load_dotenv
 
@@ -29,15 +30,14 @@ class ImageDownloader:
         """Baixa uma imagem e salva no MongoDB"""
         try:
             logger.info(f"Tentando baixar imagem: {image_url}")
-            async with self.session.get(image_url) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-                    image_id = await self.image_service.save_image(property_id, image_url, image_data)
-                    logger.info(f"Imagem salva com sucesso: {image_id}")
-                    return image_id
-                else:
-                    logger.error(f"Erro ao baixar imagem: {response.status}")
-                    return None
+            # Leitura em blocos, limitada ao tamanho máximo, com hash para deduplicação
+            result = await download_to_bytes_async(self.session, image_url)
+            image_id = await self.image_service.save_image(property_id, image_url, result.data, sha256=result.sha256)
+            logger.info(f"Imagem salva com sucesso: {image_id}")
+            return image_id
+        except DownloadError as e:
+            logger.error(f"Erro ao baixar imagem: {e}")
+            return None
         except Exception as e:
             logger.error(f"Erro ao processar imagem: {e}")
             return None
@@ -24,13 +24,24 @@ class ImageService:
         self.db = self.client[self.database]
         self.images = self.db[self.collection]
         
-    async def save_image(self, property_id: str, image_url: str, image_data: bytes) -> str:
-        """Salva uma imagem no MongoDB e retorna o ID do documento"""
+    async def save_image(self, property_id: str, image_url: str, image_data: bytes,
+                         sha256: Optional[str] = None) -> str:
+        """
+        Salva uma imagem no MongoDB e retorna o ID do documento.
+        
+        Com ``sha256``, uma imagem de mesmo conteúdo já salva para o imóvel é
+        reaproveitada em vez de duplicada.
+        """
         try:
+            if sha256:
+                existing = await self.images.find_one({"property_id": property_id, "sha256": sha256}, {"_id": 1})
+                if existing:
+                    return str(existing["_id"])
             result = await self.images.insert_one({
                 "property_id": property_id,
                 "url": image_url,
-                "data": image_data
+                "data": image_data,
+                "sha256": sha256
             })
             return str(result.inserted_id)
         except Exception as e:
@@ -0,0 +1,112 @@
+import unittest
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+from analysis.integrations import ibge_data
+from analysis.integrations.ibge_data import IBGEDataCollector
+from services.agregados_store import AgregadosStore, parse_resultados
+
+CODIGOS = [3500105 + i for i in range(25)]
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """API de agregados simulada: uma série por município pedido; registra quantos municípios cada requisição pediu"""
+    protocol_version = "HTTP/1.1"
+    lotes = []
+
+    def do_GET(self):
+        path = unquote(self.path)
+        variavel = path.split("/variaveis/")[1].split("?")[0]
+        codigos = re.search(r"N6\[([\d,]+)\]", path).group(1).split(",")
+        _StubHandler.lotes.append(len(codigos))
+        # O último município não tem dado publicado
+        series = [{"localidade": {"id": codigo},
+                   "serie": {"2022": "..." if codigo == str(CODIGOS[-1]) else codigo[-3:]}}
+                  for codigo in codigos]
+        body = json.dumps([{"id": variavel, "resultados": [{"series": series}]}]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestAgregadosStore(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.test_dir = tempfile.mkdtemp()
+        self.store = AgregadosStore(os.path.join(self.test_dir, "agregados.db"))
+        self.collector = IBGEDataCollector(agregados_store=self.store, batch_size=10)
+        self.collector.base_url = f"http://127.0.0.1:{self.server.server_port}/api/v3"
+        _StubHandler.lotes = []
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        for codigo in CODIGOS:
+            ibge_data._ibge_cache.delete(f"municipio:{codigo}")
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_batches_fan_out_to_municipalities(self):
+        """Testa que a triagem agrupa os municípios em poucas requisições e distribui os resultados"""
+        dados = self.collector.get_municipios_data(CODIGOS)
+
+        # 25 municípios em lotes de 10, para cada um dos três agregados
+        self.assertEqual(sorted(_StubHandler.lotes), [5, 5, 5, 10, 10, 10, 10, 10, 10])
+        self.assertEqual(set(dados), set(CODIGOS))
+        self.assertEqual(dados[CODIGOS[0]]["demografia"]["populacao"], {"2022": "105"})
+        self.assertEqual(dados[CODIGOS[-1]]["economia"], {})
+
+    def test_stored_values_are_not_fetched_again(self):
+        """Testa que municípios já consultados (com ou sem valores) saem do armazenamento"""
+        self.collector.get_municipios_data(CODIGOS[:20])
+        _StubHandler.lotes = []
+
+        self.collector.get_municipios_data(CODIGOS)
+        self.assertEqual(_StubHandler.lotes, [5, 5, 5])
+
+        _StubHandler.lotes = []
+        self.assertEqual(self.collector._get_dados_demograficos(str(CODIGOS[3]))["populacao"], {"2022": "108"})
+        self.assertEqual(self.collector._get_dados_economicos(str(CODIGOS[-1])), {})
+        self.assertEqual(_StubHandler.lotes, [])
+
+    def test_store_keyed_by_aggregate_variable_period_code(self):
+        """Testa a gravação por (agregado, variável, período, município) e a expiração das consultas"""
+        data = [{"id": "93", "resultados": [{"series": [
+            {"localidade": {"id": "3550308"}, "serie": {"2021": "12396372", "2022": "11451245"}},
+            {"localidade": {"id": "3304557"}, "serie": {"2022": "-"}},
+        ]}]}]
+        self.store.save(6579, 93, [3550308, 3304557], parse_resultados(data, 93))
+
+        self.assertEqual(self.store.serie(6579, 93, "3550308"), {"2021": "12396372", "2022": "11451245"})
+        self.assertEqual(self.store.series(6579, 93, [3304557]), {})
+        self.assertEqual(self.store.missing(6579, 93, [3550308, 3304557, 5300108]), [5300108])
+        self.assertEqual(self.store.stats()["6579/93"]["municipios"], 1)
+
+        self.store.ttl = 0
+        self.assertEqual(self.store.missing(6579, 93, [3550308]), [3550308])
+
+    def test_queries_accept_more_codes_than_sqlite_parameters(self):
+        """Testa consultas com mais municípios que o limite de parâmetros do SQLite"""
+        # Limite padrão de compilações antigas do SQLite (a daqui pode aceitar mais)
+        self.store._conn().setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        codigos = [1100015 + i for i in range(2500)]
+        self.store.save(6579, 9324, codigos[::2], ((codigo, "2022", str(codigo)) for codigo in codigos[::2]))
+
+        self.assertEqual(self.store.missing(6579, 9324, codigos), codigos[1::2])
+        series = self.store.series(6579, 9324, codigos)
+        self.assertEqual(len(series), 1250)
+        self.assertEqual(series[codigos[-2]], {"2022": str(codigos[-2])})
+
+if __name__ == '__main__':
+    unittest.main()
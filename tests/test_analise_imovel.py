@@ -78,5 +78,26 @@ class TestAnaliseImovel(unittest.TestCase):
             await self.analise.analyze_from_documents(docs, {})
         self.assertEqual(str(context.exception), "Dados do imóvel inválidos")
 
+    def test_dados_ibge_fall_back_to_api_when_index_misses(self):
+        """Testa que municípios fora do índice local são resolvidos pela API do IBGE"""
+        self.analise.ibge_collector.get_codigo_municipio = Mock(return_value=4115200)
+
+        dados = self.analise._obter_dados_ibge("Av. Brasil, 100 - Maringá/PR")
+
+        self.analise.ibge_collector.get_codigo_municipio.assert_called_once_with("Maringá", "PR")
+        self.assertEqual(dados["codigo_municipio"], 4115200)
+        self.assertEqual(dados["nome_municipio"], "Maringá")
+        self.assertEqual(dados["uf"], "PR")
+        self.assertEqual(dados["regiao"], "Sul")
+
+    def test_analise_juridica_provisoria_nao_e_memorizada(self):
+        """Testa que o resultado provisório da análise jurídica não vai para o cache de etapas"""
+        self.analise.cache_manager = Mock()
+
+        dados = self.analise._analisar_dados_juridicos("0001234-56.2024", "123", "edital", "matrícula")
+
+        self.assertEqual(dados["status"], "não analisado")
+        self.analise.cache_manager.memoize_stage.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+import requests
+from analysis.integrations.bcb_api import BCBAPI
+from analysis.integrations.ibge_api import IBGEAPI
+from services.async_http_client import run_sync, close_async_http_clients
+from services.series_store import SeriesStore
+
+LATENCIA = 0.2
+
+MUNICIPIO = {
+    "id": 3550308, "nome": "São Paulo",
+    "microrregiao": {"id": 35061, "nome": "São Paulo", "mesorregiao": {
+        "id": 3515, "nome": "Metropolitana de São Paulo", "UF": {
+            "id": 35, "sigla": "SP", "nome": "São Paulo",
+            "regiao": {"id": 3, "sigla": "SE", "nome": "Sudeste"}}}}
+}
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(LATENCIA)
+        if "/localidades/municipios/" in self.path:
+            status, data = 200, MUNICIPIO
+        elif "/projecoes/populacao/" in self.path:
+            status, data = 200, {"projecao": {"populacao": 12325232, "ano": 2020, "periodo": "2020"}}
+        elif ".433/" in self.path:
+            status, data = 404, {"erro": "série não encontrada"}
+        elif "/dados" in self.path:
+            status, data = 200, [{"data": "01/01/2024", "valor": 0.5}]
+        else:
+            status, data = 200, {"valor": 1}
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestAsyncIntegrations(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.ibge = IBGEAPI()
+        self.ibge.base_url = self.base_url
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_complete_city_data_runs_concurrently(self):
+        """Testa que as seis consultas do município são feitas em paralelo"""
+        start = time.perf_counter()
+        result = run_sync(self.ibge.get_complete_city_data_async("3550308"))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(result["informacoes_gerais"]["microrregiao"]["mesorregiao"]["uf"]["sigla"], "SP")
+        self.assertEqual(result["dados_populacionais"]["populacao"], 12325232)
+        self.assertEqual(result["dados_economicos"]["idh"], 1)
+        self.assertLess(elapsed, 6 * LATENCIA * 0.6)
+
+    def test_sync_variant_uses_injected_http_client(self):
+        """Testa que a variante síncrona passa pelo cliente HTTP injetado"""
+        http = MagicMock(wraps=requests.Session())
+        ibge = IBGEAPI(http_client=http)
+        ibge.base_url = self.base_url
+
+        result = ibge.get_complete_city_data("3550308")
+
+        self.assertEqual(result, run_sync(self.ibge.get_complete_city_data_async("3550308")))
+        self.assertGreaterEqual(http.get.call_count, 5)
+
+    def test_async_variant_inside_running_loop(self):
+        """Testa a variante assíncrona e o wrapper síncrono chamado de dentro de um loop"""
+        async def run():
+            direct = await self.ibge.get_population_async("3550308")
+            wrapped = run_sync(self.ibge.get_population_async("3550308"))
+            await close_async_http_clients()
+            return direct, wrapped
+
+        direct, wrapped = asyncio.run(run())
+        self.assertEqual(direct, wrapped)
+        self.assertEqual(direct["ano"], 2020)
+
+    def test_sub_request_error_is_reported(self):
+        """Testa que a falha de uma das séries do BCB é devolvida como erro"""
+        bcb = BCBAPI(series_store=SeriesStore(directory=None))
+        bcb.base_url = f"{self.base_url}/bcdata.sgs"
+
+        result = bcb.get_economic_indicators()
+
+        self.assertEqual(result["message"], "Não foi possível consultar dados de inflação")
+
+if __name__ == '__main__':
+    unittest.main()
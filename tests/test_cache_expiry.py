@@ -0,0 +1,183 @@
+import unittest
+import os
+import shutil
+import threading
+import time
+from cache_expiry import ExpiryIndex, CacheSweeper
+from cache_storage import AppendOnlyStore
+from cache_manager import CacheManager
+from analysis.integrations.cache_manager import CacheManager as IntegrationCacheManager, get_cache_manager
+
+class TestExpiryIndex(unittest.TestCase):
+    def test_pop_due_returns_only_expired_keys(self):
+        """Testa que apenas as chaves vencidas são retornadas, em ordem de prazo"""
+        index = ExpiryIndex()
+        index.push("c", 30)
+        index.push("a", 10)
+        index.push("b", 20)
+
+        self.assertEqual(index.pop_due(25), ["a", "b"])
+        self.assertEqual(len(index), 1)
+        self.assertIn("c", index)
+
+    def test_updated_deadline_replaces_previous(self):
+        """Testa que regravar uma chave invalida o prazo anterior"""
+        index = ExpiryIndex()
+        index.push("a", 10)
+        index.push("a", 50)
+
+        self.assertEqual(index.pop_due(20), [])
+        self.assertEqual(index.next_deadline(), 50)
+        self.assertEqual(index.pop_due(60), ["a"])
+
+    def test_discard(self):
+        """Testa a remoção de uma chave do índice"""
+        index = ExpiryIndex()
+        index.update("a", 10)
+        index.update("a", None)
+
+        self.assertEqual(index.pop_due(20), [])
+        self.assertIsNone(index.next_deadline())
+
+class TestCacheSweeper(unittest.TestCase):
+    def test_trigger_runs_sweep_in_background(self):
+        """Testa que o sweeper executa a limpeza fora da thread chamadora"""
+        called = threading.Event()
+        threads = []
+
+        def sweep():
+            threads.append(threading.current_thread())
+            called.set()
+
+        sweeper = CacheSweeper(sweep, interval=3600)
+        sweeper.start()
+        try:
+            sweeper.trigger()
+            self.assertTrue(called.wait(2))
+            self.assertIsNot(threads[0], threading.current_thread())
+        finally:
+            sweeper.stop(timeout=2)
+        self.assertFalse(sweeper.is_running)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requer os.fork")
+    def test_sweeper_restarts_in_forked_child(self):
+        """Testa que um sweeper ativo volta a rodar no processo filho após o fork"""
+        sweeper = CacheSweeper(lambda: None, interval=3600)
+        sweeper.start()
+        try:
+            pid = os.fork()
+            if pid == 0:
+                os._exit(0 if sweeper.is_running else 1)
+            _, status = os.waitpid(pid, 0)
+            self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        finally:
+            sweeper.stop(timeout=2)
+
+    def test_shared_integration_cache_starts_sweeper(self):
+        """Testa que o cache compartilhado por diretório é único e já limpa em segundo plano"""
+        test_dir = "test_cache_sweeper"
+        cache = get_cache_manager(test_dir)
+        try:
+            self.assertIs(get_cache_manager(test_dir), cache)
+            self.assertTrue(cache._sweeper.is_running)
+        finally:
+            cache.stop_sweeper()
+            shutil.rmtree(test_dir, ignore_errors=True)
+
+class TestDiskLimits(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_cache_expiry"
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_store_evicts_least_recently_used(self):
+        """Testa o despejo LRU do log respeitando o limite de bytes"""
+        store = AppendOnlyStore(os.path.join(self.test_dir, "store.log"))
+        try:
+            for key in ("a", "b", "c"):
+                store.set(key, b"x" * 100, ttl=60)
+            store.get("a")
+
+            evicted = store.evict_lru(store.live_bytes - 1)
+
+            self.assertEqual(evicted, ["b"])
+            self.assertIn("a", store)
+            self.assertIn("c", store)
+        finally:
+            store.close()
+
+    def test_clear_expired_cache_applies_disk_limit(self):
+        """Testa que a limpeza despeja entradas quando o log excede o limite"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        for i in range(5):
+            cache.set(f"pagina_{i}", {"results": list(range(50))})
+        cache.max_disk_bytes = cache.images_store.live_bytes // 2
+
+        totals = cache.clear_expired_cache()
+
+        self.assertGreater(totals["despejados"], 0)
+        self.assertLessEqual(cache.images_store.size_bytes, cache.max_disk_bytes)
+        self.assertIsNone(cache.get("pagina_0"))
+        self.assertEqual(cache.get("pagina_4"), {"results": list(range(50))})
+
+    def test_clear_expired_cache_skips_live_entries(self):
+        """Testa que entradas válidas não são removidas pela limpeza"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.set("curta", {"results": []}, ttl=1)
+        cache.set("longa", {"results": []}, ttl=3600)
+        time.sleep(1.1)
+
+        totals = cache.clear_expired_cache()
+
+        self.assertEqual(totals["expirados"], 1)
+        self.assertEqual(cache.images_store.keys(), ["longa"])
+
+    def test_clear_expired_cache_compacts_only_past_threshold(self):
+        """Testa que a limpeza só reescreve o log quando o espaço morto passa do limite"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.set("curta", {"results": []}, ttl=1)
+        cache.set("longa", {"results": []}, ttl=3600)
+        time.sleep(1.1)
+
+        cache.clear_expired_cache()
+        self.assertGreater(cache.images_store.dead_bytes, 0)
+
+        cache.images_store.compact_min_bytes = 0
+        cache.images_store.compact_ratio = 0
+        cache.clear_expired_cache()
+        self.assertEqual(cache.images_store.dead_bytes, 0)
+        self.assertEqual(cache.images_store.keys(), ["longa"])
+
+    def test_integration_cache_index_seeded_from_existing_files(self):
+        """Testa que o índice de expiração é montado a partir dos arquivos existentes"""
+        cache = IntegrationCacheManager(cache_dir=self.test_dir, ttl_hours=1/3600)
+        cache.set("metodo", {"dado": 1}, param="a")
+        time.sleep(1.1)
+
+        reopened = IntegrationCacheManager(cache_dir=self.test_dir, ttl_hours=1/3600)
+        reopened.clear_expired()
+
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_integration_cache_applies_disk_limit(self):
+        """Testa o despejo LRU dos arquivos de cache das integrações"""
+        cache = IntegrationCacheManager(cache_dir=self.test_dir, ttl_hours=1)
+        for i in range(3):
+            cache.set("metodo", {"dado": "x" * 100}, param=i)
+        cache.memory.clear()
+        cache.get("metodo", param=0)
+        cache.max_disk_bytes = cache._disk_bytes - 1
+
+        cache.clear_expired()
+
+        self.assertIsNotNone(cache.get("metodo", param=0))
+        self.assertIsNone(cache.get("metodo", param=1))
+        self.assertIsNotNone(cache.get("metodo", param=2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ import json
 import time
 from datetime import datetime, timedelta
 from analysis.integrations.cache_manager import CacheManager
+import cache_serializer
 import shutil
 
 class TestCacheManager(unittest.TestCase):
@@ -101,15 +102,55 @@ class TestCacheManager(unittest.TestCase):
         self.cache.set("test_method", test_data, param1="value1")
         
         # Lê o arquivo diretamente
-        cache_path = os.path.join(self.test_cache_dir, "test_method_param1_value1.json")
-        with open(cache_path, 'r') as f:
-            cache_content = json.load(f)
+        key = self.cache._generate_key("test_method", param1="value1")
+        cache_path = self.cache._get_cache_path(key)
+        with open(cache_path, 'rb') as f:
+            cache_content = cache_serializer.loads(f.read())
             
         # Verifica o formato do arquivo
         self.assertIn("timestamp", cache_content)
         self.assertIn("data", cache_content)
         self.assertEqual(cache_content["data"], test_data)
         
+    def test_cache_sharded_layout(self):
+        """Testa o layout em shards com chaves de tamanho fixo"""
+        params = {"lat": -23.55, "lon": -46.63, "categories": ["amenity", "shop"]}
+        self.cache.set("get_pois_nearby", {"pois": []}, **params)
+        
+        key = self.cache._generate_key("get_pois_nearby", **params)
+        self.assertEqual(len(key), 64)
+        self.assertEqual(key, self.cache._generate_key("get_pois_nearby", **dict(reversed(list(params.items())))))
+        
+        shard_dir = os.path.join(self.test_cache_dir, key[:2], key[2:4])
+        self.assertTrue(os.path.exists(os.path.join(shard_dir, f"{key}.bin")))
+        with open(os.path.join(shard_dir, "manifest.json"), 'r') as f:
+            self.assertIn(key, json.load(f))
+            
+    def test_cache_index_rebuilt_from_manifests(self):
+        """Testa a reconstrução do índice a partir dos manifestos dos shards"""
+        self.cache.set("test_method", {"test": "data"}, param1="value1")
+        
+        reopened = CacheManager(cache_dir=self.test_cache_dir, ttl_hours=1)
+        
+        key = reopened._generate_key("test_method", param1="value1")
+        self.assertIn(key, reopened.expiry)
+        self.assertEqual(reopened.get("test_method", param1="value1"), {"test": "data"})
+        
+    def test_legacy_json_entry_is_read(self):
+        """Testa a leitura transparente de entradas gravadas no formato JSON anterior"""
+        key = self.cache._generate_key("test_method", param1="value1")
+        shard_dir = os.path.join(self.test_cache_dir, key[:2], key[2:4])
+        os.makedirs(shard_dir)
+        with open(os.path.join(shard_dir, f"{key}.json"), 'w') as f:
+            json.dump({"timestamp": datetime.now().isoformat(), "data": {"test": "legado"}}, f, indent=2)
+        
+        reopened = CacheManager(cache_dir=self.test_cache_dir, ttl_hours=1)
+        self.assertEqual(reopened.get("test_method", param1="value1"), {"test": "legado"})
+        
+        # Regravar a entrada substitui o arquivo legado
+        reopened.set("test_method", {"test": "novo"}, param1="value1")
+        self.assertFalse(os.path.exists(os.path.join(shard_dir, f"{key}.json")))
+        
     def test_cache_error_handling(self):
         """Testa o tratamento de erros"""
         # Testa com diretório de cache inválido
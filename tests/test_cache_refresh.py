@@ -0,0 +1,78 @@
+import unittest
+import os
+import shutil
+import threading
+import time
+from cache_manager import CacheManager
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_cache_refresh"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.cache = CacheManager(cache_dir=self.test_dir)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_fresh_item_does_not_fetch(self):
+        """Testa que um item atual é servido sem consultar a origem"""
+        calls = []
+        fetch = lambda: calls.append(1) or {"pagina": len(calls)}
+
+        first = self.cache.get_or_fetch("pagina_1", fetch, fresh_ttl=60, grace_ttl=60)
+        second = self.cache.get_or_fetch("pagina_1", fetch, fresh_ttl=60, grace_ttl=60)
+
+        self.assertEqual(first, {"pagina": 1})
+        self.assertEqual(second, {"pagina": 1})
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_item_is_served_and_refreshed_in_background(self):
+        """Testa que um item vencido é servido na hora e atualizado em segundo plano"""
+        self.cache.get_or_fetch("pagina_1", lambda: {"versao": 1}, fresh_ttl=0.2, grace_ttl=60)
+        time.sleep(0.3)
+        refreshed = threading.Event()
+
+        def slow_fetch():
+            time.sleep(0.2)
+            refreshed.set()
+            return {"versao": 2}
+
+        start = time.time()
+        stale = self.cache.get_or_fetch("pagina_1", slow_fetch, fresh_ttl=0.2, grace_ttl=60)
+
+        self.assertEqual(stale, {"versao": 1})
+        self.assertLess(time.time() - start, 0.15)
+        self.assertTrue(refreshed.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(self.cache.get("pagina_1"), {"versao": 2})
+
+    def test_failed_refresh_keeps_stale_item(self):
+        """Testa que uma falha na atualização mantém o item antigo"""
+        self.cache.get_or_fetch("pagina_1", lambda: {"versao": 1}, fresh_ttl=0.2, grace_ttl=60)
+        time.sleep(0.3)
+        attempted = threading.Event()
+
+        def failing_fetch():
+            attempted.set()
+            raise RuntimeError("API indisponível")
+
+        self.cache.get_or_fetch("pagina_1", failing_fetch, fresh_ttl=0.2, grace_ttl=60)
+
+        self.assertTrue(attempted.wait(2))
+        time.sleep(0.1)
+        self.assertEqual(self.cache.get("pagina_1"), {"versao": 1})
+
+    def test_cold_key_blocks_and_propagates_errors(self):
+        """Testa que uma chave sem cache bloqueia e propaga erros da origem"""
+        def failing_fetch():
+            raise RuntimeError("API indisponível")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_fetch("pagina_1", failing_fetch, fresh_ttl=60, grace_ttl=60)
+        self.assertIsNone(self.cache.get("pagina_1"))
+
+if __name__ == '__main__':
+    unittest.main()
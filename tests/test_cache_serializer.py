@@ -0,0 +1,61 @@
+import unittest
+import json
+import zlib
+from cache_serializer import CacheSerializer, FORMAT_VERSION
+
+class TestCacheSerializer(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.serializer = CacheSerializer(encoding="auto", compression="zlib", threshold=256)
+        self.page = {
+            "results": [{"id": i, "city": "São Paulo", "sale_value": "150000.00"} for i in range(100)],
+            "next": None
+        }
+
+    def test_round_trip(self):
+        """Testa que o valor desserializado é igual ao original"""
+        for data in (self.page, {"vazio": {}}, [1, 2.5, "três", None, True]):
+            self.assertEqual(self.serializer.loads(self.serializer.dumps(data)), data)
+
+    def test_header_has_version(self):
+        """Testa que toda entrada começa com o byte de versão"""
+        self.assertEqual(self.serializer.dumps({"a": 1})[0], FORMAT_VERSION)
+
+    def test_large_entries_are_compressed(self):
+        """Testa que entradas acima do limite são comprimidas e menores que o JSON indentado"""
+        raw = self.serializer.dumps(self.page)
+        self.assertEqual(raw[2], ord('z'))
+        self.assertLess(len(raw), len(json.dumps(self.page, indent=2)) / 5)
+
+    def test_small_entries_are_not_compressed(self):
+        """Testa que entradas abaixo do limite não são comprimidas"""
+        self.assertEqual(self.serializer.dumps({"a": 1})[2], ord('-'))
+
+    def test_legacy_json_is_read(self):
+        """Testa a leitura transparente de entradas antigas em JSON"""
+        legacy = json.dumps(self.page, indent=2).encode('utf-8')
+        self.assertEqual(self.serializer.loads(legacy), self.page)
+        self.assertEqual(self.serializer.loads(legacy.decode('utf-8')), self.page)
+
+    def test_unknown_version_is_rejected(self):
+        """Testa que versões desconhecidas geram ValueError"""
+        raw = bytes((FORMAT_VERSION + 1, ord('j'), ord('-'))) + b'{}'
+        with self.assertRaises(ValueError):
+            self.serializer.loads(raw)
+
+    def test_corrupt_body_raises_value_error(self):
+        """Testa que corpo corrompido ou truncado vira ValueError"""
+        raw = self.serializer.dumps(self.page)
+        for corrupted in (raw[:len(raw) // 2], raw[:3] + b"lixo" + raw[7:], raw[:2]):
+            with self.assertRaises(ValueError):
+                self.serializer.loads(corrupted)
+
+    def test_reads_other_configurations(self):
+        """Testa que entradas gravadas com outra configuração continuam legíveis"""
+        raw = CacheSerializer(compression="none").dumps(self.page)
+        self.assertEqual(self.serializer.loads(raw), self.page)
+        body = zlib.compress(json.dumps(self.page).encode('utf-8'))
+        self.assertEqual(self.serializer.loads(bytes((FORMAT_VERSION, ord('j'), ord('z'))) + body), self.page)
+
+if __name__ == '__main__':
+    unittest.main()
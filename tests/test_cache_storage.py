@@ -0,0 +1,210 @@
+import unittest
+import os
+import json
+import shutil
+import time
+from datetime import datetime, timedelta
+from cache_storage import AppendOnlyStore
+from cache_manager import CacheManager
+
+class TestAppendOnlyStore(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_cache_storage"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.path = os.path.join(self.test_dir, "store.log")
+        self.store = AppendOnlyStore(self.path)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        self.store.close()
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_set_and_get(self):
+        """Testa gravação e leitura de um item"""
+        self.store.set("chave", b"valor", ttl=60)
+
+        value, timestamp, ttl = self.store.get("chave")
+
+        self.assertEqual(value, b"valor")
+        self.assertEqual(ttl, 60)
+        self.assertAlmostEqual(timestamp, time.time(), delta=5)
+
+    def test_overwrite_keeps_latest_value(self):
+        """Testa que a última gravação prevalece"""
+        self.store.set("chave", b"v1", ttl=60)
+        self.store.set("chave", b"v2", ttl=60)
+
+        self.assertEqual(self.store.get("chave")[0], b"v2")
+        self.assertEqual(len(self.store), 1)
+        self.assertGreater(self.store.dead_bytes, 0)
+
+    def test_delete(self):
+        """Testa a remoção de um item"""
+        self.store.set("chave", b"valor", ttl=60)
+
+        self.assertTrue(self.store.delete("chave"))
+        self.assertIsNone(self.store.get("chave"))
+        self.assertFalse(self.store.delete("chave"))
+
+    def test_index_rebuilt_on_reopen(self):
+        """Testa a reconstrução do índice a partir do log"""
+        self.store.set("a", b"1", ttl=60)
+        self.store.set("b", b"2", ttl=60)
+        self.store.delete("a")
+        self.store.close()
+
+        self.store = AppendOnlyStore(self.path)
+
+        self.assertIsNone(self.store.get("a"))
+        self.assertEqual(self.store.get("b")[0], b"2")
+
+    def test_compact(self):
+        """Testa que a compactação remove registros mortos e expirados"""
+        for i in range(10):
+            self.store.set("chave", f"valor {i}".encode(), ttl=60)
+        self.store.set("expirada", b"x", ttl=1, timestamp=time.time() - 10)
+        size_before = self.store.size_bytes
+
+        self.store.compact()
+
+        self.assertLess(self.store.size_bytes, size_before)
+        self.assertEqual(self.store.dead_bytes, 0)
+        self.assertEqual(self.store.get("chave")[0], b"valor 9")
+        self.assertIsNone(self.store.get("expirada"))
+
+    def test_torn_tail_is_discarded(self):
+        """Testa que um registro incompleto no fim do log é descartado"""
+        self.store.set("chave", b"valor", ttl=60)
+        self.store.close()
+        with open(self.path, "ab") as f:
+            f.write(b"\xca\x00\x00")
+
+        self.store = AppendOnlyStore(self.path)
+        self.store.set("outra", b"ok", ttl=60)
+
+        self.assertEqual(self.store.get("chave")[0], b"valor")
+        self.assertEqual(self.store.get("outra")[0], b"ok")
+
+    def test_sees_writes_from_other_instance(self):
+        """Testa que escritas de outra instância (outro processo) são vistas"""
+        other = AppendOnlyStore(self.path)
+        try:
+            other.set("chave", b"valor", ttl=60)
+            self.assertEqual(self.store.get("chave")[0], b"valor")
+        finally:
+            other.close()
+
+    def test_clear_is_seen_by_other_instance(self):
+        """Testa que outra instância não lê posições antigas depois de um clear"""
+        other = AppendOnlyStore(self.path, refresh_interval=0)
+        try:
+            self.store.set("k1", b"primeiro valor", ttl=60)
+            self.assertEqual(other.get("k1")[0], b"primeiro valor")
+
+            self.store.clear()
+            self.store.set("k2", b"segundo", ttl=60)
+
+            self.assertIsNone(other.get("k1"))
+            self.assertEqual(other.get("k2")[0], b"segundo")
+        finally:
+            other.close()
+
+    def test_truncated_log_rebuilds_index(self):
+        """Testa que um log que encolheu faz a outra instância refazer o índice"""
+        other = AppendOnlyStore(self.path, refresh_interval=3600)
+        try:
+            self.store.set("k1", b"primeiro valor bem mais longo", ttl=60)
+            self.assertIsNotNone(other.get("k1"))
+
+            os.truncate(self.path, 0)
+            self.store.set("k2", b"v2", ttl=60)
+
+            self.assertIsNone(other.get("k1"))
+            self.assertEqual(other.get("k2")[0], b"v2")
+        finally:
+            other.close()
+
+class TestCacheManagerStorage(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_cache_manager_storage"
+        os.makedirs(self.test_dir, exist_ok=True)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_get_and_set(self):
+        """Testa o cache de imagens sobre o log"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.set("pagina_1", {"results": [1, 2, 3]})
+
+        self.assertEqual(cache.get("pagina_1"), {"results": [1, 2, 3]})
+        self.assertIsNone(cache.get("inexistente"))
+
+    def test_corrupt_entry_is_a_miss(self):
+        """Testa que uma entrada corrompida no log é tratada como ausente e removida"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.set("pagina_1", {"results": list(range(500))})
+        raw = cache.images_store.get("pagina_1")[0]
+        cache.images_memory.clear()
+        cache.images_store.set("pagina_1", raw[:len(raw) // 2], ttl=3600)
+
+        self.assertIsNone(cache.get("pagina_1"))
+        self.assertNotIn("pagina_1", cache.images_store)
+
+    def test_analysis_roundtrip(self):
+        """Testa gravação e leitura de análises"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.save_analysis("edital", "matricula", {"penhora": "não"})
+
+        self.assertEqual(cache.get_cached_analysis("edital", "matricula"), {"penhora": "não"})
+
+    def test_expired_item_is_not_returned(self):
+        """Testa a expiração de itens"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.set("pagina_1", {"results": []}, ttl=1)
+        time.sleep(1.1)
+
+        self.assertIsNone(cache.get("pagina_1"))
+
+    def test_clear_expired_cache(self):
+        """Testa a limpeza das entradas expiradas dos dois caches"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.cache_ttl = 1
+        cache.set("pagina_1", {"results": []})
+        cache.save_analysis("edital", "matricula", {"penhora": "não"})
+        time.sleep(1.1)
+
+        cache.clear_expired_cache()
+
+        self.assertEqual(len(cache.images_store), 0)
+        self.assertEqual(len(cache.analyses_store), 0)
+
+    def test_legacy_json_migration(self):
+        """Testa a importação do cache JSON legado"""
+        legacy = {
+            "pagina_1": {
+                "data": {"results": [1]},
+                "timestamp": datetime.now().isoformat(),
+                "ttl": 3600
+            },
+            "antiga": {
+                "data": {"results": [2]},
+                "timestamp": (datetime.now() - timedelta(days=30)).isoformat(),
+                "ttl": 3600
+            }
+        }
+        with open(os.path.join(self.test_dir, "images_cache.json"), "w") as f:
+            json.dump(legacy, f)
+
+        cache = CacheManager(cache_dir=self.test_dir)
+
+        self.assertEqual(cache.get("pagina_1"), {"results": [1]})
+        self.assertIsNone(cache.get("antiga"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock
+from monitoring import metrics_collector
+from services.catalog_mirror import CatalogMirror, CatalogSync
+
+def _item(item_id, preco=100000, updated_at=None):
+    item = {"id": item_id, "titulo": f"Imóvel {item_id}", "preco": preco}
+    if updated_at:
+        item["updated_at"] = updated_at
+    return item
+
+class _StubCatalog:
+    """Catálogo paginado em memória (4 itens por página), com o filtro por data opcional"""
+
+    def __init__(self, items):
+        self.items = items
+        self.chamadas = []
+
+    def __call__(self, page, params):
+        self.chamadas.append((page, dict(params)))
+        items = self.items
+        if "updated_after" in params:
+            items = [item for item in items if item.get("updated_at", "") >= params["updated_after"]]
+        results = items[(page - 1) * 4:page * 4]
+        return {"count": len(items), "next": None if page * 4 >= len(items) else f"?page={page + 1}",
+                "results": results}
+
+class TestCatalogMirror(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = tempfile.mkdtemp()
+        self.mirror = CatalogMirror("teste", path=os.path.join(self.test_dir, "catalogo.db"))
+        metrics_collector.reset_metrics()
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_full_sync_writes_only_changes_and_tombstones(self):
+        """Testa que a sincronização completa grava só o que mudou e marca os removidos"""
+        origem = _StubCatalog([_item(i) for i in range(1, 11)])
+        sync = CatalogSync(self.mirror, origem, since_param="")
+
+        self.assertEqual(sync.run()["novos"], 10)
+        self.assertTrue(self.mirror.ready())
+
+        origem.items = [_item(i, preco=90000 if i == 2 else 100000) for i in range(2, 12)]
+        counts = sync.run()
+
+        self.assertEqual((counts["novos"], counts["alterados"], counts["inalterados"], counts["removidos"]),
+                         (1, 1, 8, 1))
+        self.assertIsNone(self.mirror.get(1))
+        self.assertEqual(self.mirror.get(1, include_removed=True)["id"], 1)
+        self.assertEqual(self.mirror.get(2)["preco"], 90000)
+        self.assertEqual(self.mirror.stats()["removidos"], 1)
+
+    def test_pages_served_from_mirror(self):
+        """Testa as páginas servidas pelo espelho no formato da origem"""
+        CatalogSync(self.mirror, _StubCatalog([_item(i) for i in range(1, 11)]), since_param="").run()
+
+        primeira = self.mirror.page(1)
+        ultima = self.mirror.page(3)
+
+        self.assertEqual(primeira["count"], 10)
+        self.assertEqual([item["id"] for item in primeira["results"]], [1, 2, 3, 4])
+        self.assertEqual([item["id"] for item in ultima["results"]], [9, 10])
+        self.assertIsNone(ultima["next"])
+
+    def test_incremental_sync_uses_since_param(self):
+        """Testa que a sincronização incremental pede só os itens alterados e não marca removidos"""
+        origem = _StubCatalog([_item(i, updated_at="2025-01-01T00:00:00") for i in range(1, 6)])
+        sync = CatalogSync(self.mirror, origem, since_param="updated_after")
+        sync.run()
+
+        origem.items = [_item(1, preco=1, updated_at="2999-01-01T00:00:00")]
+        origem.chamadas.clear()
+        counts = sync.run()
+
+        self.assertIn("updated_after", origem.chamadas[0][1])
+        self.assertEqual((counts["alterados"], counts["removidos"]), (1, 0))
+        self.assertEqual(self.mirror.stats()["itens"], 5)
+        mudancas = self.mirror.changes_since(0)
+        self.assertEqual(len(mudancas["alterados"]), 5)
+
+    def test_failed_sync_keeps_items_and_reports_lag(self):
+        """Testa que uma varredura interrompida não marca removidos e que o atraso vira métrica"""
+        origem = _StubCatalog([_item(i) for i in range(1, 11)])
+        sync = CatalogSync(self.mirror, origem, since_param="")
+        sync.run()
+
+        sync.fetch_page = MagicMock(side_effect=ConnectionError("API fora do ar"))
+        with self.assertRaises(ConnectionError):
+            sync.run()
+
+        self.assertEqual(self.mirror.stats()["itens"], 10)
+        espelho = metrics_collector.get_metrics()["mirror"]["teste"]
+        self.assertEqual(espelho["sincronizacoes"], 1)
+        self.assertGreaterEqual(espelho["atraso_segundos"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
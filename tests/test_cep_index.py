@@ -0,0 +1,107 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+from analysis.integrations.address_api import AddressAPI
+from services.cep_index import CepIndex
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """ViaCEP simulado: conhece só o CEP 01310-100 e registra os CEPs consultados"""
+    protocol_version = "HTTP/1.1"
+    consultas = []
+
+    def do_GET(self):
+        cep = self.path.strip("/").split("/")[-2]
+        _StubHandler.consultas.append(cep)
+        if cep == "01310100":
+            data = {"cep": "01310-100", "logradouro": "Avenida Paulista", "complemento": "de 612 a 1510 - lado par",
+                    "bairro": "Bela Vista", "localidade": "São Paulo", "uf": "SP", "ibge": "3550308",
+                    "gia": "1004", "ddd": "11", "siafi": "7107"}
+        else:
+            data = {"erro": True}
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestCepIndex(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.test_dir = tempfile.mkdtemp()
+        self.index = CepIndex(os.path.join(self.test_dir, "ceps.db"))
+        self.api = AddressAPI(cep_index=self.index)
+        self.api.base_url = f"http://127.0.0.1:{self.server.server_port}/ws"
+        _StubHandler.consultas = []
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_learns_from_viacep(self):
+        """Testa que cada resposta do ViaCEP (inclusive CEP inexistente) é respondida localmente depois"""
+        primeira = self.api.get_address_info("01310-100")
+        segunda = self.api.get_address_info("01310100")
+        self.assertEqual(primeira, segunda)
+        self.assertEqual(segunda["cidade"], "São Paulo")
+
+        self.assertEqual(self.api.get_address_info("99999999")["error"], "CEP não encontrado")
+        self.assertEqual(self.api.get_address_info("99999999")["error"], "CEP não encontrado")
+        self.assertEqual(_StubHandler.consultas, ["01310100", "99999999"])
+
+        self.index.not_found_ttl = 0
+        self.assertIsNone(self.index.lookup("99999999"))
+
+    def test_bulk_load_and_fast_enrichment(self):
+        """Testa a carga de um CSV e o enriquecimento de um lote inteiro sem consultar o ViaCEP"""
+        path = os.path.join(self.test_dir, "ceps.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("cep;logradouro;bairro;cidade;estado;ibge;ddd\n")
+            for i in range(2000):
+                f.write(f"0{4000000 + i};Rua {i};Centro;São Paulo;SP;3550308;11\n")
+        self.assertEqual(self.index.load_csv(path), 2000)
+        self.assertEqual(self.index.stats()["localidades"], 1)
+
+        enderecos = [f"Rua {i}, 10 - Centro, São Paulo - SP, CEP 0{4000000 + i}" for i in range(2000)]
+        inicio = time.perf_counter()
+        resultados = self.api.enrich_addresses(enderecos)
+        self.assertLess(time.perf_counter() - inicio, 1.0)
+
+        self.assertEqual(resultados[1500]["logradouro"], "Rua 1500")
+        self.assertEqual(resultados[1500]["cep"], "04001-500")
+        self.assertEqual(_StubHandler.consultas, [])
+
+    def test_faixa_answers_when_viacep_is_down(self):
+        """Testa a busca por faixa de CEP e seu uso quando o ViaCEP está indisponível"""
+        self.index.load_faixas([
+            {"cep_inicio": "01000-000", "cep_fim": "05999-999", "localidade": "São Paulo", "uf": "SP",
+             "ibge": "3550308"},
+            {"cep_inicio": "13000000", "cep_fim": "13139999", "localidade": "Campinas", "uf": "SP",
+             "ibge": "3509502"},
+        ])
+        self.assertEqual(self.index.faixa("13010-111")["localidade"], "Campinas")
+        self.assertIsNone(self.index.faixa("12999999"))
+        self.assertIsNone(self.index.faixa("13140000"))
+
+        self.api.http = MagicMock()
+        self.api.http.get.side_effect = requests.exceptions.ConnectionError("ViaCEP fora do ar")
+        resultado = self.api.get_address_info("13010-111")
+        self.assertEqual((resultado["cidade"], resultado["precisao"]), ("Campinas", "faixa"))
+        self.assertIn("error", self.api.get_address_info("20000-000"))
+
+if __name__ == '__main__':
+    unittest.main()
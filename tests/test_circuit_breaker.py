@@ -0,0 +1,88 @@
+import unittest
+import asyncio
+import time
+from unittest.mock import MagicMock
+import requests
+from analysis.integrations.legal_data import LegalData
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+
+def _falha(*args, **kwargs):
+    raise requests.exceptions.ConnectionError("fonte fora do ar")
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.breaker = CircuitBreaker("teste", failure_threshold=3, recovery_timeout=0.1,
+                                      min_timeout=0.05, max_timeout=10, timeout_multiplier=2)
+
+    def _falhar(self, vezes):
+        for _ in range(vezes):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.breaker.call(_falha)
+
+    def test_opens_after_consecutive_failures(self):
+        """Testa que o circuito abre após as falhas seguidas e recusa chamadas na hora"""
+        self._falhar(3)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        chamada = MagicMock()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(chamada)
+        chamada.assert_not_called()
+
+    def test_half_open_probe_closes_or_reopens(self):
+        """Testa a chamada de teste do estado semiaberto"""
+        self._falhar(3)
+        time.sleep(0.12)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self._falhar(1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+        time.sleep(0.12)
+        self.breaker.call(MagicMock(return_value=MagicMock(status_code=200)))
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_server_errors_count_as_failures(self):
+        """Testa que respostas 5xx contam como falha e 4xx não"""
+        self.breaker.call(MagicMock(return_value=MagicMock(status_code=404)))
+        for _ in range(3):
+            self.breaker.call(MagicMock(return_value=MagicMock(status_code=503)))
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_timeout_adapts_to_latency(self):
+        """Testa que o timeout acompanha o percentil da latência recente"""
+        self.assertEqual(self.breaker.timeout, 10)
+        for _ in range(20):
+            self.breaker.record_success(0.2)
+
+        self.assertAlmostEqual(self.breaker.timeout, 0.4)
+        chamada = MagicMock(return_value=MagicMock(status_code=200))
+        self.breaker.call(chamada)
+        self.assertEqual(chamada.call_args.kwargs["timeout"][1], self.breaker.timeout)
+
+    def test_async_call_is_cancelled_at_timeout(self):
+        """Testa que a chamada assíncrona é cancelada no timeout adaptativo e conta como falha"""
+        for _ in range(20):
+            self.breaker.record_success(0.01)
+
+        async def lenta():
+            await asyncio.sleep(1)
+
+        start = time.perf_counter()
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(self.breaker.call_async(lenta))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(self.breaker.stats()["timeouts"], 1)
+
+    def test_integration_skips_open_source(self):
+        """Testa que a integração não chama a fonte com o circuito aberto"""
+        http = MagicMock()
+        legal = LegalData(api_key="chave", http_client=http)
+        legal.breaker = self.breaker
+        self._falhar(3)
+
+        self.assertEqual(legal.obter_dados_processo("0001"), {})
+        http.get.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
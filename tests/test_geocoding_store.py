@@ -0,0 +1,96 @@
+import unittest
+import os
+import shutil
+import tempfile
+from unittest.mock import MagicMock
+import requests
+from analysis.integrations.osm_api import OSMAPI
+from services.geocoding_store import GeocodingStore, normalize_address
+from services.rate_limiter import TokenBucket
+
+def _response(items):
+    response = MagicMock()
+    response.json.return_value = items
+    return response
+
+def _resultado(query):
+    if "inexistente" in query.lower():
+        return []
+    return [{"lat": "-23.5614", "lon": "-46.6559", "display_name": query,
+             "address": {"road": "Avenida Paulista", "house_number": "1000", "city": "São Paulo"}}]
+
+class TestGeocodingStore(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = tempfile.mkdtemp()
+        self.store = GeocodingStore(os.path.join(self.test_dir, "geocodificacao.db"))
+        self.http = MagicMock()
+        self.http.get.side_effect = lambda *a, **kw: _response(_resultado(kw["params"]["q"]))
+        self.osm = OSMAPI(http_client=self.http, geocoding_store=self.store)
+        self.osm.rate_limiter = TokenBucket(rate=1000, burst=100)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_normalized_key(self):
+        """Testa que grafias triviais diferentes do mesmo endereço têm a mesma chave"""
+        chave = normalize_address("Avenida Paulista, 1000 - São Paulo/SP, 01310-100")
+        self.assertEqual(normalize_address("Av.  Paulista, nº 1000, Sao Paulo - SP, CEP 01310100"), chave)
+        self.assertEqual(normalize_address("AV PAULISTA 1000 SÃO PAULO SP 01310-100, Brasil"), chave)
+        self.assertNotEqual(normalize_address("Av. Paulista, 1001 - São Paulo/SP"), chave)
+        self.assertEqual(normalize_address("R. Dr. Arnaldo, s/n"), "rua doutor arnaldo sn")
+
+    def test_results_are_stored_with_confidence_and_source(self):
+        """Testa que o resultado é guardado e respondido sem nova consulta em outra grafia"""
+        primeiro = self.osm.search_location("Av. Paulista, 1000 - São Paulo/SP")
+        segundo = self.osm.search_location("avenida paulista 1000, sao paulo - sp")
+
+        self.assertEqual(self.http.get.call_count, 1)
+        self.assertEqual(primeiro, segundo)
+        self.assertEqual((segundo["lat"], segundo["fonte"], segundo["confianca"]), (-23.5614, "nominatim", 0.9))
+
+        self.assertIsNone(self.osm.search_location("Rua Inexistente, 1"))
+        self.assertIsNone(self.osm.search_location("rua inexistente 1"))
+        self.assertEqual(self.http.get.call_count, 2)
+
+    def test_errors_are_not_stored(self):
+        """Testa que falhas de rede não são guardadas como falta de resultado"""
+        self.http.get.side_effect = requests.exceptions.ConnectionError("sem rede")
+        self.assertIsNone(self.osm.search_location("Rua Augusta, 500"))
+        self.assertIsNone(self.store.lookup("Rua Augusta, 500"))
+
+    def test_batch_runs_once_through_queue(self):
+        """Testa que um lote consulta cada endereço uma única vez e depois é respondido sem consultas"""
+        enderecos = [f"Rua {i}, 10 - Campinas/SP" for i in range(20)]
+        enderecos += [endereco.replace("Rua", "R.") for endereco in enderecos] + ["Rua Inexistente, 1"]
+
+        resultados = self.osm.search_locations(enderecos)
+
+        self.assertEqual(self.http.get.call_count, 21)
+        self.assertEqual(resultados[0], resultados[20])
+        self.assertIsNone(resultados[-1])
+        self.assertEqual(self.store.stats()["fila"], 0)
+
+        self.assertEqual(self.osm.search_locations(enderecos), resultados)
+        self.assertEqual(self.http.get.call_count, 21)
+
+    def test_queue_survives_failures(self):
+        """Testa que a fila mantém os endereços com falha até o limite de tentativas"""
+        self.store.max_attempts = 2
+        self.assertEqual(self.store.enqueue(["Rua A, 1", "R. A, 1", "Rua B, 2"]), 2)
+
+        self.http.get.side_effect = requests.exceptions.ConnectionError("sem rede")
+        self.assertEqual(self.osm.process_geocoding_queue(), 0)
+        self.assertEqual(len(self.store.pending()), 2)
+
+        self.http.get.side_effect = lambda *a, **kw: _response(_resultado(kw["params"]["q"]))
+        self.assertEqual(self.osm.process_geocoding_queue(limit=1), 1)
+        self.assertEqual(self.store.stats()["fila"], 1)
+
+        self.http.get.side_effect = requests.exceptions.ConnectionError("sem rede")
+        self.osm.process_geocoding_queue()
+        self.assertEqual(self.store.stats()["fila"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import threading
+import time
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from monitoring import metrics_collector
+from shared_cache import SharedCache
+from services.http_client import HTTPClient, get_http_client
+
+CORPO_VERSIONADO = b'{"itens": [1, 2, 3]}'
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures = 0
+    versao = "v1"
+    vary = None
+    corpos_enviados = 0
+
+    def do_GET(self):
+        if self.path == "/versionado":
+            etag = f'"{_StubHandler.versao}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            _StubHandler.corpos_enviados += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", etag)
+            if _StubHandler.vary:
+                self.send_header("Vary", _StubHandler.vary)
+            self.send_header("Content-Length", str(len(CORPO_VERSIONADO)))
+            self.end_headers()
+            self.wfile.write(CORPO_VERSIONADO)
+            return
+        if self.path == "/lento":
+            time.sleep(1)
+        if self.path == "/instavel" and _StubHandler.failures > 0:
+            _StubHandler.failures -= 1
+            status, body = 503, b"indisponivel"
+        else:
+            status, body = 200, b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestHTTPClient(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.client = HTTPClient("teste", retries=2, backoff_factor=0,
+                                 revalidation_cache=SharedCache("teste_revalidacao", shared=False))
+        _StubHandler.versao = "v1"
+        _StubHandler.vary = None
+        _StubHandler.corpos_enviados = 0
+        metrics_collector.reset_metrics()
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        """Testa que requisições ao mesmo host reaproveitam a conexão"""
+        for _ in range(5):
+            self.assertEqual(self.client.get(f"{self.base_url}/dados").json(), {"ok": True})
+
+        stats = self.client.pool_stats()[self.base_url]
+        self.assertEqual(stats["requisicoes"], 5)
+        self.assertEqual(stats["conexoes"], 1)
+
+    def test_server_errors_are_retried(self):
+        """Testa que respostas 503 são repetidas com backoff"""
+        _StubHandler.failures = 2
+        response = self.client.get(f"{self.base_url}/instavel")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_StubHandler.failures, 0)
+
+    def test_default_timeout_is_applied(self):
+        """Testa que requisições sem timeout usam o padrão do cliente"""
+        client = HTTPClient("teste_timeout", timeout=(1, 0.2), retries=0)
+        try:
+            with self.assertRaises(requests.exceptions.RequestException):
+                client.get(f"{self.base_url}/lento")
+        finally:
+            client.close()
+
+    def test_conditional_revalidation(self):
+        """Testa que um 304 devolve o corpo guardado e contabiliza os bytes economizados"""
+        url = f"{self.base_url}/versionado"
+        primeira = self.client.get(url)
+        segunda = self.client.get(url)
+
+        self.assertEqual(segunda.status_code, 200)
+        self.assertTrue(segunda.revalidated)
+        self.assertEqual(segunda.json(), primeira.json())
+        self.assertEqual(segunda.headers["Content-Type"], "application/json")
+        self.assertEqual(_StubHandler.corpos_enviados, 1)
+        host = self.base_url.split("//")[1]
+        self.assertEqual(metrics_collector.get_metrics()["revalidation"][host]["bytes_economizados"],
+                         len(CORPO_VERSIONADO))
+
+    def test_changed_resource_is_downloaded(self):
+        """Testa que um recurso alterado é baixado de novo e substitui o guardado"""
+        url = f"{self.base_url}/versionado"
+        self.client.get(url)
+        _StubHandler.versao = "v2"
+
+        response = self.client.get(url)
+        self.assertFalse(getattr(response, "revalidated", False))
+        self.assertTrue(self.client.get(url).revalidated)
+        self.assertEqual(_StubHandler.corpos_enviados, 2)
+
+    def test_stored_body_is_keyed_by_credentials(self):
+        """Testa que o corpo guardado para uma credencial não é reaproveitado por outra"""
+        url = f"{self.base_url}/versionado"
+        self.client.get(url, headers={"Authorization": "Bearer a"})
+
+        response = self.client.get(url, headers={"Authorization": "Bearer b"})
+        self.assertFalse(getattr(response, "revalidated", False))
+        self.assertTrue(self.client.get(url, headers={"Authorization": "Bearer a"}).revalidated)
+        self.assertEqual(_StubHandler.corpos_enviados, 2)
+
+    def test_vary_outside_key_is_not_stored(self):
+        """Testa que respostas com Vary em cabeçalhos fora da chave não são guardadas"""
+        _StubHandler.vary = "X-Tenant"
+        url = f"{self.base_url}/versionado"
+        self.client.get(url)
+
+        self.assertFalse(getattr(self.client.get(url), "revalidated", False))
+        self.assertEqual(_StubHandler.corpos_enviados, 2)
+
+    def test_named_clients_are_shared(self):
+        """Testa que o mesmo nome devolve a mesma instância"""
+        self.assertIs(get_http_client("compartilhado"), get_http_client("compartilhado"))
+        self.assertIsNot(get_http_client("compartilhado"), get_http_client("outro"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -30,6 +30,17 @@ class TestIBGEDataCollector(unittest.TestCase):
         codigo = self.collector.get_codigo_municipio("Cidade Inexistente", "XX")
         self.assertIsNone(codigo)
 
+    def test_buscar_codigo_municipio_uses_localidades_api(self):
+        """Testa que a busca do código usa a API de localidades v1 da UF"""
+        http = MagicMock()
+        http.get.return_value.status_code = 200
+        http.get.return_value.json.return_value = [{"id": 4115200, "nome": "Maringá"}]
+        collector = IBGEDataCollector(http_client=http, agregados_store=MagicMock())
+
+        self.assertEqual(collector._buscar_codigo_municipio("MARINGA", "pr"), 4115200)
+        self.assertEqual(http.get.call_args[0][0],
+                         "https://servicodados.ibge.gov.br/api/v1/localidades/estados/PR/municipios")
+
     @patch('requests.get')
     def test_get_municipio_data_success(self, mock_get):
         # Mock das respostas da API
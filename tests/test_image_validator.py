@@ -0,0 +1,134 @@
+import unittest
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from shared_cache import SharedCache
+from services.image_validator import ImageValidator
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    ativas = 0
+    max_ativas = 0
+    requisicoes = 0
+    erros = {"/instavel": 503, "/ausente": 404, "/limitada": 429}
+
+    def do_HEAD(self):
+        with _StubHandler.lock:
+            _StubHandler.ativas += 1
+            _StubHandler.requisicoes += 1
+            _StubHandler.max_ativas = max(_StubHandler.max_ativas, _StubHandler.ativas)
+        try:
+            if self.path.startswith("/lenta"):
+                time.sleep(0.6)
+            else:
+                time.sleep(0.05)
+            erro = _StubHandler.erros.get(self.path.split(".")[0])
+            if erro is not None:
+                self.send_response(erro)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.path.startswith("/pagina"):
+                content_type, size = "text/html", 4096
+            elif self.path.startswith("/miniatura"):
+                content_type, size = "image/jpeg", 100
+            else:
+                content_type, size = "image/jpeg", 20480
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+        finally:
+            with _StubHandler.lock:
+                _StubHandler.ativas -= 1
+
+    def log_message(self, *args):
+        pass
+
+class TestImageValidator(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.cache = SharedCache("teste_validacao_imagens", shared=False)
+        _StubHandler.max_ativas = 0
+        _StubHandler.requisicoes = 0
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _run(self, urls, deadline=None, per_host=4):
+        async def run():
+            validator = ImageValidator(per_host=per_host, cache=self.cache)
+            try:
+                return await validator.validate_batch(urls, deadline)
+            finally:
+                await validator.close()
+        return asyncio.run(run())
+
+    def test_batch_results(self):
+        """Testa a classificação das URLs e os metadados de cada resultado"""
+        urls = [f"{self.base_url}/foto.jpg", f"{self.base_url}/pagina", f"{self.base_url}/miniatura.jpg"]
+
+        results = self._run(urls)
+
+        self.assertEqual([results[url]["valido"] for url in urls], [True, False, False])
+        self.assertEqual(results[urls[0]]["tamanho"], 20480)
+        self.assertEqual(results[urls[1]]["content_type"], "text/html")
+
+    def test_per_host_limit_and_concurrency(self):
+        """Testa que as URLs são validadas em paralelo respeitando o limite por host"""
+        urls = [f"{self.base_url}/foto{i}.jpg" for i in range(12)]
+
+        start = time.perf_counter()
+        results = self._run(urls, per_host=3)
+        elapsed = time.perf_counter() - start
+
+        self.assertTrue(all(result["valido"] for result in results.values()))
+        self.assertLessEqual(_StubHandler.max_ativas, 3)
+        self.assertLess(elapsed, 12 * 0.05)
+
+    def test_deadline_returns_partial_results(self):
+        """Testa que o prazo devolve resultados parciais e que os resultados ficam em cache"""
+        rapida, lenta = f"{self.base_url}/foto.jpg", f"{self.base_url}/lenta.jpg"
+
+        results = self._run([rapida, lenta], deadline=0.3)
+
+        self.assertTrue(results[rapida]["valido"])
+        self.assertIsNone(results[lenta])
+        requisicoes = _StubHandler.requisicoes
+        self.assertTrue(self._run([rapida])[rapida]["valido"])
+        self.assertEqual(_StubHandler.requisicoes, requisicoes)
+
+    def test_only_definite_answers_are_cached(self):
+        """Testa que 4xx fica em cache e que erros passageiros (5xx) são consultados de novo"""
+        ausente, instavel = f"{self.base_url}/ausente.jpg", f"{self.base_url}/instavel.jpg"
+
+        results = self._run([ausente, instavel])
+
+        self.assertEqual((results[ausente]["status"], results[instavel]["status"]), (404, 503))
+        self.assertIsNotNone(self.cache.get(ausente))
+        self.assertIsNone(self.cache.get(instavel))
+        requisicoes = _StubHandler.requisicoes
+        self._run([ausente, instavel])
+        self.assertEqual(_StubHandler.requisicoes, requisicoes + 1)
+
+    def test_rate_limited_answers_are_not_cached(self):
+        """Testa que 429 é tratado como erro passageiro e consultado de novo"""
+        limitada = f"{self.base_url}/limitada.jpg"
+
+        results = self._run([limitada])
+
+        self.assertEqual(results[limitada]["status"], 429)
+        self.assertIsNone(self.cache.get(limitada))
+        requisicoes = _StubHandler.requisicoes
+        self._run([limitada])
+        self.assertEqual(_StubHandler.requisicoes, requisicoes + 1)
+
+if __name__ == '__main__':
+    unittest.main()
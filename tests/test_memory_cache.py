@@ -0,0 +1,113 @@
+import unittest
+import os
+import shutil
+import time
+from unittest.mock import patch
+from memory_cache import LRUCache, estimate_size
+from cache_manager import CacheManager
+from monitoring import metrics_collector
+
+class TestLRUCache(unittest.TestCase):
+    def test_set_and_get(self):
+        """Testa armazenamento e recuperação"""
+        cache = LRUCache(max_entries=10)
+        cache.set("a", {"valor": 1})
+
+        self.assertEqual(cache.get("a"), {"valor": 1})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("b", "padrao"), "padrao")
+
+    def test_evicts_least_recently_used_by_entries(self):
+        """Testa o despejo LRU pelo limite de entradas"""
+        cache = LRUCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_evicts_by_bytes(self):
+        """Testa o despejo pelo limite de bytes"""
+        cache = LRUCache(max_entries=100, max_bytes=250)
+        cache.set("a", "x", size=100)
+        cache.set("b", "y", size=100)
+        cache.set("c", "z", size=100)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.size_bytes, 200)
+
+    def test_item_larger_than_cache_is_not_stored(self):
+        """Testa que itens maiores que o limite não são armazenados"""
+        cache = LRUCache(max_bytes=10)
+        cache.set("a", "x", size=100)
+
+        self.assertEqual(len(cache), 0)
+
+    def test_ttl(self):
+        """Testa a expiração por TTL"""
+        cache = LRUCache()
+        cache.set("a", 1, ttl=0.1)
+        time.sleep(0.15)
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.expirations, 1)
+
+    def test_stats(self):
+        """Testa as estatísticas de uso"""
+        cache = LRUCache()
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_estimate_size(self):
+        """Testa a estimativa de tamanho de estruturas aninhadas"""
+        small = estimate_size({"a": 1})
+        large = estimate_size({"a": ["x" * 1000, {"b": "y" * 1000}]})
+        self.assertGreater(large, small + 2000)
+
+class TestTwoTierCacheManager(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_two_tier_cache"
+        metrics_collector.reset_metrics()
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_hot_key_served_from_memory(self):
+        """Testa que chaves quentes não vão ao disco"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.set("pagina_1", {"results": [1]})
+
+        with patch.object(cache.images_store, "get") as disk_get:
+            self.assertEqual(cache.get("pagina_1"), {"results": [1]})
+            disk_get.assert_not_called()
+
+        rates = metrics_collector.get_tier_hit_rates()
+        self.assertEqual(rates["imagens.memoria"], 1.0)
+
+    def test_disk_hit_is_promoted_to_memory(self):
+        """Testa a promoção de itens do disco para a memória"""
+        cache = CacheManager(cache_dir=self.test_dir)
+        cache.set("pagina_1", {"results": [1]})
+        cache.images_memory.clear()
+
+        self.assertEqual(cache.get("pagina_1"), {"results": [1]})
+        self.assertIn("pagina_1", cache.images_memory)
+
+        rates = metrics_collector.get_tier_hit_rates()
+        self.assertEqual(rates["imagens.disco"], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
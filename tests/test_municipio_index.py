@@ -0,0 +1,73 @@
+import unittest
+import os
+import time
+from unittest.mock import MagicMock
+from analysis.integrations.ibge_api import IBGEAPI
+from config import IBGE_MUNICIPIOS_PATH
+from services.municipio_index import MunicipioIndex, make_municipio, normalize_name, split_address
+
+class TestMunicipioIndex(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.index = MunicipioIndex([
+            make_municipio(3550308, "São Paulo", 35061, "São Paulo", 3515, "Metropolitana de São Paulo"),
+            make_municipio(2201606, "Bom Jesus"),
+            make_municipio(4302303, "Bom Jesus"),
+            make_municipio(3515103, "Embu-Guaçu"),
+            make_municipio(3545803, "Santa Bárbara d'Oeste"),
+        ])
+
+    def test_lookup_ignores_accents_and_case(self):
+        """Testa a busca por nome sem acentos, sem caixa e com pontuação diferente"""
+        self.assertEqual(self.index.lookup("SAO PAULO", "sp").codigo, 3550308)
+        self.assertEqual(self.index.lookup("santa barbara d oeste", "SP").codigo, 3545803)
+        self.assertEqual(normalize_name("  Embu-Guaçu "), "embu guacu")
+
+    def test_uf_disambiguates_repeated_names(self):
+        """Testa que nomes repetidos só são resolvidos com a UF"""
+        self.assertIsNone(self.index.lookup("Bom Jesus"))
+        self.assertEqual(self.index.lookup("Bom Jesus", "RS").codigo, 4302303)
+        self.assertEqual(len(self.index.candidates("bom jesus")), 2)
+
+    def test_fuzzy_fallback(self):
+        """Testa a busca aproximada para nomes com erros de digitação"""
+        self.assertEqual(self.index.lookup("Sao Paolo", "SP").codigo, 3550308)
+        self.assertIsNone(self.index.lookup("Sao Paolo", "SP", fuzzy=False))
+        self.assertIsNone(self.index.lookup("Curitiba", "SP"))
+
+    def test_hierarchy_and_address(self):
+        """Testa a hierarquia pelo código e a identificação do município em endereços"""
+        hierarquia = self.index.hierarchy("3550308")
+        self.assertEqual(hierarquia["microrregiao"]["mesorregiao"]["uf"]["sigla"], "SP")
+        self.assertEqual(hierarquia["microrregiao"]["mesorregiao"]["uf"]["regiao"]["nome"], "Sudeste")
+
+        self.assertEqual(self.index.find_in_address("Rua A, 10 - Centro - Embu-Guaçu - SP, 06900-000").codigo, 3515103)
+        self.assertEqual(self.index.find_in_address("Av. Paulista, 1000, São Paulo/SP").codigo, 3550308)
+        self.assertIsNone(self.index.find_in_address("Rua sem cidade, 10"))
+
+    def test_split_address(self):
+        """Testa a separação de cidade e UF do fim do endereço"""
+        self.assertEqual(split_address("Av. Brasil, 100 - Maringá/PR, 87013-000"), ("Maringá", "PR"))
+        self.assertEqual(split_address("Rua A, 10 - Centro - Anápolis - go"), ("Anápolis", "GO"))
+        self.assertIsNone(split_address("Rua sem cidade, 10"))
+
+    def test_lookups_are_local_and_fast(self):
+        """Testa que as consultas não acessam a rede e levam microssegundos"""
+        start = time.perf_counter()
+        for _ in range(10000):
+            self.index.lookup("São Paulo", "SP")
+        self.assertLess((time.perf_counter() - start) / 10000, 50e-6)
+
+        ibge = IBGEAPI(http_client=MagicMock())
+        ibge._city_info_local = lambda city_code: self.index.hierarchy(city_code)
+        self.assertEqual(ibge.get_city_info("3550308")["nome"], "São Paulo")
+        ibge.http.get.assert_not_called()
+
+    def test_bundled_file_loads(self):
+        """Testa que o arquivo distribuído com o código é carregado"""
+        index = MunicipioIndex.from_csv(IBGE_MUNICIPIOS_PATH)
+        self.assertTrue(os.path.exists(IBGE_MUNICIPIOS_PATH))
+        self.assertEqual(index.lookup("brasilia", "DF").codigo, 5300108)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import shutil
+from unittest.mock import MagicMock
+import requests
+from analysis.integrations.cache_manager import CacheManager
+from analysis.integrations.osm_api import OSMAPI
+from services.rate_limiter import TokenBucket
+
+LAT, LON = -23.5505, -46.6333
+
+def _response(items):
+    response = MagicMock()
+    response.json.return_value = items
+    return response
+
+def _item(nome, tipo, lat, lon):
+    return {"display_name": nome, "type": tipo, "lat": str(lat), "lon": str(lon)}
+
+class TestOSMPois(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_osm_pois_cache"
+        self.http = MagicMock()
+        self.osm = OSMAPI(http_client=self.http)
+        self.osm.cache = CacheManager(cache_dir=self.test_dir)
+        self.osm.rate_limiter = TokenBucket(rate=1000, burst=100)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def _category(self, call):
+        return call.kwargs["params"]["q"].strip("[]")
+
+    def test_radius_is_honored(self):
+        """Testa que a caixa de busca acompanha o raio e que resultados fora dele são descartados"""
+        self.http.get.return_value = _response([
+            _item("Padaria", "bakery", LAT + 0.001, LON),   # ~110 m
+            _item("Mercado", "supermarket", LAT + 0.004, LON)  # ~445 m
+        ])
+
+        result = self.osm.get_pois_nearby(LAT, LON, radius=200, categories=["shop"])
+
+        self.assertEqual([poi["nome"] for poi in result["pontos_interesse"]], ["Padaria"])
+        viewbox = [float(v) for v in self.http.get.call_args.kwargs["params"]["viewbox"].split(",")]
+        self.assertAlmostEqual(viewbox[3] - viewbox[1], 2 * 200 / 111320, places=6)
+
+    def test_categories_are_cached_independently(self):
+        """Testa o cache por categoria e a atualização parcial"""
+        self.http.get.side_effect = lambda *a, **kw: _response(
+            [_item(kw["params"]["q"], "x", LAT, LON)]
+        )
+        self.osm.get_pois_nearby(LAT, LON, categories=["amenity", "shop"])
+        self.assertEqual(self.http.get.call_count, 2)
+
+        result = self.osm.get_pois_nearby(LAT, LON, categories=["amenity", "shop"], refresh=["shop"])
+
+        self.assertEqual(self.http.get.call_count, 3)
+        self.assertEqual(self._category(self.http.get.call_args), "shop")
+        self.assertEqual(result["total"], 2)
+
+    def test_failed_category_is_reported_and_not_cached(self):
+        """Testa que a falha de uma categoria não descarta as demais nem fica em cache"""
+        def fake_get(*args, **kwargs):
+            if kwargs["params"]["q"] == "[shop]":
+                raise requests.exceptions.ConnectionError("falha")
+            return _response([_item("Praça", "park", LAT, LON)])
+        self.http.get.side_effect = fake_get
+
+        result = self.osm.get_pois_nearby(LAT, LON, categories=["leisure", "shop"])
+
+        self.assertEqual(result["total"], 1)
+        self.assertEqual(result["categorias_com_erro"], ["shop"])
+        self.assertIsNone(self.osm.cache.get("get_pois_category", lat=LAT, lon=LON, radius=1000, category="shop"))
+
+    def test_malformed_category_does_not_drop_others(self):
+        """Testa que resposta malformada ou limite de taxa numa categoria não descarta as demais"""
+        def fake_get(*args, **kwargs):
+            if kwargs["params"]["q"] == "[shop]":
+                return _response([{"display_name": "Sem coordenadas"}])
+            if kwargs["params"]["q"] == "[tourism]":
+                raise TimeoutError("limite de taxa")
+            return _response([_item("Praça", "park", LAT, LON)])
+        self.http.get.side_effect = fake_get
+
+        result = self.osm.get_pois_nearby(LAT, LON, categories=["leisure", "shop", "tourism"])
+
+        self.assertEqual(result["total"], 1)
+        self.assertEqual(result["categorias_com_erro"], ["shop", "tourism"])
+
+if __name__ == '__main__':
+    unittest.main()
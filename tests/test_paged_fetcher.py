@@ -0,0 +1,122 @@
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import requests
+from services.paged_fetcher import PagedFetcher, parse_page
+
+class _StubAPI:
+    """API paginada em memória: 10 itens por página, com atraso e contagem de concorrência"""
+
+    def __init__(self, total_items=95, formato="count", atraso=0.05, falhar_em=None):
+        self.total_items = total_items
+        self.formato = formato
+        self.atraso = atraso
+        self.falhar_em = falhar_em
+        self.lock = threading.Lock()
+        self.ativas = 0
+        self.max_ativas = 0
+        self.paginas = []
+
+    def __call__(self, page):
+        with self.lock:
+            self.ativas += 1
+            self.max_ativas = max(self.max_ativas, self.ativas)
+            self.paginas.append(page)
+        try:
+            time.sleep(self.atraso)
+            if page == self.falhar_em:
+                raise requests.exceptions.ConnectionError("queda da API")
+            items = list(range((page - 1) * 10, min(page * 10, self.total_items)))
+            if self.formato == "lista":
+                return items
+            if self.formato == "404" and not items:
+                response = requests.Response()
+                response.status_code = 404
+                raise requests.exceptions.HTTPError("404", response=response)
+            data = {"results": items}
+            if self.formato == "count":
+                data["count"] = self.total_items
+            elif self.formato == "next":
+                data["next"] = f"/api/items/?page={page + 1}" if page * 10 < self.total_items else None
+            return data
+        finally:
+            with self.lock:
+                self.ativas -= 1
+
+class TestPagedFetcher(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_prefetch_with_total_count(self):
+        """Testa que o total descoberto na primeira página permite buscar as demais em paralelo"""
+        api = _StubAPI()
+
+        start = time.perf_counter()
+        items = PagedFetcher(api, prefetch=4).fetch_all()
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(items, list(range(95)))
+        self.assertEqual(sorted(api.paginas), list(range(1, 11)))
+        self.assertLessEqual(api.max_ativas, 4)
+        self.assertLess(elapsed, 10 * 0.05 * 0.7)
+
+    def test_end_detection_without_total(self):
+        """Testa o fim da coleção pelo link next, pela página menor e pelo 404"""
+        for formato in ("next", "lista", "404"):
+            with self.subTest(formato=formato):
+                api = _StubAPI(total_items=100 if formato == "404" else 95, formato=formato, atraso=0.01)
+
+                items = PagedFetcher(api, prefetch=3).fetch_all()
+
+                self.assertEqual(items, list(range(api.total_items)))
+
+    def test_max_pages_limits_requests(self):
+        """Testa que nenhuma página além do limite é pedida"""
+        api = _StubAPI(formato="lista", atraso=0.01)
+
+        items = PagedFetcher(api, prefetch=4, max_pages=3).fetch_all()
+
+        self.assertEqual(items, list(range(30)))
+        self.assertEqual(max(api.paginas), 3)
+
+    def test_resume_from_checkpoint(self):
+        """Testa que uma coleta interrompida é retomada da página em que parou"""
+        api = _StubAPI(falhar_em=5, atraso=0.01)
+        fetcher = PagedFetcher(api, prefetch=2, checkpoint="teste", checkpoint_dir=self.test_dir)
+        recebidos = []
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            for item in fetcher.iter_items():
+                recebidos.append(item)
+        self.assertEqual(recebidos, list(range(40)))
+        with open(os.path.join(self.test_dir, "teste.json"), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["pagina"], 5)
+
+        api.falhar_em = None
+        api.paginas.clear()
+        fetcher = PagedFetcher(api, prefetch=2, checkpoint="teste", checkpoint_dir=self.test_dir)
+        recebidos.extend(fetcher.iter_items())
+
+        self.assertEqual(recebidos, list(range(95)))
+        self.assertEqual(min(api.paginas), 5)
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_parse_page_formats(self):
+        """Testa a leitura dos formatos de página aceitos"""
+        self.assertEqual(parse_page([1, 2])[0], [1, 2])
+        items, info = parse_page({"items": [1], "total_pages": 3, "next": None})
+        self.assertEqual((items, info["total_pages"], info["next"]), ([1], 3, False))
+        with self.assertRaises(ValueError):
+            parse_page({"erro": "x"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+from monitoring import metrics_collector
+from services.rate_limiter import RateLimiter, SQLiteRateStore, get_rate_limiter, LEAKY
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = tempfile.mkdtemp()
+        metrics_collector.reset_metrics()
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_token_bucket_allows_burst(self):
+        """Testa que o balde de fichas libera a rajada e depois espaça as requisições"""
+        limiter = RateLimiter("token.test", rate=20, burst=3)
+
+        waits = [limiter.acquire() for _ in range(4)]
+
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertAlmostEqual(waits[3], 0.05, delta=0.01)
+
+    def test_leaky_bucket_spaces_requests_and_overflows(self):
+        """Testa que o balde furado espaça as requisições e rejeita além da fila"""
+        limiter = RateLimiter("leaky.test", rate=20, burst=2, mode=LEAKY)
+
+        start = time.perf_counter()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+
+        for _ in range(2):
+            limiter._reserve(None)
+        with self.assertRaises(TimeoutError):
+            limiter.acquire(timeout=10)
+
+    def test_leaky_bucket_without_timeout_waits(self):
+        """Testa que, sem timeout, o balde furado espera a vez mesmo com a fila cheia"""
+        limiter = RateLimiter("leaky.sem_timeout", rate=20, burst=1, mode=LEAKY)
+        for _ in range(3):
+            limiter._reserve(None)
+
+        self.assertAlmostEqual(limiter.acquire(), 0.15, delta=0.03)
+
+    def test_timeout_does_not_consume_quota(self):
+        """Testa que uma espera recusada por timeout não reserva horário"""
+        limiter = RateLimiter("timeout.test", rate=10, burst=1)
+        limiter.acquire()
+
+        with self.assertRaises(TimeoutError):
+            limiter.acquire(timeout=0.01)
+        self.assertAlmostEqual(limiter.acquire(), 0.1, delta=0.02)
+
+    def test_sqlite_store_is_shared(self):
+        """Testa que limitadores com armazenamentos SQLite distintos dividem a mesma cota"""
+        path = os.path.join(self.test_dir, "limites.db")
+        a = RateLimiter("host.test", rate=10, store=SQLiteRateStore(path))
+        b = RateLimiter("host.test", rate=10, store=SQLiteRateStore(path))
+
+        self.assertEqual(a.acquire(), 0.0)
+        self.assertAlmostEqual(b.acquire(), 0.1, delta=0.02)
+
+    def test_async_acquire_and_metrics(self):
+        """Testa a reserva assíncrona e o registro do tempo de espera"""
+        limiter = RateLimiter("async.test", rate=20, burst=1)
+
+        async def run():
+            return await asyncio.gather(*(limiter.acquire_async() for _ in range(3)))
+
+        start = time.perf_counter()
+        waits = asyncio.run(run())
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+        self.assertEqual(sorted(waits)[0], 0.0)
+
+        metricas = metrics_collector.get_metrics()['rate_limit']['async.test']
+        self.assertEqual(metricas['requisicoes'], 3)
+        self.assertEqual(metricas['esperas'], 2)
+        self.assertAlmostEqual(metricas['tempo_espera'], 0.15, delta=0.02)
+
+    def test_limiter_is_shared_per_host(self):
+        """Testa que o mesmo host recebe sempre o mesmo limitador"""
+        self.assertIs(get_rate_limiter("compartilhado.test", rate=5), get_rate_limiter("compartilhado.test"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import json
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import numpy as np
+from analysis.integrations.bcb_api import BCBAPI
+from services.series_store import SeriesStore, accumulated_rate, moving_average, to_day
+
+HOJE = date.today()
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """SGS simulado: um ponto por dia com valor igual ao dia do mês; registra as faixas pedidas"""
+    protocol_version = "HTTP/1.1"
+    faixas = []
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        inicio, fim = query["dataInicial"][0], query["dataFinal"][0]
+        _StubHandler.faixas.append((inicio, fim))
+        dia, ultimo = to_day(inicio), to_day(fim)
+        pontos = []
+        while dia <= ultimo:
+            data = date(1970, 1, 1) + timedelta(days=dia)
+            pontos.append({"data": data.strftime("%d/%m/%Y"), "valor": str(data.day / 100)})
+            dia += 1
+        body = json.dumps(pontos).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestSeriesStore(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.test_dir = tempfile.mkdtemp()
+        self.bcb = BCBAPI(series_store=SeriesStore(self.test_dir))
+        self.bcb.base_url = f"http://127.0.0.1:{self.server.server_port}/bcdata.sgs"
+        _StubHandler.faixas = []
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _data(self, dias_atras):
+        return (HOJE - timedelta(days=dias_atras)).strftime("%d/%m/%Y")
+
+    def test_only_missing_ranges_are_fetched(self):
+        """Testa que consultas repetidas ou sobrepostas baixam só as datas que faltam"""
+        primeira = self.bcb.get_selic_rate(self._data(30), self._data(0))
+        self.bcb.get_selic_rate(self._data(20), self._data(10))
+        self.assertEqual(len(_StubHandler.faixas), 1)
+
+        ampliada = self.bcb.get_selic_rate(self._data(60), self._data(0))
+
+        self.assertEqual(_StubHandler.faixas[1], (self._data(60), self._data(31)))
+        self.assertEqual(len(_StubHandler.faixas), 2)
+        self.assertEqual(len(primeira["dados"]), 31)
+        self.assertEqual(len(ampliada["dados"]), 61)
+        self.assertIsInstance(ampliada["dados"][0]["valor"], float)
+
+    def test_store_persists_between_instances(self):
+        """Testa que outra instância (ou processo) lê as séries já baixadas do disco"""
+        self.bcb.get_inflation(self._data(90), self._data(0))
+
+        outra = BCBAPI(series_store=SeriesStore(self.test_dir))
+        outra.base_url = self.bcb.base_url
+        resultado = outra.get_inflation(self._data(90), self._data(0))
+
+        self.assertEqual(len(_StubHandler.faixas), 1)
+        self.assertEqual(len(resultado["dados"]), 91)
+
+    def test_disjoint_window_fetches_the_gap(self):
+        """Testa que uma janela posterior e separada da coberta também baixa o intervalo entre as duas"""
+        ano = HOJE.year - 2
+        self.bcb.get_selic_rate(f"01/01/{ano}", f"31/12/{ano}")
+        self.bcb.get_selic_rate(f"01/01/{ano + 2}", f"28/02/{ano + 2}")
+
+        self.assertEqual(_StubHandler.faixas[1], (f"01/01/{ano + 1}", f"28/02/{ano + 2}"))
+        store = self.bcb.series
+        self.assertEqual(store.missing_ranges(11, f"01/01/{ano + 1}", f"31/12/{ano + 1}"), [])
+        datas, _ = store.window(11, f"01/01/{ano + 1}", f"31/12/{ano + 1}")
+        self.assertEqual(datas.size, (date(ano + 2, 1, 1) - date(ano + 1, 1, 1)).days)
+
+        outra = SeriesStore(directory=None)
+        outra.merge(11, [(f"01/01/{ano}", 1.0)], f"01/01/{ano}", f"31/01/{ano}")
+        outra.merge(11, [(f"01/01/{ano + 1}", 1.0)], f"01/01/{ano + 1}", f"31/01/{ano + 1}")
+        self.assertEqual(outra.missing_ranges(11, f"01/06/{ano}", f"30/06/{ano}"),
+                         [(date(ano, 1, 2), date(ano, 6, 30))])
+
+    def test_stale_tail_is_refreshed(self):
+        """Testa que, vencido o TTL, só o trecho após o último ponto é consultado de novo"""
+        store = SeriesStore(directory=None, refresh_ttl=0)
+        store.merge(11, [(self._data(5), 1.0)], self._data(10), self._data(0))
+
+        self.assertEqual(store.missing_ranges(11, self._data(10), self._data(0)),
+                         [(HOJE - timedelta(days=4), HOJE)])
+
+    def test_vectorized_helpers(self):
+        """Testa a taxa acumulada e a média móvel"""
+        self.assertAlmostEqual(accumulated_rate([1, 1]), 2.01)
+        np.testing.assert_allclose(moving_average([1, 2, 3, 4], 2), [1.5, 2.5, 3.5])
+        self.assertEqual(moving_average([1], 3).size, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import shutil
+import time
+from unittest.mock import MagicMock, patch
+from analysis.integrations import ibge_data
+from analysis.integrations.ibge_data import IBGEDataCollector
+from services.agregados_store import AgregadosStore
+from services.async_http_client import run_sync
+from shared_cache import SharedCache, SQLiteBackend
+
+class TestSharedCache(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_shared_cache"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.path = os.path.join(self.test_dir, "shared.db")
+        # Cada instância simula um worker, com sua própria conexão ao backend
+        self.worker_a = SharedCache("teste", backend=SQLiteBackend(self.path), sync_interval=0)
+        self.worker_b = SharedCache("teste", backend=SQLiteBackend(self.path), sync_interval=0)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_hit_is_shared_between_workers(self):
+        """Testa que um valor gravado por um worker é lido por outro"""
+        self.worker_a.set("pagina_1", {"properties": [], "totalPages": 1})
+
+        self.assertEqual(self.worker_b.get("pagina_1"), {"properties": [], "totalPages": 1})
+        self.assertEqual(self.worker_b.stats()["hits_compartilhados"], 1)
+
+    def test_invalidation_reaches_local_copies(self):
+        """Testa que regravações e remoções invalidam a camada local dos outros workers"""
+        self.worker_a.set("pagina_1", {"versao": 1})
+        self.assertEqual(self.worker_b.get("pagina_1"), {"versao": 1})
+
+        self.worker_a.set("pagina_1", {"versao": 2})
+        self.assertEqual(self.worker_b.get("pagina_1"), {"versao": 2})
+
+        self.worker_a.delete("pagina_1")
+        self.assertIsNone(self.worker_b.get("pagina_1"))
+
+    def test_ttl_expires_in_backend(self):
+        """Testa que itens expirados não são servidos"""
+        self.worker_a.set("pagina_1", {"versao": 1}, ttl=0.1)
+        time.sleep(0.2)
+
+        self.assertIsNone(self.worker_b.get("pagina_1"))
+        self.assertIsNone(self.worker_a.get("pagina_1"))
+
+    def test_namespaces_are_isolated(self):
+        """Testa que namespaces diferentes não compartilham chaves"""
+        other = SharedCache("outro", backend=SQLiteBackend(self.path), sync_interval=0)
+        self.worker_a.set("chave", "valor")
+
+        self.assertIsNone(other.get("chave"))
+
+    def test_failed_ibge_collection_is_not_shared(self):
+        """Testa que uma coleta do IBGE que falhou em todas as seções não é gravada no cache compartilhado"""
+        coletor = IBGEDataCollector(http_client=MagicMock(),
+                                    agregados_store=AgregadosStore(os.path.join(self.test_dir, "agregados.db")))
+        falha = {"demografia": {}, "economia": {}, "indicadores": {}}
+        with patch.object(ibge_data, "_ibge_cache", self.worker_a), \
+                patch.object(coletor, "_coletar_municipio_data", return_value=falha) as coletar, \
+                patch.object(coletor, "_coletar_municipio_data_async", return_value=falha) as coletar_async:
+            self.assertEqual(coletor.get_municipio_data("3550308"), falha)
+            self.assertEqual(coletor.get_municipio_data("3550308"), falha)
+            self.assertEqual(run_sync(coletor.get_municipio_data_async("3550308")), falha)
+            self.assertEqual(coletar.call_count, 2)
+            coletar_async.assert_called_once()
+
+        self.assertIsNone(self.worker_b.get("municipio:3550308"))
+
+    def test_local_only_mode(self):
+        """Testa o modo sem backend compartilhado"""
+        cache = SharedCache("local", shared=False)
+        cache.set("chave", [1, 2, 3])
+
+        self.assertIsNone(cache.backend)
+        self.assertEqual(cache.get("chave"), [1, 2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
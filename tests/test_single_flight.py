@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+import threading
+import time
+from single_flight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.flight = SingleFlight("teste")
+
+    def test_concurrent_calls_are_coalesced(self):
+        """Testa que chamadas simultâneas executam a função uma única vez"""
+        calls = []
+        results = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.2)
+            return {"pagina": 1}
+
+        threads = [
+            threading.Thread(target=lambda: results.append(self.flight.do("pagina_1", fetch)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"pagina": 1}] * 5)
+        self.assertEqual(self.flight.stats()["agrupadas"], 4)
+        self.assertEqual(self.flight.in_flight(), 0)
+
+    def test_leader_error_is_propagated(self):
+        """Testa que a exceção do líder chega a todos os chamadores"""
+        errors = []
+        started = threading.Event()
+
+        def fetch():
+            started.set()
+            time.sleep(0.2)
+            raise RuntimeError("falha na API")
+
+        def call():
+            try:
+                self.flight.do("pagina_1", fetch)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=call)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(errors, ["falha na API"] * 2)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """Testa que uma nova chamada após o término executa novamente"""
+        self.assertEqual(self.flight.do("chave", lambda: 1), 1)
+        self.assertEqual(self.flight.do("chave", lambda: 2), 2)
+        self.assertEqual(self.flight.stats()["lideres"], 2)
+
+    def test_async_calls_are_coalesced(self):
+        """Testa o agrupamento de corrotinas concorrentes"""
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        async def run():
+            return await asyncio.gather(*(self.flight.do_async("chave", fetch) for _ in range(3)))
+
+        self.assertEqual(asyncio.run(run()), ["ok"] * 3)
+        self.assertEqual(len(calls), 1)
+
+    def test_cancelled_follower_does_not_cancel_others(self):
+        """Testa que cancelar um seguidor não cancela o líder nem os demais seguidores"""
+        async def fetch():
+            await asyncio.sleep(0.2)
+            return "ok"
+
+        async def run():
+            lider = asyncio.ensure_future(self.flight.do_async("chave", fetch))
+            await asyncio.sleep(0)
+            cancelado = asyncio.ensure_future(self.flight.do_async("chave", fetch))
+            seguidor = asyncio.ensure_future(self.flight.do_async("chave", fetch))
+            await asyncio.sleep(0.05)
+            cancelado.cancel()
+            resultados = await asyncio.gather(lider, seguidor)
+            return resultados, cancelado.cancelled()
+
+        resultados, cancelado = asyncio.run(run())
+        self.assertEqual(resultados, ["ok", "ok"])
+        self.assertTrue(cancelado)
+
+if __name__ == '__main__':
+    unittest.main()
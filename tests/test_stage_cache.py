@@ -0,0 +1,71 @@
+import unittest
+import os
+import shutil
+from cache_manager import CacheManager, content_key
+
+class TestContentKey(unittest.TestCase):
+    def test_whitespace_and_unicode_are_normalized(self):
+        """Testa que diferenças de espaços e de forma Unicode geram a mesma chave"""
+        self.assertEqual(
+            content_key("Edital  de\nLeilão"),
+            content_key(" Edital de Leil" + "ã" + "o ")
+        )
+
+    def test_different_splits_do_not_collide(self):
+        """Testa que divisões diferentes do mesmo texto geram chaves diferentes"""
+        self.assertNotEqual(content_key("ab", "c"), content_key("a", "bc"))
+
+class TestStageMemo(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.test_dir = "test_stage_cache"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.cache = CacheManager(cache_dir=self.test_dir)
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_shared_edital_is_parsed_once(self):
+        """Testa que um edital compartilhado por vários lotes é processado uma vez"""
+        calls = []
+        edital = "Edital do leilão 123 com 30 lotes"
+
+        def parse():
+            calls.append(1)
+            return {"lotes": 30}
+
+        results = [self.cache.memoize_stage("edital", parse, edital) for _ in range(30)]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"lotes": 30}] * 30)
+
+    def test_stage_results_survive_restart(self):
+        """Testa que os resultados memorizados são reaproveitados por outra instância"""
+        self.cache.memoize_stage("matricula", lambda: {"onus": []}, "Matrícula 456")
+
+        reopened = CacheManager(cache_dir=self.test_dir)
+        result = reopened.memoize_stage("matricula", lambda: self.fail("não deveria recalcular"), "Matrícula 456")
+
+        self.assertEqual(result, {"onus": []})
+
+    def test_stages_are_isolated(self):
+        """Testa que etapas diferentes sobre o mesmo texto não compartilham resultado"""
+        self.cache.save_stage("edital", {"etapa": "edital"}, "texto")
+
+        self.assertIsNone(self.cache.get_stage("juridico", "texto"))
+        self.assertEqual(self.cache.get_stage("edital", "texto"), {"etapa": "edital"})
+
+    def test_errors_are_not_memoized(self):
+        """Testa que falhas de uma etapa não ficam em cache"""
+        def failing():
+            raise RuntimeError("falha no modelo")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.memoize_stage("resumo_llm", failing, "edital", "matricula")
+
+        self.assertIsNone(self.cache.get_stage("resumo_llm", "edital", "matricula"))
+
+if __name__ == '__main__':
+    unittest.main()
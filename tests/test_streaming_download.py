@@ -0,0 +1,92 @@
+import unittest
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import aiohttp
+from services.streaming_download import (DownloadError, DownloadTooLargeError, download_to_bytes,
+                                         download_to_bytes_async, download_to_file, detect_image_format)
+
+PNG = b"\x89PNG\r\n\x1a\n" + os.urandom(200 * 1024)
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/grande-sem-tamanho":
+            # Sem Content-Length: o limite só pode ser aplicado durante a leitura
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for _ in range(8):
+                bloco = PNG[:64 * 1024]
+                self.wfile.write(f"{len(bloco):x}\r\n".encode() + bloco + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        body, content_type = (b"<html>erro</html>", "text/html") if self.path == "/pagina" else (PNG, "image/png")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TestStreamingDownload(unittest.TestCase):
+    def setUp(self):
+        """Configuração inicial para cada teste"""
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Limpeza após cada teste"""
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_download_to_file_hashes_and_detects_format(self):
+        """Testa o download para disco com hash, formato e extensão detectados"""
+        result = download_to_file(f"{self.base_url}/foto", os.path.join(self.test_dir, "1"))
+
+        self.assertEqual(result.path, os.path.join(self.test_dir, "1.png"))
+        self.assertEqual(result.sha256, hashlib.sha256(PNG).hexdigest())
+        self.assertEqual(result.size, len(PNG))
+        with open(result.path, "rb") as f:
+            self.assertEqual(f.read(), PNG)
+
+    def test_size_cap_aborts_and_leaves_nothing(self):
+        """Testa que downloads acima do limite são abortados, com ou sem Content-Length"""
+        destino = os.path.join(self.test_dir, "grande")
+        with self.assertRaises(DownloadTooLargeError):
+            download_to_file(f"{self.base_url}/foto", destino, max_bytes=100 * 1024)
+        with self.assertRaises(DownloadTooLargeError):
+            download_to_bytes(f"{self.base_url}/grande-sem-tamanho", max_bytes=100 * 1024)
+
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_non_image_is_rejected(self):
+        """Testa que conteúdo que não é imagem é recusado"""
+        with self.assertRaises(DownloadError):
+            download_to_bytes(f"{self.base_url}/pagina")
+        self.assertIsNone(detect_image_format(b"<html>"))
+        self.assertEqual(detect_image_format(b"RIFF\x00\x00\x00\x00WEBPVP8 "), "webp")
+
+    def test_async_download(self):
+        """Testa a variante assíncrona"""
+        async def run():
+            async with aiohttp.ClientSession() as session:
+                return await download_to_bytes_async(session, f"{self.base_url}/foto")
+
+        result = asyncio.run(run())
+        self.assertEqual(result.data, PNG)
+        self.assertEqual(result.format, "png")
+
+if __name__ == '__main__':
+    unittest.main()